@@ -341,68 +341,100 @@ class FinancialAnalysisAgent:
             self.logger.warning(f"股票名称提取失败: {e}")
             return None
     
+    def _financial_data_statement(self, ts_code: str, periods: int) -> Tuple[str, Dict[str, Any]]:
+        """四表联合查询语句"""
+        query = """
+        SELECT 
+            i.ts_code, i.end_date, i.report_type,
+            -- 利润表关键字段
+            COALESCE(i.total_revenue, 0) as total_revenue,
+            COALESCE(i.n_income_attr_p, 0) as n_income_attr_p,
+            COALESCE(i.operate_profit, 0) as operate_profit,
+            -- 资产负债表关键字段  
+            COALESCE(b.total_assets, 0) as total_assets,
+            COALESCE(b.total_liab, 0) as total_liab,
+            COALESCE(b.total_hldr_eqy_inc_min_int, 0) as total_hldr_eqy_inc_min_int,
+            -- 现金流量表关键字段
+            COALESCE(c.n_cashflow_act, 0) as n_cashflow_act,
+            COALESCE(c.n_cashflow_inv_act, 0) as n_cashflow_inv_act,
+            COALESCE(c.n_cash_flows_fnc_act, 0) as n_cash_flows_fnc_act,
+            -- 财务指标关键字段
+            COALESCE(f.roe, 0) as roe,
+            COALESCE(f.roa, 0) as roa,
+            COALESCE(f.debt_to_assets, 0) as debt_to_assets,
+            COALESCE(f.current_ratio, 0) as current_ratio
+        FROM tu_income i
+        LEFT JOIN tu_balancesheet b ON i.ts_code = b.ts_code AND i.end_date = b.end_date
+        LEFT JOIN tu_cashflow c ON i.ts_code = c.ts_code AND i.end_date = c.end_date  
+        LEFT JOIN tu_fina_indicator f ON i.ts_code = f.ts_code AND i.end_date = f.end_date
+        WHERE i.ts_code = :ts_code AND i.report_type = '1'
+        ORDER BY i.end_date DESC
+        LIMIT :periods
+        """
+        return query, {'ts_code': ts_code, 'periods': periods}
+    
+    def _parse_financial_rows(self, results: List[Dict[str, Any]]) -> List[FinancialData]:
+        """将查询结果转换为FinancialData列表"""
+        financial_data = []
+        for row in results:
+            data = FinancialData(
+                ts_code=row['ts_code'],
+                end_date=row['end_date'],
+                report_type=row['report_type'],
+                total_revenue=float(row['total_revenue'] or 0),
+                n_income_attr_p=float(row['n_income_attr_p'] or 0),
+                operate_profit=float(row['operate_profit'] or 0),
+                total_assets=float(row['total_assets'] or 0),
+                total_liab=float(row['total_liab'] or 0),
+                total_hldr_eqy_inc_min_int=float(row['total_hldr_eqy_inc_min_int'] or 0),
+                n_cashflow_act=float(row['n_cashflow_act'] or 0),
+                n_cashflow_inv_act=float(row['n_cashflow_inv_act'] or 0),
+                n_cash_flows_fnc_act=float(row['n_cash_flows_fnc_act'] or 0),
+                roe=float(row['roe'] or 0),
+                roa=float(row['roa'] or 0),
+                debt_to_assets=float(row['debt_to_assets'] or 0),
+                current_ratio=float(row['current_ratio'] or 0)
+            )
+            financial_data.append(data)
+        
+        return financial_data
+    
     def get_financial_data(self, ts_code: str, periods: int = 4) -> List[FinancialData]:
         """获取财务数据 - 四表联合查询"""
         try:
-            query = """
-            SELECT 
-                i.ts_code, i.end_date, i.report_type,
-                -- 利润表关键字段
-                COALESCE(i.total_revenue, 0) as total_revenue,
-                COALESCE(i.n_income_attr_p, 0) as n_income_attr_p,
-                COALESCE(i.operate_profit, 0) as operate_profit,
-                -- 资产负债表关键字段  
-                COALESCE(b.total_assets, 0) as total_assets,
-                COALESCE(b.total_liab, 0) as total_liab,
-                COALESCE(b.total_hldr_eqy_inc_min_int, 0) as total_hldr_eqy_inc_min_int,
-                -- 现金流量表关键字段
-                COALESCE(c.n_cashflow_act, 0) as n_cashflow_act,
-                COALESCE(c.n_cashflow_inv_act, 0) as n_cashflow_inv_act,
-                COALESCE(c.n_cash_flows_fnc_act, 0) as n_cash_flows_fnc_act,
-                -- 财务指标关键字段
-                COALESCE(f.roe, 0) as roe,
-                COALESCE(f.roa, 0) as roa,
-                COALESCE(f.debt_to_assets, 0) as debt_to_assets,
-                COALESCE(f.current_ratio, 0) as current_ratio
-            FROM tu_income i
-            LEFT JOIN tu_balancesheet b ON i.ts_code = b.ts_code AND i.end_date = b.end_date
-            LEFT JOIN tu_cashflow c ON i.ts_code = c.ts_code AND i.end_date = c.end_date  
-            LEFT JOIN tu_fina_indicator f ON i.ts_code = f.ts_code AND i.end_date = f.end_date
-            WHERE i.ts_code = :ts_code AND i.report_type = '1'
-            ORDER BY i.end_date DESC
-            LIMIT :periods
-            """
-            
-            results = self.mysql.execute_query(query, {'ts_code': ts_code, 'periods': periods})
-            
-            financial_data = []
-            for row in results:
-                data = FinancialData(
-                    ts_code=row['ts_code'],
-                    end_date=row['end_date'],
-                    report_type=row['report_type'],
-                    total_revenue=float(row['total_revenue'] or 0),
-                    n_income_attr_p=float(row['n_income_attr_p'] or 0),
-                    operate_profit=float(row['operate_profit'] or 0),
-                    total_assets=float(row['total_assets'] or 0),
-                    total_liab=float(row['total_liab'] or 0),
-                    total_hldr_eqy_inc_min_int=float(row['total_hldr_eqy_inc_min_int'] or 0),
-                    n_cashflow_act=float(row['n_cashflow_act'] or 0),
-                    n_cashflow_inv_act=float(row['n_cashflow_inv_act'] or 0),
-                    n_cash_flows_fnc_act=float(row['n_cash_flows_fnc_act'] or 0),
-                    roe=float(row['roe'] or 0),
-                    roa=float(row['roa'] or 0),
-                    debt_to_assets=float(row['debt_to_assets'] or 0),
-                    current_ratio=float(row['current_ratio'] or 0)
-                )
-                financial_data.append(data)
-            
-            return financial_data
+            query, params = self._financial_data_statement(ts_code, periods)
+            results = self.mysql.execute_query(query, params)
+            return self._parse_financial_rows(results)
             
         except Exception as e:
             self.logger.error(f"获取财务数据失败: {e}")
             return []
     
+    def get_financial_context(self, ts_code: str, periods: int = 4) -> Tuple[List[FinancialData], str]:
+        """
+        批量获取财务分析所需数据：四表联合查询和股票名称在同一连接上执行
+        
+        Returns:
+            (财务数据列表, 股票名称)
+        """
+        try:
+            financial_query, financial_params = self._financial_data_statement(ts_code, periods)
+            results = self.mysql.execute_batch({
+                'financial': (financial_query, financial_params),
+                'stock_basic': (
+                    "SELECT name FROM tu_stock_basic WHERE ts_code = :ts_code LIMIT 1",
+                    {'ts_code': ts_code}
+                )
+            })
+            
+            stock_rows = results['stock_basic']
+            stock_name = stock_rows[0]['name'] if stock_rows and stock_rows[0].get('name') else ts_code
+            return self._parse_financial_rows(results['financial']), stock_name
+            
+        except Exception as e:
+            self.logger.error(f"批量获取财务数据失败: {e}")
+            return [], self._get_stock_name(ts_code)
+    
     def analyze_financial_health(self, ts_code: str) -> Dict[str, Any]:
         """财务健康度分析"""
         try:
@@ -410,7 +442,7 @@ class FinancialAnalysisAgent:
             
             # 获取财务数据
             self.logger.info(f"正在获取 {ts_code} 的财务数据...")
-            financial_data = self.get_financial_data(ts_code, periods=4)
+            financial_data, stock_name = self.get_financial_context(ts_code, periods=4)
             
             if not financial_data:
                 self.logger.warning(f"未找到股票 {ts_code} 的财务数据")
@@ -444,7 +476,6 @@ class FinancialAnalysisAgent:
             
             # 使用LLM生成详细分析
             self.logger.info(f"正在生成LLM分析报告...")
-            stock_name = self._get_stock_name(ts_code)
             analysis_report = self.analysis_chain.invoke({
                 'stock_info': f"{stock_name} ({ts_code})",
                 'analysis_type': '财务健康度分析',
@@ -1264,7 +1295,7 @@ class FinancialAnalysisAgent:
         try:
             self.logger.info(f"开始对 {ts_code} 进行杜邦分析")
             self.logger.info(f"正在获取 {ts_code} 的财务数据...")
-            financial_data = self.get_financial_data(ts_code, periods=4)
+            financial_data, stock_name = self.get_financial_context(ts_code, periods=4)
             
             if not financial_data:
                 self.logger.warning(f"未找到股票 {ts_code} 的财务数据")
@@ -1292,7 +1323,6 @@ class FinancialAnalysisAgent:
             
             # 使用LLM生成详细分析
             self.logger.info(f"正在生成杜邦分析报告...")
-            stock_name = self._get_stock_name(ts_code)
             analysis_report = self.analysis_chain.invoke({
                 'stock_info': f"{stock_name} ({ts_code})",
                 'analysis_type': '杜邦分析 - ROE分解',
@@ -1335,7 +1365,7 @@ class FinancialAnalysisAgent:
         try:
             self.logger.info(f"开始对 {ts_code} 进行现金流质量分析")
             self.logger.info(f"正在获取 {ts_code} 的8期财务数据...")
-            financial_data = self.get_financial_data(ts_code, periods=8)  # 获取更多期数据用于趋势分析
+            financial_data, stock_name = self.get_financial_context(ts_code, periods=8)  # 获取更多期数据用于趋势分析
             
             if not financial_data:
                 self.logger.warning(f"未找到股票 {ts_code} 的财务数据")
@@ -1351,7 +1381,6 @@ class FinancialAnalysisAgent:
             
             # 使用LLM生成详细分析
             self.logger.info(f"正在生成现金流质量分析报告...")
-            stock_name = self._get_stock_name(ts_code)
             analysis_report = self.analysis_chain.invoke({
                 'stock_info': f"{stock_name} ({ts_code})",
                 'analysis_type': '现金流质量分析',
@@ -1383,7 +1412,7 @@ class FinancialAnalysisAgent:
         try:
             self.logger.info(f"开始对 {ts_code} 进行多期财务对比分析")
             self.logger.info(f"正在获取 {ts_code} 的8期财务数据...")
-            financial_data = self.get_financial_data(ts_code, periods=8)  # 获取8期数据进行对比
+            financial_data, stock_name = self.get_financial_context(ts_code, periods=8)  # 获取8期数据进行对比
             
             if len(financial_data) < 2:
                 self.logger.warning(f"股票 {ts_code} 的历史数据不足")
@@ -1399,7 +1428,6 @@ class FinancialAnalysisAgent:
             
             # 使用LLM生成详细分析
             self.logger.info(f"正在生成多期对比分析报告...")
-            stock_name = self._get_stock_name(ts_code)
             analysis_report = self.analysis_chain.invoke({
                 'stock_info': f"{stock_name} ({ts_code})",
                 'analysis_type': '多期财务对比分析',
@@ -5,7 +5,7 @@
 
 import re
 import json
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 import logging
 
@@ -220,6 +220,48 @@ class MoneyFlowAgent:
             self.logger.error(f"提取分析周期失败: {e}")
             return 30
     
+    def _analysis_payload(self, result, ts_code: str, days: int) -> Dict[str, Any]:
+        """分析结果转换为字典格式及报告"""
+        money_flow_data = {
+            'ts_code': ts_code,
+            'analysis_period': f"{days}天",
+            'main_capital': {
+                'net_flow': result.main_capital_net_flow,
+                'flow_trend': result.main_capital_flow_trend,
+                'flow_strength': result.main_capital_flow_strength,
+                'flow_consistency': result.main_capital_flow_consistency
+            },
+            'super_large_orders': {
+                'net_flow': result.super_large_net_flow,
+                'buy_ratio': result.super_large_buy_ratio,
+                'frequency': result.super_large_frequency,
+                'behavior_pattern': result.super_large_behavior_pattern,
+                'dominance': result.super_large_dominance,
+                'price_correlation': result.super_large_vs_price_correlation
+            },
+            'fund_distribution': result.fund_distribution,
+            'assessment': {
+                'overall': result.overall_assessment,
+                'risk_warning': result.risk_warning,
+                'investment_suggestion': result.investment_suggestion
+            }
+        }
+        
+        return {
+            'success': True,
+            'data': money_flow_data,
+            'report': format_money_flow_report(result, ts_code)
+        }
+    
+    def _failed_analysis(self, error: Exception) -> Dict[str, Any]:
+        self.logger.error(f"资金流向分析失败: {error}")
+        return {
+            'success': False,
+            'error': str(error),
+            'data': None,
+            'report': None
+        }
+    
     def analyze_money_flow(self, ts_code: str, days: int = 30) -> Dict[str, Any]:
         """执行资金流向分析"""
         try:
@@ -227,132 +269,140 @@ class MoneyFlowAgent:
             
             # 使用分析器进行分析
             result = self.money_flow_analyzer.analyze_money_flow(ts_code, days)
+            return self._analysis_payload(result, ts_code, days)
             
-            # 转换为字典格式
-            money_flow_data = {
-                'ts_code': ts_code,
-                'analysis_period': f"{days}天",
-                'main_capital': {
-                    'net_flow': result.main_capital_net_flow,
-                    'flow_trend': result.main_capital_flow_trend,
-                    'flow_strength': result.main_capital_flow_strength,
-                    'flow_consistency': result.main_capital_flow_consistency
-                },
-                'super_large_orders': {
-                    'net_flow': result.super_large_net_flow,
-                    'buy_ratio': result.super_large_buy_ratio,
-                    'frequency': result.super_large_frequency,
-                    'behavior_pattern': result.super_large_behavior_pattern,
-                    'dominance': result.super_large_dominance,
-                    'price_correlation': result.super_large_vs_price_correlation
-                },
-                'fund_distribution': result.fund_distribution,
-                'assessment': {
-                    'overall': result.overall_assessment,
-                    'risk_warning': result.risk_warning,
-                    'investment_suggestion': result.investment_suggestion
-                }
-            }
-            
-            return {
-                'success': True,
-                'data': money_flow_data,
-                'report': format_money_flow_report(result, ts_code)
-            }
+        except Exception as e:
+            return self._failed_analysis(e)
+    
+    async def aanalyze_money_flow(self, ts_code: str, days: int = 30) -> Dict[str, Any]:
+        """analyze_money_flow的异步版本（数据获取走异步连接池）"""
+        try:
+            self.logger.info(f"开始资金流向分析: {ts_code}, {days}天")
+            result = await self.money_flow_analyzer.aanalyze_money_flow(ts_code, days)
+            return self._analysis_payload(result, ts_code, days)
             
         except Exception as e:
-            self.logger.error(f"资金流向分析失败: {e}")
-            return {
-                'success': False,
-                'error': str(e),
-                'data': None,
-                'report': None
-            }
+            return self._failed_analysis(e)
+    
+    @staticmethod
+    def _error_result(error: str) -> Dict[str, Any]:
+        return {
+            'success': False,
+            'error': error,
+            'answer': None,
+            'money_flow_data': None
+        }
+    
+    def _parse_question(self, question: str) -> Tuple[Optional[str], int, Optional[str]]:
+        """
+        校验问题并提取股票代码和分析周期
+        
+        Returns:
+            (ts_code, days, 错误信息)，错误信息非空时不进行分析
+        """
+        # 输入验证
+        if not question or not question.strip():
+            return None, 0, '查询问题不能为空'
+        
+        # 判断是否是资金流向查询
+        if not self.is_money_flow_query(question):
+            return None, 0, '这不是资金流向相关的查询'
+        
+        # 提取股票代码
+        ts_code = self.extract_ts_code(question)
+        if not ts_code:
+            return None, 0, '无法识别股票代码，请提供完整的股票代码或公司名称'
+        
+        # 提取分析周期
+        return ts_code, self.extract_analysis_period(question), None
+    
+    def _analysis_chain_inputs(self, question: str, ts_code: str, analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "ts_code": ts_code,
+            "analysis_data": json.dumps(analysis_result['data'], ensure_ascii=False, indent=2),
+            "user_question": question
+        }
+    
+    def _final_result(self, ts_code: str, days: int, analysis_result: Dict[str, Any],
+                      llm_analysis: str) -> Dict[str, Any]:
+        """组合最终答案"""
+        final_answer = analysis_result['report']
+        if llm_analysis:
+            final_answer += f"\n\n### AI深度分析\n{llm_analysis}"
+        
+        return {
+            'success': True,
+            'answer': final_answer,
+            'money_flow_data': analysis_result['data'],
+            'query_type': 'money_flow',
+            'ts_code': ts_code,
+            'analysis_period': days,
+            'error': None
+        }
     
     def query(self, question: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """处理资金流向查询"""
         try:
             self.logger.info(f"处理资金流向查询: {question}")
             
-            # 输入验证
-            if not question or not question.strip():
-                return {
-                    'success': False,
-                    'error': '查询问题不能为空',
-                    'answer': None,
-                    'money_flow_data': None
-                }
-            
-            # 判断是否是资金流向查询
-            if not self.is_money_flow_query(question):
-                return {
-                    'success': False,
-                    'error': '这不是资金流向相关的查询',
-                    'answer': None,
-                    'money_flow_data': None
-                }
-            
-            # 提取股票代码
-            ts_code = self.extract_ts_code(question)
-            if not ts_code:
-                return {
-                    'success': False,
-                    'error': '无法识别股票代码，请提供完整的股票代码或公司名称',
-                    'answer': None,
-                    'money_flow_data': None
-                }
-            
-            # 提取分析周期
-            days = self.extract_analysis_period(question)
+            ts_code, days, error = self._parse_question(question)
+            if error:
+                return self._error_result(error)
             
             # 执行资金流向分析
             analysis_result = self.analyze_money_flow(ts_code, days)
             
             if not analysis_result['success']:
-                return {
-                    'success': False,
-                    'error': analysis_result['error'],
-                    'answer': None,
-                    'money_flow_data': None
-                }
+                return self._error_result(analysis_result['error'])
             
             # 生成LLM分析
             llm_analysis = ""
             if self.llm:
                 try:
                     analysis_chain = self.analysis_prompt | self.llm | StrOutputParser()
-                    llm_analysis = analysis_chain.invoke({
-                        "ts_code": ts_code,
-                        "analysis_data": json.dumps(analysis_result['data'], ensure_ascii=False, indent=2),
-                        "user_question": question
-                    })
+                    llm_analysis = analysis_chain.invoke(
+                        self._analysis_chain_inputs(question, ts_code, analysis_result)
+                    )
                 except Exception as e:
                     self.logger.error(f"LLM分析失败: {e}")
                     llm_analysis = "LLM分析暂时不可用"
             
-            # 组合最终答案
-            final_answer = analysis_result['report']
-            if llm_analysis:
-                final_answer += f"\n\n### AI深度分析\n{llm_analysis}"
-            
-            return {
-                'success': True,
-                'answer': final_answer,
-                'money_flow_data': analysis_result['data'],
-                'query_type': 'money_flow',
-                'ts_code': ts_code,
-                'analysis_period': days,
-                'error': None
-            }
+            return self._final_result(ts_code, days, analysis_result, llm_analysis)
             
         except Exception as e:
             self.logger.error(f"资金流向查询处理失败: {e}")
-            return {
-                'success': False,
-                'error': str(e),
-                'answer': None,
-                'money_flow_data': None
-            }
+            return self._error_result(str(e))
+    
+    async def aquery(self, question: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """query的异步版本（API请求路径使用）：数据获取和LLM调用均不占用事件循环"""
+        try:
+            self.logger.info(f"处理资金流向查询: {question}")
+            
+            ts_code, days, error = self._parse_question(question)
+            if error:
+                return self._error_result(error)
+            
+            analysis_result = await self.aanalyze_money_flow(ts_code, days)
+            
+            if not analysis_result['success']:
+                return self._error_result(analysis_result['error'])
+            
+            llm_analysis = ""
+            if self.llm:
+                try:
+                    analysis_chain = self.analysis_prompt | self.llm | StrOutputParser()
+                    llm_analysis = await analysis_chain.ainvoke(
+                        self._analysis_chain_inputs(question, ts_code, analysis_result)
+                    )
+                except Exception as e:
+                    self.logger.error(f"LLM分析失败: {e}")
+                    llm_analysis = "LLM分析暂时不可用"
+            
+            return self._final_result(ts_code, days, analysis_result, llm_analysis)
+            
+        except Exception as e:
+            self.logger.error(f"资金流向查询处理失败: {e}")
+            return self._error_result(str(e))
     
     def get_stats(self) -> Dict[str, Any]:
         """获取Agent统计信息"""
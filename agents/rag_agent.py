@@ -23,6 +23,11 @@ from langchain.memory import ConversationBufferWindowMemory
 
 from database.milvus_connector import MilvusConnector
 from models.embedding_model import EmbeddingModel
+from rag.lexical_index import get_lexical_index
+from rag.hot_tier_index import get_hot_tier_index
+from rag.retrieval_executor import TieredRetrievalExecutor
+from rag.context_expander import ContextExpander
+from rag.context_builder import ContextBuilder
 from config.settings import settings
 from utils.logger import setup_logger
 from utils.date_intelligence import date_intelligence
@@ -57,9 +62,53 @@ class RAGAgent:
         # 创建分析链
         self.analysis_chain = self._create_analysis_chain()
         
+        # 词法索引（BM25），与向量检索并行查询后RRF融合
+        self.lexical_index = None
+        if settings.LEXICAL_INDEX_ENABLED:
+            try:
+                self.lexical_index = get_lexical_index()
+            except Exception as e:
+                self.logger.warning(f"词法索引加载失败，仅使用向量检索: {e}")
+        
+        # 近期公告热层向量索引（可选）：窗口内的检索在进程内完成
+        self.hot_tier = None
+        if settings.HOT_TIER_ENABLED:
+            try:
+                self.hot_tier = get_hot_tier_index()
+            except Exception as e:
+                self.logger.warning(f"热层索引加载失败，全部检索走Milvus: {e}")
+        
+        # 分级检索：严格/放宽/无过滤三级并发，按优先级取第一个非空级别
+        self.retrieval_executor = TieredRetrievalExecutor(
+            self.milvus,
+            build_filter_expr=self._build_filter_expr,
+            extract_documents=self._extract_documents,
+            lexical_index=self.lexical_index,
+            hot_tier=self.hot_tier
+        )
+        
+        # 邻近chunk上下文扩展：补全被切断的句子和表格
+        self.context_expander = ContextExpander(self.milvus) if settings.CONTEXT_EXPANSION_ENABLED else None
+        
+        # 上下文压缩：合并重叠chunk、折叠近重复句段、按token预算装入
+        self.context_builder = ContextBuilder()
+        
+        # 交叉编码器重排（可选）：过量召回候选后只保留最相关的少数文档进入提示词
+        self.reranker = None
+        if settings.RERANK_ENABLED:
+            try:
+                from models.reranker_model import get_reranker_model
+                self.reranker = get_reranker_model()
+            except Exception as e:
+                self.logger.warning(f"重排模型加载失败，跳过重排阶段: {e}")
+        
         # 初始化统计信息
         self.query_count = 0
         self.success_count = 0
+        self.retrieval_stats = {
+            'hybrid_queries': 0,
+            'lexical_only_hits': 0
+        }
         
         self.logger.info("RAG Agent初始化完成")
     
@@ -160,78 +209,27 @@ class RAGAgent:
                 filters['ts_code'] = parsing_result['stock_code']
                 self.logger.info(f"从日期解析提取股票代码: {parsing_result['stock_code']}")
             
-            # 1. 生成查询向量 (使用处理后的问题)
-            self.logger.info("步骤2: 开始生成查询向量")
-            try:
-                query_vector = self.embedding_model.encode([processed_question])[0].tolist()
-                self.logger.info(f"向量生成成功: 维度={len(query_vector)}")
-            except Exception as e:
-                self.logger.error(f"向量生成失败: {e}")
-                raise
+            # 1-4. 混合检索（向量检索与BM25词法检索并行，RRF融合）
+            self.logger.info("步骤2: 开始混合检索")
+            documents, retrieval_tier = self._hybrid_retrieve(processed_question, filters, top_k)
             
-            # 2. 构建过滤表达式
-            self.logger.info("步骤3: 构建过滤表达式")
-            filter_expr = self._build_filter_expr(filters)
-            self.logger.info(f"过滤表达式: {filter_expr}")
+            if not documents:
+                self.logger.warning("即使无过滤条件也未找到相关文档" if filters else "未找到相关文档")
+                return {
+                    'success': False,
+                    'message': '未找到相关文档，建议检查查询内容或联系管理员' if filters else '未找到相关文档，建议检查查询内容',
+                    'question': question,
+                    'error': 'no_documents_found'
+                }
+            self.logger.info(f"文档检索完成: {len(documents)}个文档")
             
-            # 3. 向量搜索
-            self.logger.info("步骤4: 开始向量搜索")
-            try:
-                search_results = self.milvus.search(
-                    query_vectors=[query_vector],
-                    top_k=top_k,
-                    filter_expr=filter_expr
-                )
-                self.logger.info(f"向量搜索完成: 找到{len(search_results[0]) if search_results else 0}个结果")
-            except Exception as e:
-                self.logger.error(f"向量搜索失败: {e}")
-                raise
-            
-            if not search_results or len(search_results[0]) == 0:
-                self.logger.warning(f"未找到相关文档，过滤条件：{filter_expr}")
-                # 如果有过滤条件导致无结果，尝试不使用过滤条件重新搜索
-                if filter_expr:
-                    self.logger.info("尝试不使用过滤条件重新搜索")
-                    try:
-                        search_results = self.milvus.search(
-                            query_vectors=[query_vector],
-                            top_k=top_k,
-                            filter_expr=None
-                        )
-                        if search_results and len(search_results[0]) > 0:
-                            self.logger.info(f"无过滤条件搜索成功: 找到{len(search_results[0])}个结果")
-                        else:
-                            self.logger.warning("即使无过滤条件也未找到相关文档")
-                            return {
-                                'success': False,
-                                'message': '未找到相关文档，建议检查查询内容或联系管理员',
-                                'question': question,
-                                'error': 'no_documents_found'
-                            }
-                    except Exception as e:
-                        self.logger.error(f"无过滤条件搜索也失败: {e}")
-                        return {
-                            'success': False,
-                            'message': f'文档搜索失败: {str(e)}',
-                            'question': question,
-                            'error': 'search_failed'
-                        }
-                else:
-                    return {
-                        'success': False,
-                        'message': '未找到相关文档，建议检查查询内容',
-                        'question': question,
-                        'error': 'no_documents_found'
-                    }
-            
-            # 4. 提取文档内容
-            self.logger.info("步骤5: 提取文档内容")
-            documents = self._extract_documents(search_results[0])
-            self.logger.info(f"文档提取完成: {len(documents)}个文档")
+            if self.context_expander is not None:
+                documents = self.context_expander.expand(documents)
+                self.logger.info(f"上下文扩展完成: {len(documents)}个窗口")
             
             # 5. 生成答案
             self.logger.info("步骤6: 生成答案")
-            context = self._format_context(documents)
+            context, compression = self.context_builder.build(documents)
             chat_history = self._get_chat_history()
             
             # 调用QA Chain并智能提取答案
@@ -270,6 +268,8 @@ class RAGAgent:
                 'answer': answer,
                 'sources': self._format_sources(documents),
                 'document_count': len(documents),
+                'retrieval_tier': retrieval_tier,
+                'context_compression': compression,
                 'type': 'rag_query',
                 'processing_time': time.time() - start_time
             }
@@ -296,6 +296,121 @@ class RAGAgent:
                 'processing_time': time.time() - start_time
             }
     
+    def _hybrid_retrieve(self, question: str, filters: Optional[Dict[str, Any]],
+                         top_k: int) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        混合检索：向量检索与词法检索并行执行，按RRF融合
+        
+        严格、放宽（仅股票代码）、无过滤三级检索并发执行，取第一个非空级别
+        
+        Returns:
+            (文档列表, 命中的检索级别)
+        """
+        limit = top_k * settings.HYBRID_CANDIDATE_MULTIPLIER
+        if self.reranker is not None:
+            limit = max(limit, settings.RERANK_CANDIDATES)
+        
+        two_phase = settings.RETRIEVAL_TWO_PHASE
+        tier, dense_docs, lexical_docs = self.retrieval_executor.retrieve(
+            question,
+            encode=lambda text: self.embedding_model.encode_query(text).tolist(),
+            filters=filters,
+            limit=limit,
+            light=two_phase,
+            extract_light=self._extract_hit_ids,
+            encode_hybrid=self._encode_query_hybrid if settings.EMBEDDING_SPARSE_ENABLED else None
+        )
+        
+        if lexical_docs:
+            self.retrieval_stats['hybrid_queries'] += 1
+            candidates = self._fuse_rrf(dense_docs, lexical_docs, limit)
+        else:
+            candidates = dense_docs
+        
+        if self.reranker is not None:
+            # 重排需要正文：只回填进入重排的候选
+            if two_phase:
+                candidates = self._hydrate_documents(candidates)
+            documents, rerank_info = self.reranker.rerank(question, candidates, top_k)
+            self.logger.info(f"重排: {rerank_info}")
+            return documents, tier
+        
+        documents = candidates[:top_k]
+        if two_phase:
+            documents = self._hydrate_documents(documents)
+        return documents, tier
+    
+    def _encode_query_hybrid(self, text: str) -> Tuple[List[float], Dict[int, float]]:
+        """查询文本 -> (稠密向量, 稀疏向量)，供Milvus服务端混合检索"""
+        dense, sparse = self.embedding_model.encode_query_hybrid(text)
+        return dense.tolist(), sparse
+    
+    def _extract_hit_ids(self, search_results) -> List[Dict[str, Any]]:
+        """两阶段检索第一阶段：只保留主键、doc_id和得分"""
+        return [
+            {'pk': hit.id, 'doc_id': getattr(hit.entity, 'doc_id', ''), 'score': hit.distance}
+            for hit in search_results
+        ]
+    
+    def _hydrate_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """两阶段检索第二阶段：按主键一次批量回填缺少正文的文档"""
+        pks = [doc['pk'] for doc in documents if 'text' not in doc and 'pk' in doc]
+        if not pks:
+            return documents
+        
+        rows = self.milvus.fetch_by_ids(pks)
+        hydrated = []
+        for doc in documents:
+            if 'text' in doc:
+                hydrated.append(doc)
+                continue
+            row = rows.get(doc.get('pk'))
+            if row is None:
+                # 检索与回填之间被删除
+                continue
+            hydrated.append({
+                **doc,
+                'doc_id': row.get('doc_id', doc.get('doc_id', '')),
+                'text': row.get('text', ''),
+                'ts_code': row.get('ts_code', ''),
+                'title': row.get('title', ''),
+                'ann_date': row.get('ann_date', ''),
+                'chunk_id': row.get('chunk_id', 0),
+                'metadata': row.get('metadata', {})
+            })
+        return hydrated
+    
+    def _fuse_rrf(self, dense_docs: List[Dict[str, Any]], lexical_docs: List[Dict[str, Any]],
+                  top_k: int) -> List[Dict[str, Any]]:
+        """
+        倒数排名融合（RRF）：score = Σ weight / (k + rank)
+        
+        融合后score为RRF得分，原始得分保存在dense_score/lexical_score
+        """
+        k = settings.HYBRID_RRF_K
+        fused: Dict[str, Dict[str, Any]] = {}
+        
+        for source, docs, weight in (('dense', dense_docs, settings.HYBRID_DENSE_WEIGHT),
+                                     ('lexical', lexical_docs, settings.HYBRID_LEXICAL_WEIGHT)):
+            for rank, doc in enumerate(docs, 1):
+                key = doc.get('doc_id') or doc.get('pk') or f"{doc['ts_code']}_{doc['title']}_{doc['chunk_id']}"
+                entry = fused.get(key)
+                if entry is None:
+                    entry = fused[key] = {**doc, 'rrf_score': 0.0}
+                else:
+                    # 两阶段检索时向量结果只有主键，用词法结果的正文补齐
+                    for field, value in doc.items():
+                        entry.setdefault(field, value)
+                entry[f'{source}_score'] = doc['score']
+                entry['rrf_score'] += weight / (k + rank)
+        
+        ranked = sorted(fused.values(), key=lambda d: d['rrf_score'], reverse=True)[:top_k]
+        for doc in ranked:
+            doc['score'] = doc.pop('rrf_score')
+            if 'dense_score' not in doc:
+                self.retrieval_stats['lexical_only_hits'] += 1
+        return ranked
+    
     def analyze_documents(self,
                          query: str,
                          analysis_type: str = "综合",
@@ -317,13 +432,14 @@ class RAGAgent:
             self.logger.info(f"文档分析: {query} (类型: {analysis_type})")
             
             # 1. 获取相关文档
-            query_vector = self.embedding_model.encode([query])[0].tolist()
+            query_vector = self.embedding_model.encode_query(query).tolist()
             filter_expr = self._build_filter_expr(filters)
             
             search_results = self.milvus.search(
                 query_vectors=[query_vector],
                 top_k=top_k,
-                filter_expr=filter_expr
+                filter_expr=filter_expr,
+                query_class="batch"
             )
             
             if not search_results or len(search_results[0]) == 0:
@@ -389,13 +505,14 @@ class RAGAgent:
                 if period:
                     filters['ann_date'] = period
                 
-                query_vector = self.embedding_model.encode([f"{aspect} {company}"])[0].tolist()
+                query_vector = self.embedding_model.encode_query(f"{aspect} {company}").tolist()
                 filter_expr = self._build_filter_expr(filters)
                 
                 results = self.milvus.search(
                     query_vectors=[query_vector],
                     top_k=5,
-                    filter_expr=filter_expr
+                    filter_expr=filter_expr,
+                    query_class="batch"
                 )
                 
                 if results and len(results[0]) > 0:
@@ -463,11 +580,17 @@ class RAGAgent:
             else:
                 conditions.append(f'ann_date == "{date}"')
         
-        # 标题关键词过滤
-        if 'title_keywords' in filters:
-            # 注意：Milvus的字符串匹配功能有限
-            # 这里只是示例，实际可能需要在应用层过滤
-            pass
+        # 标题关键词过滤（任一关键词命中即可，需Milvus 2.4+支持中缀like）
+        if filters.get('title_keywords'):
+            keywords = filters['title_keywords']
+            if isinstance(keywords, str):
+                keywords = [keywords]
+            like_conditions = [
+                'title like "%{}%"'.format(kw.replace('"', '\\"'))
+                for kw in keywords if kw
+            ]
+            if like_conditions:
+                conditions.append(f"({' or '.join(like_conditions)})")
         
         return ' and '.join(conditions) if conditions else None
     
@@ -478,6 +601,7 @@ class RAGAgent:
         for hit in search_results:
             # 使用属性访问而不是get方法
             doc = {
+                'doc_id': getattr(hit.entity, 'doc_id', ''),
                 'text': getattr(hit.entity, 'text', ''),
                 'ts_code': getattr(hit.entity, 'ts_code', ''),
                 'title': getattr(hit.entity, 'title', ''),
@@ -490,21 +614,9 @@ class RAGAgent:
         
         return documents
     def _format_context(self, documents: List[Dict[str, Any]]) -> str:
-        """格式化文档内容作为上下文"""
-        context_parts = []
-        
-        for i, doc in enumerate(documents):
-            context_part = f"""
-文档{i+1}:
-公司: {doc['ts_code']}
-标题: {doc['title']}
-日期: {doc['ann_date']}
-内容: {doc['text']}
----
-"""
-            context_parts.append(context_part)
-        
-        return "\n".join(context_parts)
+        """格式化文档内容作为上下文（经过合并、去重和token预算压缩）"""
+        context, _ = self.context_builder.build(documents)
+        return context
     
     def _format_documents_for_analysis(self, documents: List[Dict[str, Any]]) -> str:
         """为分析格式化文档"""
@@ -570,7 +682,16 @@ class RAGAgent:
         return {
             'query_count': self.query_count,
             'success_count': self.success_count,
-            'success_rate': self.success_count / self.query_count if self.query_count > 0 else 0.0
+            'success_rate': self.success_count / self.query_count if self.query_count > 0 else 0.0,
+            'retrieval': {**self.retrieval_stats, 'tiers': self.retrieval_executor.get_stats()},
+            'rerank': self.reranker.get_stats() if self.reranker else None,
+            'embedding_cache': self.embedding_model.get_cache_stats(),
+            'embedding_batcher': self.embedding_model.get_batcher_stats(),
+            'milvus_payload': self.milvus.get_search_stats(),
+            'lexical_index': self.lexical_index.get_stats() if self.lexical_index else None,
+            'hot_tier': self.hot_tier.get_stats() if self.hot_tier else None,
+            'context_expansion': self.context_expander.get_stats() if self.context_expander else None,
+            'context_compression': self.context_builder.get_stats()
         }
 
     def get_similar_questions(self, question: str, top_k: int = 5) -> List[str]:
@@ -8,6 +8,7 @@ import re
 import sys
 import os
 import time
+import threading
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import json
@@ -28,10 +29,73 @@ import pandas as pd
 
 from config.settings import settings
 from database.mysql_connector import MySQLConnector
+from database.query_governor import QueryGovernor, QueryBudgetExceededError
+from database.daily_bar_cache import get_daily_bar_cache
 from utils.logger import setup_logger
 from utils.date_intelligence import date_intelligence
+from utils.sql_result_renderer import SQLResultRenderer
 
 
+class GovernedSQLDatabase(SQLDatabase):
+    """经过查询治理器检查的SQLDatabase，供LangChain工具包使用"""
+    
+    query_governor: Optional[QueryGovernor] = None
+    _local = threading.local()
+    
+    @property
+    def last_result(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        当前线程本次问答唯一一次查询的结果行（供确定性渲染使用）
+        执行过多次查询时无法确定最终答案依据哪一次的结果，返回None
+        """
+        results = getattr(self._local, 'results', None)
+        if not results or len(results) != 1:
+            return None
+        return results[0]
+    
+    @property
+    def query_count(self) -> int:
+        """当前线程自上次reset_last_result以来成功执行的查询次数"""
+        return len(getattr(self._local, 'results', None) or [])
+    
+    @property
+    def scope_notes(self) -> List[str]:
+        """当前线程自上次reset_last_result以来治理器缩小数据范围的说明"""
+        return list(getattr(self._local, 'scope_notes', None) or [])
+    
+    def reset_last_result(self):
+        self._local.results = []
+        self._local.scope_notes = []
+    
+    def _execute(self, command, *args, **kwargs):
+        rows = super()._execute(command, *args, **kwargs)
+        if getattr(self._local, 'results', None) is None:
+            self._local.results = []
+        self._local.results.append([dict(row) for row in rows] if rows is not None else None)
+        return rows
+    
+    def run(self, command: str, *args, **kwargs):
+        notes = []
+        if self.query_governor:
+            governed = self.query_governor.govern(command)
+            command, notes = governed.sql, governed.scope_notes
+        result = super().run(command, *args, **kwargs)
+        if notes:
+            # 改写缩小了数据范围时随结果返回说明，回答需据此说明数据范围
+            if getattr(self._local, 'scope_notes', None) is None:
+                self._local.scope_notes = []
+            self._local.scope_notes.extend(note for note in notes if note not in self._local.scope_notes)
+            if isinstance(result, str):
+                result = f"{result}\n数据范围说明：{'；'.join(notes)}"
+        return result
+    
+    def run_no_throw(self, command: str, *args, **kwargs):
+        # 超预算及执行错误以文本形式返回给Agent，便于其改写查询后重试
+        try:
+            return self.run(command, *args, **kwargs)
+        except Exception as e:
+            return f"Error: {e}"
+
 
 class SQLAgent:
     """SQL查询代理 - 处理自然语言到SQL的转换"""
@@ -40,6 +104,9 @@ class SQLAgent:
         self.logger = setup_logger("sql_agent")
         self.mysql_connector = MySQLConnector()
         
+        # 查询治理器：EXPLAIN成本检查、改写和执行超时
+        self.query_governor = QueryGovernor(self.mysql_connector)
+        
         # 初始化LLM（使用DeepSeek）
         self.llm = ChatOpenAI(
             model=llm_model_name,
@@ -49,11 +116,22 @@ class SQLAgent:
         )
         
         # 初始化SQL数据库对象
-        self.db = SQLDatabase.from_uri(settings.MYSQL_URL)
+        self.db = GovernedSQLDatabase.from_uri(settings.MYSQL_URL)
+        self.db.query_governor = self.query_governor
         
         # 获取数据库schema信息
         self.schema_info = self._get_schema_info()
         
+        # 确定性结果渲染器（替代LLM翻译调用）
+        self.result_renderer = SQLResultRenderer.from_schema_info(self.schema_info)
+        self.render_stats = {
+            'rendered_answers': 0,
+            'translation_calls_avoided': 0,
+            'narrative_llm_calls': 0,
+            'narrative_llm_seconds': 0.0,
+            'latency_saved_seconds': 0.0
+        }
+        
         # 创建SQL工具包
         self.toolkit = SQLDatabaseToolkit(db=self.db, llm=self.llm)
         
@@ -149,6 +227,7 @@ class SQLAgent:
 7. 金额单位：财务数据通常以元为单位，大数字请转换为"亿元"显示
 8. 查询限制：默认限制返回10条记录，除非用户指定
 9. 排序规则：财务数据默认按金额降序，时间数据按最新优先
+10. 查询结果附带"数据范围说明"时，说明查询被限定在该日期范围内，回答中必须注明实际的数据范围
 
 特别说明：即使日期看起来像"2025年"，但如果是{last_trading_date}或之前的日期，都是数据库中实际存在的历史数据，可以正常查询。
 
@@ -276,6 +355,18 @@ class SQLAgent:
                 'cached': True
             }
             
+            # 全市场排名类问题直接由本地日线缓存回答
+            ranking_answer = self._answer_ranking_from_cache(question)
+            if ranking_answer:
+                self._query_cache[cache_key] = ranking_answer
+                return {
+                    'success': True,
+                    'result': ranking_answer,
+                    'sql': None,
+                    'cached': False,
+                    'source': 'daily_bar_cache'
+                }
+            
             # 使用智能日期解析预处理问题
             processed_question, parsing_result = date_intelligence.preprocess_question(question)
             
@@ -297,6 +388,7 @@ class SQLAgent:
             
             # 使用agent执行查询，增加更好的错误处理
             try:
+                self.db.reset_last_result()
                 result = self.agent.invoke({"input": contextualized_question})
                 
                 # 处理invoke返回的结果
@@ -319,7 +411,7 @@ class SQLAgent:
                         # 如果无法解析，返回友好的错误信息
                         processed_result = "查询处理过程中遇到格式问题，请尝试重新表述您的问题或使用更具体的查询条件。"
                 else:
-                    processed_result = self._postprocess_result(output)
+                    processed_result = self._with_scope_notes(self._postprocess_result(output, question))
                     
             except Exception as invoke_error:
                 self.logger.error(f"Agent invoke执行失败: {invoke_error}")
@@ -363,6 +455,83 @@ class SQLAgent:
                 'cached': False
             }
     
+    def _answer_ranking_from_cache(self, question: str) -> Optional[str]:
+        """
+        使用本地日线缓存回答全市场横截面排名问题（如"今天涨幅最大的10只股票"）
+        
+        Returns:
+            格式化的中文答案，不适用或缓存不可用时返回None
+        """
+        ranking_rules = {
+            '涨幅': ('pct_chg', False),
+            '跌幅': ('pct_chg', True),
+            '成交额': ('amount', False),
+            '成交量': ('vol', False)
+        }
+        match = re.search(r'(涨幅|跌幅|成交额|成交量)(?:最大|最高|最多|排名|排行|榜|前)', question)
+        if not match:
+            return None
+        
+        # 只回答全市场单日横截面排名：需要明确的"只/家/股票/排名"，
+        # 涉及具体股票、板块行业或时间窗口（最近N天、今年）的问题交给SQL Agent处理
+        if not re.search(r'只|家|股票|个股|排名|排行', question):
+            return None
+        if re.search(r'(?<!\d)\d{6}(?!\d)', question, re.IGNORECASE):
+            return None
+        if re.search(r'最近|近\s*\d+|\d+\s*(?:个)?(?:天|交易日|周|月|年)|今年|去年|本年|年内|以来|'
+                     r'板块|行业|概念|指数|基金|ETF', question, re.IGNORECASE):
+            return None
+        
+        try:
+            from utils.stock_code_mapper import get_stock_mapper
+            mapper = get_stock_mapper()
+            if mapper.mentions_stock(question):
+                return None
+            
+            # 缓存落后时在后台同步，本次回退到SQL Agent，避免请求等待MySQL全量同步
+            cache = get_daily_bar_cache()
+            if not cache.ensure_synced(background=True):
+                return None
+            
+            # 日期：显式指定的YYYYMMDD/YYYY-MM-DD，否则使用最新交易日
+            trade_date = None
+            date_match = re.search(r'(\d{4})-?(\d{2})-?(\d{2})', question)
+            if date_match:
+                trade_date = ''.join(date_match.groups())
+            elif re.search(r'\d{4}年|\d+月|\d+日|昨天|上周|本周|本月', question):
+                return None
+            
+            count_match = re.search(r'前\s*(\d+)|(\d+)\s*(?:只|家|个)', question)
+            n = int(next(g for g in count_match.groups() if g)) if count_match else 10
+            n = max(1, min(n, 100))
+            
+            column, ascending = ranking_rules[match.group(1)]
+            rows = cache.top_n(column=column, n=n, trade_date=trade_date, ascending=ascending)
+            if not rows:
+                return None
+            
+            date_text = datetime.strptime(rows[0]['trade_date'], '%Y%m%d').strftime('%Y年%m月%d日')
+            lines = [f"{date_text}{match.group(1)}排名前{len(rows)}的股票："]
+            for i, row in enumerate(rows, 1):
+                name = mapper.get_stock_name(row['ts_code'])
+                pct_chg = f"{row['pct_chg']:.2f}%" if row['pct_chg'] is not None else "N/A"
+                close = f"{row['close']:.2f}元" if row['close'] is not None else "N/A"
+                detail = f"涨跌幅{pct_chg}，收盘价{close}"
+                if column == 'amount' and row['amount'] is not None:
+                    # amount单位为千元
+                    detail += f"，成交额{row['amount'] * 1000 / 1e8:.2f}亿元"
+                elif column == 'vol' and row['vol'] is not None:
+                    # vol单位为手
+                    detail += f"，成交量{row['vol'] / 1e4:.2f}万手"
+                lines.append(f"{i}. {name}（{row['ts_code']}）：{detail}")
+            
+            self.logger.info(f"排名问题由日线缓存回答: {column}, top {len(rows)}")
+            return "\n".join(lines)
+            
+        except Exception as e:
+            self.logger.warning(f"日线缓存排名查询失败，回退到SQL Agent: {e}")
+            return None
+    
     def _get_cache_key(self, question: str) -> str:
         """生成缓存键"""
         # 简单的缓存键生成，可以根据需要优化
@@ -431,7 +600,7 @@ class SQLAgent:
         
         return processed
     
-    def _postprocess_result(self, result: Any) -> str:
+    def _postprocess_result(self, result: Any, question: Optional[str] = None) -> str:
         """后处理查询结果 - 确保返回中文字符串"""
         # 如果结果是字符串，检查是否需要中文化
         if isinstance(result, str):
@@ -439,8 +608,16 @@ class SQLAgent:
             chinese_chars = sum(1 for c in result if '\u4e00' <= c <= '\u9fff')
             english_chars = sum(1 for c in result if 'a' <= c.lower() <= 'z')
             
-            # 如果主要是英文，且包含常见的股价信息，进行中文化
-            if english_chars > chinese_chars and ('price' in result.lower() or 'opening' in result.lower() or 'closing' in result.lower()):
+            if english_chars > chinese_chars:
+                # 用户明确要求叙述性总结时才调用LLM
+                if question and self._wants_narrative(question):
+                    return self._translate_to_chinese(result)
+                
+                # 其余情况使用确定性渲染器，根据SQL结果行直接生成中文答案
+                rendered = self._render_last_result()
+                if rendered:
+                    return rendered
+                # 无法渲染（执行了多次查询、无结果行或渲染失败）时仍翻译为中文
                 return self._translate_to_chinese(result)
             
             # 尝试美化格式
@@ -455,23 +632,68 @@ class SQLAgent:
         # 如果是其他类型，转换为字符串
         return str(result)
     
+    def _with_scope_notes(self, answer: str) -> str:
+        """查询被治理器限定了日期范围时，在答案末尾注明实际的数据范围"""
+        notes = [note for note in self.db.scope_notes if note not in answer]
+        if not notes:
+            return answer
+        return f"{answer}\n\n（数据范围说明：{'；'.join(notes)}）"
+    
+    def _wants_narrative(self, question: str) -> bool:
+        """判断用户是否明确要求叙述性总结"""
+        narrative_keywords = ['总结', '分析', '解读', '点评', '概括', '评价', '说明原因', '为什么']
+        return any(keyword in question for keyword in narrative_keywords)
+    
+    def _render_last_result(self) -> Optional[str]:
+        """使用本次问答的SQL结果行进行确定性渲染，并记录节省的翻译调用"""
+        if self.db.query_count > 1:
+            # Agent执行了多次查询（如先探查再正式查询），最终答案未必对应最后一次结果，保留Agent的回答
+            self.logger.info(f"本次问答执行了 {self.db.query_count} 次查询，跳过确定性渲染")
+            return None
+        rows = self.db.last_result
+        if rows is None:
+            return None
+        
+        start_time = time.time()
+        rendered = self.result_renderer.render(rows)
+        if not rendered:
+            return None
+        
+        render_seconds = time.time() - start_time
+        stats = self.render_stats
+        stats['rendered_answers'] += 1
+        stats['translation_calls_avoided'] += 1
+        
+        # 以实测的LLM调用平均耗时（无样本时用配置估计值）估算节省的延迟
+        if stats['narrative_llm_calls']:
+            llm_seconds = stats['narrative_llm_seconds'] / stats['narrative_llm_calls']
+        else:
+            llm_seconds = settings.SQL_TRANSLATION_LATENCY_ESTIMATE
+        stats['latency_saved_seconds'] += max(0.0, llm_seconds - render_seconds)
+        
+        self.logger.info(f"确定性渲染SQL结果: {len(rows)} 行，避免一次LLM翻译调用")
+        return rendered
+    
     def _translate_to_chinese(self, english_result: str) -> str:
-        """将英文股价信息翻译为中文格式"""
+        """将英文查询结果整理为中文叙述性回答（用户要求总结/分析或无法确定性渲染时调用）"""
         try:
-            # 使用LLM进行翻译
-            translation_prompt = f"""请将以下英文股价信息翻译为标准的中文格式：
+            # 使用LLM生成中文叙述
+            translation_prompt = f"""请将以下英文查询结果整理为简洁的中文叙述性回答：
 
 {english_result}
 
 要求：
 1. 使用中文表述
-2. 价格保留到小数点后两位，加上"元"单位
-3. 格式：公司名称（股票代码）在YYYY年MM月DD日的股价为：开盘价xxx元，最高价xxx元，最低价xxx元，收盘价xxx元
-4. 只返回翻译后的中文内容，不要其他解释
+2. 价格保留到小数点后两位，加上"元"单位；大额金额使用"亿元"或"万元"
+3. 股价格式：公司名称（股票代码）在YYYY年MM月DD日的股价为：开盘价xxx元，最高价xxx元，最低价xxx元，收盘价xxx元
+4. 只返回中文内容，不要其他解释
 
 中文回答："""
             
+            start_time = time.time()
             chinese_result = self.llm.invoke(translation_prompt).content
+            self.render_stats['narrative_llm_calls'] += 1
+            self.render_stats['narrative_llm_seconds'] += time.time() - start_time
             return chinese_result.strip()
             
         except Exception as e:
@@ -495,17 +717,31 @@ class SQLAgent:
             if not self._is_safe_query(sql):
                 raise ValueError("不安全的SQL查询")
             
+            # 成本检查（可能改写或拒绝）
+            governed = self.query_governor.govern(sql)
+            
             # 执行查询
-            df = self.mysql_connector.execute_query_df(sql)
+            df = self.mysql_connector.execute_query_df(governed.sql)
             
             return {
                 'success': True,
-                'sql': sql,
+                'sql': governed.sql,
                 'data': df.to_dict('records'),
                 'row_count': len(df),
-                'columns': list(df.columns)
+                'columns': list(df.columns),
+                'estimated_rows': governed.estimated_rows,
+                'rewrites': governed.rewrites,
+                'scope_notes': governed.scope_notes
             }
             
+        except QueryBudgetExceededError as e:
+            self.logger.warning(f"SQL超出成本预算: {e}")
+            return {
+                'success': False,
+                'sql': sql,
+                'error': str(e),
+                'rejected': True
+            }
         except Exception as e:
             self.logger.error(f"SQL执行失败: {e}")
             return {
@@ -583,6 +819,14 @@ class SQLAgent:
             }.get(complexity, '未知')
         }
     
+    def get_render_stats(self) -> Dict[str, Any]:
+        """获取结果渲染统计（避免的翻译调用次数和节省的延迟）"""
+        return dict(self.render_stats)
+    
+    def get_governor_stats(self) -> Dict[str, Any]:
+        """获取SQL治理统计（按表的成本信息）"""
+        return self.query_governor.get_stats()
+    
     def clear_cache(self):
         """清空查询缓存"""
         self._query_cache.clear()
@@ -23,9 +23,14 @@ import uuid
 
 from agents.hybrid_agent import HybridAgent
 from database.mysql_connector import MySQLConnector
+from database.async_mysql_connector import get_async_mysql_connector
 from database.milvus_connector import MilvusConnector
+from models.embedding_batcher import get_batcher_stats
+from models.embedding_model import get_embedding_model
+from models.inference_worker import get_worker_stats
 from config.settings import settings
 from utils.logger import setup_logger
+from utils.date_intelligence import date_intelligence
 
 
 # 时间戳生成函数（替代lambda，解决OpenAPI序列化问题）
@@ -121,6 +126,7 @@ logger = setup_logger("api")
 # 全局代理实例（使用依赖注入会更好）
 hybrid_agent = None
 mysql_conn = None
+async_mysql_conn = None  # 请求路径上的轻量查询使用异步连接池
 milvus_conn = None
 
 
@@ -445,16 +451,20 @@ manager = ConnectionManager()
 @app.on_event("startup")
 async def startup_event():
     """应用启动时初始化"""
-    global hybrid_agent, mysql_conn, milvus_conn
+    global hybrid_agent, mysql_conn, async_mysql_conn, milvus_conn
     
     logger.info("正在初始化系统...")
     
     try:
         # 初始化连接
         mysql_conn = MySQLConnector()
+        async_mysql_conn = get_async_mysql_connector()  # 与日期解析、资金流向分析共用连接池
         milvus_conn = MilvusConnector()
         hybrid_agent = HybridAgent()
         
+        # 嵌入模型在后台线程加载并预热，不阻塞启动；首个RAG查询如早于加载完成则等待
+        get_embedding_model().start_loading()
+        
         logger.info("系统初始化完成")
     except Exception as e:
         logger.error(f"系统初始化失败: {e}")
@@ -465,12 +475,12 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时清理"""
-    global mysql_conn, milvus_conn
-    
     logger.info("正在关闭系统...")
     
     if mysql_conn:
         mysql_conn.close()
+    if async_mysql_conn:
+        await async_mysql_conn.close()
     if milvus_conn:
         milvus_conn.close()
     
@@ -552,7 +562,8 @@ async def health_check():
             "services": {
                 "mysql": "✅ 连接正常" if mysql_ok else "❌ 连接异常",
                 "milvus": "✅ 连接正常" if bool(milvus_stats) else "❌ 连接异常",
-                "hybrid_agent": "✅ 就绪" if hybrid_agent else "❌ 未初始化"
+                "hybrid_agent": "✅ 就绪" if hybrid_agent else "❌ 未初始化",
+                "embedding_model": get_embedding_model().get_load_status()['state']
             },
             "database_stats": {
                 "mysql_connected": mysql_ok,
@@ -612,6 +623,16 @@ async def get_system_status():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/metrics/embedding", tags=["系统"])
+async def get_embedding_metrics():
+    """嵌入微批编码服务与推理工作者指标：批量大小分布、排队等待时间、吞吐、超时与重启"""
+    return {
+        "batchers": get_batcher_stats(),
+        "workers": get_worker_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 @app.post("/query", response_model=QueryResponse, tags=["核心查询"])
 async def query(request: QueryRequest):
     """智能查询接口 - 核心功能
@@ -636,6 +657,10 @@ async def query(request: QueryRequest):
         if not hybrid_agent:
             raise HTTPException(status_code=503, detail="系统未初始化")
         
+        # 时间表达在事件循环上异步解析（交易日查询走异步连接池）并写入交易日缓存，
+        # Agent内部的同步解析随后直接命中缓存；问题原文不变，路由规则依赖"最近N天"等原始表述
+        await date_intelligence.apreprocess_question(request.question)
+        
         # 执行查询
         result = hybrid_agent.query(
             question=request.question,
@@ -895,9 +920,9 @@ async def money_flow_analysis(request: MoneyFlowAnalysisRequest):
         # 构建资金流向分析查询
         query_text = f"分析{request.ts_code}最近{request.days}天的资金流向"
         
-        # 执行资金流向分析
+        # 执行资金流向分析（数据获取走异步连接池）
         start_time = time.time()
-        result = hybrid_agent.query(query_text)
+        result = await hybrid_agent.money_flow_agent.aquery(query_text)
         processing_time = time.time() - start_time
         
         if result.get('success', False):
@@ -951,11 +976,13 @@ async def list_companies(
     try:
         # 构建查询
         query = "SELECT DISTINCT ts_code, name FROM stock_basic"
+        params = {'limit': limit}
         if sector:
-            query += f" WHERE industry = '{sector}'"
-        query += f" LIMIT {limit}"
+            query += " WHERE industry = :sector"
+            params['sector'] = sector
+        query += " LIMIT :limit"
         
-        companies = mysql_conn.execute_query(query)
+        companies = await async_mysql_conn.execute_query(query, params)
         
         return {
             "total": len(companies),
@@ -989,16 +1016,20 @@ async def get_recent_reports(days: int = 7, limit: int = 20):
         end_date = datetime.now().strftime('%Y%m%d')
         start_date = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
         
-        query = f"""
+        query = """
         SELECT ts_code, name, title, ann_date, url
         FROM tu_anns_d
-        WHERE ann_date BETWEEN '{start_date}' AND '{end_date}'
+        WHERE ann_date BETWEEN :start_date AND :end_date
         AND (title LIKE '%年度报告%' OR title LIKE '%季度报告%')
         ORDER BY ann_date DESC
-        LIMIT {limit}
+        LIMIT :limit
         """
         
-        reports = mysql_conn.execute_query(query)
+        reports = await async_mysql_conn.execute_query(query, {
+            'start_date': start_date,
+            'end_date': end_date,
+            'limit': limit
+        })
         
         return {
             "period": {"start": start_date, "end": end_date},
@@ -18,7 +18,7 @@ class BatchProcessManager:
     """批量处理管理器"""
     
     def __init__(self):
-        self.processor = DocumentProcessor()
+        self.processor = DocumentProcessor(use_embedding_pool=True)
         self.mysql = MySQLConnector()
         self.milvus = MilvusConnector()
         self.progress_file = Path("data/processing_progress.json")
@@ -19,6 +19,8 @@ class Settings:
 
     # MySQL连接URL - 不需要特殊处理了
     MYSQL_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
+    # 异步驱动连接URL（API请求路径使用）
+    MYSQL_ASYNC_URL = f"mysql+aiomysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}"
     
     # Milvus配置
     MILVUS_HOST = os.getenv("MILVUS_HOST", "10.0.0.77")
@@ -26,6 +28,64 @@ class Settings:
     MILVUS_USER = os.getenv("MILVUS_USER", "root")
     MILVUS_PASSWORD = os.getenv("MILVUS_PASSWORD", "Milvus")
     MILVUS_COLLECTION_NAME = os.getenv("MILVUS_COLLECTION_NAME", "stock_announcements")
+    # 按公告年份 × 股票代码哈希桶分区，检索时按过滤条件剪枝（需先用迁移工具生成分区集合）
+    MILVUS_PARTITIONING_ENABLED = os.getenv("MILVUS_PARTITIONING_ENABLED", "false").lower() == "true"
+    MILVUS_PARTITION_TS_BUCKETS = int(os.getenv("MILVUS_PARTITION_TS_BUCKETS", 16))  # 年份数 × 桶数需低于Milvus分区上限
+    MILVUS_PARTITION_REFRESH_INTERVAL = int(os.getenv("MILVUS_PARTITION_REFRESH_INTERVAL", 60))  # 秒，发现其他进程新建的分区
+    
+    # 向量索引配置：建索引参数 + 按查询类别的检索参数
+    # interactive: 在线问答，牺牲少量召回换取延迟；batch: 批量分析，优先召回
+    MILVUS_INDEX_PROFILE = os.getenv("MILVUS_INDEX_PROFILE", "ivf_flat")  # 新建集合使用的索引；已有集合按实际索引类型匹配
+    MILVUS_INDEX_PROFILES = {
+        "flat": {
+            "index": {"index_type": "FLAT", "metric_type": "IP", "params": {}},
+            "search": {"interactive": {}, "batch": {}}
+        },
+        "ivf_flat": {
+            "index": {"index_type": "IVF_FLAT", "metric_type": "IP", "params": {"nlist": 128}},
+            "search": {"interactive": {"nprobe": 10}, "batch": {"nprobe": 32}}
+        },
+        "ivf_sq8": {
+            "index": {"index_type": "IVF_SQ8", "metric_type": "IP", "params": {"nlist": 2048}},
+            "search": {"interactive": {"nprobe": 16}, "batch": {"nprobe": 64}}
+        },
+        "hnsw": {
+            "index": {"index_type": "HNSW", "metric_type": "IP", "params": {"M": 16, "efConstruction": 200}},
+            "search": {"interactive": {"ef": 64}, "batch": {"ef": 256}}
+        },
+        "diskann": {
+            "index": {"index_type": "DISKANN", "metric_type": "IP", "params": {}},
+            "search": {"interactive": {"search_list": 50}, "batch": {"search_list": 200}}
+        },
+        # 二值向量（MILVUS_VECTOR_STORAGE=binary）使用
+        "bin_flat": {
+            "index": {"index_type": "BIN_FLAT", "metric_type": "HAMMING", "params": {}},
+            "search": {"interactive": {}, "batch": {}}
+        },
+        "bin_ivf_flat": {
+            "index": {"index_type": "BIN_IVF_FLAT", "metric_type": "HAMMING", "params": {"nlist": 1024}},
+            "search": {"interactive": {"nprobe": 16}, "batch": {"nprobe": 64}}
+        },
+    }
+    MILVUS_DEFAULT_QUERY_CLASS = "interactive"
+    # 向量存储精度（新建集合使用；已有集合按字段类型判断）：float32 / float16 / int8 / binary
+    # 非float32时多取 top_k × rescore_multiplier 个候选，用本地全精度向量精确重排
+    MILVUS_VECTOR_STORAGE = os.getenv("MILVUS_VECTOR_STORAGE", "float32")
+    MILVUS_VECTOR_STORAGE_MODES = {
+        "float32": {"dtype": "FLOAT_VECTOR", "index_types": None, "rescore_multiplier": 1},
+        "float16": {"dtype": "FLOAT16_VECTOR", "index_types": ["FLAT", "IVF_FLAT", "IVF_SQ8", "HNSW"], "rescore_multiplier": 2},
+        "int8": {"dtype": "FLOAT16_VECTOR", "index_types": ["IVF_SQ8"], "rescore_multiplier": 4},  # Milvus标量量化索引
+        "binary": {"dtype": "BINARY_VECTOR", "index_types": ["BIN_FLAT", "BIN_IVF_FLAT"], "rescore_multiplier": 10},
+    }
+    MILVUS_RESCORE_ENABLED = os.getenv("MILVUS_RESCORE_ENABLED", "true").lower() == "true"
+    MILVUS_RESCORE_STORE_PATH = Path(os.getenv("MILVUS_RESCORE_STORE_PATH", "./data/full_precision_vectors"))  # 入库与查询进程需访问同一目录
+    # BGE-M3稀疏（词项权重）向量：新建集合时增加SPARSE_FLOAT_VECTOR字段；已有集合按schema判断
+    MILVUS_SPARSE_INDEX = {"index_type": "SPARSE_INVERTED_INDEX", "metric_type": "IP", "params": {"drop_ratio_build": 0.2}}
+    MILVUS_SPARSE_SEARCH_PARAMS = {"metric_type": "IP", "params": {"drop_ratio_search": 0.2}}
+    MILVUS_HYBRID_SEARCH_ENABLED = os.getenv("MILVUS_HYBRID_SEARCH_ENABLED", "true").lower() == "true"  # 集合含稀疏字段时稠密+稀疏服务端融合检索
+    MILVUS_HYBRID_RANKER = os.getenv("MILVUS_HYBRID_RANKER", "rrf")  # rrf / weighted
+    MILVUS_HYBRID_DENSE_WEIGHT = float(os.getenv("MILVUS_HYBRID_DENSE_WEIGHT", 1.0))  # weighted融合中稠密检索的权重
+    MILVUS_HYBRID_SPARSE_WEIGHT = float(os.getenv("MILVUS_HYBRID_SPARSE_WEIGHT", 0.3))  # weighted融合中稀疏检索的权重
     
     # LLM配置
     DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "")
@@ -48,20 +108,99 @@ class Settings:
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
     
+    # 上下文扩展：命中chunk前后各取k个相邻chunk，合并为连续窗口
+    CONTEXT_EXPANSION_ENABLED = os.getenv("CONTEXT_EXPANSION_ENABLED", "true").lower() == "true"
+    CONTEXT_EXPANSION_RADIUS = int(os.getenv("CONTEXT_EXPANSION_RADIUS", 1))
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 6000))  # 进入提示词的文档内容token上限
+    CONTEXT_DEDUP_MIN_CHARS = 20  # 参与近重复判断的最短句段（更短的句段直接保留）
+    CONTEXT_DEDUP_THRESHOLD = 0.8  # 字符3-gram的Jaccard相似度不低于该值且数字相同视为近重复
+    
     # 数据库连接池配置
     DB_POOL_SIZE = 20
     DB_MAX_OVERFLOW = 30
     DB_POOL_TIMEOUT = 30
+    DB_BATCH_MAX_PARALLEL = 8  # 批量查询并发执行时最多占用的连接数
+    ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", 50))  # 异步连接池大小（独立于同步连接池）
+    ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 100))
+
+    # SQL查询治理配置（EXPLAIN成本守卫）
+    SQL_GOVERNOR_ENABLED = os.getenv("SQL_GOVERNOR_ENABLED", "true").lower() == "true"
+    SQL_GOVERNOR_MAX_ROWS = int(os.getenv("SQL_GOVERNOR_MAX_ROWS", 2000000))  # 单条语句预估扫描行数上限
+    SQL_GOVERNOR_DEFAULT_LIMIT = 1000  # 未指定LIMIT时追加的返回行数上限
+    SQL_GOVERNOR_DATE_WINDOW_DAYS = 30  # 超预算改写时追加的日期范围（天）
+    SQL_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", 15000))  # 单语句执行超时（毫秒）
+    SQL_TRANSLATION_LATENCY_ESTIMATE = 3.0  # 无实测样本时估计的单次LLM翻译耗时（秒）
+
+    # 日线行情列式缓存配置（tu_daily_detail本地内存映射缓存）
+    DAILY_BAR_CACHE_ENABLED = os.getenv("DAILY_BAR_CACHE_ENABLED", "true").lower() == "true"
+    DAILY_BAR_CACHE_PATH = Path(os.getenv("DAILY_BAR_CACHE_PATH", "./data/daily_bars"))
+    DAILY_BAR_CACHE_START_DATE = os.getenv("DAILY_BAR_CACHE_START_DATE", "20200101")  # 首次构建的起始日期
+    DAILY_BAR_CACHE_SYNC_INTERVAL = 300  # 检查新交易日的间隔（秒）
     
     # 嵌入模型配置
     EMBEDDING_MODEL_NAME = "BAAI/bge-m3"
     EMBEDDING_DEVICE = "cuda" if os.getenv("USE_GPU", "false").lower() == "true" else "cpu"
     EMBEDDING_DIM = 1024  # BGE-M3 的向量维度
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))  # 查询向量缓存条目数（每条4KB）
+    EMBEDDING_MICROBATCH_ENABLED = os.getenv("EMBEDDING_MICROBATCH_ENABLED", "true").lower() == "true"  # 并发查询编码合并为微批
+    EMBEDDING_MICROBATCH_MAX_SIZE = int(os.getenv("EMBEDDING_MICROBATCH_MAX_SIZE", 32))
+    EMBEDDING_MICROBATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MICROBATCH_MAX_WAIT_MS", 5))
+    EMBEDDING_MAX_SEQ_LENGTH = 8192  # BGE-M3 最大序列长度
+    EMBEDDING_BATCH_TOKEN_BUDGET = int(os.getenv("EMBEDDING_BATCH_TOKEN_BUDGET", 16384))  # 入库编码单批填充后token上限
+    EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", 128))  # 入库编码单批最多文本数
+    EMBEDDING_STORE_ENABLED = os.getenv("EMBEDDING_STORE_ENABLED", "true").lower() == "true"  # 入库前查询持久化chunk向量库
+    EMBEDDING_STORE_PATH = Path(os.getenv("EMBEDDING_STORE_PATH", "./data/embedding_store"))
+    EMBEDDING_POOL_WORKERS = int(os.getenv("EMBEDDING_POOL_WORKERS", 0))  # 入库多进程编码池子进程数，0为不启用
+    EMBEDDING_POOL_THREADS_PER_WORKER = int(os.getenv("EMBEDDING_POOL_THREADS_PER_WORKER", 0))  # 0为CPU核数/子进程数
+    EMBEDDING_POOL_BUFFER_ROWS = int(os.getenv("EMBEDDING_POOL_BUFFER_ROWS", 4096))  # 共享输出缓冲区行数（每行4KB）
+    EMBEDDING_POOL_PIN_CORES = os.getenv("EMBEDDING_POOL_PIN_CORES", "true").lower() == "true"  # 子进程绑定互不重叠的CPU核
+    EMBEDDING_LOAD_MODE = os.getenv("EMBEDDING_LOAD_MODE", "lazy")  # lazy（首次编码时加载）/ background / eager
+    EMBEDDING_SNAPSHOT_PATH = Path(os.getenv("EMBEDDING_SNAPSHOT_PATH", str(Path(__file__).resolve().parent.parent / "models" / "bge-m3")))  # 本地safetensors快照
+    EMBEDDING_SPARSE_ENABLED = os.getenv("EMBEDDING_SPARSE_ENABLED", "false").lower() == "true"  # 同一次前向计算输出稀疏词项权重（需与集合schema一致）
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # 推理后端: torch / onnx（ONNX Runtime，仅CPU）
+    EMBEDDING_ONNX_PATH = os.getenv("EMBEDDING_ONNX_PATH", str(Path(__file__).resolve().parent.parent / "models" / "bge-m3-onnx"))
+    EMBEDDING_ONNX_QUANTIZED = os.getenv("EMBEDDING_ONNX_QUANTIZED", "true").lower() == "true"  # 使用int8动态量化图
+    EMBEDDING_ONNX_INTRA_OP_THREADS = int(os.getenv("EMBEDDING_ONNX_INTRA_OP_THREADS", 0))  # 0为物理核数
+    EMBEDDING_ONNX_INTER_OP_THREADS = int(os.getenv("EMBEDDING_ONNX_INTER_OP_THREADS", 1))
+    EMBEDDING_ONNX_COSINE_TOLERANCE = float(os.getenv("EMBEDDING_ONNX_COSINE_TOLERANCE", 0.99))  # 与PyTorch向量的最低余弦
+    EMBEDDING_WORKER_MODE = os.getenv("EMBEDDING_WORKER_MODE", "thread")  # 推理工作者: thread/subprocess（超时重启）
+    EMBEDDING_LOAD_TIMEOUT = float(os.getenv("EMBEDDING_LOAD_TIMEOUT", 60))  # 模型加载超时（秒）
+    EMBEDDING_ENCODE_TIMEOUT = float(os.getenv("EMBEDDING_ENCODE_TIMEOUT", 30))  # 单次编码截止时间（秒）
     
     # 查询配置
     DEFAULT_TOP_K = 5
     DEFAULT_SCORE_THRESHOLD = 0.7
 
+    # 混合检索配置（BM25词法检索 + 稠密向量检索，RRF融合）
+    LEXICAL_INDEX_ENABLED = os.getenv("LEXICAL_INDEX_ENABLED", "true").lower() == "true"
+    LEXICAL_INDEX_PATH = Path(os.getenv("LEXICAL_INDEX_PATH", "./data/lexical_index"))
+    LEXICAL_INDEX_COMPACT_EVERY = 20000  # 增量日志条目数达到该值时压缩为新快照
+    LEXICAL_INDEX_REFRESH_INTERVAL = 10  # 查询进程同步增量日志的间隔（秒）
+    LEXICAL_TITLE_BOOST = 2  # 标题词项的重复计数（提高标题命中权重）
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", 1.0))  # RRF融合中稠密检索的权重
+    HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", 1.0))  # RRF融合中词法检索的权重
+    HYBRID_RRF_K = 60  # RRF平滑常数
+    HYBRID_CANDIDATE_MULTIPLIER = 3  # 每路检索的候选数 = top_k × 倍数
+    LEXICAL_SEARCH_TIMEOUT = 0.2  # 稠密检索完成后等待词法检索的最长时间（秒），超时则仅用稠密结果
+    RETRIEVAL_TWO_PHASE = os.getenv("RETRIEVAL_TWO_PHASE", "true").lower() == "true"  # 先取主键和得分，融合/重排后按主键回填字段
+    
+    # 近期公告热层向量索引（查询进程内存映射，日期过滤落在窗口内时不访问Milvus）
+    HOT_TIER_ENABLED = os.getenv("HOT_TIER_ENABLED", "false").lower() == "true"
+    HOT_TIER_PATH = Path(os.getenv("HOT_TIER_PATH", "./data/hot_tier"))
+    HOT_TIER_MONTHS = int(os.getenv("HOT_TIER_MONTHS", 6))  # 窗口长度（月）
+    HOT_TIER_COMPACT_EVERY = 20000  # 增量日志条目数达到该值时压缩（同时丢弃滑出窗口的数据）
+    HOT_TIER_REFRESH_INTERVAL = 10  # 查询进程同步增量日志的间隔（秒）
+
+    # 交叉编码器重排配置（可选）
+    RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANKER_MODEL_NAME = os.getenv("RERANKER_MODEL_NAME", "BAAI/bge-reranker-v2-m3")
+    RERANK_CANDIDATES = 50  # 重排前召回的候选数
+    RERANK_TIMEOUT = float(os.getenv("RERANK_TIMEOUT", 1.0))  # 单次查询重排时间预算（秒），超时使用原排序
+    RERANK_MAX_CONCURRENT = 2  # 在途重排推理上限，超出时跳过重排
+    RERANK_MAX_LENGTH = 512  # 查询+文档对的最大token长度
+
     # ========== 内容过滤配置（基于分析结果优化） ==========
     # 默认启用的核心报告类型
     ENABLED_CORE_TYPES = [
@@ -0,0 +1,202 @@
+"""
+异步MySQL数据库连接器
+基于asyncio原生驱动（aiomysql）和独立连接池，提供与MySQLConnector一致的
+execute_query / execute_query_df 接口，等待网络期间不占用工作线程
+"""
+import asyncio
+import threading
+from typing import List, Dict, Any, Optional, Tuple, Union
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+
+from config.settings import settings
+from utils.logger import setup_logger
+
+
+class AsyncMySQLConnector:
+    """异步MySQL数据库连接器"""
+
+    def __init__(self):
+        self.logger = setup_logger("async_mysql_connector")
+        self.engine = self._create_engine()
+        self.logger.info("异步MySQL连接器初始化完成")
+
+    def _create_engine(self) -> AsyncEngine:
+        """创建异步数据库引擎（连接在首次使用时建立）"""
+        try:
+            engine = create_async_engine(
+                settings.MYSQL_ASYNC_URL,
+                pool_size=settings.ASYNC_DB_POOL_SIZE,
+                max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+                pool_recycle=3600,  # 1小时回收连接
+                echo=False
+            )
+            return engine
+
+        except Exception as e:
+            self.logger.error(f"异步MySQL引擎创建失败: {e}")
+            raise
+
+    async def _fetch_rows(self, conn, query: str, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        """在给定连接上执行查询并转换为字典列表"""
+        if params:
+            result = await conn.execute(text(query), params)
+        else:
+            result = await conn.execute(text(query))
+
+        columns = result.keys()
+        return [dict(zip(columns, row)) for row in result]
+
+    async def execute_query(self, query: str, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        """
+        执行查询并返回结果
+
+        Args:
+            query: SQL查询语句
+            params: 查询参数（可选）
+
+        Returns:
+            查询结果列表
+        """
+        try:
+            async with self.engine.connect() as conn:
+                rows = await self._fetch_rows(conn, query, params)
+                self.logger.debug(f"查询执行成功，返回 {len(rows)} 条记录")
+                return rows
+
+        except Exception as e:
+            self.logger.error(f"查询执行失败: {e}")
+            self.logger.error(f"查询语句: {query}")
+            raise
+
+    async def execute_query_df(self, query: str, params: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        执行查询并返回DataFrame
+
+        Args:
+            query: SQL查询语句
+            params: 查询参数（可选）
+
+        Returns:
+            查询结果DataFrame
+        """
+        try:
+            async with self.engine.connect() as conn:
+                if params:
+                    result = await conn.execute(text(query), params)
+                else:
+                    result = await conn.execute(text(query))
+                df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+                self.logger.debug(f"查询执行成功，返回 {len(df)} 条记录")
+                return df
+
+        except Exception as e:
+            self.logger.error(f"查询执行失败: {e}")
+            self.logger.error(f"查询语句: {query}")
+            raise
+
+    async def execute_batch(self,
+                            statements: Union[Dict[str, Tuple[str, Optional[Dict]]], List[Tuple[str, Optional[Dict]]]],
+                            parallel: bool = False) -> Union[Dict[str, List[Dict[str, Any]]], List[List[Dict[str, Any]]]]:
+        """
+        批量执行多条参数化查询（语义与MySQLConnector.execute_batch一致）
+
+        Args:
+            statements: {名称: (SQL, 参数)} 或 [(SQL, 参数), ...]
+            parallel: 是否并发执行（语句之间必须相互独立）
+
+        Returns:
+            与输入形状一致的结果
+        """
+        named = isinstance(statements, dict)
+        keys = list(statements.keys()) if named else list(range(len(statements)))
+        items = [statements[key] for key in keys]
+        if not items:
+            return {} if named else []
+
+        try:
+            if parallel and len(items) > 1:
+                results = await asyncio.gather(
+                    *(self.execute_query(query, params) for query, params in items)
+                )
+            else:
+                async with self.engine.connect() as conn:
+                    results = [await self._fetch_rows(conn, query, params) for query, params in items]
+
+            self.logger.debug(f"批量查询执行成功: {len(items)} 条语句 (parallel={parallel})")
+
+        except Exception as e:
+            self.logger.error(f"批量查询执行失败: {e}")
+            raise
+
+        if named:
+            return dict(zip(keys, results))
+        return list(results)
+
+    async def test_connection(self) -> bool:
+        """测试数据库连接"""
+        try:
+            async with self.engine.connect() as conn:
+                result = await conn.execute(text("SELECT 1"))
+                result.fetchone()
+            return True
+        except Exception as e:
+            self.logger.error(f"连接测试失败: {e}")
+            return False
+
+    def get_pool_status(self) -> Dict[str, Any]:
+        """获取连接池状态"""
+        pool = self.engine.pool
+        return {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'max_overflow': settings.ASYNC_DB_MAX_OVERFLOW
+        }
+
+    async def close(self):
+        """关闭连接池"""
+        await self.engine.dispose()
+        self.logger.info("异步MySQL连接池已关闭")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+# 进程内共享实例（API与各模块的异步查询共用一个连接池）
+_connector_instance = None
+_connector_lock = threading.Lock()
+
+
+def get_async_mysql_connector() -> AsyncMySQLConnector:
+    """获取异步MySQL连接器的单例实例"""
+    global _connector_instance
+
+    if _connector_instance is None:
+        with _connector_lock:
+            if _connector_instance is None:
+                _connector_instance = AsyncMySQLConnector()
+
+    return _connector_instance
+
+
+# 使用示例
+if __name__ == "__main__":
+    async def main():
+        async with AsyncMySQLConnector() as db:
+            if await db.test_connection():
+                print("✓ 异步MySQL连接成功")
+
+                # 并发执行多条查询
+                results = await asyncio.gather(*(
+                    db.execute_query("SELECT :n AS n", {'n': i}) for i in range(10)
+                ))
+                print(f"并发查询完成: {len(results)} 条")
+                print(f"连接池状态: {db.get_pool_status()}")
+
+    asyncio.run(main())
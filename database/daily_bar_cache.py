@@ -0,0 +1,425 @@
+"""
+日线行情列式本地缓存
+将tu_daily_detail按列存储为内存映射文件，按交易日增量追加，
+为价格、涨跌幅、成交量查询和全市场排名提供亚毫秒级的本地查询
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from config.settings import settings
+from database.mysql_connector import MySQLConnector
+from utils.logger import setup_logger
+
+
+class DailyBarCache:
+    """tu_daily_detail列式缓存：每列一个内存映射文件，按ts_code和交易日索引"""
+
+    # 数值列及其存储类型
+    VALUE_COLUMNS = {
+        'open': np.float32,
+        'high': np.float32,
+        'low': np.float32,
+        'close': np.float32,
+        'pre_close': np.float32,
+        'pct_chg': np.float32,
+        'vol': np.float64,
+        'amount': np.float64,
+    }
+
+    def __init__(self, mysql_connector: Optional[MySQLConnector] = None,
+                 cache_dir: Optional[Path] = None):
+        self.logger = setup_logger("daily_bar_cache")
+        self._mysql = mysql_connector
+        self.cache_dir = Path(cache_dir or settings.DAILY_BAR_CACHE_PATH)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.meta_file = self.cache_dir / "meta.json"
+
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()  # 同步写入互斥，与查询使用的_lock分开
+        self._last_sync_check = 0.0
+        self._sync_thread: Optional[threading.Thread] = None
+        self._sync_thread_lock = threading.Lock()
+
+        # 元数据与列数据
+        self.row_count = 0
+        self.ts_codes: List[str] = []
+        self._code_ids: Dict[str, int] = {}
+        self._dates = np.empty(0, dtype=np.int32)    # 已缓存的交易日（升序）
+        self._offsets = np.empty(0, dtype=np.int64)  # 每个交易日的起始行
+        self._columns: Dict[str, np.ndarray] = {}
+
+        # ts_code索引：按代码稳定排序后的行号及每个代码的起始位置
+        self._code_order = np.empty(0, dtype=np.int64)
+        self._code_starts = np.zeros(1, dtype=np.int64)
+
+        self._load()
+
+    @property
+    def mysql(self) -> MySQLConnector:
+        """按需创建MySQL连接（仅同步时需要）"""
+        if self._mysql is None:
+            self._mysql = MySQLConnector()
+        return self._mysql
+
+    # ---------- 存储 ----------
+
+    def _column_file(self, name: str) -> Path:
+        return self.cache_dir / f"{name}.bin"
+
+    def _column_dtypes(self) -> Dict[str, Any]:
+        dtypes = {'trade_date': np.int32, 'ts_code': np.int32}
+        dtypes.update(self.VALUE_COLUMNS)
+        return dtypes
+
+    def _load(self):
+        """加载元数据并内存映射各列，构建完成后在锁内整体替换（查询不等待文件读取和索引构建）"""
+        if not self.meta_file.exists():
+            return
+
+        with open(self.meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        row_count = meta['row_count']
+        ts_codes = meta['ts_codes']
+        columns = {}
+        if row_count > 0:
+            for name, dtype in self._column_dtypes().items():
+                columns[name] = np.memmap(self._column_file(name), dtype=dtype, mode='r', shape=(row_count,))
+        code_order, code_starts = self._build_code_index(columns, len(ts_codes))
+
+        with self._lock:
+            self.row_count = row_count
+            self.ts_codes = ts_codes
+            self._code_ids = {code: i for i, code in enumerate(ts_codes)}
+            self._dates = np.asarray(meta['dates'], dtype=np.int32)
+            self._offsets = np.asarray(meta['offsets'], dtype=np.int64)
+            self._columns = columns
+            self._code_order, self._code_starts = code_order, code_starts
+
+        self.logger.info(
+            f"日线缓存已加载: {row_count} 行, {len(meta['dates'])} 个交易日, {len(ts_codes)} 只股票"
+        )
+
+    @staticmethod
+    def _build_code_index(columns: Dict[str, np.ndarray], code_count: int):
+        """构建ts_code索引（稳定排序保证每个代码内部按日期升序）"""
+        if 'ts_code' not in columns:
+            return np.empty(0, dtype=np.int64), np.zeros(code_count + 1, dtype=np.int64)
+
+        code_col = columns['ts_code']
+        code_order = np.argsort(code_col, kind='stable')
+        counts = np.bincount(code_col, minlength=code_count)
+        return code_order, np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    def _writer_state(self) -> Dict[str, Any]:
+        """同步写入使用的元数据副本（写入期间查询继续使用已加载的数据）"""
+        with self._lock:
+            return {
+                'row_count': self.row_count,
+                'ts_codes': list(self.ts_codes),
+                'code_ids': dict(self._code_ids),
+                'dates': self._dates.copy(),
+                'offsets': self._offsets.copy()
+            }
+
+    def _save_meta(self, state: Dict[str, Any]):
+        """原子写入元数据"""
+        meta = {
+            'row_count': state['row_count'],
+            'ts_codes': state['ts_codes'],
+            'dates': state['dates'].tolist(),
+            'offsets': state['offsets'].tolist(),
+            'updated_at': time.time()
+        }
+        tmp_file = self.meta_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_file, self.meta_file)
+
+    def _truncate_to_meta(self, row_count: int):
+        """截断列文件到元数据记录的行数，丢弃上次中断同步留下的残余数据"""
+        for name, dtype in self._column_dtypes().items():
+            path = self._column_file(name)
+            expected = row_count * np.dtype(dtype).itemsize
+            if path.exists() and path.stat().st_size != expected:
+                with open(path, 'r+b') as f:
+                    f.truncate(expected)
+
+    def _append_rows(self, state: Dict[str, Any], rows: List[Dict[str, Any]]):
+        """追加一批按交易日排序的行（只更新写入状态，已映射的行不受影响）"""
+        if not rows:
+            return
+
+        ts_codes, code_ids_map = state['ts_codes'], state['code_ids']
+        trade_dates = np.asarray([self.to_int_date(r['trade_date']) for r in rows], dtype=np.int32)
+        code_ids = np.empty(len(rows), dtype=np.int32)
+        for i, row in enumerate(rows):
+            code = row['ts_code']
+            if code not in code_ids_map:
+                code_ids_map[code] = len(ts_codes)
+                ts_codes.append(code)
+            code_ids[i] = code_ids_map[code]
+
+        data = {'trade_date': trade_dates, 'ts_code': code_ids}
+        for name, dtype in self.VALUE_COLUMNS.items():
+            data[name] = np.asarray(
+                [np.nan if r.get(name) is None else float(r[name]) for r in rows], dtype=dtype
+            )
+
+        for name, values in data.items():
+            with open(self._column_file(name), 'ab') as f:
+                f.write(values.tobytes())
+
+        # 更新交易日偏移
+        new_dates, first_idx = np.unique(trade_dates, return_index=True)
+        state['dates'] = np.concatenate((state['dates'], new_dates)).astype(np.int32)
+        state['offsets'] = np.concatenate((state['offsets'], first_idx + state['row_count'])).astype(np.int64)
+        state['row_count'] += len(rows)
+
+    # ---------- 同步 ----------
+
+    def sync(self, start_date: Optional[str] = None) -> int:
+        """
+        从MySQL增量同步新的交易日
+
+        查询MySQL和追加列文件时不持有查询锁，只在重新加载后替换数据时短暂加锁
+
+        Args:
+            start_date: 缓存为空时的起始日期（YYYYMMDD），默认使用配置
+
+        Returns:
+            新增行数
+        """
+        with self._write_lock:
+            state = self._writer_state()
+            last_date = int(state['dates'][-1]) if len(state['dates']) else None
+            if last_date is None:
+                lower = start_date or settings.DAILY_BAR_CACHE_START_DATE
+                condition, params = "trade_date >= :lower", {'lower': lower}
+            else:
+                condition, params = "trade_date > :lower", {'lower': str(last_date)}
+
+            date_rows = self.mysql.execute_query(
+                f"SELECT DISTINCT trade_date FROM tu_daily_detail WHERE {condition} ORDER BY trade_date",
+                params
+            )
+            new_dates = [str(r['trade_date']) for r in date_rows]
+            if not new_dates:
+                self._last_sync_check = time.time()
+                return 0
+
+            columns = ', '.join(['trade_date', 'ts_code'] + list(self.VALUE_COLUMNS))
+            added = 0
+            self._truncate_to_meta(state['row_count'])
+            try:
+                # 逐日追加并提交元数据，控制单次内存占用，中断后可续传
+                for trade_date in new_dates:
+                    rows = self.mysql.execute_query(
+                        f"SELECT {columns} FROM tu_daily_detail WHERE trade_date = :trade_date ORDER BY ts_code",
+                        {'trade_date': trade_date}
+                    )
+                    self._append_rows(state, rows)
+                    self._save_meta(state)
+                    added += len(rows)
+            finally:
+                self._load()
+            self._last_sync_check = time.time()
+            self.logger.info(f"日线缓存同步完成: 新增 {len(new_dates)} 个交易日, {added} 行")
+            return added
+
+    def _sync_quietly(self):
+        try:
+            self.sync()
+        except Exception as e:
+            # 同步失败时继续使用已有数据，下个间隔再试
+            self.logger.warning(f"日线缓存增量同步失败: {e}")
+            self._last_sync_check = time.time()
+
+    def _start_background_sync(self):
+        with self._sync_thread_lock:
+            if self._sync_thread is not None and self._sync_thread.is_alive():
+                return
+            self._sync_thread = threading.Thread(target=self._sync_quietly, name="daily-bar-sync", daemon=True)
+            self._sync_thread.start()
+
+    def ensure_synced(self, background: bool = False) -> bool:
+        """
+        确保缓存可用且不落后（按配置的间隔检查新交易日）
+
+        Args:
+            background: 在后台线程同步；检查到期或同步进行中时返回False（请求路径使用，不等待MySQL）
+
+        Returns:
+            缓存是否可用；缓存未构建时返回False，由调用方回退到SQL
+        """
+        if not settings.DAILY_BAR_CACHE_ENABLED or self.row_count == 0:
+            return False
+
+        if background and self._sync_thread is not None and self._sync_thread.is_alive():
+            return False
+
+        if time.time() - self._last_sync_check >= settings.DAILY_BAR_CACHE_SYNC_INTERVAL:
+            if background:
+                self._start_background_sync()
+                return False
+            self._sync_quietly()
+        return True
+
+    # ---------- 查询 ----------
+
+    @staticmethod
+    def to_int_date(value: Any) -> int:
+        """日期统一转换为YYYYMMDD整数"""
+        return int(str(value).replace('-', '')[:8])
+
+    @staticmethod
+    def format_date(value: int, dash: bool = False) -> str:
+        """YYYYMMDD整数转换为字符串"""
+        text = str(int(value))
+        return f"{text[:4]}-{text[4:6]}-{text[6:8]}" if dash else text
+
+    def _rows_to_dicts(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        result = []
+        for row in rows:
+            item = {
+                'trade_date': self.format_date(self._columns['trade_date'][row]),
+                'ts_code': self.ts_codes[self._columns['ts_code'][row]]
+            }
+            for name, dtype in self.VALUE_COLUMNS.items():
+                value = float(self._columns[name][row])
+                if np.isnan(value):
+                    item[name] = None
+                else:
+                    # float32列按单精度有效位数取整，避免输出多余的尾数
+                    item[name] = round(value, 4) if dtype is np.float32 else value
+            result.append(item)
+        return result
+
+    def _code_rows(self, ts_code: str) -> np.ndarray:
+        code_id = self._code_ids.get(ts_code)
+        if code_id is None:
+            return np.empty(0, dtype=np.int64)
+        return self._code_order[self._code_starts[code_id]:self._code_starts[code_id + 1]]
+
+    def trading_dates(self) -> np.ndarray:
+        """已缓存的交易日（YYYYMMDD整数，升序）"""
+        return self._dates
+
+    def latest_trade_date(self) -> Optional[str]:
+        """缓存中的最新交易日（YYYYMMDD）"""
+        return self.format_date(self._dates[-1]) if len(self._dates) else None
+
+    def covers(self, trade_date: Any) -> bool:
+        """判断日期是否落在缓存范围内"""
+        if not len(self._dates):
+            return False
+        value = self.to_int_date(trade_date)
+        return int(self._dates[0]) <= value
+
+    def get_range(self, ts_code: str, start_date: Optional[str] = None,
+                  end_date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        获取单只股票区间行情（按日期升序）
+
+        Args:
+            ts_code: 股票代码
+            start_date: 开始日期（含），YYYYMMDD或YYYY-MM-DD
+            end_date: 结束日期（含）
+        """
+        with self._lock:
+            rows = self._code_rows(ts_code)
+            if not len(rows):
+                return []
+            dates = self._columns['trade_date'][rows]
+            lo = np.searchsorted(dates, self.to_int_date(start_date), 'left') if start_date else 0
+            hi = np.searchsorted(dates, self.to_int_date(end_date), 'right') if end_date else len(rows)
+            return self._rows_to_dicts(rows[lo:hi])
+
+    def get_latest(self, ts_code: str, before_date: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """获取单只股票最新一条行情（可限定不晚于某日）"""
+        bars = self.get_range(ts_code, end_date=before_date)
+        return bars[-1] if bars else None
+
+    def top_n(self, column: str = 'pct_chg', n: int = 10, trade_date: Optional[str] = None,
+              ascending: bool = False) -> List[Dict[str, Any]]:
+        """
+        全市场横截面排名（向量化计算，替代SQL ORDER BY）
+
+        Args:
+            column: 排名字段，如pct_chg、amount、vol
+            n: 返回数量
+            trade_date: 交易日，默认最新交易日
+            ascending: 是否升序（如跌幅榜）
+        """
+        if column not in self.VALUE_COLUMNS:
+            raise ValueError(f"不支持的排名字段: {column}")
+
+        with self._lock:
+            if not len(self._dates):
+                return []
+            if trade_date:
+                pos = np.searchsorted(self._dates, self.to_int_date(trade_date))
+                if pos >= len(self._dates) or self._dates[pos] != self.to_int_date(trade_date):
+                    return []
+            else:
+                pos = len(self._dates) - 1
+
+            start = int(self._offsets[pos])
+            end = int(self._offsets[pos + 1]) if pos + 1 < len(self._offsets) else self.row_count
+
+            values = np.asarray(self._columns[column][start:end], dtype=np.float64)
+            keys = values if ascending else -values
+            keys = np.where(np.isnan(keys), np.inf, keys)
+
+            n = min(n, len(keys))
+            if n <= 0:
+                return []
+            top = np.argpartition(keys, n - 1)[:n]
+            top = top[np.argsort(keys[top], kind='stable')]
+            return self._rows_to_dicts(top + start)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {
+            'enabled': settings.DAILY_BAR_CACHE_ENABLED,
+            'row_count': self.row_count,
+            'trading_days': len(self._dates),
+            'stock_count': len(self.ts_codes),
+            'first_date': self.format_date(self._dates[0]) if len(self._dates) else None,
+            'latest_date': self.latest_trade_date(),
+            'disk_bytes': sum(
+                self._column_file(name).stat().st_size
+                for name in self._column_dtypes() if self._column_file(name).exists()
+            )
+        }
+
+
+# 单例实例
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_daily_bar_cache() -> DailyBarCache:
+    """获取日线缓存的单例实例"""
+    global _cache_instance
+
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = DailyBarCache()
+
+    return _cache_instance
+
+
+# 构建/增量同步缓存
+if __name__ == "__main__":
+    cache = get_daily_bar_cache()
+    added = cache.sync()
+    print(f"新增 {added} 行")
+    print(f"缓存统计: {cache.get_stats()}")
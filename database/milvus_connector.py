@@ -4,22 +4,62 @@ Milvus向量数据库连接器 - 修复版本
 from typing import List, Dict, Any, Optional
 import logging
 import json
+import threading
+import time
+import numpy as np
 from pymilvus import (
     connections, Collection, utility,
-    FieldSchema, CollectionSchema, DataType
+    FieldSchema, CollectionSchema, DataType,
+    AnnSearchRequest, RRFRanker, WeightedRanker
 )
 
 from config.settings import settings
+from database.milvus_partitioning import PartitionRouter
+from database.vector_storage import (
+    STORAGE_FLOAT32, STORAGE_BINARY, check_storage_profile, to_storage_vectors, from_float16_field,
+    rescore_results, RescoringFuture, get_full_precision_store
+)
 from utils.logger import setup_logger
 
 
 class MilvusConnector:
     """Milvus向量数据库连接器"""
     
-    def __init__(self):
+    # BGE-M3稀疏向量字段
+    SPARSE_FIELD = "sparse_embeddings"
+    
+    def __init__(self, collection_name: Optional[str] = None, partitioned: Optional[bool] = None,
+                 index_profile: Optional[str] = None, sparse: Optional[bool] = None,
+                 vector_storage: Optional[str] = None):
+        """
+        Args:
+            collection_name: 集合名称（或别名），默认使用配置文件中的设置
+            partitioned: 是否按年份和股票代码桶分区写入/检索，默认使用配置文件中的设置
+            index_profile: 新建集合时使用的索引配置名，默认使用配置文件中的设置
+            sparse: 新建集合时是否包含稀疏向量字段，默认EMBEDDING_SPARSE_ENABLED；已有集合按schema判断
+            vector_storage: 新建集合的向量存储精度，默认MILVUS_VECTOR_STORAGE；已有集合按字段类型判断
+        """
         self.logger = setup_logger("milvus_connector")
-        self.collection_name = settings.MILVUS_COLLECTION_NAME
+        self.collection_name = collection_name or settings.MILVUS_COLLECTION_NAME
         self.collection = None
+        self.sparse_enabled = settings.EMBEDDING_SPARSE_ENABLED if sparse is None else sparse
+        self.index_profile = index_profile or settings.MILVUS_INDEX_PROFILE
+        if self.index_profile not in settings.MILVUS_INDEX_PROFILES:
+            raise ValueError(f"未知的索引配置: {self.index_profile}")
+        self.vector_storage = vector_storage or settings.MILVUS_VECTOR_STORAGE
+        self._full_precision_store = None
+        
+        # 分区路由
+        self.partitioned = settings.MILVUS_PARTITIONING_ENABLED if partitioned is None else partitioned
+        self.partition_router = PartitionRouter()
+        self._partitions = set()
+        self._partitions_refreshed_at = 0.0
+        self._partition_lock = threading.Lock()
+        self._partition_stats = {'searches': 0, 'pruned': 0, 'partitions_searched': 0}
+        
+        # 检索负载统计（按模式：full=完整字段搜索，light=仅主键搜索，hydrate=按主键回填）
+        self._search_stats = {}
+        self._search_stats_lock = threading.Lock()
         
         # 连接到Milvus
         self._connect()
@@ -58,10 +98,18 @@ class MilvusConnector:
                 
                 # 确保集合已加载 - 修复的关键部分
                 self._ensure_collection_loaded()
+                self._refresh_partitions()
+                self.index_profile = self._detect_index_profile()
+                self.sparse_enabled = any(field.name == self.SPARSE_FIELD for field in schema.fields)
+                self.vector_storage = self._detect_vector_storage(schema)
+                if settings.EMBEDDING_SPARSE_ENABLED and not self.sparse_enabled:
+                    self.logger.warning(f"集合不含稀疏向量字段 {self.SPARSE_FIELD}，只使用稠密检索；"
+                                        f"可用 scripts/maintenance/rebuild_milvus_index.py --sparse 迁移")
             else:
                 # 集合不存在，创建新集合
                 self.logger.info(f"集合 '{self.collection_name}' 不存在，开始创建...")
                 self._create_collection()
+                self._refresh_partitions()
                 
         except Exception as e:
             self.logger.error(f"初始化集合失败: {e}")
@@ -93,6 +141,10 @@ class MilvusConnector:
     def _create_collection(self):
         """创建新集合 - 使用与现有集合相同的schema"""
         try:
+            check_storage_profile(self.vector_storage,
+                                  settings.MILVUS_INDEX_PROFILES[self.index_profile]["index"]["index_type"])
+            vector_dtype = getattr(DataType, settings.MILVUS_VECTOR_STORAGE_MODES[self.vector_storage]["dtype"])
+            
             # 定义字段 - 匹配现有schema
             fields = [
                 FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
@@ -102,9 +154,11 @@ class MilvusConnector:
                 FieldSchema(name="ann_date", dtype=DataType.VARCHAR, max_length=20),
                 FieldSchema(name="title", dtype=DataType.VARCHAR, max_length=500),
                 FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=2000),
-                FieldSchema(name="embeddings", dtype=DataType.FLOAT_VECTOR, dim=1024),
+                FieldSchema(name="embeddings", dtype=vector_dtype, dim=1024),
                 FieldSchema(name="metadata", dtype=DataType.JSON)
             ]
+            if self.sparse_enabled:
+                fields.append(FieldSchema(name=self.SPARSE_FIELD, dtype=DataType.SPARSE_FLOAT_VECTOR))
             
             # 创建schema
             schema = CollectionSchema(
@@ -117,19 +171,13 @@ class MilvusConnector:
                 name=self.collection_name,
                 schema=schema
             )
-            self.logger.info("集合创建成功")
+            self.logger.info(f"集合创建成功，向量存储精度: {self.vector_storage}")
             
             # 创建索引
-            index_params = {
-                "metric_type": "IP",
-                "index_type": "IVF_FLAT",
-                "params": {"nlist": 128}
-            }
-            self.collection.create_index(
-                field_name="embeddings",
-                index_params=index_params
-            )
-            self.logger.info("向量索引创建成功")
+            self.create_vector_index(self.index_profile)
+            if self.sparse_enabled:
+                self.collection.create_index(field_name=self.SPARSE_FIELD, index_params=settings.MILVUS_SPARSE_INDEX)
+                self.logger.info(f"稀疏向量索引创建成功: {settings.MILVUS_SPARSE_INDEX}")
             
             # 加载集合
             self.collection.load()
@@ -139,6 +187,94 @@ class MilvusConnector:
             self.logger.error(f"创建集合失败: {e}")
             raise
     
+    def create_vector_index(self, profile: str):
+        """按索引配置在embeddings字段上建索引"""
+        index_params = settings.MILVUS_INDEX_PROFILES[profile]["index"]
+        self.collection.create_index(
+            field_name="embeddings",
+            index_params=index_params
+        )
+        self.index_profile = profile
+        self.logger.info(f"向量索引创建成功: {profile} {index_params}")
+    
+    def _detect_index_profile(self) -> str:
+        """按集合实际的索引类型匹配索引配置，无法匹配时沿用配置文件中的设置"""
+        try:
+            for index in self.collection.indexes:
+                if index.field_name != "embeddings":
+                    continue
+                index_type = index.params.get("index_type", "").upper()
+                for name, profile in settings.MILVUS_INDEX_PROFILES.items():
+                    if profile["index"]["index_type"] == index_type:
+                        self.logger.info(f"向量索引: {index_type}，使用索引配置 {name}")
+                        return name
+                self.logger.warning(f"索引类型 {index_type} 没有对应的索引配置，使用 {self.index_profile}")
+        except Exception as e:
+            self.logger.warning(f"读取索引信息失败: {e}")
+        return self.index_profile
+    
+    def _detect_vector_storage(self, schema) -> str:
+        """按向量字段类型（及索引类型）判断存储精度"""
+        dtype = next((field.dtype.name for field in schema.fields if field.name == "embeddings"), "FLOAT_VECTOR")
+        index_type = settings.MILVUS_INDEX_PROFILES[self.index_profile]["index"]["index_type"]
+        if dtype == "BINARY_VECTOR":
+            storage = "binary"
+        elif dtype == "FLOAT16_VECTOR":
+            storage = "int8" if index_type == "IVF_SQ8" else "float16"
+        else:
+            storage = STORAGE_FLOAT32
+        if storage != STORAGE_FLOAT32:
+            self.logger.info(f"向量存储精度: {storage}（{dtype} + {index_type}）")
+        return storage
+    
+    @property
+    def rescore_enabled(self) -> bool:
+        """低精度存储且开启精排"""
+        return self.vector_storage != STORAGE_FLOAT32 and settings.MILVUS_RESCORE_ENABLED
+    
+    @property
+    def full_precision_store(self):
+        """本集合的全精度向量存储（按实际集合名分目录，别名切换后不混用）"""
+        if self._full_precision_store is None:
+            try:
+                name = self.collection.describe().get("collection_name") or self.collection_name
+            except Exception:
+                name = self.collection_name
+            self._full_precision_store = get_full_precision_store(name)
+        return self._full_precision_store
+    
+    def full_precision_vectors(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        query结果行（含id和embeddings字段）的float32向量
+        
+        低精度集合从本地全精度存储读取；本地缺失时float16字段解码使用，二值字段无法还原则报错
+        """
+        if self.vector_storage == STORAGE_FLOAT32:
+            return np.asarray([row['embeddings'] for row in rows], dtype=np.float32).reshape(len(rows), -1)
+        found, vectors = self.full_precision_store.get_many([row['id'] for row in rows])
+        for i in np.flatnonzero(~found):
+            if self.vector_storage == STORAGE_BINARY:
+                raise RuntimeError(f"主键 {rows[i]['id']} 缺少本地全精度向量，二值向量无法还原")
+            vectors[i] = from_float16_field(rows[i]['embeddings'])
+        return vectors
+    
+    def get_search_params(self, query_class: Optional[str] = None, top_k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        按查询类别选择检索参数
+        
+        Args:
+            query_class: interactive（在线问答）或batch（批量分析），默认interactive
+            top_k: 返回数量（HNSW的ef、DiskANN的search_list不能小于top_k）
+        """
+        profile = settings.MILVUS_INDEX_PROFILES[self.index_profile]
+        query_class = query_class or settings.MILVUS_DEFAULT_QUERY_CLASS
+        params = dict(profile["search"].get(query_class, profile["search"][settings.MILVUS_DEFAULT_QUERY_CLASS]))
+        if top_k:
+            for key in ("ef", "search_list"):
+                if key in params:
+                    params[key] = max(params[key], top_k)
+        return {"metric_type": profile["index"]["metric_type"], "params": params}
+    
     def query(self, expr: str, output_fields: List[str] = None, limit: int = 10000) -> List[Dict[str, Any]]:
         """查询数据 - 添加了重试机制"""
         if not self.collection:
@@ -181,8 +317,20 @@ class MilvusConnector:
             
             return []
     
-    def insert_data(self, data: List[Dict[str, Any]]) -> bool:
-        """插入数据到集合"""
+    def insert_data(self, data: List[Dict[str, Any]], flush: bool = True,
+                    embeddings: Optional[np.ndarray] = None,
+                    sparse_embeddings: Optional[List[Dict[int, float]]] = None) -> bool:
+        """
+        插入数据到集合（批量迁移时可关闭逐批flush，结束后统一flush）
+        
+        Args:
+            data: 数据项列表
+            flush: 插入后是否flush
+            embeddings: 与data逐行对应的float32向量矩阵；提供时直接作为向量列写入，
+                不再逐条读取item['embedding']
+            sparse_embeddings: 与data逐行对应的稀疏向量（集合含稀疏字段时必需）；
+                未提供时逐条读取item['sparse_embedding']
+        """
         if not self.collection:
             self.logger.error("集合未初始化")
             raise RuntimeError("集合未初始化")
@@ -191,48 +339,20 @@ class MilvusConnector:
             # 确保集合已加载
             self._ensure_collection_loaded()
             
-            # 准备数据
-            doc_ids = []
-            chunk_ids = []
-            ts_codes = []
-            ann_dates = []
-            titles = []
-            texts = []
-            embeddings = []
-            metadatas = []
-            
-            for item in data:
-                doc_ids.append(item['id'])
-                chunk_ids.append(item['chunk_id'])
-                ts_codes.append(item['ts_code'])
-                ann_dates.append(str(item['ann_date']))
-                titles.append(item['title'][:500])
-                texts.append(item['text'][:2000])
-                embeddings.append(item['embedding'])
-                
-                if isinstance(item['metadata'], str):
-                    try:
-                        metadata_json = json.loads(item['metadata'])
-                    except:
-                        metadata_json = {"raw": item['metadata']}
-                else:
-                    metadata_json = item['metadata']
-                metadatas.append(metadata_json)
-            
-            # 插入数据
-            insert_data = [
-                doc_ids,
-                chunk_ids,
-                ts_codes,
-                ann_dates,
-                titles,
-                texts,
-                embeddings,
-                metadatas
-            ]
+            if self.sparse_enabled and sparse_embeddings is None:
+                if any('sparse_embedding' not in item for item in data):
+                    raise ValueError(f"集合包含稀疏向量字段 {self.SPARSE_FIELD}，插入数据缺少稀疏向量")
+                sparse_embeddings = [item['sparse_embedding'] for item in data]
+            insert_data = self.build_insert_columns(data, embeddings,
+                                                    sparse_embeddings if self.sparse_enabled else None)
+            ts_codes, ann_dates = insert_data[2], insert_data[3]
             
-            self.collection.insert(insert_data)
-            self.collection.flush()
+            if self.partitioned:
+                self._insert_partitioned(insert_data, ts_codes, ann_dates)
+            else:
+                self._insert_columns(insert_data)
+            if flush:
+                self.collection.flush()
             
             self.logger.info(f"成功插入 {len(data)} 条数据")
             return True
@@ -241,11 +361,235 @@ class MilvusConnector:
             self.logger.error(f"插入数据失败: {e}")
             raise
     
+    def _refresh_partitions(self):
+        """刷新集合的分区列表缓存"""
+        with self._partition_lock:
+            self._partitions = {partition.name for partition in self.collection.partitions}
+            self._partitions_refreshed_at = time.time()
+    
+    # 剪枝结果为空时强制刷新的最短间隔（秒），避免无匹配分区的查询反复请求分区列表
+    PARTITION_MISS_REFRESH_INTERVAL = 1.0
+    
+    def _known_partitions(self, max_age: Optional[float] = None) -> set:
+        """
+        分区列表缓存，超过max_age（默认MILVUS_PARTITION_REFRESH_INTERVAL）秒时重新读取，
+        使其他进程（入库、迁移）新建的分区能被检索到
+        """
+        if max_age is None:
+            max_age = settings.MILVUS_PARTITION_REFRESH_INTERVAL
+        if time.time() - self._partitions_refreshed_at >= max_age:
+            try:
+                self._refresh_partitions()
+            except Exception as e:
+                # 刷新失败时继续使用已有列表
+                self.logger.warning(f"刷新分区列表失败: {e}")
+                self._partitions_refreshed_at = time.time()
+        with self._partition_lock:
+            return self._partitions
+    
+    def _ensure_partition(self, name: str):
+        """分区不存在时创建并加载"""
+        if name in self._partitions:
+            return
+        with self._partition_lock:
+            if name in self._partitions:
+                return
+            if not self.collection.has_partition(name):
+                self.collection.create_partition(name)
+                self.logger.info(f"创建分区: {name}")
+            try:
+                # 已加载集合中新建的分区需要单独加载才能被检索
+                self.collection.partition(name).load()
+            except Exception as e:
+                self.logger.debug(f"加载分区 {name} 失败: {e}")
+            self._partitions = self._partitions | {name}
+    
+    @staticmethod
+    def build_insert_columns(data: List[Dict[str, Any]], embeddings: Optional[np.ndarray] = None,
+                             sparse_embeddings: Optional[List[Dict[int, float]]] = None) -> List[Any]:
+        """按集合字段顺序组装列式插入数据，向量列为连续的float32矩阵；提供稀疏向量时追加为最后一列"""
+        doc_ids = []
+        chunk_ids = []
+        ts_codes = []
+        ann_dates = []
+        titles = []
+        texts = []
+        metadatas = []
+        
+        for item in data:
+            doc_ids.append(item['id'])
+            chunk_ids.append(item['chunk_id'])
+            ts_codes.append(item['ts_code'])
+            ann_dates.append(str(item['ann_date']))
+            titles.append(item['title'][:500])
+            texts.append(item['text'][:2000])
+            
+            if isinstance(item['metadata'], str):
+                try:
+                    metadata_json = json.loads(item['metadata'])
+                except:
+                    metadata_json = {"raw": item['metadata']}
+            else:
+                metadata_json = item['metadata']
+            metadatas.append(metadata_json)
+        
+        if embeddings is None:
+            embeddings = np.asarray([item['embedding'] for item in data], dtype=np.float32)
+        else:
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if len(embeddings) != len(data):
+            raise ValueError(f"向量行数 {len(embeddings)} 与数据条数 {len(data)} 不一致")
+        
+        columns = [
+            doc_ids,
+            chunk_ids,
+            ts_codes,
+            ann_dates,
+            titles,
+            texts,
+            embeddings,
+            metadatas
+        ]
+        if sparse_embeddings is not None:
+            if len(sparse_embeddings) != len(data):
+                raise ValueError(f"稀疏向量条数 {len(sparse_embeddings)} 与数据条数 {len(data)} 不一致")
+            columns.append(list(sparse_embeddings))
+        return columns
+    
+    def _insert_partitioned(self, columns: List[List[Any]], ts_codes: List[str], ann_dates: List[str]):
+        """按年份和股票代码桶分组后逐分区插入"""
+        groups = {}
+        for i, (ts_code, ann_date) in enumerate(zip(ts_codes, ann_dates)):
+            groups.setdefault(self.partition_router.partition_name(ts_code, ann_date), []).append(i)
+        
+        for name, indices in groups.items():
+            self._ensure_partition(name)
+            self._insert_columns(
+                [column[indices] if isinstance(column, np.ndarray) else [column[i] for i in indices]
+                 for column in columns],
+                partition_name=name
+            )
+        self.logger.debug(f"分区写入: {len(ts_codes)} 条数据分布在 {len(groups)} 个分区")
+    
+    def _insert_columns(self, columns: List[Any], partition_name: Optional[str] = None):
+        """写入一组列；低精度存储时向量列转换为字段格式，全精度向量按返回的主键保存到本地"""
+        if self.vector_storage == STORAGE_FLOAT32:
+            if partition_name:
+                self.collection.insert(columns, partition_name=partition_name)
+            else:
+                self.collection.insert(columns)
+            return
+        
+        embeddings = columns[6]
+        columns = columns[:6] + [to_storage_vectors(self.vector_storage, embeddings)] + columns[7:]
+        if partition_name:
+            result = self.collection.insert(columns, partition_name=partition_name)
+        else:
+            result = self.collection.insert(columns)
+        try:
+            self.full_precision_store.put(result.primary_keys, embeddings)
+        except Exception as e:
+            # 数据已写入Milvus，不抛出避免调用方重试造成重复；缺失的向量检索时按近似得分排序
+            self.logger.error(f"保存全精度向量失败: {e}")
+    
+    def resolve_partitions(self, filter_expr: Optional[str]) -> Optional[List[str]]:
+        """
+        根据过滤表达式计算需要检索的最小分区集合
+        
+        Returns:
+            分区名列表；未启用分区或表达式无法剪枝时返回None（检索全部分区）
+        """
+        if not self.partitioned:
+            return None
+        partitions = self.partition_router.partitions_for_expr(filter_expr, self._known_partitions())
+        if partitions is not None and not partitions:
+            # 满足条件的分区可能刚由其他进程创建，重新读取分区列表后再判断
+            partitions = self.partition_router.partitions_for_expr(
+                filter_expr, self._known_partitions(max_age=self.PARTITION_MISS_REFRESH_INTERVAL)
+            )
+        
+        with self._partition_lock:
+            self._partition_stats['searches'] += 1
+            if partitions is not None:
+                self._partition_stats['pruned'] += 1
+                self._partition_stats['partitions_searched'] += len(partitions)
+        
+        if partitions is not None and not partitions:
+            # 没有分区能满足条件：检索空的默认分区，保持返回结构不变
+            return ["_default"]
+        return partitions
+    
+    def get_partition_stats(self) -> Dict[str, Any]:
+        """分区剪枝统计"""
+        with self._partition_lock:
+            stats = dict(self._partition_stats)
+            stats['total_partitions'] = len(self._partitions)
+        stats['enabled'] = self.partitioned
+        stats['avg_partitions_searched'] = (
+            stats['partitions_searched'] / stats['pruned'] if stats['pruned'] else None
+        )
+        return stats
+    
+    # 输出字段
+    SEARCH_OUTPUT_FIELDS = [
+        "doc_id", "text", "ts_code", "title", 
+        "ann_date", "chunk_id", "metadata"
+    ]
+    # 两阶段检索第一阶段只返回主键、得分和用于去重的doc_id
+    LIGHT_OUTPUT_FIELDS = ["doc_id"]
+    
+    @property
+    def hybrid_search_enabled(self) -> bool:
+        """集合含稀疏字段且开启服务端混合检索"""
+        return self.sparse_enabled and settings.MILVUS_HYBRID_SEARCH_ENABLED
+    
+    def get_hybrid_ranker(self):
+        """服务端融合策略：RRF（按排名）或加权（按得分）"""
+        if settings.MILVUS_HYBRID_RANKER == "weighted":
+            return WeightedRanker(settings.MILVUS_HYBRID_DENSE_WEIGHT, settings.MILVUS_HYBRID_SPARSE_WEIGHT)
+        if settings.MILVUS_HYBRID_RANKER != "rrf":
+            raise ValueError(f"未知的混合检索融合策略: {settings.MILVUS_HYBRID_RANKER}")
+        return RRFRanker(settings.HYBRID_RRF_K)
+    
+    def _hybrid_search(self, query_vectors, sparse_vectors, top_k, filter_expr, output_fields, query_class,
+                       **kwargs):
+        """稠密与稀疏两路ANN在一次请求中执行，服务端融合后返回（结果结构与search相同，得分为融合得分）"""
+        if not self.sparse_enabled:
+            raise ValueError(f"集合不含稀疏向量字段 {self.SPARSE_FIELD}，无法混合检索")
+        if len(sparse_vectors) != len(query_vectors):
+            raise ValueError("稀疏查询向量与稠密查询向量条数不一致")
+        requests = [
+            AnnSearchRequest(data=self._storage_query_vectors(query_vectors), anns_field="embeddings",
+                             param=self.get_search_params(query_class, top_k), limit=top_k, expr=filter_expr),
+            AnnSearchRequest(data=sparse_vectors, anns_field=self.SPARSE_FIELD,
+                             param=settings.MILVUS_SPARSE_SEARCH_PARAMS, limit=top_k, expr=filter_expr)
+        ]
+        return self.collection.hybrid_search(
+            reqs=requests,
+            rerank=self.get_hybrid_ranker(),
+            limit=top_k,
+            partition_names=self.resolve_partitions(filter_expr),
+            output_fields=self.SEARCH_OUTPUT_FIELDS if output_fields is None else output_fields,
+            **kwargs
+        )
+    
     def search(self, 
               query_vectors: List[List[float]], 
               top_k: int = 5,
-              filter_expr: Optional[str] = None) -> List[List[Dict[str, Any]]]:
-        """向量搜索"""
+              filter_expr: Optional[str] = None,
+              output_fields: Optional[List[str]] = None,
+              query_class: Optional[str] = None,
+              sparse_vectors: Optional[List[Dict[int, float]]] = None,
+              rescore: Optional[bool] = None) -> List[List[Dict[str, Any]]]:
+        """
+        向量搜索（output_fields默认返回完整字段，query_class选择检索参数）
+        
+        提供sparse_vectors（与query_vectors逐条对应）时为混合模式：稠密与稀疏检索在服务端
+        按MILVUS_HYBRID_RANKER融合，需集合含稀疏向量字段
+        
+        低精度存储的集合多取候选后用本地全精度向量精排（rescore默认MILVUS_RESCORE_ENABLED），
+        返回的distance为精确内积；混合模式返回融合得分，不精排
+        """
         if not self.collection:
             self.logger.error("集合未初始化")
             raise RuntimeError("集合未初始化")
@@ -254,27 +598,14 @@ class MilvusConnector:
             # 确保集合已加载
             self._ensure_collection_loaded()
             
-            # 搜索参数
-            search_params = {
-                "metric_type": "IP",
-                "params": {"nprobe": 10}
-            }
-            
-            # 输出字段
-            output_fields = [
-                "doc_id", "text", "ts_code", "title", 
-                "ann_date", "chunk_id", "metadata"
-            ]
+            if sparse_vectors is not None:
+                results = self._hybrid_search(query_vectors, sparse_vectors, top_k, filter_expr,
+                                              output_fields, query_class)
+                self.logger.debug(f"混合搜索完成，返回 {len(results)} 组结果")
+                return results
             
-            # 执行搜索
-            results = self.collection.search(
-                data=query_vectors,
-                anns_field="embeddings",
-                param=search_params,
-                limit=top_k,
-                expr=filter_expr,
-                output_fields=output_fields
-            )
+            # 执行搜索（只检索过滤条件可能命中的分区）
+            results = self._dense_search(query_vectors, top_k, filter_expr, output_fields, query_class, rescore)
             
             self.logger.debug(f"搜索完成，返回 {len(results)} 组结果")
             return results
@@ -287,6 +618,150 @@ class MilvusConnector:
                 # 可以选择重试搜索
             raise
     
+    def search_async(self, 
+                     query_vectors: List[List[float]], 
+                     top_k: int = 5,
+                     filter_expr: Optional[str] = None,
+                     output_fields: Optional[List[str]] = None,
+                     query_class: Optional[str] = None,
+                     sparse_vectors: Optional[List[Dict[int, float]]] = None,
+                     rescore: Optional[bool] = None):
+        """
+        异步向量搜索（sparse_vectors、rescore同search）
+        
+        Returns:
+            SearchFuture：result()获取与search相同的结果，cancel()取消未完成的请求
+        """
+        if not self.collection:
+            self.logger.error("集合未初始化")
+            raise RuntimeError("集合未初始化")
+        
+        self._ensure_collection_loaded()
+        if sparse_vectors is not None:
+            return self._hybrid_search(query_vectors, sparse_vectors, top_k, filter_expr,
+                                       output_fields, query_class, _async=True)
+        return self._dense_search(query_vectors, top_k, filter_expr, output_fields, query_class, rescore,
+                                  _async=True)
+    
+    def _storage_query_vectors(self, query_vectors):
+        """查询向量转换为向量字段的格式（float32原样传入）"""
+        if self.vector_storage == STORAGE_FLOAT32:
+            return query_vectors
+        return to_storage_vectors(self.vector_storage, query_vectors)
+    
+    def _dense_search(self, query_vectors, top_k, filter_expr, output_fields, query_class, rescore, **kwargs):
+        """稠密向量检索；需要精排时按倍数多取候选，结果（或异步结果）取回后重排为top_k"""
+        rescore = self.rescore_enabled if rescore is None else (rescore and self.vector_storage != STORAGE_FLOAT32)
+        limit = top_k
+        if rescore:
+            limit = top_k * settings.MILVUS_VECTOR_STORAGE_MODES[self.vector_storage]["rescore_multiplier"]
+        results = self.collection.search(
+            data=self._storage_query_vectors(query_vectors),
+            anns_field="embeddings",
+            param=self.get_search_params(query_class, limit),
+            limit=limit,
+            expr=filter_expr,
+            partition_names=self.resolve_partitions(filter_expr),
+            output_fields=self.SEARCH_OUTPUT_FIELDS if output_fields is None else output_fields,
+            **kwargs
+        )
+        if not rescore:
+            return results
+        
+        def apply(raw):
+            return rescore_results(raw, query_vectors, self.full_precision_store, self.vector_storage, top_k)
+        return RescoringFuture(results, apply) if kwargs.get('_async') else apply(results)
+    
+    def fetch_by_ids(self, ids: List[int], output_fields: Optional[List[str]] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        按主键批量回填字段（两阶段检索第二阶段，一次query请求）
+        
+        Args:
+            ids: 主键列表
+            output_fields: 回填字段，默认与完整搜索相同
+            
+        Returns:
+            {主键: 字段字典}
+        """
+        if not ids:
+            return {}
+        if not self.collection:
+            self.logger.error("集合未初始化")
+            raise RuntimeError("集合未初始化")
+        
+        self._ensure_collection_loaded()
+        start = time.time()
+        rows = self.collection.query(
+            expr=f"id in [{', '.join(str(int(pk)) for pk in ids)}]",
+            output_fields=output_fields or self.SEARCH_OUTPUT_FIELDS,
+            limit=len(ids)
+        )
+        self.record_search('hydrate', time.time() - start, self.estimate_payload_bytes(rows), len(rows))
+        return {row['id']: row for row in rows}
+    
+    def fetch_by_doc_ids(self, doc_ids: List[str],
+                         output_fields: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        按doc_id（{announcement_id}_{chunk_id}）批量读取chunk，一次query请求
+        
+        Returns:
+            {doc_id: 字段字典}，不存在的doc_id不出现在结果中
+        """
+        if not doc_ids:
+            return {}
+        if not self.collection:
+            self.logger.error("集合未初始化")
+            raise RuntimeError("集合未初始化")
+        
+        self._ensure_collection_loaded()
+        start = time.time()
+        quoted = ', '.join(json.dumps(doc_id, ensure_ascii=False) for doc_id in doc_ids)
+        rows = self.collection.query(
+            expr=f"doc_id in [{quoted}]",
+            output_fields=output_fields or ["doc_id", "chunk_id", "text"],
+            limit=min(len(doc_ids) * 4, 16384)  # 历史数据中可能存在重复chunk
+        )
+        self.record_search('neighbors', time.time() - start, self.estimate_payload_bytes(rows), len(rows))
+        return {row['doc_id']: row for row in rows}
+    
+    @staticmethod
+    def estimate_payload_bytes(rows: List[Dict[str, Any]]) -> int:
+        """估算结果字段的传输字节数（字符串按UTF-8，JSON按序列化长度，数值按8字节）"""
+        total = 0
+        for row in rows:
+            for value in row.values():
+                if isinstance(value, str):
+                    total += len(value.encode('utf-8'))
+                elif isinstance(value, (dict, list)):
+                    total += len(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+                else:
+                    total += 8
+        return total
+    
+    def record_search(self, mode: str, latency: float, payload_bytes: int, hits: int):
+        """记录一次检索的耗时和负载"""
+        with self._search_stats_lock:
+            stats = self._search_stats.setdefault(mode, {
+                'requests': 0, 'hits': 0, 'total_latency': 0.0, 'payload_bytes': 0
+            })
+            stats['requests'] += 1
+            stats['hits'] += hits
+            stats['total_latency'] += latency
+            stats['payload_bytes'] += payload_bytes
+    
+    def get_search_stats(self) -> Dict[str, Any]:
+        """按模式汇总的检索耗时和负载"""
+        with self._search_stats_lock:
+            result = {}
+            for mode, stats in self._search_stats.items():
+                requests = stats['requests'] or 1
+                result[mode] = {
+                    **stats,
+                    'avg_latency': stats['total_latency'] / requests,
+                    'avg_payload_bytes': stats['payload_bytes'] / requests
+                }
+            return result
+    
     def delete_by_expr(self, expr: str) -> bool:
         """根据表达式删除数据"""
         if not self.collection:
@@ -316,7 +791,12 @@ class MilvusConnector:
                 "name": self.collection.name,
                 "row_count": self.collection.num_entities,
                 "loaded": load_state.name == "Loaded",
-                "load_state": load_state.name
+                "load_state": load_state.name,
+                "index_profile": self.index_profile,
+                "sparse": self.sparse_enabled,
+                "vector_storage": self.vector_storage,
+                "full_precision_store": self.full_precision_store.get_stats() if self.rescore_enabled else None,
+                "partitions": self.get_partition_stats()
             }
         except Exception as e:
             self.logger.error(f"获取统计信息失败: {e}")
@@ -0,0 +1,229 @@
+"""
+Milvus索引重建与集合复制
+同一向量字段只能有一个索引，原地重建需要释放集合（期间无法检索）。
+在线重建的做法：按新索引配置建影子集合 -> 复制数据 -> 等待索引构建完成并加载 ->
+追平复制期间的新增数据 -> 切换别名（服务端原子操作，检索方无需重启）->
+从源集合做最后一次按主键的追平，并按源集合删除复制后被删除（或被替换）的行
+同样的流程也用于给已有集合增加BGE-M3稀疏向量字段（复制时由模型补算稀疏向量）
+"""
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from pymilvus import utility
+
+from database.milvus_connector import MilvusConnector
+from database.milvus_partitioning import PARTITION_PATTERN
+from utils.logger import setup_logger
+
+logger = setup_logger("milvus_index_manager")
+
+COPY_FIELDS = ["id", "doc_id", "chunk_id", "ts_code", "ann_date", "title", "text", "embeddings", "metadata"]
+
+
+def _copy_fields(connector: MilvusConnector) -> List[str]:
+    return COPY_FIELDS + [MilvusConnector.SPARSE_FIELD] if connector.sparse_enabled else COPY_FIELDS
+
+
+def _to_insert_item(row):
+    """query结果行 -> insert_data的输入格式"""
+    item = {
+        'id': row['doc_id'],
+        'chunk_id': row['chunk_id'],
+        'ts_code': row['ts_code'],
+        'ann_date': row['ann_date'],
+        'title': row['title'],
+        'text': row['text'],
+        'embedding': row['embeddings'],
+        'metadata': row['metadata']
+    }
+    if MilvusConnector.SPARSE_FIELD in row:
+        item['sparse_embedding'] = row[MilvusConnector.SPARSE_FIELD]
+    return item
+
+
+def model_sparse_encoder() -> Callable[[List[str]], List[Dict[int, float]]]:
+    """用嵌入模型（配置了编码池时使用编码池）补算稀疏向量，需EMBEDDING_SPARSE_ENABLED"""
+    from config.settings import settings
+    if settings.EMBEDDING_POOL_WORKERS > 0:
+        from models.embedding_pool import get_embedding_pool
+        encoder = get_embedding_pool()
+    else:
+        from models.embedding_model import get_embedding_model
+        encoder = get_embedding_model()
+    return lambda texts: encoder.encode_batch(texts, return_sparse=True)[1]
+
+
+def copy_collection(source: MilvusConnector, target: MilvusConnector,
+                    batch_size: int = 2000, resume_after_id: int = 0,
+                    sparse_encoder: Optional[Callable[[List[str]], List[Dict[int, float]]]] = None) -> Tuple[int, int]:
+    """
+    把源集合中主键大于resume_after_id的数据复制到目标集合（按目标集合的分区设置路由）
+
+    Args:
+        sparse_encoder: 目标集合有稀疏字段而源集合没有时，按chunk文本补算稀疏向量（稠密向量沿用源集合）
+
+    Returns:
+        (复制条数, 已复制的最大源主键)；中断后可从该主键继续
+    """
+    if target.sparse_enabled and not source.sparse_enabled and sparse_encoder is None:
+        raise ValueError("目标集合含稀疏向量字段而源集合没有，需提供sparse_encoder")
+    iterator = source.collection.query_iterator(
+        batch_size=batch_size,
+        expr=f"id > {resume_after_id}",
+        output_fields=_copy_fields(source)
+    )
+    copied, last_id, start = 0, resume_after_id, time.time()
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            sparse = None
+            if target.sparse_enabled and not source.sparse_enabled:
+                sparse = sparse_encoder([row['text'] for row in rows])
+            # 低精度存储的源集合从本地全精度存储取向量，目标集合按自身存储精度写入
+            target.insert_data([_to_insert_item(row) for row in rows], flush=False,
+                               embeddings=source.full_precision_vectors(rows), sparse_embeddings=sparse)
+            copied += len(rows)
+            last_id = max(last_id, max(row['id'] for row in rows))
+            logger.info(f"已复制 {copied} 条，{copied / (time.time() - start):.0f} 条/秒，源集合最大id {last_id}")
+    finally:
+        iterator.close()
+
+    target.collection.flush()
+    target._refresh_partitions()
+    return copied, last_id
+
+
+def _iterate_rows(connector: MilvusConnector, expr: str, output_fields: List[str],
+                  batch_size: int) -> Iterator[Dict]:
+    iterator = connector.collection.query_iterator(batch_size=batch_size, expr=expr, output_fields=output_fields)
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            yield from rows
+    finally:
+        iterator.close()
+
+
+def snapshot_keys(connector: MilvusConnector, batch_size: int = 2000) -> Dict[Tuple[str, int], List[int]]:
+    """集合中 (doc_id, chunk_id) -> 主键列表（升序）"""
+    keys = {}
+    for row in _iterate_rows(connector, "id > 0", ["id", "doc_id", "chunk_id"], batch_size):
+        keys.setdefault((row['doc_id'], row['chunk_id']), []).append(row['id'])
+    for ids in keys.values():
+        ids.sort()
+    return keys
+
+
+def reconcile_deletes(source: MilvusConnector, target: MilvusConnector, copied_through: int,
+                      target_keys: Dict[Tuple[str, int], List[int]], batch_size: int = 2000) -> int:
+    """
+    删除目标集合中源集合已不存在的复制行
+
+    target_keys是目标集合中从源集合主键不超过copied_through的行复制来的数据（snapshot_keys的结果），
+    按 (doc_id, chunk_id) 与源集合这部分行的现存条数比较，多出的是复制后在源集合被删除的行；
+    同一键既有旧行又有新行时（删除后重新写入），保留目标集合中较新的主键
+
+    Returns:
+        删除条数
+    """
+    alive = Counter((row['doc_id'], row['chunk_id'])
+                    for row in _iterate_rows(source, f"id <= {copied_through}", ["doc_id", "chunk_id"], batch_size))
+    stale = []
+    for key, ids in target_keys.items():
+        extra = len(ids) - alive.get(key, 0)
+        if extra > 0:
+            stale.extend(ids[:extra])
+    for i in range(0, len(stale), batch_size):
+        target.collection.delete(f"id in {stale[i:i + batch_size]}")
+    if stale:
+        target.collection.flush()
+    return len(stale)
+
+
+def is_partitioned(connector: MilvusConnector) -> bool:
+    """集合是否已按年份和股票代码桶分区"""
+    return any(PARTITION_PATTERN.match(name) for name in connector._partitions)
+
+
+def resolve_alias(alias: str) -> Optional[str]:
+    """别名当前指向的集合，别名不存在时返回None"""
+    for name in utility.list_collections():
+        if alias in utility.list_aliases(name):
+            return name
+    return None
+
+
+def rebuild_index(alias: str, profile: str, source_name: Optional[str] = None,
+                  batch_size: int = 2000, drop_old: bool = False, sparse: Optional[bool] = None,
+                  vector_storage: Optional[str] = None) -> str:
+    """
+    按新索引配置在线重建并切换别名
+
+    Args:
+        alias: 服务使用的别名（MILVUS_COLLECTION_NAME应设置为该别名）
+        profile: 目标索引配置名
+        source_name: 别名尚不存在时的源集合
+        batch_size: 每批复制的条数
+        drop_old: 切换后删除旧集合
+        sparse: 新集合是否包含稀疏向量字段，默认与源集合相同；源集合没有时由模型补算
+        vector_storage: 新集合的向量存储精度，默认与源集合相同
+
+    Returns:
+        新集合名称
+    """
+    current = resolve_alias(alias) or source_name
+    if not current:
+        raise ValueError(f"别名 {alias} 不存在，首次重建需指定源集合")
+
+    source = MilvusConnector(collection_name=current, partitioned=False)
+    partitioned = is_partitioned(source)
+    sparse = source.sparse_enabled if sparse is None else sparse
+    vector_storage = vector_storage or source.vector_storage
+    target_name = f"{alias}__{profile}_{time.strftime('%Y%m%d%H%M%S')}"
+    logger.info(f"开始重建: {current}({source.index_profile}, {source.vector_storage}) -> "
+                f"{target_name}({profile}, {vector_storage})，分区: {partitioned}，稀疏字段: {sparse}")
+
+    target = MilvusConnector(collection_name=target_name, partitioned=partitioned, index_profile=profile,
+                             sparse=sparse, vector_storage=vector_storage)
+    sparse_encoder = model_sparse_encoder() if sparse and not source.sparse_enabled else None
+    copied, last_id = copy_collection(source, target, batch_size, sparse_encoder=sparse_encoder)
+
+    logger.info("等待索引构建完成...")
+    utility.wait_for_index_building_complete(target_name)
+    target._ensure_collection_loaded()
+
+    # 追平复制期间写入的数据（自增主键单调递增）
+    caught_up, last_id = copy_collection(source, target, batch_size, resume_after_id=last_id,
+                                         sparse_encoder=sparse_encoder)
+    copied += caught_up
+
+    # 切换前目标集合只含复制来的行，记下它们的主键用于切换后核对删除
+    copied_keys = snapshot_keys(target, batch_size)
+
+    if resolve_alias(alias):
+        utility.alter_alias(target_name, alias)
+    else:
+        utility.create_alias(target_name, alias)
+    logger.info(f"别名 {alias} 已切换到 {target_name}")
+
+    # 切换后新的写入与删除经别名进入目标集合，源集合不再变化：
+    # 复制追平到切换之间写入源集合的行按主键补齐，其间在源集合删除的行从目标集合删除。
+    # 仍存在的窗口：切换前已解析别名、切换后才到达源集合的写入或删除不会被同步；
+    # 切换后经别名删除、但在最后一次追平才复制到目标集合的行会被重新写入。
+    # 对一致性要求严格时应在重建期间暂停入库
+    caught_up, last_id_after = copy_collection(source, target, batch_size, resume_after_id=last_id,
+                                               sparse_encoder=sparse_encoder)
+    copied += caught_up
+    deleted = reconcile_deletes(source, target, last_id, copied_keys, batch_size)
+    logger.info(f"重建完成: 复制 {copied} 条（切换后补齐 {caught_up} 条，源集合最大id {last_id_after}），"
+                f"删除源集合中已不存在的 {deleted} 条")
+
+    if drop_old and current != target_name:
+        utility.drop_collection(current)
+        logger.info(f"已删除旧集合 {current}")
+    return target_name
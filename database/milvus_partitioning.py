@@ -0,0 +1,108 @@
+"""
+Milvus分区路由
+按公告年份和股票代码哈希桶划分分区（分区名 y{年份}_b{桶号}），
+写入时按行路由，检索时从过滤表达式推导最小分区集合
+"""
+import re
+import zlib
+from typing import Iterable, List, Optional, Set
+
+from config.settings import settings
+
+PARTITION_PATTERN = re.compile(r'^y(\d{4})_b(\d+)$')
+UNKNOWN_YEAR = 0  # 日期无法解析的行放入y0000分区
+
+_TS_CODE_EQ = re.compile(r'\bts_code\s*==\s*["\']([^"\']+)["\']')
+_TS_CODE_IN = re.compile(r'\bts_code\s+in\s*\[([^\]]*)\]')
+_ANN_DATE_CMP = re.compile(r'\bann_date\s*(==|>=|<=|>|<)\s*["\']([^"\']+)["\']')
+_QUOTED = re.compile(r'["\']([^"\']+)["\']')
+_PARENTHESIZED = re.compile(r'\([^()]*\)')
+
+
+class PartitionRouter:
+    """年份 × 股票代码哈希桶分区路由"""
+
+    def __init__(self, ts_buckets: Optional[int] = None):
+        self.ts_buckets = ts_buckets or settings.MILVUS_PARTITION_TS_BUCKETS
+
+    def bucket(self, ts_code: str) -> int:
+        """股票代码哈希桶（crc32，跨进程稳定）"""
+        return zlib.crc32(str(ts_code).encode('utf-8')) % self.ts_buckets
+
+    @staticmethod
+    def year(ann_date) -> int:
+        """公告年份，支持YYYYMMDD和YYYY-MM-DD"""
+        text = str(ann_date or '')[:4]
+        return int(text) if text.isdigit() else UNKNOWN_YEAR
+
+    def partition_name(self, ts_code: str, ann_date) -> str:
+        """行所属分区名"""
+        return f"y{self.year(ann_date):04d}_b{self.bucket(ts_code):02d}"
+
+    def partitions_for_expr(self, expr: Optional[str], existing: Iterable[str]) -> Optional[List[str]]:
+        """
+        从过滤表达式推导需要检索的分区
+
+        只对顶层为and连接的表达式剪枝（括号内的or子句不影响年份和股票代码条件）
+
+        Args:
+            expr: Milvus过滤表达式
+            existing: 集合中已有的分区名
+
+        Returns:
+            需要检索的分区名列表（可能为空，表示没有分区能满足条件）；
+            无法剪枝时返回None，表示检索全部分区
+        """
+        if not expr:
+            return None
+        top_level = expr
+        while _PARENTHESIZED.search(top_level):
+            top_level = _PARENTHESIZED.sub('', top_level)
+        if re.search(r'\b(or|not)\b|\|\||!', top_level, re.IGNORECASE):
+            return None
+
+        buckets = self._buckets_from_expr(top_level)
+        years = self._year_range_from_expr(top_level)
+        if buckets is None and years is None:
+            return None
+
+        selected = []
+        for name in existing:
+            match = PARTITION_PATTERN.match(name)
+            if not match:
+                continue
+            year, bucket = int(match.group(1)), int(match.group(2))
+            if buckets is not None and bucket not in buckets:
+                continue
+            if years is not None and not (years[0] <= year <= years[1]):
+                continue
+            selected.append(name)
+        return sorted(selected)
+
+    def _buckets_from_expr(self, expr: str) -> Optional[Set[int]]:
+        codes = None
+        for match in _TS_CODE_EQ.finditer(expr):
+            codes = self._intersect(codes, {match.group(1)})
+        for match in _TS_CODE_IN.finditer(expr):
+            codes = self._intersect(codes, set(_QUOTED.findall(match.group(1))))
+        if codes is None:
+            return None
+        return {self.bucket(code) for code in codes}
+
+    @staticmethod
+    def _intersect(current: Optional[Set[str]], codes: Set[str]) -> Set[str]:
+        return codes if current is None else current & codes
+
+    def _year_range_from_expr(self, expr: str) -> Optional[tuple]:
+        low, high = None, None
+        for op, value in _ANN_DATE_CMP.findall(expr):
+            year = self.year(value)
+            if year == UNKNOWN_YEAR:
+                continue
+            if op in ('==', '>=', '>'):
+                low = year if low is None else max(low, year)
+            if op in ('==', '<=', '<'):
+                high = year if high is None else min(high, year)
+        if low is None and high is None:
+            return None
+        return (low if low is not None else UNKNOWN_YEAR + 1, high if high is not None else 9999)
@@ -1,7 +1,9 @@
 """
 MySQL数据库连接器
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import pandas as pd
 from sqlalchemy import create_engine, text, Engine
 from sqlalchemy.pool import QueuePool
@@ -17,6 +19,11 @@ class MySQLConnector:
     def __init__(self):
         self.logger = setup_logger("mysql_connector")
         self.engine = self._create_engine()
+        
+        # 批量查询并发执行的线程池（按需创建）
+        self._batch_executor = None
+        self._batch_executor_lock = threading.Lock()
+        
         self.logger.info("MySQL连接器初始化完成")
     
     def _create_engine(self) -> Engine:
@@ -56,20 +63,7 @@ class MySQLConnector:
         """
         try:
             with self.engine.connect() as conn:
-                # 使用text()包装查询，避免格式化问题
-                if params:
-                    result = conn.execute(text(query), params)
-                else:
-                    result = conn.execute(text(query))
-                
-                # 获取列名
-                columns = result.keys()
-                
-                # 转换为字典列表
-                rows = []
-                for row in result:
-                    rows.append(dict(zip(columns, row)))
-                
+                rows = self._fetch_rows(conn, query, params)
                 self.logger.debug(f"查询执行成功，返回 {len(rows)} 条记录")
                 return rows
                 
@@ -78,6 +72,75 @@ class MySQLConnector:
             self.logger.error(f"查询语句: {query}")
             raise
     
+    def _fetch_rows(self, conn, query: str, params: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        """在给定连接上执行查询并转换为字典列表"""
+        # 使用text()包装查询，避免格式化问题
+        if params:
+            result = conn.execute(text(query), params)
+        else:
+            result = conn.execute(text(query))
+        
+        # 获取列名
+        columns = result.keys()
+        
+        # 转换为字典列表
+        rows = []
+        for row in result:
+            rows.append(dict(zip(columns, row)))
+        return rows
+    
+    def execute_batch(self,
+                      statements: Union[Dict[str, Tuple[str, Optional[Dict]]], List[Tuple[str, Optional[Dict]]]],
+                      parallel: bool = False) -> Union[Dict[str, List[Dict[str, Any]]], List[List[Dict[str, Any]]]]:
+        """
+        批量执行多条参数化查询
+        
+        顺序模式下所有语句在同一个连接上执行，只检出一次连接；
+        并发模式下相互独立的语句分发到多个池化连接上同时执行。
+        
+        Args:
+            statements: {名称: (SQL, 参数)} 或 [(SQL, 参数), ...]
+            parallel: 是否并发执行（语句之间必须相互独立）
+            
+        Returns:
+            与输入形状一致的结果：{名称: 行列表} 或 [行列表, ...]
+        """
+        named = isinstance(statements, dict)
+        keys = list(statements.keys()) if named else list(range(len(statements)))
+        items = [statements[key] for key in keys]
+        if not items:
+            return {} if named else []
+        
+        try:
+            if parallel and len(items) > 1:
+                executor = self._get_batch_executor()
+                futures = [executor.submit(self.execute_query, query, params) for query, params in items]
+                results = [future.result() for future in futures]
+            else:
+                with self.engine.connect() as conn:
+                    results = [self._fetch_rows(conn, query, params) for query, params in items]
+            
+            self.logger.debug(f"批量查询执行成功: {len(items)} 条语句 (parallel={parallel})")
+            
+        except Exception as e:
+            self.logger.error(f"批量查询执行失败: {e}")
+            raise
+        
+        if named:
+            return dict(zip(keys, results))
+        return results
+    
+    def _get_batch_executor(self) -> ThreadPoolExecutor:
+        """获取批量查询线程池（大小不超过连接池容量）"""
+        if self._batch_executor is None:
+            with self._batch_executor_lock:
+                if self._batch_executor is None:
+                    self._batch_executor = ThreadPoolExecutor(
+                        max_workers=min(settings.DB_BATCH_MAX_PARALLEL, settings.DB_POOL_SIZE),
+                        thread_name_prefix="mysql_batch"
+                    )
+        return self._batch_executor
+    
     def execute_query_df(self, query: str, params: Optional[Dict] = None) -> pd.DataFrame:
         """
         执行查询并返回DataFrame
@@ -159,6 +222,9 @@ class MySQLConnector:
     
     def close(self):
         """关闭连接池"""
+        if self._batch_executor is not None:
+            self._batch_executor.shutdown(wait=False)
+            self._batch_executor = None
         self.engine.dispose()
         self.logger.info("MySQL连接池已关闭")
     
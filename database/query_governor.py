@@ -0,0 +1,280 @@
+"""
+SQL查询治理器
+对Agent生成的SQL先执行EXPLAIN估算扫描成本，超预算时改写（附数据范围说明）或拒绝，
+并为每条语句附加执行超时，记录按表统计的成本信息
+"""
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+from config.settings import settings
+from database.mysql_connector import MySQLConnector
+from utils.logger import setup_logger
+
+
+class QueryBudgetExceededError(Exception):
+    """查询成本超出预算"""
+    pass
+
+
+@dataclass
+class GovernedQuery:
+    """治理后的查询"""
+    original_sql: str
+    sql: str
+    estimated_rows: int
+    full_scan_tables: List[str] = field(default_factory=list)
+    tables: List[str] = field(default_factory=list)
+    rewrites: List[str] = field(default_factory=list)
+    scope_notes: List[str] = field(default_factory=list)  # 缩小数据范围的改写说明，需随结果告知回答方
+
+
+class QueryGovernor:
+    """基于EXPLAIN的查询成本守卫"""
+
+    # 大表及其日期列，超预算时用于追加日期范围条件
+    LARGE_TABLE_DATE_COLUMNS = {
+        'tu_daily_detail': 'trade_date',
+        'tu_moneyflow_dc': 'trade_date',
+        'tu_moneyflow_ind_dc': 'trade_date',
+        'tu_anns_d': 'ann_date',
+    }
+
+    # 子句关键字，用于定位WHERE条件的结束位置
+    _CLAUSE_END_PATTERN = re.compile(
+        r'\b(GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT)\b', re.IGNORECASE
+    )
+    _AGGREGATE_PATTERN = re.compile(
+        r'\b(COUNT|SUM|AVG|MIN|MAX)\s*\(', re.IGNORECASE
+    )
+
+    def __init__(self, mysql_connector: Optional[MySQLConnector] = None):
+        self.mysql = mysql_connector or MySQLConnector()
+        self.logger = setup_logger("query_governor")
+
+        self.enabled = settings.SQL_GOVERNOR_ENABLED
+        self.max_rows = settings.SQL_GOVERNOR_MAX_ROWS
+        self.default_limit = settings.SQL_GOVERNOR_DEFAULT_LIMIT
+        self.date_window_days = settings.SQL_GOVERNOR_DATE_WINDOW_DAYS
+        self.timeout_ms = settings.SQL_STATEMENT_TIMEOUT_MS
+
+        # 按表统计的成本信息
+        self._table_stats: Dict[str, Dict[str, Any]] = {}
+        self._counters = {'checked': 0, 'rewritten': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+    def explain(self, sql: str) -> List[Dict[str, Any]]:
+        """执行EXPLAIN并返回执行计划"""
+        return self.mysql.execute_query(f"EXPLAIN {sql}")
+
+    def estimate_cost(self, plan: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        根据执行计划估算扫描成本
+
+        同一id的计划行构成一条嵌套循环连接链：每张表的扫描行数为 rows × 前序表的扇出，
+        扇出按 rows × filtered/100 累乘；不同id（子查询、UNION分支）的成本相加
+
+        Args:
+            plan: EXPLAIN返回的执行计划
+
+        Returns:
+            {'estimated_rows', 'tables', 'full_scan_tables'}
+        """
+        chains: Dict[Any, List[float]] = {}  # id -> [扫描行数, 扇出]
+        tables = []
+        full_scan_tables = []
+
+        for row in plan:
+            table = row.get('table') or ''
+            rows = float(row.get('rows') or 0)
+            filtered = row.get('filtered')
+            filtered = 100.0 if filtered is None else float(filtered)
+
+            chain = chains.setdefault(row.get('id'), [0.0, 1.0])
+            chain[0] += chain[1] * rows
+            chain[1] *= max(rows * filtered / 100, 1.0)
+
+            # 派生表（<derived2>）等不计入按表统计
+            if not table or table.startswith('<'):
+                continue
+            tables.append(table)
+
+            # type=ALL或未使用索引视为全表扫描
+            if str(row.get('type', '')).upper() == 'ALL' or not row.get('key'):
+                full_scan_tables.append(table)
+
+        return {
+            'estimated_rows': int(sum(scanned for scanned, _ in chains.values())),
+            'tables': tables,
+            'full_scan_tables': full_scan_tables
+        }
+
+    def govern(self, sql: str) -> GovernedQuery:
+        """
+        检查并治理一条SQL语句
+
+        Args:
+            sql: 原始SQL语句
+
+        Returns:
+            治理后的查询
+
+        Raises:
+            QueryBudgetExceededError: 改写后仍超出预算
+        """
+        sql = sql.strip().rstrip(';').strip()
+        if not self.enabled:
+            return GovernedQuery(original_sql=sql, sql=sql, estimated_rows=0)
+
+        with self._lock:
+            self._counters['checked'] += 1
+
+        cost = self.estimate_cost(self.explain(sql))
+        governed_sql = sql
+        rewrites, scope_notes = [], []
+
+        if cost['estimated_rows'] > self.max_rows:
+            self.logger.warning(
+                f"查询预估扫描 {cost['estimated_rows']} 行，超出预算 {self.max_rows}，尝试改写"
+            )
+            governed_sql, rewrites, scope_notes = self._rewrite_over_budget(governed_sql, cost)
+            if rewrites:
+                cost = self.estimate_cost(self.explain(governed_sql))
+
+            if cost['estimated_rows'] > self.max_rows:
+                self._record(cost, rejected=True)
+                raise QueryBudgetExceededError(
+                    f"查询预估扫描 {cost['estimated_rows']} 行，超出预算 {self.max_rows} 行，"
+                    f"请添加日期范围或股票代码条件"
+                )
+
+        if self._needs_limit(governed_sql):
+            governed_sql = f"{governed_sql} LIMIT {self.default_limit}"
+            rewrites.append(f"limit:{self.default_limit}")
+
+        governed_sql = self._apply_timeout_hint(governed_sql)
+        self._record(cost, rewritten=bool(rewrites))
+
+        if rewrites:
+            self.logger.info(f"查询已改写: {rewrites}")
+
+        return GovernedQuery(
+            original_sql=sql,
+            sql=governed_sql,
+            estimated_rows=cost['estimated_rows'],
+            full_scan_tables=cost['full_scan_tables'],
+            tables=cost['tables'],
+            rewrites=rewrites,
+            scope_notes=scope_notes
+        )
+
+    def _rewrite_over_budget(self, sql: str, cost: Dict[str, Any]) -> tuple:
+        """
+        为全表扫描的大表追加日期范围条件
+
+        Returns:
+            (改写后的SQL, 改写标记, 数据范围说明)
+        """
+        rewrites, notes = [], []
+        # 只改写单表查询，多表/子查询改写容易改变语义
+        if re.search(r'\bJOIN\b|\(\s*SELECT\b', sql, re.IGNORECASE):
+            return sql, rewrites, notes
+
+        for table in cost['full_scan_tables']:
+            date_column = self.LARGE_TABLE_DATE_COLUMNS.get(table)
+            if not date_column:
+                continue
+            if re.search(rf'\b{date_column}\b', self._where_clause(sql) or '', re.IGNORECASE):
+                continue
+
+            start_date = (datetime.now() - timedelta(days=self.date_window_days)).strftime('%Y%m%d')
+            sql = self._add_predicate(sql, f"{date_column} >= '{start_date}'")
+            rewrites.append(f"date_range:{table}.{date_column}>={start_date}")
+            notes.append(f"原查询超出扫描预算，已限定为{table}中{date_column}不早于{start_date}"
+                         f"（最近{self.date_window_days}天）的数据，查询更早的数据需指定日期范围")
+
+        return sql, rewrites, notes
+
+    def _where_clause(self, sql: str) -> Optional[str]:
+        """提取WHERE条件文本"""
+        match = re.search(r'\bWHERE\b', sql, re.IGNORECASE)
+        if not match:
+            return None
+        rest = sql[match.end():]
+        end = self._CLAUSE_END_PATTERN.search(rest)
+        return rest[:end.start()] if end else rest
+
+    def _add_predicate(self, sql: str, predicate: str) -> str:
+        """追加WHERE条件，原有条件用括号包裹以保持优先级"""
+        match = re.search(r'\bWHERE\b', sql, re.IGNORECASE)
+        if match:
+            rest = sql[match.end():]
+            end = self._CLAUSE_END_PATTERN.search(rest)
+            condition = rest[:end.start()] if end else rest
+            tail = rest[end.start():] if end else ''
+            return f"{sql[:match.start()]}WHERE {predicate} AND ({condition.strip()}) {tail}".strip()
+
+        end = self._CLAUSE_END_PATTERN.search(sql)
+        if end:
+            return f"{sql[:end.start()]}WHERE {predicate} {sql[end.start():]}"
+        return f"{sql} WHERE {predicate}"
+
+    def _needs_limit(self, sql: str) -> bool:
+        """非聚合查询且未指定LIMIT时需要追加LIMIT"""
+        if re.search(r'\bLIMIT\s+\d+', sql, re.IGNORECASE):
+            return False
+        if re.search(r'\bGROUP\s+BY\b', sql, re.IGNORECASE):
+            return True
+        return not self._AGGREGATE_PATTERN.search(sql)
+
+    def _apply_timeout_hint(self, sql: str) -> str:
+        """添加MAX_EXECUTION_TIME优化器提示，实现单语句超时"""
+        if not self.timeout_ms or 'MAX_EXECUTION_TIME' in sql.upper():
+            return sql
+        return re.sub(
+            r'^\s*SELECT\b',
+            f'SELECT /*+ MAX_EXECUTION_TIME({int(self.timeout_ms)}) */',
+            sql,
+            count=1,
+            flags=re.IGNORECASE
+        )
+
+    def _record(self, cost: Dict[str, Any], rewritten: bool = False, rejected: bool = False):
+        """记录按表统计的成本信息"""
+        with self._lock:
+            if rewritten:
+                self._counters['rewritten'] += 1
+            if rejected:
+                self._counters['rejected'] += 1
+
+            for table in set(cost['tables']):
+                stats = self._table_stats.setdefault(table, {
+                    'queries': 0,
+                    'estimated_rows_total': 0,
+                    'max_estimated_rows': 0,
+                    'full_scans': 0,
+                    'rewritten': 0,
+                    'rejected': 0
+                })
+                stats['queries'] += 1
+                stats['estimated_rows_total'] += cost['estimated_rows']
+                stats['max_estimated_rows'] = max(stats['max_estimated_rows'], cost['estimated_rows'])
+                if table in cost['full_scan_tables']:
+                    stats['full_scans'] += 1
+                if rewritten:
+                    stats['rewritten'] += 1
+                if rejected:
+                    stats['rejected'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取治理统计信息"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'max_rows': self.max_rows,
+                'timeout_ms': self.timeout_ms,
+                **self._counters,
+                'tables': {table: dict(stats) for table, stats in self._table_stats.items()}
+            }
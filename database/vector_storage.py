@@ -0,0 +1,204 @@
+"""
+向量存储精度与精排
+集合的向量字段可使用低精度存储以降低Milvus常驻内存（MILVUS_VECTOR_STORAGE）：
+- float32：FLOAT_VECTOR，原有方式
+- float16：FLOAT16_VECTOR，内存减半
+- int8：FLOAT16_VECTOR字段 + IVF_SQ8索引（索引内每维1字节标量量化）
+- binary：BINARY_VECTOR，每维取符号位（每条128字节），汉明距离预检索
+
+低精度集合检索时按倍数多取候选，再用本地内存映射的全精度float32向量计算精确内积重排，
+全精度向量在写入Milvus时按主键追加保存（每个集合一个目录）
+"""
+
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+import numpy as np
+
+from config.settings import settings
+from utils.append_only_store import AppendOnlyVectorStore
+from utils.logger import setup_logger
+
+logger = setup_logger("vector_storage")
+
+STORAGE_FLOAT32 = "float32"
+STORAGE_BINARY = "binary"
+
+
+def check_storage_profile(storage: str, index_type: str):
+    """校验存储精度与索引类型是否匹配"""
+    if storage not in settings.MILVUS_VECTOR_STORAGE_MODES:
+        raise ValueError(f"未知的向量存储精度: {storage}")
+    allowed = settings.MILVUS_VECTOR_STORAGE_MODES[storage]["index_types"]
+    if allowed is None:
+        allowed_ok = not index_type.startswith("BIN_")
+    else:
+        allowed_ok = index_type in allowed
+    if not allowed_ok:
+        raise ValueError(f"向量存储精度 {storage} 不支持索引类型 {index_type}")
+
+
+def to_storage_vectors(storage: str, vectors) -> Any:
+    """float32向量 -> 写入/检索低精度字段的格式（float32保持连续矩阵不复制）"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    if storage == STORAGE_FLOAT32:
+        return vectors
+    if storage == STORAGE_BINARY:
+        return [row.tobytes() for row in np.packbits(vectors > 0, axis=1)]
+    # pymilvus的FLOAT16_VECTOR需要逐条float16数组
+    return list(vectors.astype(np.float16))
+
+
+def from_float16_field(value) -> np.ndarray:
+    """query返回的FLOAT16_VECTOR字段值 -> float32向量"""
+    if isinstance(value, (list, tuple)) and len(value) == 1 and isinstance(value[0], (bytes, bytearray)):
+        value = value[0]
+    if isinstance(value, (bytes, bytearray)):
+        return np.frombuffer(value, dtype=np.float16).astype(np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+class FullPrecisionStore(AppendOnlyVectorStore):
+    """按Milvus主键保存全精度向量的只追加存储（ids.i64 + vectors.f32，读取时内存映射）"""
+
+    KEY_DTYPE = np.dtype('<i8')
+    KEYS_FILE_NAME = "ids.i64"
+
+    def __init__(self, path: Path, dimension: Optional[int] = None):
+        """
+        Args:
+            path: 存储目录（每个集合一个）
+            dimension: 向量维度
+        """
+        super().__init__(path, dimension or settings.EMBEDDING_DIM)
+        self._sorted_ids = np.empty(0, dtype=np.int64)
+        self._sorted_rows = np.empty(0, dtype=np.int64)
+        with self._lock:
+            self._sync()
+        logger.info(f"全精度向量存储已加载: {self._rows} 条, 目录 {self.path}")
+
+    def _index_keys(self, keys: np.ndarray, rows: np.ndarray):
+        """新追加的主键按序插入排序索引"""
+        order = np.argsort(keys, kind='stable')
+        new_ids = keys[order].astype(np.int64)
+        positions = np.searchsorted(self._sorted_ids, new_ids)
+        self._sorted_ids = np.insert(self._sorted_ids, positions, new_ids)
+        self._sorted_rows = np.insert(self._sorted_rows, positions, rows[order])
+
+    def _index_bytes(self) -> int:
+        return int(self._sorted_ids.nbytes + self._sorted_rows.nbytes)
+
+    def _lookup(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        positions = np.minimum(np.searchsorted(self._sorted_ids, ids), max(len(self._sorted_ids) - 1, 0))
+        if not len(self._sorted_ids):
+            return np.zeros(len(ids), dtype=bool), positions
+        found = self._sorted_ids[positions] == ids
+        return found, self._sorted_rows[positions]
+
+    def get_many(self, ids: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        按主键批量读取
+
+        Returns:
+            (命中掩码, 向量矩阵)；未命中的行为零
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.zeros((len(ids), self.dimension), dtype=np.float32)
+        with self._lock:
+            found, rows = self._lookup(ids)
+            if not found.all():
+                # 其他进程刚写入的数据
+                self._sync()
+                found, rows = self._lookup(ids)
+            if found.any():
+                vectors[found] = self._vector_view()[rows[found]]
+            self.stats['lookups'] += len(ids)
+            self.stats['hits'] += int(found.sum())
+        return found, vectors
+
+    def put(self, ids: List[int], vectors: np.ndarray):
+        """追加主键和全精度向量"""
+        ids = np.asarray(ids, dtype=self.KEY_DTYPE)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(ids), self.dimension)
+        if not len(ids):
+            return
+        with self._lock:
+            self._append(ids, vectors)
+
+
+class RescoredHit:
+    """精排后的命中（id / distance / entity 与pymilvus的Hit一致，distance为精确内积）"""
+
+    __slots__ = ('id', 'distance', 'entity')
+
+    def __init__(self, hit, distance: float):
+        self.id = hit.id
+        self.distance = distance
+        self.entity = hit.entity
+
+    @property
+    def score(self) -> float:
+        return self.distance
+
+    def get(self, field: str):
+        return self.entity.get(field)
+
+
+def rescore_results(results, query_vectors, store: FullPrecisionStore, storage: str,
+                    top_k: int) -> List[List[RescoredHit]]:
+    """
+    用全精度向量重排检索结果，每个查询保留top_k条
+
+    本地缺少全精度向量的候选沿用近似得分：低精度内积直接使用，
+    汉明距离按 cos(π·d/维数) 换算为余弦估计，与精确内积可比
+    """
+    rescored = []
+    for hits, query in zip(results, query_vectors):
+        hits = list(hits)
+        if not hits:
+            rescored.append([])
+            continue
+        found, vectors = store.get_many([hit.id for hit in hits])
+        exact = vectors @ np.asarray(query, dtype=np.float32)
+        approx = np.asarray([hit.distance for hit in hits], dtype=np.float32)
+        if storage == STORAGE_BINARY:
+            approx = np.cos(np.pi * approx / store.dimension)
+        scores = np.where(found, exact, approx)
+        order = np.argsort(-scores, kind='stable')[:top_k]
+        rescored.append([RescoredHit(hits[i], float(scores[i])) for i in order])
+    return rescored
+
+
+class RescoringFuture:
+    """异步检索结果取回时再精排（result / cancel / done 与SearchFuture一致）"""
+
+    def __init__(self, future, rescore: Callable[[Any], List[List[RescoredHit]]]):
+        self._future = future
+        self._rescore = rescore
+
+    def result(self, *args, **kwargs):
+        return self._rescore(self._future.result(*args, **kwargs))
+
+    def cancel(self):
+        return self._future.cancel()
+
+    def done(self):
+        return self._future.done()
+
+
+_stores: Dict[str, FullPrecisionStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_full_precision_store(collection_name: str) -> FullPrecisionStore:
+    """获取集合对应的全精度向量存储（进程内共享）"""
+    with _stores_lock:
+        store = _stores.get(collection_name)
+        if store is None:
+            store = _stores[collection_name] = FullPrecisionStore(
+                Path(settings.MILVUS_RESCORE_STORE_PATH) / collection_name
+            )
+        return store
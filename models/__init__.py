@@ -1,6 +1,7 @@
 # models/__init__.py
 """
 模型模块
+重排模型按需导入（首次访问时才加载sentence-transformers）
 """
 
 from .embedding_model import (
@@ -14,5 +15,14 @@ __all__ = [
     'EmbeddingModel',
     'get_embedding_model',
     'encode_text',
-    'batch_encode_texts'
-]
\ No newline at end of file
+    'batch_encode_texts',
+    'RerankerModel',
+    'get_reranker_model'
+]
+
+
+def __getattr__(name):
+    if name in ('RerankerModel', 'get_reranker_model'):
+        from . import reranker_model
+        return getattr(reranker_model, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
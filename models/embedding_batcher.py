@@ -0,0 +1,161 @@
+# models/embedding_batcher.py
+"""
+嵌入动态微批处理模块
+汇集进程内所有Agent的编码请求，凑满最大批量或等待超过最大等待时间后执行一次前向计算，
+再把结果分发到各调用方的Future
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Dict, Any, Optional
+
+import numpy as np
+
+from config.settings import settings
+from utils.logger import setup_logger
+
+logger = setup_logger("embedding_batcher")
+
+# 批量大小直方图的桶上界
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class EmbeddingBatcher:
+    """动态微批编码服务"""
+
+    def __init__(self,
+                 encode_fn: Callable[[List[str]], np.ndarray],
+                 max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None):
+        """
+        Args:
+            encode_fn: 文本列表 -> 归一化向量矩阵，或(向量矩阵, 逐条附加结果)如稀疏向量（一次前向计算）
+            max_batch_size: 单批最多文本数
+            max_wait_ms: 首个请求入队后最多等待的毫秒数
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_MICROBATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.EMBEDDING_MICROBATCH_MAX_WAIT_MS) / 1000
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._started_at = time.time()
+        self.stats = {
+            'requests': 0,
+            'batches': 0,
+            'errors': 0,
+            'total_queue_wait': 0.0,
+            'max_queue_wait': 0.0,
+            'total_encode_time': 0.0,
+            'batch_size_histogram': {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        }
+
+        self._worker = threading.Thread(target=self._run, name="embedding_batcher", daemon=True)
+        self._worker.start()
+        logger.info(f"微批编码服务启动: 最大批量{self.max_batch_size}, 最大等待{self.max_wait * 1000:.1f}ms")
+
+    def submit(self, text: str) -> Future:
+        """提交单条文本，返回结果为float32向量（encode_fn返回附加结果时为(向量, 附加结果)）的Future"""
+        future = Future()
+        self._queue.put((text, future, time.time()))
+        return future
+
+    def encode(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
+        """提交并等待结果"""
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self) -> List[tuple]:
+        """阻塞等待首个请求，再在最大等待时间内凑批"""
+        batch = [self._queue.get()]
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # 调用方已放弃的请求不参与计算
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            start = time.time()
+            waits = [start - enqueued for _, _, enqueued in batch]
+            try:
+                output = self.encode_fn([text for text, _, _ in batch])
+                if isinstance(output, tuple):
+                    vectors, extras = np.asarray(output[0], dtype=np.float32), output[1]
+                    results = [(vectors[i], extras[i]) for i in range(len(batch))]
+                else:
+                    vectors = np.asarray(output, dtype=np.float32)
+                    results = [vectors[i] for i in range(len(batch))]
+            except Exception as e:
+                logger.error(f"微批编码失败({len(batch)}条): {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                self._record(batch, waits, time.time() - start, error=True)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+            self._record(batch, waits, time.time() - start)
+
+    def _record(self, batch: List[tuple], waits: List[float], encode_time: float, error: bool = False):
+        size = len(batch)
+        bucket = next((b for b in BATCH_SIZE_BUCKETS if size <= b), BATCH_SIZE_BUCKETS[-1])
+        with self._stats_lock:
+            self.stats['requests'] += size
+            self.stats['batches'] += 1
+            self.stats['errors'] += int(error)
+            self.stats['total_queue_wait'] += sum(waits)
+            self.stats['max_queue_wait'] = max(self.stats['max_queue_wait'], max(waits))
+            self.stats['total_encode_time'] += encode_time
+            self.stats['batch_size_histogram'][bucket] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """批量分布、排队等待和吞吐统计"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+            stats['batch_size_histogram'] = dict(self.stats['batch_size_histogram'])
+        requests, batches = stats['requests'], stats['batches']
+        stats.update({
+            'queue_depth': self._queue.qsize(),
+            'avg_batch_size': requests / batches if batches else 0.0,
+            'avg_queue_wait_ms': stats['total_queue_wait'] / requests * 1000 if requests else 0.0,
+            'max_queue_wait_ms': stats.pop('max_queue_wait') * 1000,
+            'avg_encode_ms': stats['total_encode_time'] / batches * 1000 if batches else 0.0,
+            'throughput_per_sec': requests / (time.time() - self._started_at),
+            'encode_throughput_per_sec': requests / stats['total_encode_time'] if stats['total_encode_time'] else 0.0
+        })
+        return stats
+
+
+# 进程内共享实例（按向量来源标识，见EmbeddingModel.model_id）
+_batchers: Dict[str, EmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_embedding_batcher(model_id: str, encode_fn: Callable[[List[str]], np.ndarray]) -> EmbeddingBatcher:
+    """获取进程内共享的微批编码服务（同一模型与推理后端的所有EmbeddingModel实例共用）"""
+    batcher = _batchers.get(model_id)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(model_id)
+            if batcher is None:
+                batcher = _batchers[model_id] = EmbeddingBatcher(encode_fn)
+    return batcher
+
+
+def get_batcher_stats() -> Dict[str, Dict[str, Any]]:
+    """所有微批编码服务的统计"""
+    with _batchers_lock:
+        return {name: batcher.get_stats() for name, batcher in _batchers.items()}
@@ -0,0 +1,142 @@
+# models/embedding_cache.py
+"""
+查询向量缓存模块
+按（模型标识, 归一化文本）缓存查询向量，向量以float32存放在预分配的连续数组中，
+LRU淘汰，进程内所有Agent共享；混合检索的BGE-M3稀疏向量与稠密向量存放在同一键下
+"""
+
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+import numpy as np
+
+from config.settings import settings
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """归一化查询文本：NFKC（全角转半角）、去首尾空白、合并连续空白"""
+    return _WHITESPACE_PATTERN.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+class EmbeddingCache:
+    """定长LRU向量缓存"""
+
+    def __init__(self, capacity: int, dimension: int):
+        """
+        Args:
+            capacity: 最多缓存的向量数
+            dimension: 向量维度
+        """
+        self.capacity = capacity
+        self.dimension = dimension
+        self._slab = np.zeros((capacity, dimension), dtype=np.float32)
+        self._slots: "OrderedDict[bytes, int]" = OrderedDict()  # 键 -> 槽位，按最近使用排序
+        self._free = list(range(capacity - 1, -1, -1))
+        self._sparse: Dict[int, Dict[int, float]] = {}  # 槽位 -> 稀疏向量
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> bytes:
+        """缓存键：模型标识与归一化文本的摘要（定长16字节）"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(model_id.encode('utf-8'))
+        digest.update(b'\x00')
+        digest.update(normalize_text(text).encode('utf-8'))
+        return digest.digest()
+
+    def get(self, model_id: str, text: str) -> Optional[np.ndarray]:
+        """命中时返回向量副本（槽位可能被后续写入覆盖），未命中返回None"""
+        key = self.make_key(model_id, text)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                self.misses += 1
+                return None
+            self._slots.move_to_end(key)
+            self.hits += 1
+            return self._slab[slot].copy()
+
+    def get_hybrid(self, model_id: str, text: str) -> Optional[Tuple[np.ndarray, Dict[int, float]]]:
+        """命中稠密和稀疏向量时返回(稠密向量副本, 稀疏向量副本)，否则返回None"""
+        key = self.make_key(model_id, text)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None or slot not in self._sparse:
+                self.misses += 1
+                return None
+            self._slots.move_to_end(key)
+            self.hits += 1
+            return self._slab[slot].copy(), dict(self._sparse[slot])
+
+    def put(self, model_id: str, text: str, vector: np.ndarray, sparse: Optional[Dict[int, float]] = None):
+        """写入向量（可同时写入稀疏向量），缓存已满时淘汰最久未使用的条目"""
+        if self.capacity <= 0:
+            return
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.dimension:
+            return
+
+        key = self.make_key(model_id, text)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    _, slot = self._slots.popitem(last=False)
+                    self._sparse.pop(slot, None)
+                    self.evictions += 1
+                self._slots[key] = slot
+            else:
+                self._slots.move_to_end(key)
+            self._slab[slot] = vector
+            if sparse is not None:
+                self._sparse[slot] = dict(sparse)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._slots.clear()
+            self._sparse.clear()
+            self._free = list(range(self.capacity - 1, -1, -1))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取命中率和内存占用"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'capacity': self.capacity,
+                'size': len(self._slots),
+                'sparse_entries': len(self._sparse),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'slab_bytes': int(self._slab.nbytes),
+                # 键摘要16字节 + 有序字典条目开销的粗略估计
+                'index_bytes_estimate': len(self._slots) * (16 + 100)
+            }
+
+
+# 进程内共享实例
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """获取进程内共享的查询向量缓存"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_SIZE, settings.EMBEDDING_DIM)
+    return _embedding_cache
@@ -4,12 +4,16 @@ BGE-M3 嵌入模型模块
 提供文本向量化功能
 """
 
-import torch
 import numpy as np
-from typing import List, Union, Optional
-from sentence_transformers import SentenceTransformer
+from typing import List, Dict, Tuple, Union, Optional
 import logging
 from config.settings import settings
+from models.embedding_cache import get_embedding_cache
+from models.embedding_batcher import get_embedding_batcher, get_batcher_stats
+from models.inference_worker import create_inference_worker
+from utils.token_estimator import estimate_tokens
+import threading
+import time
 import warnings
 import os
 
@@ -19,112 +23,220 @@ warnings.filterwarnings('ignore', category=FutureWarning)
 
 logger = logging.getLogger(__name__)
 
+
+def plan_length_batches(lengths: np.ndarray, max_batch_tokens: int, max_batch_size: int) -> List[np.ndarray]:
+    """
+    按长度分桶组批
+    
+    Args:
+        lengths: 每条文本的token数
+        max_batch_tokens: 单批填充后的token上限（批内条数 × 批内最长长度）
+        max_batch_size: 单批最多文本数
+        
+    Returns:
+        每批的文本下标（批内按长度降序，首个即最长）
+    """
+    order = np.argsort(-np.asarray(lengths), kind="stable")
+    batches = []
+    start = 0
+    while start < len(order):
+        longest = max(int(lengths[order[start]]), 1)
+        size = max(1, min(max_batch_size, max_batch_tokens // longest, len(order) - start))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+# 后台预热使用的文本（覆盖短查询和较长chunk两种形状）
+WARMUP_TEXTS = [
+    "贵州茅台2024年第一季度营收",
+    "公司2023年度实现营业收入1,234.56亿元，同比增长12.34%；归属于上市公司股东的净利润234.56亿元。" * 8,
+]
+
+
+def resolve_model_path(backend: str, model_name: Optional[str] = None) -> str:
+    """
+    解析模型加载路径：ONNX后端使用导出目录；torch后端优先使用本地快照
+    （scripts/maintenance/prepare_model_snapshot.py 生成的safetensors目录），否则按模型名下载
+    """
+    if backend == 'onnx':
+        return settings.EMBEDDING_ONNX_PATH
+    snapshot = str(settings.EMBEDDING_SNAPSHOT_PATH)
+    if os.path.exists(snapshot):
+        if not any(name.endswith('.safetensors') for name in os.listdir(snapshot)):
+            logger.warning(f"本地模型 {snapshot} 不含safetensors权重，"
+                           f"运行 scripts/maintenance/prepare_model_snapshot.py 可加快加载")
+        return snapshot
+    return model_name or settings.EMBEDDING_MODEL_NAME
+
+
+class ModelLoader:
+    """
+    嵌入模型加载管理
+    
+    同一（后端, 模型路径, 设备）在进程内只加载一次，所有EmbeddingModel实例共享推理工作者；
+    支持首次编码时同步加载或后台线程加载并预热
+    """
+    
+    def __init__(self, backend: str, model_path: str, device: str):
+        self.backend = backend
+        self.model_path = model_path
+        self.device = device
+        self.worker = None
+        self.dimension: Optional[int] = None
+        self.load_time: Optional[float] = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._started = False
+        self._error: Optional[BaseException] = None
+    
+    @property
+    def state(self) -> str:
+        if not self._started:
+            return 'not_loaded'
+        if not self._ready.is_set():
+            return 'loading'
+        return 'failed' if self._error else 'ready'
+    
+    def start(self, background: bool) -> bool:
+        """开始加载（已加载或加载中时忽略，上次失败时重新加载），返回本次是否发起了加载"""
+        with self._lock:
+            if self._started and not (self._ready.is_set() and self._error is not None):
+                return False
+            self._started = True
+            self._ready.clear()
+            self._error = None
+        if background:
+            threading.Thread(target=self._load, args=(True,), name="embedding_loader", daemon=True).start()
+        else:
+            self._load(False)
+        return True
+    
+    def _load(self, warm_up: bool):
+        start = time.time()
+        try:
+            logger.info(f"正在加载嵌入模型: {self.model_path}")
+            logger.info(f"使用设备: {self.device}, 推理后端: {self.backend}, 推理工作者: {settings.EMBEDDING_WORKER_MODE}")
+            worker = create_inference_worker(
+                settings.EMBEDDING_WORKER_MODE,
+                self.model_path,
+                self.device,
+                settings.EMBEDDING_LOAD_TIMEOUT,
+                self.backend,
+                sparse=settings.EMBEDDING_SPARSE_ENABLED
+            )
+            worker.wait_ready(settings.EMBEDDING_LOAD_TIMEOUT)
+            
+            # 验证模型维度
+            test_embedding = worker.encode(
+                ["测试文本"], timeout=settings.EMBEDDING_ENCODE_TIMEOUT, convert_to_numpy=True
+            )[0]
+            actual_dim = test_embedding.shape[0]
+            if actual_dim != settings.EMBEDDING_DIM:
+                logger.warning(f"模型实际维度 {actual_dim} 与配置维度 {settings.EMBEDDING_DIM} 不匹配")
+                settings.EMBEDDING_DIM = actual_dim
+            
+            # 预热：首批真实请求不再承担内存分配和算子初始化的开销
+            if warm_up:
+                worker.encode(WARMUP_TEXTS, timeout=settings.EMBEDDING_ENCODE_TIMEOUT,
+                              batch_size=len(WARMUP_TEXTS), normalize_embeddings=True, convert_to_numpy=True)
+            
+            self.worker, self.dimension = worker, actual_dim
+            self.load_time = time.time() - start
+            logger.info(f"模型加载成功，向量维度: {actual_dim}，耗时 {self.load_time:.1f}秒"
+                        f"{'（含预热）' if warm_up else ''}")
+        except Exception as e:
+            logger.error(f"模型加载失败: {e}")
+            self._error = e
+        finally:
+            self._ready.set()
+    
+    def ensure(self):
+        """确保模型可用：未开始时同步加载，后台加载中则等待；失败时抛出异常，下次调用重新加载"""
+        self.start(background=False)
+        if not self._ready.wait(settings.EMBEDDING_LOAD_TIMEOUT + settings.EMBEDDING_ENCODE_TIMEOUT):
+            raise TimeoutError("等待嵌入模型加载超时")
+        if self._error is not None:
+            raise self._error
+    
+    def get_status(self) -> dict:
+        return {
+            'state': self.state,
+            'backend': self.backend,
+            'model_path': self.model_path,
+            'device': self.device,
+            'load_time': self.load_time,
+            'error': str(self._error) if self._error else None
+        }
+
+
+_loaders: dict = {}
+_loaders_lock = threading.Lock()
+
+
+def get_model_loader(backend: str, model_path: str, device: str) -> ModelLoader:
+    """获取进程内共享的模型加载管理器"""
+    key = (backend, model_path, device)
+    with _loaders_lock:
+        loader = _loaders.get(key)
+        if loader is None:
+            loader = _loaders[key] = ModelLoader(backend, model_path, device)
+        return loader
+
+
 class EmbeddingModel:
     """BGE-M3 嵌入模型封装"""
     
-    def __init__(self, model_name: Optional[str] = None, device: Optional[str] = None):
+    def __init__(self, model_name: Optional[str] = None, device: Optional[str] = None,
+                 backend: Optional[str] = None, load_mode: Optional[str] = None):
         """
-        初始化嵌入模型
+        初始化嵌入模型（默认不加载，首次编码时加载）
         
         Args:
             model_name: 模型名称，默认使用配置文件中的设置
             device: 运行设备，默认使用配置文件中的设置
+            backend: 推理后端 torch / onnx，默认使用配置文件中的设置
+            load_mode: lazy（首次编码时加载）/ background（立即后台加载并预热）/ eager（构造时同步加载），
+                默认使用配置文件中的设置
         """
         self.model_name = model_name or settings.EMBEDDING_MODEL_NAME
-        self.device = device or settings.EMBEDDING_DEVICE
-        self.model = None
-        self.dimension = settings.EMBEDDING_DIM
+        self.backend = backend or settings.EMBEDDING_BACKEND
+        # ONNX Runtime 后端只在CPU上运行
+        self.device = 'cpu' if self.backend == 'onnx' else (device or settings.EMBEDDING_DEVICE)
+        self._stats_lock = threading.Lock()
+        self.batch_stats = {'texts': 0, 'batches': 0, 'tokens': 0, 'padded_tokens': 0, 'encode_time': 0.0}
         
-        # 初始化模型
-        self._init_model()
+        self._loader = get_model_loader(self.backend, resolve_model_path(self.backend, self.model_name), self.device)
+        load_mode = load_mode or settings.EMBEDDING_LOAD_MODE
+        if load_mode == 'eager':
+            self._loader.ensure()
+        elif load_mode == 'background':
+            self.start_loading()
     
-    def _init_model(self):
-        """初始化模型（Windows兼容版本）"""
-        try:
-            # 检查是否有本地模型
-            import os
-            import platform
-            import threading
-            
-            local_model_path = os.path.join(os.path.dirname(__file__), "bge-m3")
-            if os.path.exists(local_model_path):
-                logger.info(f"发现本地模型: {local_model_path}")
-                model_name_to_use = local_model_path
-            else:
-                model_name_to_use = self.model_name
-            
-            logger.info(f"正在加载嵌入模型: {model_name_to_use}")
-            logger.info(f"使用设备: {self.device}")
-            
-            # Windows兼容的超时处理
-            model_loaded = False
-            load_error = None
-            
-            def load_model():
-                nonlocal model_loaded, load_error
-                try:
-                    self.model = SentenceTransformer(
-                        model_name_to_use,
-                        device=self.device,
-                        trust_remote_code=True
-                    )
-                    model_loaded = True
-                except Exception as e:
-                    load_error = e
-            
-            # 启动模型加载线程
-            load_thread = threading.Thread(target=load_model)
-            load_thread.daemon = True
-            load_thread.start()
-            
-            # 等待60秒
-            load_thread.join(timeout=60)
-            
-            if not model_loaded:
-                if load_error:
-                    raise load_error
-                else:
-                    raise TimeoutError("模型加载超时(60秒)")
-            
-            # 设置模型为评估模式
-            self.model.eval()
-            
-            # 验证模型维度（带超时保护）
-            test_embedding = None
-            test_error = None
-            
-            def test_encode():
-                nonlocal test_embedding, test_error
-                try:
-                    test_embedding = self.model.encode("测试文本", convert_to_numpy=True)
-                except Exception as e:
-                    test_error = e
-            
-            # 启动测试编码线程
-            test_thread = threading.Thread(target=test_encode)
-            test_thread.daemon = True
-            test_thread.start()
-            
-            # 等待30秒
-            test_thread.join(timeout=30)
-            
-            if test_error:
-                raise test_error
-            elif test_embedding is None:
-                raise TimeoutError("模型测试编码超时(30秒)")
-            
-            actual_dim = test_embedding.shape[0]
-            
-            if actual_dim != self.dimension:
-                logger.warning(f"模型实际维度 {actual_dim} 与配置维度 {self.dimension} 不匹配")
-                self.dimension = actual_dim
-                settings.EMBEDDING_DIM = actual_dim
-            
-            logger.info(f"模型加载成功，向量维度: {self.dimension}")
-            
-        except Exception as e:
-            logger.error(f"模型加载失败: {e}")
-            raise
+    def start_loading(self):
+        """后台加载并预热模型（已加载或加载中时忽略）"""
+        self._loader.start(background=True)
+    
+    def wait_until_ready(self):
+        """阻塞直到模型可用"""
+        self._loader.ensure()
+    
+    @property
+    def worker(self):
+        """推理工作者，未加载时为None"""
+        return self._loader.worker
+    
+    @property
+    def model(self):
+        """本进程内的模型对象；未加载或子进程推理模式下为None"""
+        return self._loader.worker.model if self._loader.worker else None
+    
+    @property
+    def dimension(self) -> int:
+        return self._loader.dimension or settings.EMBEDDING_DIM
+    
+    def get_load_status(self) -> dict:
+        """模型加载状态（not_loaded / loading / ready / failed）"""
+        return self._loader.get_status()
     
     def encode(
         self, 
@@ -147,9 +259,6 @@ class EmbeddingModel:
         Returns:
             文本向量或向量列表
         """
-        if self.model is None:
-            raise RuntimeError("模型未初始化")
-        
         # 处理单个文本
         is_single = isinstance(texts, str)
         if is_single:
@@ -162,37 +271,16 @@ class EmbeddingModel:
             return empty_embedding if is_single else [empty_embedding]
         
         try:
-            # Windows兼容的编码超时处理
-            import threading
-            encode_result = None
-            encode_error = None
-            
-            def encode_texts():
-                nonlocal encode_result, encode_error
-                try:
-                    encode_result = self.model.encode(
-                        texts,
-                        batch_size=batch_size,
-                        show_progress_bar=show_progress_bar,
-                        normalize_embeddings=normalize_embeddings,
-                        convert_to_numpy=convert_to_numpy,
-                        device=self.device
-                    )
-                except Exception as e:
-                    encode_error = e
-            
-            # 启动编码线程
-            encode_thread = threading.Thread(target=encode_texts)
-            encode_thread.daemon = True
-            encode_thread.start()
-            
-            # 等待30秒
-            encode_thread.join(timeout=30)
-            
-            if encode_error:
-                raise encode_error
-            elif encode_result is None:
-                raise TimeoutError(f"文本编码超时(30秒): {len(texts)}个文本")
+            self._loader.ensure()
+            encode_result = self.worker.encode(
+                texts,
+                timeout=settings.EMBEDDING_ENCODE_TIMEOUT,
+                batch_size=batch_size,
+                show_progress_bar=show_progress_bar,
+                normalize_embeddings=normalize_embeddings,
+                convert_to_numpy=convert_to_numpy,
+                device=self.device
+            )
             
             # 确保返回正确的格式
             if is_single:
@@ -203,25 +291,115 @@ class EmbeddingModel:
             logger.error(f"文本编码失败: {e}")
             raise
     
+    def encode_query(self, text: str) -> np.ndarray:
+        """
+        编码查询文本（经进程内共享的LRU向量缓存）
+        
+        Args:
+            text: 查询文本
+            
+        Returns:
+            归一化的float32查询向量
+        """
+        if not text or not text.strip():
+            return np.zeros(self.dimension, dtype=np.float32)
+        
+        # 按向量来源区分缓存，torch / ONNX / 量化ONNX 的向量不混用
+        cache = get_embedding_cache()
+        vector = cache.get(self.model_id, text)
+        if vector is not None:
+            return vector
+        
+        if settings.EMBEDDING_MICROBATCH_ENABLED:
+            # 与其他并发查询合并为一次前向计算
+            batcher = get_embedding_batcher(self.model_id, self._encode_microbatch)
+            vector = batcher.encode(text)
+        else:
+            vector = np.asarray(self.encode(text, normalize_embeddings=True), dtype=np.float32)
+        cache.put(self.model_id, text, vector)
+        return vector
+    
+    def encode_hybrid(self, texts: List[str], batch_size: int = 32) -> Tuple[np.ndarray, List[Dict[int, float]]]:
+        """
+        一次前向计算同时输出稠密向量和BGE-M3稀疏（词项权重）向量（需EMBEDDING_SPARSE_ENABLED）
+        
+        Returns:
+            (归一化的float32稠密矩阵, 逐条 {token_id: 权重})
+        """
+        self._loader.ensure()
+        dense, sparse = self.worker.encode(
+            texts,
+            timeout=settings.EMBEDDING_ENCODE_TIMEOUT,
+            method='encode_hybrid',
+            batch_size=batch_size
+        )
+        return np.ascontiguousarray(dense, dtype=np.float32), sparse
+    
+    def encode_query_hybrid(self, text: str) -> Tuple[np.ndarray, Dict[int, float]]:
+        """
+        编码查询文本，返回(稠密向量, 稀疏向量)
+
+        稀疏向量与稠密向量缓存在查询向量缓存的同一键下；未命中时经混合编码的微批服务
+        与其他并发查询合并为一次前向计算
+        """
+        if not text or not text.strip():
+            return np.zeros(self.dimension, dtype=np.float32), {}
+        
+        cache = get_embedding_cache()
+        cached = cache.get_hybrid(self.model_id, text)
+        if cached is not None:
+            return cached
+        
+        if settings.EMBEDDING_MICROBATCH_ENABLED:
+            # 稀疏输出需要encode_hybrid前向计算，与稠密查询分开成批
+            batcher = get_embedding_batcher(f"{self.model_id}/hybrid", self._encode_microbatch_hybrid)
+            dense, sparse = batcher.encode(text)
+        else:
+            dense, sparse = self.encode_hybrid([text], batch_size=1)
+            dense, sparse = dense[0], sparse[0]
+        cache.put(self.model_id, text, dense, sparse=sparse)
+        return dense, dict(sparse)
+    
+    def _encode_microbatch(self, texts: List[str]) -> np.ndarray:
+        """微批编码服务的一次前向计算"""
+        return np.asarray(
+            self.encode(texts, batch_size=len(texts), normalize_embeddings=True),
+            dtype=np.float32
+        )
+    
+    def _encode_microbatch_hybrid(self, texts: List[str]) -> Tuple[np.ndarray, List[Dict[int, float]]]:
+        """混合编码微批服务的一次前向计算（method='encode_hybrid'）"""
+        return self.encode_hybrid(texts, batch_size=len(texts))
+    
     def encode_batch(
         self,
         texts: List[str],
-        batch_size: int = 32,
-        show_progress_bar: bool = True
-    ) -> List[List[float]]:
+        batch_size: Optional[int] = None,
+        show_progress_bar: bool = True,
+        max_batch_tokens: Optional[int] = None,
+        return_sparse: bool = False
+    ) -> Union[np.ndarray, Tuple[np.ndarray, List[Dict[int, float]]]]:
         """
-        批量编码文本（优化版本）
+        批量编码文本（按长度分桶）
+        
+        文本按token长度降序排序，按填充后的token预算（批内条数 × 最长长度）组批，
+        避免短chunk被填充到同批最长chunk的长度，结果按输入顺序返回
         
         Args:
             texts: 文本列表
-            batch_size: 批处理大小
-            show_progress_bar: 是否显示进度条
+            batch_size: 单批最多文本数，默认EMBEDDING_BATCH_MAX_SIZE
+            show_progress_bar: 是否输出分批进度
+            max_batch_tokens: 单批填充后的token上限，默认EMBEDDING_BATCH_TOKEN_BUDGET
+            return_sparse: 同时返回稀疏向量（同一次前向计算）
             
         Returns:
-            向量列表（浮点数列表的列表）
+            连续存储的float32向量矩阵 (len(texts), dimension)，空文本对应零向量；
+            return_sparse时为 (向量矩阵, 逐条稀疏向量)，空文本对应空字典
         """
+        sparse: List[Dict[int, float]] = [{} for _ in texts]
         if not texts:
-            return []
+            empty = np.empty((0, self.dimension), dtype=np.float32)
+            return (empty, sparse) if return_sparse else empty
         
         # 过滤空文本
         valid_indices = []
@@ -233,28 +411,71 @@ class EmbeddingModel:
         
         if not valid_texts:
             logger.warning("所有文本都为空")
-            return [[0.0] * self.dimension for _ in texts]
+            zeros = np.zeros((len(texts), self.dimension), dtype=np.float32)
+            return (zeros, sparse) if return_sparse else zeros
         
-        # 编码有效文本
-        embeddings = self.encode(
-            valid_texts,
-            batch_size=batch_size,
-            show_progress_bar=show_progress_bar,
-            normalize_embeddings=True,
-            convert_to_numpy=True
+        self._loader.ensure()
+        # 空文本保持零向量
+        result = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        start = time.time()
+        lengths = self._token_lengths(valid_texts)
+        batches = plan_length_batches(
+            lengths,
+            max_batch_tokens or settings.EMBEDDING_BATCH_TOKEN_BUDGET,
+            batch_size or settings.EMBEDDING_BATCH_MAX_SIZE
         )
         
-        # 构建结果，为空文本填充零向量
-        result = []
-        valid_idx = 0
-        for i in range(len(texts)):
-            if i in valid_indices:
-                result.append(embeddings[valid_idx].tolist())
-                valid_idx += 1
+        # 按桶编码，直接写回结果矩阵中的原始位置
+        positions = np.asarray(valid_indices)
+        padded_tokens = 0
+        for n, batch in enumerate(batches, 1):
+            batch_texts = [valid_texts[i] for i in batch]
+            if return_sparse:
+                result[positions[batch]], batch_sparse = self.encode_hybrid(batch_texts, batch_size=len(batch))
+                for position, weights in zip(positions[batch], batch_sparse):
+                    sparse[position] = weights
             else:
-                result.append([0.0] * self.dimension)
+                result[positions[batch]] = self.encode(
+                    batch_texts,
+                    batch_size=len(batch),
+                    normalize_embeddings=True,
+                    convert_to_numpy=True
+                )
+            padded_tokens += len(batch) * int(lengths[batch[0]])
+            if show_progress_bar:
+                logger.info(f"批量编码进度: {n}/{len(batches)} 批")
         
-        return result
+        self._record_batch_stats(len(valid_texts), len(batches), int(lengths.sum()), padded_tokens, time.time() - start)
+        return (result, sparse) if return_sparse else result
+    
+    def _token_lengths(self, texts: List[str]) -> np.ndarray:
+        """每条文本的token数（含特殊token，截断到最大序列长度）；模型不在本进程时按字符估算"""
+        tokenizer = getattr(self.model, 'tokenizer', None)
+        if tokenizer is not None:
+            encoded = tokenizer(texts, add_special_tokens=True, truncation=True,
+                                max_length=settings.EMBEDDING_MAX_SEQ_LENGTH)['input_ids']
+            lengths = [len(ids) for ids in encoded]
+        else:
+            lengths = [estimate_tokens(text) + 2 for text in texts]
+        return np.minimum(np.asarray(lengths, dtype=np.int64), settings.EMBEDDING_MAX_SEQ_LENGTH)
+    
+    def _record_batch_stats(self, texts: int, batches: int, tokens: int, padded_tokens: int, elapsed: float):
+        with self._stats_lock:
+            self.batch_stats['texts'] += texts
+            self.batch_stats['batches'] += batches
+            self.batch_stats['tokens'] += tokens
+            self.batch_stats['padded_tokens'] += padded_tokens
+            self.batch_stats['encode_time'] += elapsed
+        logger.info(f"批量编码完成: {texts}条/{batches}批, {tokens}个token, "
+                    f"{tokens / elapsed if elapsed else 0:.0f} tokens/秒, 填充率{1 - tokens / padded_tokens:.1%}")
+    
+    def get_batch_stats(self) -> dict:
+        """批量编码统计（实际token吞吐与填充率）"""
+        with self._stats_lock:
+            stats = dict(self.batch_stats)
+        stats['tokens_per_sec'] = stats['tokens'] / stats['encode_time'] if stats['encode_time'] else 0.0
+        stats['padding_ratio'] = 1 - stats['tokens'] / stats['padded_tokens'] if stats['padded_tokens'] else 0.0
+        return stats
     
     def compute_similarity(
         self,
@@ -288,15 +509,37 @@ class EmbeddingModel:
         # 确保结果在 [0, 1] 范围内
         return float(max(0, min(1, similarity)))
     
+    @property
+    def model_id(self) -> str:
+        """向量来源标识（模型 + 推理后端），不同来源的向量不混用"""
+        if self.backend == 'onnx':
+            return f"{self.model_name}:onnx{'-int8' if settings.EMBEDDING_ONNX_QUANTIZED else ''}"
+        return f"{self.model_name}:{self.backend}"
+    
     def get_dimension(self) -> int:
         """获取向量维度"""
         return self.dimension
     
     def save_model(self, path: str):
         """保存模型到本地"""
+        self._loader.ensure()
         if self.model:
             self.model.save(path)
             logger.info(f"模型已保存到: {path}")
+        else:
+            logger.warning("子进程推理模式下模型不在本进程内，无法保存")
+    
+    def get_cache_stats(self) -> dict:
+        """获取查询向量缓存统计"""
+        return get_embedding_cache().get_stats()
+    
+    def get_batcher_stats(self) -> dict:
+        """获取微批编码服务统计（批量分布、排队等待、吞吐）"""
+        return get_batcher_stats().get(self.model_id, {})
+    
+    def get_worker_stats(self) -> dict:
+        """获取推理工作者统计（请求数、超时、重启、平均延迟）"""
+        return self.worker.get_stats() if self.worker else {}
     
     @property
     def device_type(self) -> str:
@@ -319,7 +562,7 @@ def encode_text(text: Union[str, List[str]], **kwargs) -> Union[np.ndarray, List
     model = get_embedding_model()
     return model.encode(text, **kwargs)
 
-def batch_encode_texts(texts: List[str], **kwargs) -> List[List[float]]:
+def batch_encode_texts(texts: List[str], **kwargs) -> np.ndarray:
     """便捷的批量编码函数"""
     model = get_embedding_model()
     return model.encode_batch(texts, **kwargs)
\ No newline at end of file
@@ -0,0 +1,269 @@
+# models/embedding_pool.py
+"""
+入库编码多进程池
+N个常驻子进程各自加载一次模型，并固定计算线程数（可选绑定CPU核）；
+一次编码调用按长度分桶后由各进程并行领取，向量直接写入共享内存输出缓冲区，
+结果无需经过pickle回传。适用于CPU入库/回填，查询编码仍走EmbeddingModel。
+"""
+
+import atexit
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from config.settings import settings
+from models.embedding_model import plan_length_batches, resolve_model_path
+from models.inference_worker import load_encoder
+from models.sparse_encoder import encode_hybrid
+from utils.logger import setup_logger
+from utils.token_estimator import estimate_tokens
+
+logger = setup_logger("embedding_pool")
+
+
+def _pool_worker_main(index: int, backend: str, model_path: str, num_threads: int, cores: Optional[List[int]],
+                      sparse: bool, shm_name: str, capacity: int, dimension: int, tasks, results):
+    """池子进程：固定线程数、加载模型，循环编码并写入共享内存（稀疏向量体积小，随结果回传）"""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(num_threads)
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+
+    try:
+        encoder = load_encoder(backend, model_path, 'cpu', num_threads, sparse=sparse)
+        shm = shared_memory.SharedMemory(name=shm_name)
+        output = np.ndarray((capacity, dimension), dtype=np.float32, buffer=shm.buf)
+    except BaseException as e:
+        results.put(('load_error', index, repr(e), None))
+        return
+    results.put(('ready', index, None, None))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        call_id, rows, texts, hybrid = task
+        try:
+            weights = None
+            if hybrid:
+                output[rows], weights = encode_hybrid(encoder, texts, batch_size=len(texts))
+            else:
+                output[rows] = encoder.encode(texts, batch_size=len(texts), normalize_embeddings=True,
+                                              convert_to_numpy=True)
+            results.put((call_id, rows, None, weights))
+        except BaseException as e:
+            results.put((call_id, rows, repr(e), None))
+    del output
+    shm.close()
+
+
+class EmbeddingProcessPool:
+    """多进程编码池"""
+
+    def __init__(self,
+                 num_workers: Optional[int] = None,
+                 threads_per_worker: Optional[int] = None,
+                 capacity: Optional[int] = None,
+                 backend: Optional[str] = None,
+                 model_path: Optional[str] = None,
+                 sparse: Optional[bool] = None):
+        """
+        Args:
+            num_workers: 子进程数
+            threads_per_worker: 每个子进程的计算线程数，0为CPU核数/子进程数
+            capacity: 共享输出缓冲区行数（单次调用超过时分段处理）
+            backend: 推理后端 torch / onnx
+            model_path: 模型目录，默认与EmbeddingModel相同的解析规则
+            sparse: 子进程加载稀疏权重头，默认EMBEDDING_SPARSE_ENABLED
+        """
+        cpu_count = os.cpu_count() or 1
+        self.num_workers = num_workers or settings.EMBEDDING_POOL_WORKERS or 1
+        self.threads_per_worker = (threads_per_worker or settings.EMBEDDING_POOL_THREADS_PER_WORKER
+                                   or max(1, cpu_count // self.num_workers))
+        self.capacity = capacity or settings.EMBEDDING_POOL_BUFFER_ROWS
+        self.backend = backend or settings.EMBEDDING_BACKEND
+        self.model_path = model_path or resolve_model_path(self.backend)
+        self.dimension = settings.EMBEDDING_DIM
+        self.sparse = settings.EMBEDDING_SPARSE_ENABLED if sparse is None else sparse
+
+        self._context = multiprocessing.get_context('spawn')
+        self._lock = threading.Lock()  # 共享缓冲区一次只服务一个调用
+        self._call_ids = itertools.count()
+        self._shm = shared_memory.SharedMemory(create=True, size=self.capacity * self.dimension * 4)
+        self._output = np.ndarray((self.capacity, self.dimension), dtype=np.float32, buffer=self._shm.buf)
+        self._processes = []
+        self.stats = {'calls': 0, 'texts': 0, 'batches': 0, 'tokens': 0, 'encode_time': 0.0, 'restarts': 0}
+
+        self._start_workers()
+        atexit.register(self.close)
+
+    def _worker_cores(self, index: int) -> Optional[List[int]]:
+        """子进程绑定的CPU核（各进程互不重叠），核数不足时不绑定"""
+        if not settings.EMBEDDING_POOL_PIN_CORES or not hasattr(os, 'sched_getaffinity'):
+            return None
+        available = sorted(os.sched_getaffinity(0))
+        if len(available) < self.num_workers * self.threads_per_worker:
+            return None
+        return available[index * self.threads_per_worker:(index + 1) * self.threads_per_worker]
+
+    def _start_workers(self):
+        self._tasks = self._context.Queue()
+        self._results = self._context.Queue()
+        self._processes = []
+        for index in range(self.num_workers):
+            process = self._context.Process(
+                target=_pool_worker_main,
+                args=(index, self.backend, self.model_path, self.threads_per_worker, self._worker_cores(index),
+                      self.sparse, self._shm.name, self.capacity, self.dimension, self._tasks, self._results),
+                name=f"embedding_pool_{index}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+        ready, deadline = 0, time.time() + settings.EMBEDDING_LOAD_TIMEOUT * 2
+        while ready < self.num_workers:
+            try:
+                kind, index, error, _ = self._results.get(timeout=max(deadline - time.time(), 0.1))
+            except queue.Empty:
+                self._terminate()
+                raise TimeoutError(f"编码池子进程加载超时（{ready}/{self.num_workers}就绪）")
+            if kind == 'load_error':
+                self._terminate()
+                raise RuntimeError(f"编码池子进程{index}加载模型失败: {error}")
+            ready += 1
+        logger.info(f"编码池已启动: {self.num_workers}个子进程 × {self.threads_per_worker}线程, "
+                    f"后端{self.backend}, 共享缓冲区{self.capacity}行")
+
+    def _terminate(self):
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            process.join(timeout=5)
+        self._processes = []
+
+    def _restart(self, reason: str):
+        logger.warning(f"重启编码池: {reason}")
+        self.stats['restarts'] += 1
+        self._terminate()
+        self._start_workers()
+
+    def encode(self, texts: List[str], return_sparse: bool = False):
+        """
+        编码非空文本，返回归一化的float32矩阵（行与输入一一对应）；
+        return_sparse时返回 (矩阵, 逐条稀疏向量)
+        """
+        if return_sparse and not self.sparse:
+            raise RuntimeError("编码池未加载稀疏权重头（EMBEDDING_SPARSE_ENABLED=false）")
+        result = np.empty((len(texts), self.dimension), dtype=np.float32)
+        sparse: List[Dict[int, float]] = []
+        with self._lock:
+            start = time.time()
+            for offset in range(0, len(texts), self.capacity):
+                segment = texts[offset:offset + self.capacity]
+                segment_sparse = self._encode_segment(segment, return_sparse)
+                # 缓冲区会被下一段复用，拷贝到调用方自己的数组
+                result[offset:offset + len(segment)] = self._output[:len(segment)]
+                if return_sparse:
+                    sparse.extend(segment_sparse)
+            self.stats['calls'] += 1
+            self.stats['texts'] += len(texts)
+            self.stats['encode_time'] += time.time() - start
+        return (result, sparse) if return_sparse else result
+
+    def _encode_segment(self, texts: List[str], hybrid: bool = False) -> Optional[List[Dict[int, float]]]:
+        lengths = np.minimum(np.asarray([estimate_tokens(text) + 2 for text in texts], dtype=np.int64),
+                             settings.EMBEDDING_MAX_SEQ_LENGTH)
+        # 批数不少于子进程数，使所有子进程都参与
+        max_batch_size = min(settings.EMBEDDING_BATCH_MAX_SIZE, -(-len(texts) // self.num_workers))
+        batches = plan_length_batches(lengths, settings.EMBEDDING_BATCH_TOKEN_BUDGET, max_batch_size)
+        call_id = next(self._call_ids)
+        for rows in batches:
+            self._tasks.put((call_id, rows, [texts[i] for i in rows], hybrid))
+        self.stats['batches'] += len(batches)
+        self.stats['tokens'] += int(lengths.sum())
+
+        remaining, errors = len(batches), []
+        sparse: List[Dict[int, float]] = [{} for _ in texts] if hybrid else None
+        timeout = settings.EMBEDDING_ENCODE_TIMEOUT
+        while remaining:
+            try:
+                result_call, rows, error, weights = self._results.get(timeout=timeout)
+            except queue.Empty:
+                # 子进程可能仍在写入共享缓冲区，整体重启后再报错
+                self._restart(f"{timeout}秒内无编码结果")
+                raise TimeoutError(f"编码池编码超时({timeout}秒)")
+            if result_call != call_id:
+                continue
+            remaining -= 1
+            if error:
+                errors.append(error)
+            elif weights is not None:
+                for row, row_weights in zip(rows, weights):
+                    sparse[row] = row_weights
+        if errors:
+            raise RuntimeError(f"编码池编码失败: {errors[0]}")
+        return sparse
+
+    def encode_batch(self, texts: List[str], return_sparse: bool = False, **kwargs):
+        """与EmbeddingModel.encode_batch相同的返回格式（float32矩阵），空文本对应零向量/空稀疏向量"""
+        valid = [i for i, text in enumerate(texts) if text and text.strip()]
+        if valid and len(valid) == len(texts):
+            return self.encode(texts, return_sparse)
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        sparse: List[Dict[int, float]] = [{} for _ in texts]
+        if valid:
+            encoded = self.encode([texts[i] for i in valid], return_sparse)
+            if return_sparse:
+                encoded, valid_sparse = encoded
+                for i, weights in zip(valid, valid_sparse):
+                    sparse[i] = weights
+            embeddings[valid] = encoded
+        return (embeddings, sparse) if return_sparse else embeddings
+
+    def get_stats(self) -> Dict[str, Any]:
+        """编码池统计（token吞吐）"""
+        stats = dict(self.stats)
+        stats.update({
+            'workers': self.num_workers,
+            'threads_per_worker': self.threads_per_worker,
+            'tokens_per_sec': stats['tokens'] / stats['encode_time'] if stats['encode_time'] else 0.0,
+            'texts_per_sec': stats['texts'] / stats['encode_time'] if stats['encode_time'] else 0.0
+        })
+        return stats
+
+    def close(self):
+        """停止子进程并释放共享内存"""
+        if self._shm is None:
+            return
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+        self._terminate()
+        del self._output
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+
+_embedding_pool: Optional[EmbeddingProcessPool] = None
+_embedding_pool_lock = threading.Lock()
+
+
+def get_embedding_pool() -> EmbeddingProcessPool:
+    """获取进程内共享的编码池（首次调用时启动子进程）"""
+    global _embedding_pool
+    with _embedding_pool_lock:
+        if _embedding_pool is None:
+            _embedding_pool = EmbeddingProcessPool()
+        return _embedding_pool
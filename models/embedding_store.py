@@ -0,0 +1,152 @@
+# models/embedding_store.py
+"""
+内容寻址的持久化chunk向量库
+以 摘要(模型标识 + 归一化chunk文本) 为键保存入库向量，重新处理文本未变化的公告
+（缺失向量恢复、向量更新、去重后重灌、切分边界不变的重新切块）时直接复用，跳过模型推理。
+
+存储为两个只追加文件（格式与中断恢复见utils/append_only_store.py），第i条键对应第i行向量：
+- keys.bin：每条16字节键摘要
+- vectors.f32：float32向量行，读取时内存映射
+内存中的索引为按键排序的紧凑数组（每条约24字节）+ 新追加条目的小字典
+"""
+
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from models.embedding_cache import EmbeddingCache
+from utils.append_only_store import AppendOnlyVectorStore
+from utils.logger import setup_logger
+
+logger = setup_logger("embedding_store")
+
+KEY_DTYPE = np.dtype([('hi', '<u8'), ('lo', '<u8')])
+# 本进程新追加的条目超过该数量时合并进排序索引
+PENDING_MERGE_THRESHOLD = 50000
+
+
+class EmbeddingStore(AppendOnlyVectorStore):
+    """只追加、内存映射的chunk向量库"""
+
+    KEY_DTYPE = KEY_DTYPE
+    KEYS_FILE_NAME = "keys.bin"
+
+    def __init__(self, path: Optional[Path] = None, dimension: Optional[int] = None):
+        """
+        Args:
+            path: 存储目录
+            dimension: 向量维度
+        """
+        super().__init__(path or settings.EMBEDDING_STORE_PATH, dimension or settings.EMBEDDING_DIM)
+        self._sorted_hi = np.empty(0, dtype=np.uint64)
+        self._sorted_lo = np.empty(0, dtype=np.uint64)
+        self._sorted_rows = np.empty(0, dtype=np.int64)
+        self._pending: Dict[bytes, int] = {}
+        with self._lock:
+            self._sync()
+        logger.info(f"向量库已加载: {self._rows} 条, 目录 {self.path}")
+
+    def _index_keys(self, keys: np.ndarray, rows: np.ndarray):
+        """少量新键放入待合并字典，大批（如加载时读取全部键）直接合并进排序索引"""
+        if len(keys) >= PENDING_MERGE_THRESHOLD:
+            self._merge_pending()
+            self._merge_sorted(keys['hi'], keys['lo'], rows)
+            return
+        data, size = keys.tobytes(), KEY_DTYPE.itemsize
+        for offset, row in enumerate(rows.tolist()):
+            self._pending.setdefault(data[offset * size:(offset + 1) * size], row)
+        if len(self._pending) >= PENDING_MERGE_THRESHOLD:
+            self._merge_pending()
+
+    def _index_bytes(self) -> int:
+        return int(self._sorted_hi.nbytes + self._sorted_lo.nbytes + self._sorted_rows.nbytes)
+
+    def _merge_sorted(self, hi: np.ndarray, lo: np.ndarray, rows: np.ndarray):
+        hi = np.concatenate([self._sorted_hi, hi])
+        lo = np.concatenate([self._sorted_lo, lo])
+        rows = np.concatenate([self._sorted_rows, rows])
+        order = np.lexsort((lo, hi))
+        self._sorted_hi, self._sorted_lo, self._sorted_rows = hi[order], lo[order], rows[order]
+
+    def _merge_pending(self):
+        """把本进程新追加的条目合并进排序索引"""
+        if not self._pending:
+            return
+        pending = np.frombuffer(b''.join(self._pending), dtype=KEY_DTYPE)
+        self._merge_sorted(pending['hi'], pending['lo'], np.fromiter(self._pending.values(), dtype=np.int64))
+        self._pending = {}
+
+    def _find(self, key: bytes) -> Optional[int]:
+        row = self._pending.get(key)
+        if row is not None:
+            return row
+        record = np.frombuffer(key, dtype=KEY_DTYPE)[0]
+        start = np.searchsorted(self._sorted_hi, record['hi'], side='left')
+        end = np.searchsorted(self._sorted_hi, record['hi'], side='right')
+        for i in range(start, end):
+            if self._sorted_lo[i] == record['lo']:
+                return int(self._sorted_rows[i])
+        return None
+
+    def get_many(self, model_id: str, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        批量查找
+
+        Returns:
+            (命中掩码, 向量矩阵)；未命中的行为零
+        """
+        keys = [EmbeddingCache.make_key(model_id, text) for text in texts]
+        found = np.zeros(len(texts), dtype=bool)
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        with self._lock:
+            rows = [self._find(key) for key in keys]
+            if any(row is None for row in rows):
+                # 其他进程刚追加的数据
+                self._sync()
+                rows = [row if row is not None else self._find(key) for key, row in zip(keys, rows)]
+            hit_positions = [i for i, row in enumerate(rows) if row is not None]
+            if hit_positions:
+                found[hit_positions] = True
+                vectors[hit_positions] = self._vector_view()[[rows[i] for i in hit_positions]]
+            self.stats['lookups'] += len(texts)
+            self.stats['hits'] += len(hit_positions)
+        return found, vectors
+
+    def put_many(self, model_id: str, texts: List[str], vectors: np.ndarray):
+        """追加向量（已存在的键跳过，包括其他进程已写入的键）"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(texts), self.dimension)
+        with self._lock:
+            new_keys, new_rows, seen = [], [], set()
+            for i, text in enumerate(texts):
+                key = EmbeddingCache.make_key(model_id, text)
+                if key in seen or self._find(key) is not None:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_rows.append(i)
+            if not new_keys:
+                return
+
+            self._append(
+                np.frombuffer(b''.join(new_keys), dtype=KEY_DTYPE), vectors[new_rows],
+                select=lambda: np.fromiter((self._find(key) is None for key in new_keys), dtype=bool,
+                                           count=len(new_keys))
+            )
+
+
+# 进程内共享实例
+_embedding_store = None
+_embedding_store_lock = threading.Lock()
+
+
+def get_embedding_store() -> EmbeddingStore:
+    """获取进程内共享的持久化向量库"""
+    global _embedding_store
+    if _embedding_store is None:
+        with _embedding_store_lock:
+            if _embedding_store is None:
+                _embedding_store = EmbeddingStore()
+    return _embedding_store
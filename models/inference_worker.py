@@ -0,0 +1,342 @@
+# models/inference_worker.py
+"""
+常驻推理工作者模块
+嵌入模型在一个长期存活的工作者中加载和执行，调用方通过请求队列提交编码任务并按截止时间等待：
+- thread：进程内单个推理线程，无需复制模型；超时的请求若尚未开始则直接丢弃，
+  但已在执行的前向计算无法中断
+- subprocess：独立子进程持有模型；请求超时即判定工作者卡死，终止并重启子进程
+"""
+
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional
+
+from utils.logger import setup_logger
+
+logger = setup_logger("inference_worker")
+
+
+def load_encoder(backend: str, model_path: str, device: str, num_threads: Optional[int] = None,
+                 sparse: bool = False):
+    """
+    按推理后端加载编码器：torch为SentenceTransformer，onnx为ONNX Runtime（仅CPU）
+
+    num_threads: 固定计算线程数（多进程编码池中每个子进程使用），None为框架默认
+    sparse: 同时加载BGE-M3稀疏权重头（encode_hybrid可用）
+    """
+    if backend == 'onnx':
+        from models.onnx_backend import OnnxEmbeddingBackend
+        return OnnxEmbeddingBackend(model_path, intra_op_threads=num_threads, sparse=sparse)
+    if backend != 'torch':
+        raise ValueError(f"未知的嵌入推理后端: {backend}")
+    if num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+        torch.set_num_interop_threads(1)
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_path, device=device, trust_remote_code=True)
+    model.eval()
+    if sparse:
+        from models.sparse_encoder import SparseHead
+        model.sparse_head = SparseHead.load(model_path, model.tokenizer)
+    return model
+
+
+def run_encoder(model, method: str, texts: List[str], kwargs: Dict[str, Any]):
+    """执行一次编码：encode返回稠密矩阵，encode_hybrid返回(稠密矩阵, 稀疏向量列表)"""
+    if method == 'encode_hybrid':
+        from models.sparse_encoder import encode_hybrid
+        return encode_hybrid(model, texts, **kwargs)
+    if method != 'encode':
+        raise ValueError(f"未知的编码方法: {method}")
+    return model.encode(texts, **kwargs)
+
+
+class _WorkerStats:
+    """工作者统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'texts': 0, 'timeouts': 0, 'errors': 0, 'restarts': 0, 'total_latency': 0.0}
+
+    def record(self, **counters):
+        with self._lock:
+            for key, value in counters.items():
+                self.stats[key] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        completed = stats['requests'] - stats['timeouts'] - stats['errors']
+        stats['avg_latency'] = stats['total_latency'] / completed if completed > 0 else 0.0
+        return stats
+
+
+class ThreadInferenceWorker:
+    """进程内常驻推理线程"""
+
+    mode = 'thread'
+
+    def __init__(self, model_path: str, device: str, backend: str = 'torch', sparse: bool = False):
+        self.model_path = model_path
+        self.device = device
+        self.backend = backend
+        self.sparse = sparse
+        self.model = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._ready = threading.Event()
+        self._load_error: Optional[BaseException] = None
+        self._stats = _WorkerStats()
+
+        self._thread = threading.Thread(target=self._run, name="embedding_inference", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self.model = load_encoder(self.backend, self.model_path, self.device, sparse=self.sparse)
+        except BaseException as e:
+            self._load_error = e
+            return
+        finally:
+            self._ready.set()
+
+        while True:
+            method, texts, kwargs, future = self._queue.get()
+            # 调用方已超时放弃的请求不再计算
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(run_encoder(self.model, method, texts, kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def wait_ready(self, timeout: float):
+        """等待模型加载完成"""
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"模型加载超时({timeout}秒)")
+        if self._load_error is not None:
+            raise self._load_error
+
+    def encode(self, texts: List[str], timeout: float, method: str = 'encode', **kwargs):
+        """提交编码请求并在截止时间内等待结果（method见run_encoder）"""
+        start = time.time()
+        future = Future()
+        self._queue.put((method, texts, kwargs, future))
+        self._stats.record(requests=1, texts=len(texts))
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self._stats.record(timeouts=1)
+            raise TimeoutError(f"文本编码超时({timeout}秒): {len(texts)}个文本")
+        except Exception:
+            self._stats.record(errors=1)
+            raise
+        self._stats.record(total_latency=time.time() - start)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self._stats.snapshot()
+        stats.update({'mode': self.mode, 'queue_depth': self._queue.qsize()})
+        return stats
+
+    def close(self):
+        pass
+
+
+def _subprocess_main(backend: str, model_path: str, device: str, sparse: bool, requests, responses):
+    """子进程入口：加载模型后循环处理请求"""
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+    try:
+        model = load_encoder(backend, model_path, device, sparse=sparse)
+    except BaseException as e:
+        responses.put(('load_error', False, repr(e)))
+        return
+    responses.put(('ready', True, None))
+
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, method, texts, kwargs = request
+        try:
+            responses.put((request_id, True, run_encoder(model, method, texts, kwargs)))
+        except BaseException as e:
+            responses.put((request_id, False, repr(e)))
+
+
+class SubprocessInferenceWorker:
+    """子进程推理工作者（请求超时时重启）"""
+
+    mode = 'subprocess'
+
+    def __init__(self, model_path: str, device: str, load_timeout: float = 60, backend: str = 'torch',
+                 sparse: bool = False):
+        self.model_path = model_path
+        self.device = device
+        self.backend = backend
+        self.sparse = sparse
+        self.model = None  # 模型只存在于子进程中
+        self.load_timeout = load_timeout
+        self._context = multiprocessing.get_context('spawn')
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._stats = _WorkerStats()
+        self._generation = 0
+        self._start()
+
+    def _start(self):
+        self._generation += 1
+        self._ready = threading.Event()
+        self._load_error: Optional[str] = None
+        self._requests = self._context.Queue()
+        self._responses = self._context.Queue()
+        self._process = self._context.Process(
+            target=_subprocess_main,
+            args=(self.backend, self.model_path, self.device, self.sparse, self._requests, self._responses),
+            name="embedding_inference",
+            daemon=True
+        )
+        self._process.start()
+        threading.Thread(
+            target=self._dispatch, args=(self._generation, self._process, self._responses),
+            name="embedding_inference_dispatch", daemon=True
+        ).start()
+        logger.info(f"推理子进程已启动: pid={self._process.pid}")
+
+    def _dispatch(self, generation: int, process, responses):
+        """把子进程的结果分发到对应的Future，工作者重启后退出"""
+        while generation == self._generation:
+            try:
+                request_id, ok, payload = responses.get(timeout=0.5)
+            except queue.Empty:
+                if process.is_alive() or generation != self._generation:
+                    continue
+                if not self._ready.is_set():
+                    # 加载阶段崩溃不自动重启，由wait_ready报告
+                    self._load_error = f"子进程退出(exitcode={process.exitcode})"
+                    self._ready.set()
+                else:
+                    self.restart(f"子进程异常退出(exitcode={process.exitcode})", generation)
+                break
+            except (EOFError, OSError):
+                break
+            if request_id == 'ready':
+                self._ready.set()
+                continue
+            if request_id == 'load_error':
+                self._load_error = payload
+                self._ready.set()
+                continue
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def wait_ready(self, timeout: float):
+        """等待子进程加载模型"""
+        generation, ready = self._generation, self._ready
+        if not ready.wait(timeout):
+            self.restart("模型加载超时", generation)
+            raise TimeoutError(f"模型加载超时({timeout}秒)")
+        if self._load_error is not None:
+            raise RuntimeError(f"模型加载失败: {self._load_error}")
+
+    def restart(self, reason: str, generation: Optional[int] = None):
+        """
+        终止子进程并重启，未完成的请求全部失败
+
+        Args:
+            generation: 发现问题时子进程的代数；已被其他请求重启过时不再重启（避免终止正在加载的新子进程）
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            logger.warning(f"重启推理子进程: {reason}")
+            process = self._process
+            pending, self._pending = self._pending, {}
+            self._stats.record(restarts=1)
+            self._start()
+        process.terminate()
+        process.join(timeout=5)
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(f"推理子进程已重启: {reason}"))
+
+    def encode(self, texts: List[str], timeout: float, method: str = 'encode', **kwargs):
+        """提交编码请求（method见run_encoder）；超过截止时间视为工作者卡死并重启"""
+        start = time.time()
+        if not self._ready.is_set():
+            self.wait_ready(self.load_timeout)
+
+        request_id = next(self._ids)
+        future = Future()
+        with self._lock:
+            self._pending[request_id] = future
+            requests, generation = self._requests, self._generation
+        requests.put((request_id, method, texts, kwargs))
+        self._stats.record(requests=1, texts=len(texts))
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._stats.record(timeouts=1)
+            self.restart(f"编码超过{timeout}秒", generation)
+            raise TimeoutError(f"文本编码超时({timeout}秒): {len(texts)}个文本")
+        except Exception:
+            self._stats.record(errors=1)
+            raise
+        self._stats.record(total_latency=time.time() - start)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self._stats.snapshot()
+        with self._lock:
+            stats.update({'mode': self.mode, 'pending': len(self._pending), 'pid': self._process.pid})
+        return stats
+
+    def close(self):
+        """停止子进程"""
+        # 分发线程随之退出，不把正常退出当作崩溃重启
+        self._generation += 1
+        try:
+            self._requests.put(None)
+            self._process.join(timeout=5)
+        finally:
+            if self._process.is_alive():
+                self._process.terminate()
+
+
+# 进程内已创建的工作者（用于指标汇总）
+_workers: List[Any] = []
+_workers_lock = threading.Lock()
+
+
+def create_inference_worker(mode: str, model_path: str, device: str, load_timeout: float, backend: str = 'torch',
+                            sparse: bool = False):
+    """按模式创建推理工作者（sparse: 同时加载稀疏权重头）"""
+    if mode == 'subprocess':
+        worker = SubprocessInferenceWorker(model_path, device, load_timeout, backend, sparse)
+    elif mode == 'thread':
+        worker = ThreadInferenceWorker(model_path, device, backend, sparse)
+    else:
+        raise ValueError(f"未知的推理工作者模式: {mode}")
+    with _workers_lock:
+        _workers.append(worker)
+    return worker
+
+
+def get_worker_stats() -> List[Dict[str, Any]]:
+    """所有推理工作者的统计"""
+    with _workers_lock:
+        workers = list(_workers)
+    return [dict(worker.get_stats(), model=worker.model_path, backend=worker.backend) for worker in workers]
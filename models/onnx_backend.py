@@ -0,0 +1,136 @@
+# models/onnx_backend.py
+"""
+BGE-M3 ONNX Runtime 推理后端
+加载 scripts/maintenance/export_onnx_embedding.py 导出的ONNX图（可选动态int8量化），
+以CLS池化 + L2归一化输出与SentenceTransformer一致的稠密向量。
+
+与PyTorch fp32路径的余弦相似度容差（scripts/tests/test_onnx_parity.py 校验）：
+- fp32 ONNX：逐条余弦 >= 0.9999
+- int8 动态量化：逐条余弦 >= EMBEDDING_ONNX_COSINE_TOLERANCE（默认0.99），
+  可与已有集合中的PyTorch向量混用
+"""
+
+import os
+from typing import List, Dict, Tuple, Union, Optional
+
+import numpy as np
+
+from config.settings import settings
+from utils.logger import setup_logger
+
+logger = setup_logger("onnx_backend")
+
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_int8.onnx"
+
+
+class OnnxEmbeddingBackend:
+    """ONNX Runtime 编码器（encode接口与SentenceTransformer.encode兼容）"""
+
+    def __init__(self,
+                 model_dir: str,
+                 quantized: Optional[bool] = None,
+                 intra_op_threads: Optional[int] = None,
+                 inter_op_threads: Optional[int] = None,
+                 max_seq_length: Optional[int] = None,
+                 sparse: bool = False):
+        """
+        Args:
+            model_dir: 导出目录（含ONNX图与分词器文件）
+            quantized: 是否加载int8量化图
+            intra_op_threads: 单个算子内并行线程数，0为ONNX Runtime默认（物理核数）
+            inter_op_threads: 算子间并行线程数
+            max_seq_length: 最大序列长度
+            sparse: 加载稀疏权重头（encode_hybrid同时输出稀疏向量）
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        quantized = settings.EMBEDDING_ONNX_QUANTIZED if quantized is None else quantized
+        intra_op_threads = settings.EMBEDDING_ONNX_INTRA_OP_THREADS if intra_op_threads is None else intra_op_threads
+        inter_op_threads = settings.EMBEDDING_ONNX_INTER_OP_THREADS if inter_op_threads is None else inter_op_threads
+        self.max_seq_length = max_seq_length or settings.EMBEDDING_MAX_SEQ_LENGTH
+
+        model_file = os.path.join(model_dir, ONNX_INT8_FILE if quantized else ONNX_FP32_FILE)
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(f"ONNX模型不存在: {model_file}，请先运行 scripts/maintenance/export_onnx_embedding.py")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if inter_op_threads > 1
+                                  else ort.ExecutionMode.ORT_SEQUENTIAL)
+
+        self.session = ort.InferenceSession(model_file, sess_options=options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.model_file = model_file
+        self.quantized = quantized
+        self.sparse_head = None
+        if sparse:
+            from models.sparse_encoder import SparseHead
+            self.sparse_head = SparseHead.load(model_dir, self.tokenizer)
+        logger.info(f"ONNX后端已加载: {model_file}，intra_op={intra_op_threads}，inter_op={inter_op_threads}")
+
+    def eval(self):
+        """与SentenceTransformer接口保持一致"""
+        return self
+
+    def _run(self, texts: List[str]):
+        inputs = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        feed = {name: inputs[name].astype(np.int64) for name in inputs if name in self.input_names}
+        return inputs, self.session.run(None, feed)[0]
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        _, last_hidden_state = self._run(texts)
+        # BGE-M3稠密向量取CLS位置
+        return last_hidden_state[:, 0].astype(np.float32)
+
+    def encode(self,
+               sentences: Union[str, List[str]],
+               batch_size: int = 32,
+               show_progress_bar: bool = False,
+               normalize_embeddings: bool = False,
+               convert_to_numpy: bool = True,
+               **kwargs) -> np.ndarray:
+        """编码文本；单条输入返回一维向量，列表输入返回矩阵"""
+        is_single = isinstance(sentences, str)
+        texts = [sentences] if is_single else list(sentences)
+
+        # 按长度排序后分批，减少批内填充
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        embeddings = None
+        for start in range(0, len(texts), batch_size):
+            indices = order[start:start + batch_size]
+            output = self._forward([texts[i] for i in indices])
+            if embeddings is None:
+                embeddings = np.empty((len(texts), output.shape[1]), dtype=np.float32)
+            embeddings[indices] = output
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+        return embeddings[0] if is_single else embeddings
+
+    def encode_hybrid(self, texts: List[str], batch_size: int = 32) -> Tuple[np.ndarray, List[Dict[int, float]]]:
+        """同一次前向计算输出归一化稠密向量和稀疏向量"""
+        if self.sparse_head is None:
+            raise RuntimeError("ONNX后端未加载稀疏权重头（EMBEDDING_SPARSE_ENABLED=false）")
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        dense = None
+        sparse: List[Dict[int, float]] = [{} for _ in texts]
+        for start in range(0, len(texts), batch_size):
+            indices = order[start:start + batch_size]
+            inputs, last_hidden_state = self._run([texts[i] for i in indices])
+            if dense is None:
+                dense = np.empty((len(texts), last_hidden_state.shape[2]), dtype=np.float32)
+            dense[indices] = last_hidden_state[:, 0]
+            for row, i in enumerate(indices):
+                sparse[i] = self.sparse_head.lexical_weights(
+                    last_hidden_state[row], inputs["input_ids"][row], inputs["attention_mask"][row]
+                )
+        dense /= np.maximum(np.linalg.norm(dense, axis=1, keepdims=True), 1e-12)
+        return dense, sparse
@@ -0,0 +1,173 @@
+# models/reranker_model.py
+"""
+交叉编码器重排模型模块
+对检索候选做一次批量前向打分，只保留最相关的少数文档进入提示词
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from utils.logger import setup_logger
+from utils.token_estimator import estimate_total_tokens
+
+logger = setup_logger("reranker_model")
+
+
+class RerankerModel:
+    """交叉编码器重排器（带时间预算和过载跳过）"""
+
+    def __init__(self, model_name: Optional[str] = None, device: Optional[str] = None):
+        """
+        Args:
+            model_name: 重排模型名称，默认使用配置文件中的设置
+            device: 运行设备，默认与嵌入模型一致
+        """
+        self.model_name = model_name or settings.RERANKER_MODEL_NAME
+        self.device = device or settings.EMBEDDING_DEVICE
+        self.timeout = settings.RERANK_TIMEOUT
+        self.max_length = settings.RERANK_MAX_LENGTH
+
+        logger.info(f"正在加载重排模型: {self.model_name} ({self.device})")
+        from sentence_transformers import CrossEncoder  # 仅在加载重排模型时导入
+        self.model = CrossEncoder(self.model_name, device=self.device, max_length=self.max_length)
+
+        # 专用推理线程：超时后调用方立即返回，推理在后台完成
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.RERANK_MAX_CONCURRENT,
+            thread_name_prefix="reranker"
+        )
+        # 在途推理数达到上限时直接跳过（过载保护）
+        self._slots = threading.BoundedSemaphore(settings.RERANK_MAX_CONCURRENT)
+
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'queries': 0,
+            'reranked': 0,
+            'skipped_overload': 0,
+            'skipped_timeout': 0,
+            'errors': 0,
+            'candidates': 0,
+            'kept': 0,
+            'candidate_tokens': 0,
+            'prompt_tokens': 0,
+            'tokens_saved': 0,
+            'total_latency': 0.0
+        }
+        logger.info("重排模型加载完成")
+
+    def _score(self, query: str, texts: List[str]) -> np.ndarray:
+        """一次批量前向计算所有候选的相关性得分"""
+        pairs = [(query, text) for text in texts]
+        return np.asarray(
+            self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False),
+            dtype=np.float32
+        )
+
+    def _record(self, **counters):
+        with self._stats_lock:
+            for key, value in counters.items():
+                self.stats[key] += value
+
+    def rerank(self, query: str, documents: List[Dict[str, Any]],
+               top_k: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        对候选文档重排并截取前top_k个
+
+        超出时间预算、推理过载或出错时按原顺序截取，不阻塞查询
+
+        Args:
+            query: 用户问题
+            documents: 候选文档（需包含text字段），按上游得分排序
+            top_k: 保留数量
+
+        Returns:
+            (保留的文档, 本次重排信息)
+        """
+        self._record(queries=1)
+        info = {'status': 'skipped', 'candidates': len(documents), 'kept': min(top_k, len(documents))}
+        if len(documents) <= top_k:
+            info['status'] = 'not_needed'
+            return documents, info
+
+        if not self._slots.acquire(blocking=False):
+            self._record(skipped_overload=1)
+            info['status'] = 'skipped_overload'
+            logger.warning("重排推理过载，跳过重排")
+            return documents[:top_k], info
+
+        start = time.time()
+        try:
+            future = self._executor.submit(self._score, query, [doc.get('text', '') for doc in documents])
+        except Exception:
+            self._slots.release()
+            raise
+        # 推理结束时释放名额（包括调用方已超时放弃的推理）
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            scores = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._record(skipped_timeout=1)
+            info['status'] = 'skipped_timeout'
+            logger.warning(f"重排超出时间预算({self.timeout}秒)，使用原排序")
+            return documents[:top_k], info
+        except Exception as e:
+            self._record(errors=1)
+            info['status'] = 'error'
+            logger.error(f"重排失败: {e}")
+            return documents[:top_k], info
+
+        order = np.argsort(-scores)[:top_k]
+        kept = []
+        for i in order:
+            doc = dict(documents[i])
+            doc['rerank_score'] = float(scores[i])
+            kept.append(doc)
+
+        latency = time.time() - start
+        candidate_tokens = estimate_total_tokens(doc.get('text', '') for doc in documents)
+        prompt_tokens = estimate_total_tokens(doc.get('text', '') for doc in kept)
+        self._record(
+            reranked=1,
+            candidates=len(documents),
+            kept=len(kept),
+            candidate_tokens=candidate_tokens,
+            prompt_tokens=prompt_tokens,
+            tokens_saved=candidate_tokens - prompt_tokens,
+            total_latency=latency
+        )
+        info.update({
+            'status': 'reranked',
+            'kept': len(kept),
+            'latency': latency,
+            'tokens_saved': candidate_tokens - prompt_tokens
+        })
+        logger.debug(f"重排完成: {len(documents)} -> {len(kept)}, 耗时{latency:.3f}秒")
+        return kept, info
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取重排统计信息（tokens_saved为未进入提示词的候选文本估算token数）"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['avg_latency'] = stats['total_latency'] / stats['reranked'] if stats['reranked'] else 0.0
+        return stats
+
+
+# 全局实例（延迟加载）
+_reranker_model = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker_model() -> RerankerModel:
+    """获取重排模型实例（单例模式）"""
+    global _reranker_model
+    if _reranker_model is None:
+        with _reranker_lock:
+            if _reranker_model is None:
+                _reranker_model = RerankerModel()
+    return _reranker_model
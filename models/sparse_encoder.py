@@ -0,0 +1,125 @@
+# models/sparse_encoder.py
+"""
+BGE-M3 稀疏（词项权重）输出
+BGE-M3在最后一层隐状态上接一个线性层（sparse_linear）：每个token的权重为 relu(W·h + b)，
+同一token id取最大值，去掉CLS/EOS/PAD/UNK后得到 {token_id: 权重} 的稀疏向量。
+与稠密向量（CLS池化）共用同一次前向计算，不额外推理。
+
+权重头文件：
+- sparse_linear.pt：模型仓库自带（torch后端加载）
+- sparse_linear.npz：导出ONNX时一并保存（ONNX后端无需torch）
+"""
+
+import os
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+
+from utils.logger import setup_logger
+
+logger = setup_logger("sparse_encoder")
+
+SPARSE_HEAD_FILE = "sparse_linear.pt"
+SPARSE_HEAD_NPZ_FILE = "sparse_linear.npz"
+
+
+def _to_numpy(value) -> np.ndarray:
+    if hasattr(value, 'detach'):
+        return value.detach().float().cpu().numpy()
+    return np.asarray(value)
+
+
+class SparseHead:
+    """sparse_linear线性层（numpy实现）"""
+
+    def __init__(self, weight: np.ndarray, bias: float, skip_ids: List[int]):
+        """
+        Args:
+            weight: 线性层权重 (hidden_size,)
+            bias: 线性层偏置
+            skip_ids: 不计入稀疏向量的特殊token id
+        """
+        self.weight = np.ascontiguousarray(weight, dtype=np.float32).reshape(-1)
+        self.bias = float(bias)
+        self.skip_ids = np.asarray(sorted(skip_ids), dtype=np.int64)
+
+    @classmethod
+    def load(cls, model_path: str, tokenizer) -> "SparseHead":
+        """从模型目录（或HuggingFace模型名）加载权重头"""
+        npz_file = os.path.join(model_path, SPARSE_HEAD_NPZ_FILE)
+        if os.path.exists(npz_file):
+            arrays = np.load(npz_file)
+            weight, bias = arrays['weight'], float(arrays['bias'].reshape(-1)[0])
+        else:
+            pt_file = os.path.join(model_path, SPARSE_HEAD_FILE)
+            if not os.path.exists(pt_file):
+                if os.path.isdir(model_path):
+                    raise FileNotFoundError(f"未找到稀疏权重头: {pt_file}")
+                from huggingface_hub import hf_hub_download
+                pt_file = hf_hub_download(model_path, SPARSE_HEAD_FILE)
+            import torch
+            state = torch.load(pt_file, map_location='cpu')
+            weight, bias = state['weight'].float().numpy(), float(state['bias'].reshape(-1)[0])
+
+        skip_ids = [getattr(tokenizer, name, None)
+                    for name in ('cls_token_id', 'eos_token_id', 'pad_token_id', 'unk_token_id')]
+        logger.info(f"稀疏权重头已加载: {model_path}")
+        return cls(weight, bias, [token_id for token_id in skip_ids if token_id is not None])
+
+    def save_npz(self, path: str):
+        """保存为numpy格式（供ONNX后端加载）"""
+        np.savez(path, weight=self.weight, bias=np.asarray([self.bias], dtype=np.float32))
+
+    def lexical_weights(self, hidden: np.ndarray, input_ids: np.ndarray,
+                        attention_mask: Optional[np.ndarray] = None) -> Dict[int, float]:
+        """
+        单条文本的稀疏向量
+
+        Args:
+            hidden: 最后一层隐状态 (seq_len, hidden_size)
+            input_ids: token id (seq_len,)
+            attention_mask: 注意力掩码，填充位置为0
+        """
+        input_ids = np.asarray(input_ids, dtype=np.int64)
+        valid = ~np.isin(input_ids, self.skip_ids)
+        if attention_mask is not None:
+            valid &= np.asarray(attention_mask).astype(bool)
+        ids = input_ids[valid]
+        if not len(ids):
+            return {}
+        weights = np.maximum(hidden[valid].astype(np.float32) @ self.weight + self.bias, 0)
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        best = np.zeros(len(unique_ids), dtype=np.float32)
+        np.maximum.at(best, inverse, weights)
+        keep = best > 0
+        return {int(token_id): float(weight) for token_id, weight in zip(unique_ids[keep], best[keep])}
+
+
+def encode_hybrid(encoder, texts: List[str], batch_size: int = 32, **kwargs) -> Tuple[np.ndarray, List[Dict[int, float]]]:
+    """
+    一次前向计算同时得到稠密向量和稀疏向量
+
+    Args:
+        encoder: load_encoder加载的编码器（需已加载稀疏权重头）
+
+    Returns:
+        (归一化的float32稠密矩阵, 逐条稀疏向量)
+    """
+    if hasattr(encoder, 'encode_hybrid'):
+        return encoder.encode_hybrid(texts, batch_size=batch_size)
+
+    head = getattr(encoder, 'sparse_head', None)
+    if head is None:
+        raise RuntimeError("编码器未加载稀疏权重头（EMBEDDING_SPARSE_ENABLED=false）")
+
+    # output_value=None 返回每条文本的全部输出：sentence_embedding、token_embeddings、input_ids、attention_mask
+    outputs = encoder.encode(texts, batch_size=batch_size, output_value=None, convert_to_numpy=False)
+    dense = np.empty((len(texts), encoder.get_sentence_embedding_dimension()), dtype=np.float32)
+    sparse = []
+    for i, row in enumerate(outputs):
+        dense[i] = _to_numpy(row['sentence_embedding'])
+        sparse.append(head.lexical_weights(
+            _to_numpy(row['token_embeddings']), _to_numpy(row['input_ids']), _to_numpy(row['attention_mask'])
+        ))
+    dense /= np.maximum(np.linalg.norm(dense, axis=1, keepdims=True), 1e-12)
+    return dense, sparse
@@ -0,0 +1,228 @@
+"""
+提示词上下文构建
+在调用LLM前压缩检索到的文档：
+1. 同一公告的相邻/重叠chunk合并，去掉切分时重复的CHUNK_OVERLAP部分
+2. 跨文档近重复句段（免责声明、董事会保证等模板文字）按MinHash折叠，只保留首次出现
+3. 按相关性顺序装入token预算，超出部分在句段边界截断
+"""
+import hashlib
+import re
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from rag.context_expander import split_doc_id, join_overlapping
+from utils.logger import setup_logger
+from utils.token_estimator import estimate_tokens
+
+# 句段切分：保留句末标点
+_SEGMENT_PATTERN = re.compile(r'[^。！？；!?;\n]+[。！？；!?;\n]*')
+_SPACE_PATTERN = re.compile(r'\s+')
+_NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
+MINHASH_PERMUTATIONS = 64
+_LSH_BANDS = 16  # 16个波段 × 4行：Jaccard约0.5以上的句段成为候选，再按估计的Jaccard确认
+_LSH_ROWS = MINHASH_PERMUTATIONS // _LSH_BANDS
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 1 << 31, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+
+
+def minhash(text: str, shingle: int = 3) -> np.ndarray:
+    """字符n-gram集合的MinHash签名"""
+    text = _SPACE_PATTERN.sub('', text)
+    grams = {text[i:i + shingle] for i in range(max(len(text) - shingle + 1, 1))}
+    # 32位分片哈希，使a*x+b不超出uint64
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=4).digest(), 'little') for g in grams),
+        dtype=np.uint64, count=len(grams)
+    )
+    return ((hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME).min(axis=0)
+
+
+class NearDuplicateFilter:
+    """
+    按MinHash估计的Jaccard相似度判断近重复（LSH波段分桶，避免两两比较）
+
+    数字不同的句段（如不同金额、比例）即使文字相近也不视为重复
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._buckets: Dict[Tuple[int, bytes], List[Tuple[np.ndarray, tuple]]] = {}
+
+    def seen(self, segment: str) -> bool:
+        """已有近重复时返回True，否则登记并返回False"""
+        signature = minhash(segment)
+        numbers = tuple(_NUMBER_PATTERN.findall(segment))
+        keys = [(band, signature[band * _LSH_ROWS:(band + 1) * _LSH_ROWS].tobytes()) for band in range(_LSH_BANDS)]
+        for key in keys:
+            for other, other_numbers in self._buckets.get(key, ()):
+                if other_numbers == numbers and np.mean(signature == other) >= self.threshold:
+                    return True
+        for key in keys:
+            self._buckets.setdefault(key, []).append((signature, numbers))
+        return False
+
+
+class ContextBuilder:
+    """提示词上下文构建器"""
+
+    def __init__(self, token_budget: Optional[int] = None):
+        self.logger = setup_logger("context_builder")
+        self.token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+        self.min_segment_chars = settings.CONTEXT_DEDUP_MIN_CHARS
+        self.similarity_threshold = settings.CONTEXT_DEDUP_THRESHOLD
+
+        self._lock = threading.Lock()
+        self.stats = {
+            'queries': 0,
+            'documents_in': 0,
+            'documents_out': 0,
+            'merged_adjacent': 0,
+            'duplicate_segments': 0,
+            'truncated': 0,
+            'tokens_in': 0,
+            'tokens_out': 0
+        }
+
+    def _record(self, **counters):
+        with self._lock:
+            for key, value in counters.items():
+                self.stats[key] += value
+
+    @staticmethod
+    def _format_document(index: int, doc: Dict[str, Any], text: str) -> str:
+        return f"""
+文档{index}:
+公司: {doc['ts_code']}
+标题: {doc['title']}
+日期: {doc['ann_date']}
+内容: {text}
+---
+"""
+
+    def build(self, documents: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """
+        构建上下文
+
+        Args:
+            documents: 按相关性排序的文档
+
+        Returns:
+            (上下文文本, 本次压缩信息)
+        """
+        tokens_in = estimate_tokens("\n".join(
+            self._format_document(i + 1, doc, doc.get('text', '')) for i, doc in enumerate(documents)
+        ))
+
+        merged, merged_count = self._merge_adjacent(documents)
+        deduped, duplicate_count = self._drop_duplicate_segments(merged)
+        parts, truncated = self._pack(deduped)
+
+        context = "\n".join(parts)
+        tokens_out = estimate_tokens(context)
+        info = {
+            'documents_in': len(documents),
+            'documents_out': len(parts),
+            'merged_adjacent': merged_count,
+            'duplicate_segments': duplicate_count,
+            'truncated': truncated,
+            'tokens_in': tokens_in,
+            'tokens_out': tokens_out,
+            'tokens_saved': tokens_in - tokens_out
+        }
+        self._record(queries=1, **{k: v for k, v in info.items() if k in self.stats})
+        self.logger.info(f"上下文压缩: {tokens_in} -> {tokens_out} tokens，"
+                         f"合并{merged_count}、去重句段{duplicate_count}、截断{truncated}")
+        return context, info
+
+    def _merge_adjacent(self, documents: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """同一公告中相邻或重叠的chunk（或扩展窗口）合并到排名较高的一个中"""
+        output: List[Optional[Dict[str, Any]]] = []
+        ranges: Dict[str, List[Tuple[int, int, int]]] = {}  # 公告 -> [(起, 止, 输出位置)]
+        merged_count = 0
+
+        for doc in documents:
+            parsed = split_doc_id(doc.get('doc_id'))
+            if parsed is None:
+                output.append(dict(doc))
+                continue
+            announcement_id, chunk_id = parsed
+            start, end = doc.get('chunk_range') or (doc.get('chunk_id', chunk_id), doc.get('chunk_id', chunk_id))
+
+            target = None
+            for i, (r_start, r_end, position) in enumerate(ranges.get(announcement_id, [])):
+                if start <= r_end + 1 and end >= r_start - 1:
+                    target = i, r_start, r_end, position
+                    break
+            if target is None:
+                ranges.setdefault(announcement_id, []).append((start, end, len(output)))
+                output.append({**doc, 'chunk_range': (start, end)})
+                continue
+
+            i, r_start, r_end, position = target
+            existing = output[position]
+            if start >= r_start and end <= r_end:
+                text = existing['text']  # 已被包含
+            elif start > r_start:
+                text = join_overlapping(existing['text'], doc['text'])
+            else:
+                text = join_overlapping(doc['text'], existing['text'])
+            new_range = (min(start, r_start), max(end, r_end))
+            output[position] = {**existing, 'text': text, 'chunk_range': new_range}
+            ranges[announcement_id][i] = (new_range[0], new_range[1], position)
+            merged_count += 1
+
+        return [doc for doc in output if doc is not None], merged_count
+
+    def _drop_duplicate_segments(self, documents: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """跨文档折叠近重复句段，只保留排名最高文档中的首次出现"""
+        seen = NearDuplicateFilter(self.similarity_threshold)
+        output, duplicates = [], 0
+        for doc in documents:
+            kept = []
+            for segment in _SEGMENT_PATTERN.findall(doc.get('text', '')):
+                if len(segment.strip()) >= self.min_segment_chars and seen.seen(segment):
+                    duplicates += 1
+                    continue
+                kept.append(segment)
+            text = ''.join(kept).strip()
+            if text:
+                output.append({**doc, 'text': text})
+        return output, duplicates
+
+    def _pack(self, documents: List[Dict[str, Any]]) -> Tuple[List[str], int]:
+        """按顺序装入token预算，最后一个放不下的文档在句段边界截断"""
+        parts, used, truncated = [], 0, 0
+        for doc in documents:
+            part = self._format_document(len(parts) + 1, doc, doc['text'])
+            cost = estimate_tokens(part)
+            if used + cost <= self.token_budget:
+                parts.append(part)
+                used += cost
+                continue
+
+            overhead = estimate_tokens(self._format_document(len(parts) + 1, doc, ''))
+            remaining = self.token_budget - used - overhead
+            text = ''
+            for segment in _SEGMENT_PATTERN.findall(doc['text']):
+                if estimate_tokens(text + segment) > remaining:
+                    break
+                text += segment
+            if text.strip():
+                parts.append(self._format_document(len(parts) + 1, doc, text))
+                truncated += 1
+            break
+        return parts, truncated
+
+    def get_stats(self) -> Dict[str, Any]:
+        """累计压缩统计（tokens_saved为去重、合并和预算截断节省的估算token数）"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['tokens_saved'] = stats['tokens_in'] - stats['tokens_out']
+        stats['avg_tokens_saved'] = stats['tokens_saved'] / stats['queries'] if stats['queries'] else 0.0
+        return stats
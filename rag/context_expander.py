@@ -0,0 +1,179 @@
+"""
+邻近chunk上下文扩展
+chunk按doc_id = {announcement_id}_{chunk_id}存储，相邻chunk的doc_id可直接推算。
+对排名靠前的命中一次批量读取同一公告±k个相邻chunk，按命中排名逐圈扩展，
+同一公告的重叠/相邻窗口合并为一段连续文本，总长度受token预算约束
+"""
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+from config.settings import settings
+from utils.logger import setup_logger
+from utils.token_estimator import estimate_tokens
+
+
+def split_doc_id(doc_id: str) -> Optional[Tuple[str, int]]:
+    """doc_id -> (announcement_id, chunk_id)，格式不符时返回None"""
+    announcement_id, sep, chunk = str(doc_id or '').rpartition('_')
+    if not sep or not announcement_id or not chunk.isdigit():
+        return None
+    return announcement_id, int(chunk)
+
+
+def join_overlapping(left: str, right: str, max_overlap: Optional[int] = None) -> str:
+    """拼接相邻chunk，去掉切分时重复的重叠部分（left的后缀与right的前缀）"""
+    max_overlap = settings.CHUNK_OVERLAP if max_overlap is None else max_overlap
+    for size in range(min(max_overlap, len(left), len(right)), 0, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return left + right
+
+
+class ContextExpander:
+    """邻近chunk上下文扩展"""
+
+    def __init__(self, milvus_connector, radius: Optional[int] = None, token_budget: Optional[int] = None):
+        """
+        Args:
+            milvus_connector: MilvusConnector实例
+            radius: 每个命中向前后扩展的chunk数
+            token_budget: 扩展后上下文的token上限
+        """
+        self.logger = setup_logger("context_expander")
+        self.milvus = milvus_connector
+        self.radius = settings.CONTEXT_EXPANSION_RADIUS if radius is None else radius
+        self.token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+
+        self._lock = threading.Lock()
+        self.stats = {
+            'queries': 0,
+            'hits': 0,
+            'neighbors_fetched': 0,
+            'neighbors_added': 0,
+            'windows': 0,
+            'budget_limited': 0,
+            'errors': 0
+        }
+
+    def _record(self, **counters):
+        with self._lock:
+            for key, value in counters.items():
+                self.stats[key] += value
+
+    def expand(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        扩展命中文档的上下文
+
+        Args:
+            documents: 按相关性排序的命中文档（需含doc_id和text）
+
+        Returns:
+            合并后的窗口文档列表，按窗口内最佳命中的排名排序；
+            字段与输入一致，另含chunk_range（起止chunk_id）和hit_count
+        """
+        self._record(queries=1, hits=len(documents))
+        if self.radius <= 0 or not documents:
+            return documents
+
+        # 每个公告内以chunk_id为键的已知文本（命中本身无需再读）
+        hits, texts, passthrough = [], {}, []
+        for rank, doc in enumerate(documents):
+            parsed = split_doc_id(doc.get('doc_id'))
+            if parsed is None or not doc.get('text'):
+                passthrough.append((rank, doc))
+                continue
+            hits.append((rank, parsed[0], parsed[1], doc))
+            texts[parsed] = doc['text']
+
+        wanted = {
+            (announcement_id, chunk_id + offset)
+            for _, announcement_id, chunk_id, _ in hits
+            for offset in range(-self.radius, self.radius + 1)
+            if chunk_id + offset >= 0
+        } - set(texts)
+        if wanted:
+            try:
+                rows = self.milvus.fetch_by_doc_ids([f"{a}_{c}" for a, c in sorted(wanted)])
+                for doc_id, row in rows.items():
+                    parsed = split_doc_id(doc_id)
+                    if parsed is not None and row.get('text'):
+                        texts[parsed] = row['text']
+                self._record(neighbors_fetched=len(rows))
+            except Exception as e:
+                self._record(errors=1)
+                self.logger.warning(f"读取相邻chunk失败，使用原始命中: {e}")
+                return documents
+
+        selected = self._select_chunks(hits, texts)
+        windows = self._build_windows(hits, selected, texts)
+        windows.extend(passthrough)
+        windows.sort(key=lambda item: item[0])
+        self._record(windows=len(windows), neighbors_added=sum(len(c) for c in selected.values()) - len(hits))
+        return [doc for _, doc in windows]
+
+    def _select_chunks(self, hits, texts) -> Dict[str, set]:
+        """
+        在token预算内选择chunk：先放入全部命中，再按圈（±1、±2…）和命中排名依次加入邻居
+        """
+        selected: Dict[str, set] = {}
+        used = 0
+        for _, announcement_id, chunk_id, doc in hits:
+            chunks = selected.setdefault(announcement_id, set())
+            if chunk_id not in chunks:
+                chunks.add(chunk_id)
+                used += estimate_tokens(doc['text'])
+
+        for ring in range(1, self.radius + 1):
+            for _, announcement_id, chunk_id, _ in hits:
+                for neighbor in (chunk_id - ring, chunk_id + ring):
+                    chunks = selected[announcement_id]
+                    text = texts.get((announcement_id, neighbor))
+                    if text is None or neighbor in chunks:
+                        continue
+                    # 相邻chunk约有CHUNK_OVERLAP字符重复，合并后去掉
+                    cost = estimate_tokens(text[settings.CHUNK_OVERLAP:])
+                    if used + cost > self.token_budget:
+                        self._record(budget_limited=1)
+                        return selected
+                    chunks.add(neighbor)
+                    used += cost
+        return selected
+
+    def _build_windows(self, hits, selected, texts) -> List[Tuple[int, Dict[str, Any]]]:
+        """同一公告中连续的chunk合并为一个窗口，窗口继承其中排名最高的命中的字段"""
+        hits_by_announcement: Dict[str, list] = {}
+        for rank, announcement_id, chunk_id, doc in hits:
+            hits_by_announcement.setdefault(announcement_id, []).append((rank, chunk_id, doc))
+
+        windows = []
+        for announcement_id, chunks in selected.items():
+            ordered = sorted(chunks)
+            runs, run = [], [ordered[0]]
+            for chunk_id in ordered[1:]:
+                if chunk_id == run[-1] + 1:
+                    run.append(chunk_id)
+                else:
+                    runs.append(run)
+                    run = [chunk_id]
+            runs.append(run)
+
+            for run in runs:
+                run_hits = [h for h in hits_by_announcement[announcement_id] if run[0] <= h[1] <= run[-1]]
+                if not run_hits:
+                    continue
+                rank, _, best = min(run_hits, key=lambda h: h[0])
+                text = texts[(announcement_id, run[0])]
+                for chunk_id in run[1:]:
+                    text = join_overlapping(text, texts[(announcement_id, chunk_id)])
+                windows.append((rank, {
+                    **best,
+                    'text': text,
+                    'chunk_range': (run[0], run[-1]),
+                    'hit_count': len(run_hits)
+                }))
+        return windows
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取扩展统计信息"""
+        with self._lock:
+            return dict(self.stats)
@@ -15,6 +15,7 @@ import logging
 
 import requests
 import pandas as pd
+import numpy as np
 from tqdm import tqdm
 import pdfplumber
 import PyPDF2
@@ -25,6 +26,10 @@ from config.settings import settings
 from database.mysql_connector import MySQLConnector
 from database.milvus_connector import MilvusConnector
 from models.embedding_model import EmbeddingModel
+from models.embedding_pool import get_embedding_pool
+from models.embedding_store import get_embedding_store
+from rag.lexical_index import get_lexical_index
+from rag.hot_tier_index import get_hot_tier_index
 from utils.logger import setup_logger
 
 
@@ -36,11 +41,19 @@ class PDFDownloadError(Exception):
 class DocumentProcessor:
     """文档处理器：负责公告的下载、解析和向量化"""
     
-    def __init__(self):
+    def __init__(self, use_embedding_pool: bool = False):
+        """
+        Args:
+            use_embedding_pool: 入库编码使用多进程编码池（EMBEDDING_POOL_WORKERS > 0 时生效），
+                供批量回填使用；查询编码仍使用本进程的嵌入模型
+        """
         self.logger = setup_logger("document_processor")
         self.mysql_conn = MySQLConnector()
         self.milvus_conn = MilvusConnector()
         self.embedding_model = EmbeddingModel()
+        self.embedding_pool = None
+        if use_embedding_pool and settings.EMBEDDING_POOL_WORKERS > 0:
+            self.embedding_pool = get_embedding_pool()
         
         # 文本分割器
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -609,8 +622,12 @@ class DocumentProcessor:
             texts = [doc.page_content for doc in documents]
             metadatas = [doc.metadata for doc in documents]
             
-            # 批量生成向量
-            embeddings = self.embedding_model.encode_batch(texts)
+            # 批量生成向量（float32矩阵，直接作为Milvus向量列写入）；集合含稀疏字段时同一次前向计算输出稀疏向量
+            sparse_embeddings = None
+            if self.milvus_conn.sparse_enabled:
+                embeddings, sparse_embeddings = self._encode_chunks_hybrid(texts)
+            else:
+                embeddings = self._encode_chunks(texts)
             
             # 准备数据
             data = []
@@ -618,15 +635,9 @@ class DocumentProcessor:
                 # 生成唯一ID
                 doc_id = f"{metadata['announcement_id']}_{metadata['chunk_id']}"
                 
-                # 处理embedding格式
-                if hasattr(embedding, 'tolist'):
-                    embedding_list = embedding.tolist()
-                else:
-                    embedding_list = embedding  # 已经是list格式
-                
                 data.append({
                     'id': doc_id,
-                    'embedding': embedding_list,
+                    'embedding': embedding,  # 矩阵行视图，不复制
                     'text': text,
                     'ts_code': metadata['ts_code'],
                     'company_name': metadata['company_name'],
@@ -637,14 +648,89 @@ class DocumentProcessor:
                 })
             
             # 插入到Milvus
-            self.milvus_conn.insert_data(data)
+            self.milvus_conn.insert_data(data, embeddings=embeddings, sparse_embeddings=sparse_embeddings)
             self.logger.info(f"成功存储 {len(data)} 个向量到Milvus")
+            
+            # 同步写入本地词法索引和热层索引（失败不影响向量入库）
+            self._index_lexical(data)
+            self._index_hot_tier(data)
             return True
             
         except Exception as e:
             self.logger.error(f"存储到Milvus失败: {e}")
             return False
     
+    def _encode_chunks(self, texts: List[str]) -> np.ndarray:
+        """编码chunk文本：先查持久化向量库，只对未命中的文本调用模型，新向量写回向量库"""
+        encoder = self.embedding_pool or self.embedding_model
+        if not settings.EMBEDDING_STORE_ENABLED:
+            return encoder.encode_batch(texts)
+        
+        store = get_embedding_store()
+        model_id = self.embedding_model.model_id
+        found, embeddings = store.get_many(model_id, texts)
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            missing_texts = [texts[i] for i in missing]
+            vectors = encoder.encode_batch(missing_texts)
+            embeddings[missing] = vectors
+            # 空文本的零向量不入库
+            valid = [i for i, text in enumerate(missing_texts) if text and text.strip()]
+            if valid:
+                store.put_many(model_id, [missing_texts[i] for i in valid], vectors[valid])
+        self.logger.info(f"向量库命中 {len(texts) - len(missing)}/{len(texts)} 个chunk")
+        return embeddings
+    
+    def _encode_chunks_hybrid(self, texts: List[str]) -> Tuple[np.ndarray, List[Dict[int, float]]]:
+        """编码chunk文本的稠密和稀疏向量（稀疏向量不在向量库中，需模型推理；稠密向量仍写回向量库）"""
+        encoder = self.embedding_pool or self.embedding_model
+        embeddings, sparse_embeddings = encoder.encode_batch(texts, return_sparse=True)
+        if settings.EMBEDDING_STORE_ENABLED:
+            valid = [i for i, text in enumerate(texts) if text and text.strip()]
+            if valid:
+                get_embedding_store().put_many(self.embedding_model.model_id, [texts[i] for i in valid],
+                                               embeddings[valid])
+        return embeddings, sparse_embeddings
+    
+    def _index_lexical(self, data: List[Dict[str, Any]]):
+        """将已入库的chunk增量写入BM25词法索引"""
+        if not settings.LEXICAL_INDEX_ENABLED:
+            return
+        try:
+            get_lexical_index().add_documents([
+                {
+                    'doc_id': item['id'],
+                    'text': item['text'],
+                    'ts_code': item['ts_code'],
+                    'ann_date': item['ann_date'],
+                    'title': item['title'],
+                    'chunk_id': item['chunk_id']
+                }
+                for item in data
+            ])
+        except Exception as e:
+            self.logger.warning(f"写入词法索引失败: {e}")
+    
+    def _index_hot_tier(self, data: List[Dict[str, Any]]):
+        """将已入库的近期chunk增量写入热层向量索引（早于窗口的chunk自动跳过）"""
+        if not settings.HOT_TIER_ENABLED:
+            return
+        try:
+            get_hot_tier_index().add_documents([
+                {
+                    'doc_id': item['id'],
+                    'embedding': item['embedding'],
+                    'text': item['text'],
+                    'ts_code': item['ts_code'],
+                    'ann_date': item['ann_date'],
+                    'title': item['title'],
+                    'chunk_id': item['chunk_id']
+                }
+                for item in data
+            ])
+        except Exception as e:
+            self.logger.warning(f"写入热层索引失败: {e}")
+    
     def search_similar_documents(self, 
                                 query: str, 
                                 top_k: int = 5,
@@ -661,7 +747,7 @@ class DocumentProcessor:
             相似文档列表
         """
         # 生成查询向量
-        query_embedding = self.embedding_model.encode(query)
+        query_embedding = self.embedding_model.encode_query(query)
         
         # 构建过滤条件
         filter_expr = None
@@ -701,6 +787,10 @@ class DocumentProcessor:
         # 删除旧向量
         for ann_id in announcement_ids:
             self.milvus_conn.delete_by_expr(f"announcement_id == '{ann_id}'")
+            if settings.LEXICAL_INDEX_ENABLED:
+                get_lexical_index().delete_announcement(ann_id)
+            if settings.HOT_TIER_ENABLED:
+                get_hot_tier_index().delete_announcement(ann_id)
         
         # 重新处理和存储
         success_count = 0
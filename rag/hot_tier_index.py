@@ -0,0 +1,555 @@
+"""
+近期公告热层向量索引
+在查询进程内保存最近HOT_TIER_MONTHS个月的chunk向量，日期过滤落在热层窗口内的检索
+无需访问Milvus；跨越窗口边界的检索由热层与Milvus（只查窗口之前的数据）合并结果
+
+存储布局（HOT_TIER_PATH）：
+- manifest.json：当前代数、完整覆盖的起始日期（covered_since）
+- vectors_{gen}.f32：float32向量，按行追加，查询进程内存映射（启动无需加载到内存）
+- meta_{gen}.jsonl：行元数据追加日志（add/delete）
+- texts_{gen}.bin：正文（按偏移读取）
+
+写入端（入库进程）随store_documents_to_milvus增量追加；读取端定期回放日志并扩展映射。
+压缩时丢弃已删除和滑出窗口的行，并保留上一代文件供尚未刷新的读取端使用（更早的代在下次压缩时删除；
+读取端落后两代以上时读取失败，重新加载后重试）。同一索引目录只应有一个写入进程。
+窗口内数据完整（covered_since已设置，通常由--rebuild回填）之前不参与路由。
+
+规模：半年约数十万chunk × 1024维 × 4字节，按行暴力内积检索即可满足延迟，
+结果为精确Top-K，得分与Milvus内积得分可直接比较
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable
+
+import numpy as np
+
+from config.settings import settings
+from utils.logger import setup_logger
+
+ROUTE_LOCAL = 'local'
+ROUTE_REMOTE = 'remote'
+ROUTE_MERGE = 'merge'
+
+
+def normalize_date(value) -> str:
+    """日期统一为YYYYMMDD字符串"""
+    return str(value or '').replace('-', '')[:8]
+
+
+def window_start(months: Optional[int] = None) -> str:
+    """热层窗口起始日期（按每月30天估算）"""
+    months = settings.HOT_TIER_MONTHS if months is None else months
+    return (datetime.now() - timedelta(days=30 * months)).strftime('%Y%m%d')
+
+
+class HotTierIndex:
+    """内存映射的近期向量索引"""
+
+    def __init__(self, index_path: Optional[Path] = None, dimension: Optional[int] = None):
+        self.logger = setup_logger("hot_tier_index")
+        self.index_path = Path(index_path or settings.HOT_TIER_PATH)
+        self.index_path.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension or settings.EMBEDDING_DIM
+        self._row_bytes = self.dimension * 4
+
+        self._lock = threading.RLock()
+        self._reset()
+        self._load()
+
+    # ---------- 存储 ----------
+
+    def _reset(self):
+        self._generation = 0
+        self._covered_since: Optional[str] = None
+        self._rows: List[Dict[str, Any]] = []  # 行号 -> 元数据（None表示该行未写元数据）
+        self._row_index: Dict[str, int] = {}   # doc_id -> 行号
+        self._deleted = set()
+        self._vectors = None
+        self._mapped_rows = 0
+        self._arrays = None  # 过滤用的numpy列，元数据变化时重建
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._compacted_entries = 0  # 本代压缩时写入的条目数，之后的才计入压缩阈值
+        self._suspend_compaction = False
+        self._last_refresh = time.time()
+
+    def _path(self, kind: str, generation: Optional[int] = None) -> Path:
+        gen = self._generation if generation is None else generation
+        suffix = {'vectors': 'f32', 'meta': 'jsonl', 'texts': 'bin'}[kind]
+        return self.index_path / f"{kind}_{gen}.{suffix}"
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        manifest = self.index_path / "manifest.json"
+        if not manifest.exists():
+            return {'generation': 0, 'covered_since': None}
+        with open(manifest, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_manifest(self, generation: int, covered_since: Optional[str], row_count: int):
+        tmp = self.index_path / "manifest.json.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'generation': generation, 'covered_since': covered_since,
+                       'dimension': self.dimension, 'row_count': row_count}, f)
+        os.replace(tmp, self.index_path / "manifest.json")
+
+    def _load(self):
+        """映射向量文件并回放元数据日志"""
+        with self._lock:
+            self._reset()
+            manifest = self._read_manifest()
+            self._generation = int(manifest.get('generation', 0))
+            self._covered_since = manifest.get('covered_since')
+            self._compacted_entries = int(manifest.get('row_count', 0))
+            self._replay_journal()
+            self.logger.info(
+                f"热层索引加载完成: 代数={self._generation}, 行={self.doc_count}, "
+                f"覆盖起始={self._covered_since}"
+            )
+
+    def _replay_journal(self):
+        """从上次位置回放日志（只处理以换行结尾的完整条目）"""
+        journal = self._path('meta')
+        if not journal.exists():
+            return
+
+        with open(journal, 'rb') as f:
+            f.seek(self._journal_offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._journal_offset += len(line)
+                self._journal_entries += 1
+                entry = json.loads(line)
+                if entry['op'] == 'add':
+                    self._apply_add(entry)
+                elif entry['op'] == 'delete':
+                    self._apply_delete(entry['doc_ids'])
+
+    def _map_vectors(self):
+        """向量文件增长后重新映射"""
+        needed = len(self._rows)
+        if needed <= self._mapped_rows:
+            return
+        path = self._path('vectors')
+        rows = path.stat().st_size // self._row_bytes if path.exists() else 0
+        if rows == 0:
+            return
+        self._vectors = np.memmap(path, dtype=np.float32, mode='r', shape=(rows, self.dimension))
+        self._mapped_rows = rows
+        self._arrays = None
+
+    def refresh(self, force: bool = False):
+        """同步入库进程写入的增量（按HOT_TIER_REFRESH_INTERVAL节流）"""
+        if not force and time.time() - self._last_refresh < settings.HOT_TIER_REFRESH_INTERVAL:
+            return
+        with self._lock:
+            self._last_refresh = time.time()
+            if int(self._read_manifest().get('generation', 0)) != self._generation:
+                self._load()
+            else:
+                self._replay_journal()
+
+    # ---------- 写入 ----------
+
+    def _apply_add(self, entry: Dict[str, Any]):
+        old_row = self._row_index.get(entry['doc_id'])
+        if old_row is not None:
+            self._deleted.add(old_row)
+
+        row = entry['row']
+        if row >= len(self._rows):
+            self._rows.extend([None] * (row + 1 - len(self._rows)))
+        self._rows[row] = {
+            'doc_id': entry['doc_id'],
+            'ts_code': entry.get('ts_code', ''),
+            'ann_date': entry.get('ann_date', ''),
+            'title': entry.get('title', ''),
+            'chunk_id': entry.get('chunk_id', 0),
+            'offset': entry['offset'],
+            'length': entry['length']
+        }
+        self._row_index[entry['doc_id']] = row
+        self._arrays = None
+
+    def _apply_delete(self, doc_ids: Iterable[str]):
+        for doc_id in doc_ids:
+            row = self._row_index.pop(doc_id, None)
+            if row is not None:
+                self._deleted.add(row)
+                self._arrays = None
+
+    def _append_journal(self, entries: List[Dict[str, Any]]):
+        with open(self._path('meta'), 'ab') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+            self._journal_offset = f.tell()
+        self._journal_entries += len(entries)
+
+    def add_documents(self, documents: List[Dict[str, Any]], enforce_window: bool = True) -> int:
+        """
+        增量添加chunk（已存在的doc_id会被替换）
+
+        Args:
+            documents: [{'doc_id', 'embedding', 'text', 'ts_code', 'ann_date', 'title', 'chunk_id'}, ...]
+            enforce_window: 跳过早于热层窗口的chunk
+
+        Returns:
+            添加的行数
+        """
+        if enforce_window:
+            start = self.boundary or window_start()
+            documents = [doc for doc in documents if normalize_date(doc.get('ann_date')) >= start]
+        if not documents:
+            return 0
+
+        with self._lock:
+            self._replay_journal()
+
+            vectors = np.asarray([doc['embedding'] for doc in documents], dtype=np.float32)
+            if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+                raise ValueError(f"向量维度不匹配: {vectors.shape}")
+
+            # 行号以向量文件实际长度为准（崩溃遗留的未登记行不会被引用）
+            with open(self._path('vectors'), 'ab') as vectors_file:
+                first_row = vectors_file.tell() // self._row_bytes
+                vectors_file.seek(first_row * self._row_bytes)
+                vectors_file.truncate()
+                vectors_file.write(vectors.tobytes())
+                vectors_file.flush()
+                os.fsync(vectors_file.fileno())
+
+            entries = []
+            with open(self._path('texts'), 'ab') as texts_file:
+                for i, doc in enumerate(documents):
+                    raw = (doc.get('text') or '').encode('utf-8')
+                    offset = texts_file.tell()
+                    texts_file.write(raw)
+                    entries.append({
+                        'op': 'add',
+                        'row': first_row + i,
+                        'doc_id': doc['doc_id'],
+                        'ts_code': doc.get('ts_code', ''),
+                        'ann_date': normalize_date(doc.get('ann_date')),
+                        'title': doc.get('title') or '',
+                        'chunk_id': int(doc.get('chunk_id', 0)),
+                        'offset': offset,
+                        'length': len(raw)
+                    })
+                texts_file.flush()
+                os.fsync(texts_file.fileno())
+
+            self._append_journal(entries)
+            for entry in entries:
+                self._apply_add(entry)
+
+            if (not self._suspend_compaction
+                    and self._journal_entries - self._compacted_entries >= settings.HOT_TIER_COMPACT_EVERY):
+                self.compact()
+
+        self.logger.debug(f"热层索引新增 {len(entries)} 行")
+        return len(entries)
+
+    def delete_documents(self, doc_ids: List[str]) -> int:
+        """删除chunk"""
+        with self._lock:
+            self._replay_journal()
+            existing = [doc_id for doc_id in doc_ids if doc_id in self._row_index]
+            if existing:
+                self._append_journal([{'op': 'delete', 'doc_ids': existing}])
+                self._apply_delete(existing)
+            return len(existing)
+
+    def delete_announcement(self, announcement_id: str) -> int:
+        """删除某公告的全部chunk（doc_id格式为 {announcement_id}_{chunk_id}）"""
+        prefix = f"{announcement_id}_"
+        with self._lock:
+            doc_ids = [doc_id for doc_id in self._row_index if doc_id.startswith(prefix)]
+        return self.delete_documents(doc_ids)
+
+    def compact(self, covered_since: Optional[str] = None):
+        """
+        剔除已删除和滑出窗口的行，写出新一代文件
+
+        Args:
+            covered_since: 新的完整覆盖起始日期（回填后设置），默认随窗口前移
+        """
+        with self._lock:
+            self._map_vectors()
+            start = window_start()
+            if covered_since is None and self._covered_since:
+                covered_since = max(self._covered_since, start)
+
+            old_generation = self._generation
+            published = int(self._read_manifest().get('generation', 0))
+            new_generation = old_generation + 1
+            self._path('texts').touch(exist_ok=True)
+
+            entries = []
+            with open(self._path('texts'), 'rb') as src_texts, \
+                    open(self._path('texts', new_generation), 'wb') as dst_texts, \
+                    open(self._path('vectors', new_generation), 'wb') as dst_vectors:
+                for row, meta in enumerate(self._rows):
+                    if meta is None or row in self._deleted or meta['ann_date'] < start:
+                        continue
+                    src_texts.seek(meta['offset'])
+                    raw = src_texts.read(meta['length'])
+                    entries.append({**meta, 'op': 'add', 'row': len(entries), 'offset': dst_texts.tell()})
+                    dst_texts.write(raw)
+                    dst_vectors.write(np.ascontiguousarray(self._vectors[row]).tobytes())
+
+            with open(self._path('meta', new_generation), 'wb') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n')
+
+            self._write_manifest(new_generation, covered_since, len(entries))
+            self._vectors = None
+            # 读取端可能仍在使用切换前发布的一代，保留到下次压缩
+            self._remove_generations(keep={new_generation, published})
+
+            self._load()
+            self.logger.info(f"热层索引压缩完成: 代数={new_generation}, 行={len(entries)}")
+
+    def _remove_generations(self, keep: set):
+        """删除keep以外各代的文件"""
+        for kind, suffix in (('vectors', 'f32'), ('meta', 'jsonl'), ('texts', 'bin')):
+            for path in self.index_path.glob(f"{kind}_*.{suffix}"):
+                generation = path.stem.split('_', 1)[1]
+                if generation.isdigit() and int(generation) not in keep:
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+
+    def rebuild_from_milvus(self, milvus_connector, batch_size: int = 1000) -> int:
+        """
+        从Milvus回填窗口内的全部chunk，完成后热层开始参与路由
+
+        回填写入新的一代（不发布），读取端在压缩写出manifest之前继续使用原有数据；
+        回填期间不触发压缩，结束时压缩一次
+        """
+        start = window_start()
+        with self._lock:
+            published = int(self._read_manifest().get('generation', 0))
+            generation = max(self._generation, published) + 1
+            self._reset()
+            self._generation = generation
+            # 清理中断的回填留下的未发布代
+            self._remove_generations(keep={published})
+
+            iterator = milvus_connector.collection.query_iterator(
+                batch_size=batch_size,
+                expr=f'ann_date >= "{start}"',
+                output_fields=["id", "doc_id", "ts_code", "ann_date", "title", "chunk_id", "text", "embeddings"]
+            )
+            total = 0
+            self._suspend_compaction = True
+            try:
+                while True:
+                    batch = iterator.next()
+                    if not batch:
+                        break
+                    # 低精度存储的集合从本地全精度存储取向量
+                    vectors = milvus_connector.full_precision_vectors(batch)
+                    total += self.add_documents(
+                        [{**row, 'embedding': vector} for row, vector in zip(batch, vectors)],
+                        enforce_window=False
+                    )
+                    self.logger.info(f"已回填 {total} 行")
+            finally:
+                self._suspend_compaction = False
+                iterator.close()
+
+            self.compact(covered_since=start)
+            return total
+
+    # ---------- 查询 ----------
+
+    @property
+    def doc_count(self) -> int:
+        return len(self._row_index)
+
+    @property
+    def boundary(self) -> Optional[str]:
+        """热层完整覆盖的起始日期；None表示尚未回填，不参与路由"""
+        return self._covered_since
+
+    def route(self, filters: Optional[Dict[str, Any]]) -> str:
+        """
+        按日期过滤条件选择检索路径
+
+        Returns:
+            local（仅热层）、remote（仅Milvus）或merge（热层 + Milvus中窗口之前的数据）
+        """
+        self.refresh()
+        boundary = self.boundary
+        if not boundary:
+            return ROUTE_REMOTE
+
+        ann_date = (filters or {}).get('ann_date')
+        if not ann_date:
+            return ROUTE_MERGE
+        if isinstance(ann_date, dict):
+            start, end = ann_date.get('start'), ann_date.get('end')
+            if start and normalize_date(start) >= boundary:
+                return ROUTE_LOCAL
+            if end and normalize_date(end) < boundary:
+                return ROUTE_REMOTE
+            return ROUTE_MERGE
+        return ROUTE_LOCAL if normalize_date(ann_date) >= boundary else ROUTE_REMOTE
+
+    def _filter_arrays(self):
+        """过滤用的列：存活标记、日期（整数）、股票代码"""
+        if self._arrays is None:
+            count = len(self._rows)
+            live = np.zeros(count, dtype=bool)
+            dates = np.zeros(count, dtype=np.int32)
+            codes = np.empty(count, dtype=object)
+            for row, meta in enumerate(self._rows):
+                if meta is None or row in self._deleted or row >= self._mapped_rows:
+                    continue
+                live[row] = True
+                dates[row] = int(meta['ann_date']) if meta['ann_date'].isdigit() else 0
+                codes[row] = meta['ts_code']
+            self._arrays = (live, dates, codes)
+        return self._arrays
+
+    def _candidate_rows(self, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """应用层过滤，语义与RAGAgent._build_filter_expr一致"""
+        live, dates, codes = self._filter_arrays()
+        mask = live.copy()
+        filters = filters or {}
+
+        ts_code = filters.get('ts_code')
+        if ts_code:
+            wanted = ts_code if isinstance(ts_code, list) else [ts_code]
+            mask &= np.isin(codes, wanted)
+
+        ann_date = filters.get('ann_date')
+        if ann_date:
+            if isinstance(ann_date, dict):
+                if 'start' in ann_date:
+                    mask &= dates >= int(normalize_date(ann_date['start']) or 0)
+                if 'end' in ann_date:
+                    mask &= dates <= int(normalize_date(ann_date['end']) or 99999999)
+            else:
+                mask &= dates == int(normalize_date(ann_date) or 0)
+
+        rows = np.flatnonzero(mask)
+        keywords = filters.get('title_keywords')
+        if keywords and len(rows):
+            if isinstance(keywords, str):
+                keywords = [keywords]
+            rows = np.array([row for row in rows
+                             if any(keyword in self._rows[row]['title'] for keyword in keywords)],
+                            dtype=np.int64)
+        return rows
+
+    def search(self, query_vector, top_k: int = 10,
+               filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        内积检索
+
+        Args:
+            query_vector: 查询向量
+            top_k: 返回数量
+            filters: 过滤条件 {'ts_code', 'ann_date', 'title_keywords'}
+
+        Returns:
+            与RAGAgent._extract_documents结构一致的文档列表，score为内积得分
+        """
+        self.refresh()
+        query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+        try:
+            return self._search(query, top_k, filters)
+        except FileNotFoundError:
+            # 写入端已压缩并删除了本进程仍在使用的一代文件，重新加载后重试
+            self.logger.info("热层索引文件已切换代，重新加载")
+            self.refresh(force=True)
+            return self._search(query, top_k, filters)
+
+    def _search(self, query: np.ndarray, top_k: int, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._map_vectors()
+            if self._vectors is None:
+                return []
+            rows = self._candidate_rows(filters)
+            if len(rows) == 0:
+                return []
+
+            # 候选占比较高时整表矩阵乘再取子集，避免大规模花式索引拷贝
+            if len(rows) * 4 > self._mapped_rows:
+                scores = (self._vectors @ query)[rows]
+            else:
+                scores = self._vectors[rows] @ query
+
+            k = min(top_k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            results = []
+            with open(self._path('texts'), 'rb') as texts_file:
+                for i in top:
+                    meta = self._rows[rows[i]]
+                    texts_file.seek(meta['offset'])
+                    results.append({
+                        'doc_id': meta['doc_id'],
+                        'text': texts_file.read(meta['length']).decode('utf-8', errors='ignore'),
+                        'ts_code': meta['ts_code'],
+                        'title': meta['title'],
+                        'ann_date': meta['ann_date'],
+                        'chunk_id': meta['chunk_id'],
+                        'score': float(scores[i]),
+                        'metadata': {}
+                    })
+            return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取索引统计信息"""
+        with self._lock:
+            return {
+                'generation': self._generation,
+                'doc_count': self.doc_count,
+                'deleted': len(self._deleted),
+                'covered_since': self._covered_since,
+                'mapped_rows': self._mapped_rows,
+                'vector_bytes': self._mapped_rows * self._row_bytes,
+                'journal_entries': self._journal_entries
+            }
+
+
+_hot_tier_index = None
+_hot_tier_index_lock = threading.Lock()
+
+
+def get_hot_tier_index() -> HotTierIndex:
+    """获取进程内共享的热层索引"""
+    global _hot_tier_index
+    if _hot_tier_index is None:
+        with _hot_tier_index_lock:
+            if _hot_tier_index is None:
+                _hot_tier_index = HotTierIndex()
+    return _hot_tier_index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="热层向量索引维护")
+    parser.add_argument("--rebuild", action="store_true", help="从Milvus回填窗口内的数据")
+    parser.add_argument("--compact", action="store_true", help="压缩索引并丢弃滑出窗口的数据")
+    args = parser.parse_args()
+
+    index = get_hot_tier_index()
+    if args.rebuild:
+        from database.milvus_connector import MilvusConnector
+        count = index.rebuild_from_milvus(MilvusConnector())
+        print(f"回填完成: {count} 行")
+    if args.compact:
+        index.compact()
+    print(index.get_stats())
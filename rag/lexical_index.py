@@ -0,0 +1,925 @@
+"""
+词法检索索引
+基于jieba分词和BM25打分的公告文本倒排索引，随文档入库增量构建并存储在本地，
+用于补充稠密向量检索对精确术语（如"募集资金"、"商誉减值"）的召回
+
+存储布局（LEXICAL_INDEX_PATH）：
+- manifest.json：当前代数
+- gen_{gen}/：一代压缩段（只读，查询进程内存映射，启动无需反序列化）
+  - vocab.bin / vocab_offsets.npy：按字节序排序的词项表（下标即词项编号，二分查找）
+  - indptr.npy / postings.npy / tf.npy：CSR倒排表（词项 -> 升序文档编号、词频）
+  - dl.npy / ann_date.npy / ts_code.npy / title.npy / chunk_id.npy：文档列（股票代码、标题为类别编号）
+  - categories.json：股票代码、标题的类别表
+  - doc_ids.bin / doc_id_offsets.npy、texts.bin / text_offsets.npy：doc_id与正文（按偏移读取）
+  - journal.jsonl / delta_texts.bin：压缩之后的增量日志与增量正文
+
+写入端（入库进程）追加日志，增量条目达到LEXICAL_INDEX_COMPACT_EVERY时与压缩段合并为新一代；
+读取端（查询进程）定期回放新增日志或在代数变化时重新加载。增量部分以扁平数组常驻内存（条目数有上限），
+打分按词项切片做向量运算。压缩时保留切换前发布的一代供尚未刷新的读取端使用（落后两代以上时
+读取失败，重新加载后重试）。同一索引目录只应有一个写入进程，全量重建期间应暂停入库。
+"""
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import jieba
+import numpy as np
+
+from config.settings import settings
+from utils.logger import setup_logger
+
+jieba.setLogLevel(60)
+
+# 高频虚词，不进入倒排表
+STOPWORDS = frozenset([
+    '的', '了', '和', '是', '在', '及', '与', '或', '等', '对', '为', '将',
+    '于', '其', '之', '而', '也', '并', '由', '以', '从', '被', '所', '各',
+])
+
+_WORD_PATTERN = re.compile(r'\w', re.UNICODE)
+_MAX_TF = np.iinfo(np.uint16).max
+_MERGE_BLOCK = 1 << 23  # 压缩时每块处理的倒排条目数（限制临时内存）
+_COLUMNS = ('dl', 'ann_date', 'ts_code', 'title', 'chunk_id')
+_CATEGORY_COLUMNS = ('ts_code', 'title')
+
+
+def tokenize(text: str) -> List[str]:
+    """jieba搜索引擎模式分词，去除标点、空白和虚词"""
+    if not text:
+        return []
+    return [
+        token for token in (t.strip().lower() for t in jieba.lcut_for_search(text))
+        if token and token not in STOPWORDS and _WORD_PATTERN.search(token)
+    ]
+
+
+def date_text(value) -> str:
+    """日期统一为YYYYMMDD字符串"""
+    return str(value or '').replace('-', '')[:8]
+
+
+def date_number(value) -> int:
+    """日期转为YYYYMMDD整数（无法解析时为0）"""
+    text = date_text(value)
+    return int(text) if text.isdigit() else 0
+
+
+def _as_numpy(values: array, dtype) -> np.ndarray:
+    """array.array拷贝为numpy数组（不保留缓冲区引用，之后仍可追加）"""
+    return np.array(values, dtype=dtype) if len(values) else np.empty(0, dtype=dtype)
+
+
+def _load_array(path: Path) -> np.ndarray:
+    """只读内存映射加载（空数组无法映射时直接读取）"""
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        return np.load(path)
+
+
+class _Segment:
+    """一代只读压缩段"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        if not (path / 'indptr.npy').exists():
+            self.categories = {kind: [] for kind in _CATEGORY_COLUMNS}
+            self.vocab = np.empty(0, dtype=np.uint8)
+            self.vocab_offsets = np.zeros(1, dtype=np.int64)
+            self.indptr = np.zeros(1, dtype=np.int64)
+            self.postings = np.empty(0, dtype=np.int32)
+            self.tf = np.empty(0, dtype=np.uint16)
+            self.columns = {name: np.empty(0, dtype=np.int32) for name in _COLUMNS}
+            self.text_offsets = np.zeros(1, dtype=np.int64)
+            self.doc_id_offsets = np.zeros(1, dtype=np.int64)
+        else:
+            with open(path / 'categories.json', 'r', encoding='utf-8') as f:
+                self.categories = json.load(f)
+            self.vocab = np.memmap(path / 'vocab.bin', dtype=np.uint8, mode='r') \
+                if (path / 'vocab.bin').stat().st_size else np.empty(0, dtype=np.uint8)
+            self.vocab_offsets = _load_array(path / 'vocab_offsets.npy')
+            self.indptr = _load_array(path / 'indptr.npy')
+            self.postings = _load_array(path / 'postings.npy')
+            self.tf = _load_array(path / 'tf.npy')
+            self.columns = {name: _load_array(path / f'{name}.npy') for name in _COLUMNS}
+            self.text_offsets = _load_array(path / 'text_offsets.npy')
+            self.doc_id_offsets = _load_array(path / 'doc_id_offsets.npy')
+        self.size = len(self.columns['dl'])
+        self.term_count = len(self.vocab_offsets) - 1
+        self.ts_code_ids = {code: i for i, code in enumerate(self.categories['ts_code'])}
+
+    def _term_at(self, term_id: int) -> bytes:
+        return self.vocab[self.vocab_offsets[term_id]:self.vocab_offsets[term_id + 1]].tobytes()
+
+    def term_id(self, term: str) -> Optional[int]:
+        """二分查找词项编号"""
+        key = term.encode('utf-8')
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.term_count and self._term_at(lo) == key else None
+
+    def terms(self) -> List[str]:
+        """全部词项（压缩合并时使用）"""
+        data = self.vocab.tobytes()
+        offsets = self.vocab_offsets.tolist()
+        return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.term_count)]
+
+    def posting(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        term_id = self.term_id(term)
+        if term_id is None:
+            return self.postings[:0], self.tf[:0]
+        start, end = self.indptr[term_id], self.indptr[term_id + 1]
+        return self.postings[start:end], self.tf[start:end]
+
+    def doc_ids(self) -> List[str]:
+        """全部doc_id（写入端建立doc_id索引时使用）"""
+        if self.size == 0:
+            return []
+        data = (self.path / 'doc_ids.bin').read_bytes()
+        offsets = self.doc_id_offsets.tolist()
+        return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.size)]
+
+    def read(self, handle, offsets: np.ndarray, idx: int) -> str:
+        handle.seek(int(offsets[idx]))
+        return handle.read(int(offsets[idx + 1] - offsets[idx])).decode('utf-8', errors='ignore')
+
+
+class _SegmentBuilder:
+    """
+    写出新一代压缩段
+
+    先按掩码并入已有段（文档列与正文按连续区间整块复制），再逐个追加新文档；
+    finish时按词项计数排序合并：已有段的倒排条目本身按（词项, 文档）有序，只需对新增条目排序
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.mkdir(parents=True, exist_ok=True)
+        self.terms: List[str] = []
+        self.vocab: Dict[str, int] = {}
+        self.categories = {kind: [] for kind in _CATEGORY_COLUMNS}
+        self._category_ids = {kind: {} for kind in _CATEGORY_COLUMNS}
+        self.columns = {name: array('i') for name in _COLUMNS}
+        self._texts = open(path / 'texts.bin', 'wb')
+        self._doc_ids = open(path / 'doc_ids.bin', 'wb')
+        self._text_offsets = array('q', [0])
+        self._doc_id_offsets = array('q', [0])
+        # 新文档的倒排条目（词项编号, 文档编号, 词频）
+        self._term_ids = array('i')
+        self._docs = array('i')
+        self._tfs = array('H')
+        self._base: Optional[_Segment] = None
+        self._base_remap: Optional[np.ndarray] = None
+        self.size = 0
+
+    def _term_id(self, term: str) -> int:
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = self.vocab[term] = len(self.terms)
+            self.terms.append(term)
+        return term_id
+
+    def _category(self, kind: str, value: str) -> int:
+        ids = self._category_ids[kind]
+        category = ids.get(value)
+        if category is None:
+            category = ids[value] = len(self.categories[kind])
+            self.categories[kind].append(value)
+        return category
+
+    @staticmethod
+    def _copy_records(source: Path, offsets: np.ndarray, rows: np.ndarray, handle, new_offsets: array):
+        """按行复制变长记录，连续的行合并为一次读写"""
+        starts, ends = offsets[rows], offsets[rows + 1]
+        new_offsets.frombytes((new_offsets[-1] + np.cumsum(ends - starts)).astype(np.int64).tobytes())
+        breaks = np.flatnonzero(starts[1:] != ends[:-1]) + 1
+        with open(source, 'rb') as src:
+            for first, last in zip(np.concatenate([[0], breaks]), np.concatenate([breaks, [len(rows)]])):
+                src.seek(int(starts[first]))
+                remaining = int(ends[last - 1] - starts[first])
+                while remaining:
+                    chunk = src.read(min(remaining, 1 << 24))
+                    handle.write(chunk)
+                    remaining -= len(chunk)
+
+    def add_base(self, segment: _Segment, keep: np.ndarray):
+        """并入已有段中keep为True的文档（须在追加新文档之前调用）"""
+        for term in segment.terms():  # 词项编号与已有段一致
+            self._term_id(term)
+        rows = np.flatnonzero(keep)
+        self._base = segment
+        self._base_remap = np.full(segment.size, -1, dtype=np.int64)
+        self._base_remap[rows] = np.arange(len(rows))
+        if not len(rows):
+            return
+
+        for name in _COLUMNS:
+            values = np.asarray(segment.columns[name][rows])
+            if name in _CATEGORY_COLUMNS:
+                # 只保留仍被引用的类别
+                used, inverse = np.unique(values, return_inverse=True)
+                mapping = np.asarray([self._category(name, segment.categories[name][c]) for c in used],
+                                     dtype=np.int32)
+                values = mapping[inverse]
+            self.columns[name].frombytes(values.astype(np.int32).tobytes())
+        self._copy_records(segment.path / 'texts.bin', segment.text_offsets, rows,
+                           self._texts, self._text_offsets)
+        self._copy_records(segment.path / 'doc_ids.bin', segment.doc_id_offsets, rows,
+                           self._doc_ids, self._doc_id_offsets)
+        self.size = len(rows)
+
+    def add(self, doc: Dict[str, Any], raw: bytes, tf: Dict[str, int]):
+        """追加一个文档（doc含doc_id、ts_code、ann_date、title、chunk_id、dl）"""
+        idx = self.size
+        for term, count in tf.items():
+            self._term_ids.append(self._term_id(term))
+            self._docs.append(idx)
+            self._tfs.append(min(int(count), _MAX_TF))
+        self.columns['dl'].append(int(doc['dl']))
+        self.columns['ann_date'].append(date_number(doc.get('ann_date')))
+        self.columns['ts_code'].append(self._category('ts_code', doc.get('ts_code') or ''))
+        self.columns['title'].append(self._category('title', doc.get('title') or ''))
+        self.columns['chunk_id'].append(int(doc.get('chunk_id', 0)))
+        self._texts.write(raw)
+        self._text_offsets.append(self._text_offsets[-1] + len(raw))
+        doc_id = doc['doc_id'].encode('utf-8')
+        self._doc_ids.write(doc_id)
+        self._doc_id_offsets.append(self._doc_id_offsets[-1] + len(doc_id))
+        self.size += 1
+
+    def _base_blocks(self):
+        """分块遍历已有段的倒排条目，返回(词项编号, 新文档编号, 词频)，已删除文档的条目已剔除"""
+        base = self._base
+        for start in range(0, len(base.postings), _MERGE_BLOCK):
+            end = min(start + _MERGE_BLOCK, len(base.postings))
+            terms = np.searchsorted(base.indptr, np.arange(start, end), side='right') - 1
+            docs = self._base_remap[base.postings[start:end]]
+            kept = docs >= 0
+            yield terms[kept], docs[kept], base.tf[start:end][kept]
+
+    @staticmethod
+    def _output(path: Path, dtype, size: int) -> np.ndarray:
+        if size == 0:
+            return np.empty(0, dtype=dtype)
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(size,))
+
+    def finish(self) -> int:
+        """写出倒排表、词项表和文档列，返回文档数"""
+        self._texts.close()
+        self._doc_ids.close()
+        new_terms = _as_numpy(self._term_ids, np.int64)
+        new_docs = _as_numpy(self._docs, np.int32)
+        new_tfs = _as_numpy(self._tfs, np.uint16)
+
+        counts = np.bincount(new_terms, minlength=len(self.terms)).astype(np.int64)
+        if self._base is not None:
+            for terms, _, _ in self._base_blocks():
+                counts += np.bincount(terms, minlength=len(self.terms))
+
+        # 剔除没有倒排条目的词项，其余按字节序重新编号
+        live = np.flatnonzero(counts)
+        encoded = [self.terms[i].encode('utf-8') for i in live]
+        order = sorted(range(len(live)), key=encoded.__getitem__)
+        term_remap = np.full(len(self.terms), -1, dtype=np.int64)
+        term_remap[live[order]] = np.arange(len(live))
+        indptr = np.zeros(len(live) + 1, dtype=np.int64)
+        np.cumsum(counts[live[order]], out=indptr[1:])
+
+        postings = self._output(self.path / 'postings.npy', np.int32, int(indptr[-1]))
+        tfs = self._output(self.path / 'tf.npy', np.uint16, int(indptr[-1]))
+        written = np.zeros(len(live), dtype=np.int64)
+
+        def place(terms, docs, values):
+            # terms升序；同一词项内按到达顺序（文档编号递增）依次写入
+            starts = np.searchsorted(terms, terms, side='left')
+            dest = indptr[terms] + written[terms] + np.arange(len(terms)) - starts
+            postings[dest] = docs
+            tfs[dest] = values
+            written[:] += np.bincount(terms, minlength=len(live))
+
+        if self._base is not None:
+            for terms, docs, values in self._base_blocks():
+                remapped = term_remap[terms]
+                block_order = np.argsort(remapped, kind='stable')
+                place(remapped[block_order], docs[block_order], values[block_order])
+        new_order = np.argsort(term_remap[new_terms], kind='stable')
+        place(term_remap[new_terms][new_order], new_docs[new_order], new_tfs[new_order])
+
+        for path, values in (('postings.npy', postings), ('tf.npy', tfs)):
+            if isinstance(values, np.memmap):
+                values.flush()
+            else:
+                np.save(self.path / path, values)
+
+        with open(self.path / 'vocab.bin', 'wb') as f:
+            for i in order:
+                f.write(encoded[i])
+        vocab_offsets = np.zeros(len(live) + 1, dtype=np.int64)
+        np.cumsum([len(encoded[i]) for i in order], out=vocab_offsets[1:])
+        np.save(self.path / 'vocab_offsets.npy', vocab_offsets)
+        np.save(self.path / 'indptr.npy', indptr)
+        for name in _COLUMNS:
+            np.save(self.path / f'{name}.npy', _as_numpy(self.columns[name], np.int32))
+        np.save(self.path / 'text_offsets.npy', _as_numpy(self._text_offsets, np.int64))
+        np.save(self.path / 'doc_id_offsets.npy', _as_numpy(self._doc_id_offsets, np.int64))
+        with open(self.path / 'categories.json', 'w', encoding='utf-8') as f:
+            json.dump(self.categories, f, ensure_ascii=False)
+        return self.size
+
+
+class LexicalIndex:
+    """BM25倒排索引（只读压缩段 + 内存中的增量）"""
+
+    def __init__(self, index_path: Optional[Path] = None):
+        self.logger = setup_logger("lexical_index")
+        self.index_path = Path(index_path or settings.LEXICAL_INDEX_PATH)
+        self.index_path.mkdir(parents=True, exist_ok=True)
+
+        self.k1 = settings.BM25_K1
+        self.b = settings.BM25_B
+        self.title_boost = settings.LEXICAL_TITLE_BOOST
+
+        self._lock = threading.RLock()
+        self._reset()
+        self._load()
+
+    # ---------- 存储 ----------
+
+    def _reset(self):
+        self._generation = 0
+        self._segment: Optional[_Segment] = None
+        self._seg_deleted = np.zeros(0, dtype=bool)
+        # 增量文档：元数据列表 + 扁平倒排条目（增量词项编号, 增量内文档编号, 词频）
+        self._delta_docs: List[Dict[str, Any]] = []
+        self._delta_dl = array('i')
+        self._delta_vocab: Dict[str, int] = {}
+        self._delta_terms = array('i')
+        self._delta_postings = array('i')
+        self._delta_tfs = array('H')
+        self._delta_deleted = set()
+        self._live = 0
+        self._total_length = 0
+        self._doc_index: Optional[Dict[str, int]] = None  # doc_id -> 文档编号，写入端按需建立
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._last_refresh = time.time()
+
+    def _gen_path(self, generation: Optional[int] = None) -> Path:
+        return self.index_path / f"gen_{self._generation if generation is None else generation}"
+
+    def _path(self, kind: str) -> Path:
+        return self._gen_path() / {'journal': 'journal.jsonl', 'delta_texts': 'delta_texts.bin'}[kind]
+
+    def _read_generation(self) -> int:
+        manifest = self.index_path / "manifest.json"
+        if not manifest.exists():
+            return 0
+        with open(manifest, 'r', encoding='utf-8') as f:
+            return int(json.load(f).get('generation', 0))
+
+    def _load(self):
+        """映射压缩段并回放增量日志"""
+        with self._lock:
+            self._reset()
+            self._generation = self._read_generation()
+            self._segment = _Segment(self._gen_path())
+            self._seg_deleted = np.zeros(self._segment.size, dtype=bool)
+            self._live = self._segment.size
+            self._total_length = int(np.asarray(self._segment.columns['dl']).sum(dtype=np.int64))
+            if self._segment.size == 0 and any(self.index_path.glob('snapshot_*.pkl')):
+                self.logger.warning("检测到旧格式（pickle快照）的词法索引，请运行 python -m rag.lexical_index --rebuild 重建")
+
+            self._replay_journal()
+            self.logger.info(
+                f"词法索引加载完成: 代数={self._generation}, 文档={self.doc_count}, "
+                f"词项={self._segment.term_count}, 增量文档={len(self._delta_docs)}"
+            )
+
+    def _replay_journal(self):
+        """从上次位置回放日志（只处理以换行结尾的完整条目）"""
+        journal = self._path('journal')
+        if not journal.exists():
+            return
+
+        with open(journal, 'rb') as f:
+            f.seek(self._journal_offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._journal_offset += len(line)
+                self._journal_entries += 1
+                entry = json.loads(line)
+                if entry['op'] == 'add':
+                    self._apply_add(entry)
+                elif entry['op'] == 'delete':
+                    self._apply_delete(entry)
+
+    def refresh(self, force: bool = False):
+        """同步其他进程写入的增量（按LEXICAL_INDEX_REFRESH_INTERVAL节流）"""
+        if not force and time.time() - self._last_refresh < settings.LEXICAL_INDEX_REFRESH_INTERVAL:
+            return
+        with self._lock:
+            self._last_refresh = time.time()
+            if self._read_generation() != self._generation:
+                self._load()
+            else:
+                self._replay_journal()
+
+    # ---------- 写入 ----------
+
+    def _apply_add(self, entry: Dict[str, Any]):
+        # 被替换的旧文档编号由写入端记录在日志中，读取端无需doc_id索引
+        if entry.get('replaces') is not None:
+            self._mark_deleted(entry['replaces'])
+
+        position = len(self._delta_docs)
+        self._delta_docs.append({
+            'doc_id': entry['doc_id'],
+            'ts_code': entry.get('ts_code', ''),
+            'ann_date': entry.get('ann_date', ''),
+            'title': entry.get('title', ''),
+            'chunk_id': entry.get('chunk_id', 0),
+            'offset': entry['offset'],
+            'length': entry['length'],
+            'dl': entry['dl']
+        })
+        self._delta_dl.append(entry['dl'])
+        for term, tf in entry['tf'].items():
+            self._delta_terms.append(self._delta_vocab.setdefault(term, len(self._delta_vocab)))
+            self._delta_postings.append(position)
+            self._delta_tfs.append(min(tf, _MAX_TF))
+        self._live += 1
+        self._total_length += entry['dl']
+        if self._doc_index is not None:
+            self._doc_index[entry['doc_id']] = self._segment.size + position
+
+    def _apply_delete(self, entry: Dict[str, Any]):
+        for doc_id, idx in zip(entry['doc_ids'], entry['rows']):
+            self._mark_deleted(idx)
+            if self._doc_index is not None and self._doc_index.get(doc_id) == idx:
+                del self._doc_index[doc_id]
+
+    def _mark_deleted(self, idx: int):
+        if idx < self._segment.size:
+            if self._seg_deleted[idx]:
+                return
+            self._seg_deleted[idx] = True
+            dl = int(self._segment.columns['dl'][idx])
+        else:
+            if idx in self._delta_deleted:
+                return
+            self._delta_deleted.add(idx)
+            dl = self._delta_docs[idx - self._segment.size]['dl']
+        self._live -= 1
+        self._total_length -= dl
+
+    def _ensure_doc_index(self) -> Dict[str, int]:
+        """写入端的doc_id -> 文档编号（首次写入时从压缩段读取）"""
+        if self._doc_index is None:
+            index = {doc_id: idx for idx, doc_id in enumerate(self._segment.doc_ids())
+                     if not self._seg_deleted[idx]}
+            for position, doc in enumerate(self._delta_docs):
+                idx = self._segment.size + position
+                if idx not in self._delta_deleted:
+                    index[doc['doc_id']] = idx
+            self._doc_index = index
+        return self._doc_index
+
+    def _append_journal(self, entries: List[Dict[str, Any]]):
+        self._gen_path().mkdir(parents=True, exist_ok=True)
+        with open(self._path('journal'), 'ab') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+            self._journal_offset = f.tell()
+        self._journal_entries += len(entries)
+
+    def _analyze(self, doc: Dict[str, Any]) -> Tuple[bytes, int, Dict[str, int]]:
+        """正文字节、文档长度（词项数）和词频"""
+        tokens = tokenize(doc.get('text') or '') + tokenize(doc.get('title') or '') * self.title_boost
+        return (doc.get('text') or '').encode('utf-8'), len(tokens), dict(Counter(tokens))
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> int:
+        """
+        增量添加文档（已存在的doc_id会被替换）
+
+        Args:
+            documents: [{'doc_id', 'text', 'ts_code', 'ann_date', 'title', 'chunk_id'}, ...]
+
+        Returns:
+            添加的文档数
+        """
+        if not documents:
+            return 0
+
+        with self._lock:
+            # 先追上其他写入，保证日志偏移正确
+            self._replay_journal()
+            doc_index = self._ensure_doc_index()
+            self._gen_path().mkdir(parents=True, exist_ok=True)
+
+            entries, pending = [], {}
+            next_idx = self._segment.size + len(self._delta_docs)
+            with open(self._path('delta_texts'), 'ab') as texts_file:
+                for doc in documents:
+                    raw, dl, tf = self._analyze(doc)
+                    offset = texts_file.tell()
+                    texts_file.write(raw)
+                    doc_id = doc['doc_id']
+                    entries.append({
+                        'op': 'add',
+                        'doc_id': doc_id,
+                        'ts_code': doc.get('ts_code', ''),
+                        'ann_date': date_text(doc.get('ann_date')),
+                        'title': doc.get('title') or '',
+                        'chunk_id': int(doc.get('chunk_id', 0)),
+                        'offset': offset,
+                        'length': len(raw),
+                        'dl': dl,
+                        'tf': tf,
+                        'replaces': pending.get(doc_id, doc_index.get(doc_id))
+                    })
+                    pending[doc_id] = next_idx + len(entries) - 1
+                texts_file.flush()
+                os.fsync(texts_file.fileno())
+
+            self._append_journal(entries)
+            for entry in entries:
+                self._apply_add(entry)
+
+            if self._journal_entries >= settings.LEXICAL_INDEX_COMPACT_EVERY:
+                self.compact()
+
+        self.logger.debug(f"词法索引新增 {len(entries)} 个文档")
+        return len(entries)
+
+    def delete_documents(self, doc_ids: List[str]) -> int:
+        """删除文档"""
+        with self._lock:
+            self._replay_journal()
+            doc_index = self._ensure_doc_index()
+            existing = [doc_id for doc_id in dict.fromkeys(doc_ids) if doc_id in doc_index]
+            if existing:
+                entry = {'op': 'delete', 'doc_ids': existing, 'rows': [doc_index[doc_id] for doc_id in existing]}
+                self._append_journal([entry])
+                self._apply_delete(entry)
+            return len(existing)
+
+    def delete_announcement(self, announcement_id: str) -> int:
+        """删除某公告的全部chunk（doc_id格式为 {announcement_id}_{chunk_id}）"""
+        prefix = f"{announcement_id}_"
+        with self._lock:
+            doc_ids = [doc_id for doc_id in self._ensure_doc_index() if doc_id.startswith(prefix)]
+        return self.delete_documents(doc_ids)
+
+    def _write_delta(self, builder: _SegmentBuilder):
+        """增量中仍存活的文档写入新段"""
+        if not self._delta_docs:
+            return
+        terms = [None] * len(self._delta_vocab)
+        for term, term_id in self._delta_vocab.items():
+            terms[term_id] = term
+        term_ids = _as_numpy(self._delta_terms, np.int32)
+        tfs = _as_numpy(self._delta_tfs, np.uint16)
+        bounds = np.searchsorted(_as_numpy(self._delta_postings, np.int32), np.arange(len(self._delta_docs) + 1))
+        with open(self._path('delta_texts'), 'rb') as texts_file:
+            for position, doc in enumerate(self._delta_docs):
+                if self._segment.size + position in self._delta_deleted:
+                    continue
+                texts_file.seek(doc['offset'])
+                raw = texts_file.read(doc['length'])
+                start, end = bounds[position], bounds[position + 1]
+                builder.add(doc, raw, {terms[t]: int(tf) for t, tf in zip(term_ids[start:end], tfs[start:end])})
+
+    def _remove_generations(self, keep: set):
+        """删除keep以外各代的目录（以及旧格式的快照文件）"""
+        for path in self.index_path.glob("gen_*"):
+            generation = path.name.split('_', 1)[1]
+            if generation.isdigit() and int(generation) not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+        for pattern in ("snapshot_*.pkl", "journal_*.jsonl", "texts_*.bin"):
+            for path in self.index_path.glob(pattern):
+                path.unlink(missing_ok=True)
+
+    def _publish(self, generation: int, doc_count: int, previous: int):
+        """切换manifest到新的一代；切换前发布的一代保留到下次压缩"""
+        manifest_tmp = self.index_path / "manifest.json.tmp"
+        with open(manifest_tmp, 'w', encoding='utf-8') as f:
+            json.dump({'generation': generation, 'doc_count': doc_count}, f)
+        os.replace(manifest_tmp, self.index_path / "manifest.json")
+        self._remove_generations(keep={generation, previous})
+        self._load()
+
+    def compact(self):
+        """已删除文档剔除、增量并入，写出新一代压缩段"""
+        with self._lock:
+            self._replay_journal()
+            published = self._read_generation()
+            new_generation = max(self._generation, published) + 1
+            builder = _SegmentBuilder(self._gen_path(new_generation))
+            builder.add_base(self._segment, ~self._seg_deleted)
+            self._write_delta(builder)
+            count = builder.finish()
+            self._publish(new_generation, count, published)
+            self.logger.info(f"词法索引压缩完成: 代数={new_generation}, 文档={count}")
+
+    # ---------- 查询 ----------
+
+    @property
+    def doc_count(self) -> int:
+        return self._live
+
+    @staticmethod
+    def _matches(doc: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+        """应用层过滤（增量文档），语义与RAGAgent._build_filter_expr一致"""
+        if not filters:
+            return True
+
+        ts_code = filters.get('ts_code')
+        if ts_code:
+            codes = ts_code if isinstance(ts_code, list) else [ts_code]
+            if doc['ts_code'] not in codes:
+                return False
+
+        ann_date = filters.get('ann_date')
+        if ann_date:
+            date = date_number(doc['ann_date'])
+            if isinstance(ann_date, dict):
+                if 'start' in ann_date and date < date_number(ann_date['start']):
+                    return False
+                if 'end' in ann_date and date > date_number(ann_date['end']):
+                    return False
+            elif date != date_number(ann_date):
+                return False
+
+        keywords = filters.get('title_keywords')
+        if keywords:
+            if isinstance(keywords, str):
+                keywords = [keywords]
+            if not any(keyword in doc['title'] for keyword in keywords):
+                return False
+
+        return True
+
+    @staticmethod
+    def _segment_mask(segment: _Segment, rows: np.ndarray, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+        """应用层过滤（压缩段，按列向量化）"""
+        mask = np.ones(len(rows), dtype=bool)
+        if not filters or not len(rows):
+            return mask
+
+        ts_code = filters.get('ts_code')
+        if ts_code:
+            codes = ts_code if isinstance(ts_code, list) else [ts_code]
+            wanted = [segment.ts_code_ids[code] for code in codes if code in segment.ts_code_ids]
+            mask &= np.isin(segment.columns['ts_code'][rows], wanted)
+
+        ann_date = filters.get('ann_date')
+        if ann_date:
+            dates = segment.columns['ann_date'][rows]
+            if isinstance(ann_date, dict):
+                if 'start' in ann_date:
+                    mask &= dates >= date_number(ann_date['start'])
+                if 'end' in ann_date:
+                    mask &= dates <= date_number(ann_date['end'])
+            else:
+                mask &= dates == date_number(ann_date)
+
+        keywords = filters.get('title_keywords')
+        if keywords:
+            if isinstance(keywords, str):
+                keywords = [keywords]
+            titles = segment.columns['title'][rows]
+            used, inverse = np.unique(titles, return_inverse=True)
+            matched = np.asarray([any(keyword in segment.categories['title'][c] for keyword in keywords)
+                                  for c in used], dtype=bool)
+            mask &= matched[inverse]
+        return mask
+
+    def _bm25(self, idf: float, tf: np.ndarray, dl: np.ndarray, avgdl: float) -> np.ndarray:
+        tf = tf.astype(np.float32)
+        return idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * dl / avgdl))
+
+    def search(self, query: str, top_k: int = 10,
+               filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        BM25检索
+
+        Args:
+            query: 查询文本
+            top_k: 返回数量
+            filters: 过滤条件 {'ts_code', 'ann_date', 'title_keywords'}
+
+        Returns:
+            与RAGAgent._extract_documents结构一致的文档列表，score为BM25得分
+        """
+        self.refresh()
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        try:
+            return self._search(terms, top_k, filters)
+        except FileNotFoundError:
+            # 写入端已压缩并删除了本进程仍在使用的一代，重新加载后重试
+            self.logger.info("词法索引文件已切换代，重新加载")
+            self.refresh(force=True)
+            return self._search(terms, top_k, filters)
+
+    def _search(self, terms: set, top_k: int, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            n_docs = self._live
+            if n_docs == 0:
+                return []
+            avgdl = self._total_length / n_docs or 1.0
+            segment = self._segment
+
+            segment_scores = np.zeros(segment.size, dtype=np.float32)
+            delta_scores = np.zeros(len(self._delta_docs), dtype=np.float32)
+            if self._delta_docs:
+                delta_terms = _as_numpy(self._delta_terms, np.int32)
+                delta_postings = _as_numpy(self._delta_postings, np.int32)
+                delta_tfs = _as_numpy(self._delta_tfs, np.uint16)
+                delta_dl = _as_numpy(self._delta_dl, np.float32)
+                delta_alive = np.ones(len(self._delta_docs), dtype=bool)
+                delta_alive[[idx - segment.size for idx in self._delta_deleted]] = False
+            has_deleted = bool(self._seg_deleted.any())
+
+            for term in terms:
+                docs, tfs = segment.posting(term)
+                # 文档频率只计存活文档（已删除、被替换的文档在压缩前仍留在倒排表中）
+                df = len(docs) - (int(self._seg_deleted[docs].sum()) if has_deleted else 0)
+                delta_hits = None
+                term_id = self._delta_vocab.get(term)
+                if term_id is not None:
+                    delta_hits = np.flatnonzero(delta_terms == term_id)
+                    delta_hits = delta_hits[delta_alive[delta_postings[delta_hits]]]
+                    df += len(delta_hits)
+                if df == 0:
+                    continue
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                if len(docs):
+                    # 同一词项的倒排表内文档不重复，可直接按下标累加
+                    segment_scores[docs] += self._bm25(idf, tfs, segment.columns['dl'][docs], avgdl)
+                if delta_hits is not None and len(delta_hits):
+                    rows = delta_postings[delta_hits]
+                    delta_scores[rows] += self._bm25(idf, delta_tfs[delta_hits], delta_dl[rows], avgdl)
+
+            segment_rows = np.flatnonzero(segment_scores)
+            segment_rows = segment_rows[~self._seg_deleted[segment_rows]]
+            segment_rows = segment_rows[self._segment_mask(segment, segment_rows, filters)]
+            delta_rows = np.asarray([
+                position for position in np.flatnonzero(delta_scores)
+                if self._matches(self._delta_docs[position], filters)
+            ], dtype=np.int64)
+
+            scores = np.concatenate([segment_scores[segment_rows], delta_scores[delta_rows]])
+            ids = np.concatenate([segment_rows, segment.size + delta_rows])
+            if not len(ids):
+                return []
+            k = min(top_k, len(ids))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return self._documents([int(ids[i]) for i in top], [float(scores[i]) for i in top])
+
+    def _documents(self, ids: List[int], scores: List[float]) -> List[Dict[str, Any]]:
+        """按文档编号读取结果（正文按偏移读取）"""
+        segment = self._segment
+        handles = {}
+        try:
+            results = []
+            for idx, score in zip(ids, scores):
+                if idx < segment.size:
+                    if 'segment' not in handles:
+                        handles['segment'] = open(segment.path / 'texts.bin', 'rb')
+                        handles['doc_ids'] = open(segment.path / 'doc_ids.bin', 'rb')
+                    date = int(segment.columns['ann_date'][idx])
+                    results.append({
+                        'doc_id': segment.read(handles['doc_ids'], segment.doc_id_offsets, idx),
+                        'text': segment.read(handles['segment'], segment.text_offsets, idx),
+                        'ts_code': segment.categories['ts_code'][segment.columns['ts_code'][idx]],
+                        'title': segment.categories['title'][segment.columns['title'][idx]],
+                        'ann_date': str(date) if date else '',
+                        'chunk_id': int(segment.columns['chunk_id'][idx]),
+                        'score': score,
+                        'metadata': {}
+                    })
+                else:
+                    if 'delta' not in handles:
+                        handles['delta'] = open(self._path('delta_texts'), 'rb')
+                    doc = self._delta_docs[idx - segment.size]
+                    handles['delta'].seek(doc['offset'])
+                    results.append({
+                        'doc_id': doc['doc_id'],
+                        'text': handles['delta'].read(doc['length']).decode('utf-8', errors='ignore'),
+                        'ts_code': doc['ts_code'],
+                        'title': doc['title'],
+                        'ann_date': doc['ann_date'],
+                        'chunk_id': doc['chunk_id'],
+                        'score': score,
+                        'metadata': {}
+                    })
+            return results
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取索引统计信息"""
+        with self._lock:
+            return {
+                'generation': self._generation,
+                'doc_count': self.doc_count,
+                'deleted': int(self._seg_deleted.sum()) + len(self._delta_deleted),
+                'terms': self._segment.term_count,
+                'postings': len(self._segment.postings),
+                'delta_docs': len(self._delta_docs),
+                'delta_terms': len(self._delta_vocab),
+                'journal_entries': self._journal_entries,
+                'avg_doc_length': self._total_length / self.doc_count if self.doc_count else 0
+            }
+
+    def rebuild_from_milvus(self, milvus_connector, batch_size: int = 1000) -> int:
+        """
+        从Milvus集合全量重建索引（用于首次启用或索引损坏时）
+
+        直接写出一个新的压缩段（不经过增量日志），完成后一次切换；读取端在此之前继续使用原有数据
+        """
+        with self._lock:
+            published = self._read_generation()
+            generation = max(self._generation, published) + 1
+            # 清理中断的重建留下的未发布代
+            self._remove_generations(keep={published, self._generation})
+            builder = _SegmentBuilder(self._gen_path(generation))
+
+            iterator = milvus_connector.collection.query_iterator(
+                batch_size=batch_size,
+                expr="chunk_id >= 0",
+                output_fields=["doc_id", "ts_code", "ann_date", "title", "chunk_id", "text"]
+            )
+            total = 0
+            try:
+                while True:
+                    batch = iterator.next()
+                    if not batch:
+                        break
+                    for row in batch:
+                        raw, dl, tf = self._analyze(row)
+                        builder.add({**row, 'dl': dl}, raw, tf)
+                    total += len(batch)
+                    self.logger.info(f"已重建 {total} 个文档")
+            finally:
+                iterator.close()
+
+            count = builder.finish()
+            self._publish(generation, count, published)
+            return total
+
+
+_lexical_index = None
+_lexical_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    """获取进程内共享的词法索引"""
+    global _lexical_index
+    if _lexical_index is None:
+        with _lexical_index_lock:
+            if _lexical_index is None:
+                _lexical_index = LexicalIndex()
+    return _lexical_index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="词法检索索引维护")
+    parser.add_argument("--rebuild", action="store_true", help="从Milvus全量重建索引")
+    parser.add_argument("--compact", action="store_true", help="压缩索引")
+    parser.add_argument("--query", type=str, help="测试查询")
+    args = parser.parse_args()
+
+    index = get_lexical_index()
+    if args.rebuild:
+        from database.milvus_connector import MilvusConnector
+        count = index.rebuild_from_milvus(MilvusConnector())
+        print(f"重建完成: {count} 个文档")
+    if args.compact:
+        index.compact()
+    if args.query:
+        for doc in index.search(args.query, top_k=5):
+            print(f"{doc['score']:.3f} {doc['ts_code']} {doc['title']} [{doc['chunk_id']}] {doc['text'][:80]}")
+    print(index.get_stats())
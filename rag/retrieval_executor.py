@@ -0,0 +1,242 @@
+"""
+分级检索执行器
+严格（股票代码+日期等全部条件）、放宽（仅股票代码）、无过滤三级检索并发发出，
+按优先级选取第一个非空级别，高优先级命中后取消其余请求
+
+启用热层索引时，每个级别按日期条件路由：窗口内只查本地热层，窗口外只查Milvus，
+跨越窗口边界时热层与Milvus（追加窗口之前的日期条件）并发查询后按得分合并。
+集合含稀疏向量字段时可走Milvus服务端混合检索（稠密+稀疏融合得分与热层内积得分不可比，此时不使用热层）
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from config.settings import settings
+from rag.hot_tier_index import ROUTE_LOCAL, ROUTE_REMOTE, ROUTE_MERGE
+from utils.logger import setup_logger
+
+
+@dataclass
+class RetrievalTier:
+    """检索级别"""
+    name: str
+    filters: Optional[Dict[str, Any]]
+    filter_expr: Optional[str]
+
+
+class TieredRetrievalExecutor:
+    """多级检索执行器"""
+
+    TIER_NAMES = ('strict', 'relaxed', 'unfiltered')
+
+    def __init__(self,
+                 milvus_connector,
+                 build_filter_expr: Callable[[Optional[Dict[str, Any]]], Optional[str]],
+                 extract_documents: Callable[[Any], List[Dict[str, Any]]],
+                 lexical_index=None,
+                 hot_tier=None):
+        """
+        Args:
+            milvus_connector: MilvusConnector实例
+            build_filter_expr: 过滤条件 -> Milvus表达式
+            extract_documents: Milvus命中列表 -> 文档字典列表
+            lexical_index: 可选的LexicalIndex，与向量检索按相同级别并行查询
+            hot_tier: 可选的HotTierIndex，近期数据在进程内检索
+        """
+        self.logger = setup_logger("retrieval_executor")
+        self.milvus = milvus_connector
+        self.build_filter_expr = build_filter_expr
+        self.extract_documents = extract_documents
+        self.lexical_index = lexical_index
+        self.hot_tier = hot_tier
+        self._lexical_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical_search")
+        self._hot_tier_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hot_tier_search")
+
+        self._lock = threading.Lock()
+        self.stats = {name: 0 for name in self.TIER_NAMES}
+        self.stats.update({'empty': 0, 'cancelled': 0, 'lexical_timeouts': 0, 'hybrid_queries': 0})
+        self.stats.update({f'route_{route}': 0 for route in (ROUTE_LOCAL, ROUTE_REMOTE, ROUTE_MERGE)})
+
+    def build_tiers(self, filters: Optional[Dict[str, Any]]) -> List[RetrievalTier]:
+        """按优先级构建检索级别，表达式相同的级别只保留一个"""
+        candidates = [('strict', filters or None)]
+        if filters and filters.get('ts_code'):
+            candidates.append(('relaxed', {'ts_code': filters['ts_code']}))
+        candidates.append(('unfiltered', None))
+
+        tiers, seen = [], set()
+        for name, tier_filters in candidates:
+            expr = self.build_filter_expr(tier_filters)
+            if expr in seen:
+                continue
+            seen.add(expr)
+            tiers.append(RetrievalTier(name=name if expr else 'unfiltered', filters=tier_filters, filter_expr=expr))
+        return tiers
+
+    def _lexical_search(self, question: str, filters: Optional[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        return self.lexical_index.search(question, top_k=limit, filters=filters)
+
+    def _collect_lexical(self, future) -> List[Dict[str, Any]]:
+        """在延迟预算内获取词法检索结果，超时或失败时返回空列表"""
+        if future is None:
+            return []
+        try:
+            return future.result(timeout=settings.LEXICAL_SEARCH_TIMEOUT)
+        except FutureTimeoutError:
+            with self._lock:
+                self.stats['lexical_timeouts'] += 1
+            self.logger.warning("词法检索超出延迟预算，仅使用向量检索结果")
+        except Exception as e:
+            self.logger.warning(f"词法检索失败: {e}")
+        return []
+
+    def retrieve(self,
+                 question: str,
+                 encode: Callable[[str], List[float]],
+                 filters: Optional[Dict[str, Any]],
+                 limit: int,
+                 light: bool = False,
+                 extract_light: Optional[Callable[[Any], List[Dict[str, Any]]]] = None,
+                 encode_hybrid: Optional[Callable[[str], Tuple[List[float], Dict[int, float]]]] = None
+                 ) -> Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        并发执行各级检索并按优先级选取结果
+
+        Args:
+            question: 查询文本
+            encode: 查询文本 -> 查询向量
+            filters: 原始过滤条件
+            limit: 每路检索的候选数
+            light: 两阶段检索的第一阶段，只取主键、得分和doc_id
+            extract_light: light模式下的命中提取函数
+            encode_hybrid: 查询文本 -> (稠密向量, 稀疏向量)；提供且集合支持时使用服务端混合检索
+
+        Returns:
+            (命中级别, 向量检索结果, 词法检索结果)；均无结果时级别为'empty'
+        """
+        mode = 'light' if light else 'full'
+        output_fields = self.milvus.LIGHT_OUTPUT_FIELDS if light else None
+        extract = extract_light if light else self.extract_documents
+        tiers = self.build_tiers(filters)
+
+        # 词法检索为本地计算，先提交以与查询编码重叠
+        lexical_futures = [
+            self._lexical_executor.submit(self._lexical_search, question, tier.filters, limit)
+            if self.lexical_index is not None else None
+            for tier in tiers
+        ]
+
+        sparse_vector = None
+        if encode_hybrid is not None and self.milvus.hybrid_search_enabled:
+            query_vector, sparse_vector = encode_hybrid(question)
+            with self._lock:
+                self.stats['hybrid_queries'] += 1
+        else:
+            query_vector = encode(question)
+        search_start = time.time()
+        dense_futures, hot_futures = [], []
+        for tier in tiers:
+            dense_future, hot_future = self._submit_dense(tier, query_vector, limit, output_fields, sparse_vector)
+            dense_futures.append(dense_future)
+            hot_futures.append(hot_future)
+
+        try:
+            for i, tier in enumerate(tiers):
+                dense_docs = []
+                if dense_futures[i] is not None:
+                    results = dense_futures[i].result()
+                    dense_docs = extract(results[0]) if results and len(results[0]) > 0 else []
+                    self.milvus.record_search(
+                        mode, time.time() - search_start,
+                        self.milvus.estimate_payload_bytes(
+                            [{k: v for k, v in doc.items() if k != 'score'} for doc in dense_docs]
+                        ),
+                        len(dense_docs)
+                    )
+                if hot_futures[i] is not None:
+                    dense_docs = self._merge_by_score(hot_futures[i].result(), dense_docs, limit)
+                lexical_docs = self._collect_lexical(lexical_futures[i])
+
+                if dense_docs or lexical_docs:
+                    self._cancel(dense_futures[i + 1:] + hot_futures[i + 1:], lexical_futures[i + 1:])
+                    with self._lock:
+                        self.stats[tier.name] += 1
+                    self.logger.info(
+                        f"检索级别: {tier.name} (表达式: {tier.filter_expr})，"
+                        f"向量{len(dense_docs)}个、词法{len(lexical_docs)}个结果"
+                    )
+                    return tier.name, dense_docs, lexical_docs
+
+                self.logger.info(f"检索级别 {tier.name} 无结果，使用下一级")
+        except Exception:
+            self._cancel(dense_futures + hot_futures, lexical_futures)
+            raise
+
+        with self._lock:
+            self.stats['empty'] += 1
+        return 'empty', [], []
+
+    def _submit_dense(self, tier: RetrievalTier, query_vector: List[float], limit: int,
+                      output_fields: Optional[List[str]],
+                      sparse_vector: Optional[Dict[int, float]] = None) -> Tuple[Any, Any]:
+        """按热层路由提交一个级别的向量检索，返回(Milvus请求, 热层请求)，未使用的一路为None"""
+        if sparse_vector is not None:
+            dense_future = self.milvus.search_async(query_vectors=[query_vector], top_k=limit,
+                                                    filter_expr=tier.filter_expr, output_fields=output_fields,
+                                                    sparse_vectors=[sparse_vector])
+            return dense_future, None
+
+        route = self.hot_tier.route(tier.filters) if self.hot_tier is not None else ROUTE_REMOTE
+        if self.hot_tier is not None:
+            with self._lock:
+                self.stats[f'route_{route}'] += 1
+
+        hot_future = None
+        if route in (ROUTE_LOCAL, ROUTE_MERGE):
+            hot_future = self._hot_tier_executor.submit(self.hot_tier.search, query_vector, limit, tier.filters)
+        if route == ROUTE_LOCAL:
+            return None, hot_future
+
+        filter_expr = tier.filter_expr
+        if route == ROUTE_MERGE:
+            # Milvus只查热层窗口之前的数据，避免与热层重复
+            cold_expr = f'ann_date < "{self.hot_tier.boundary}"'
+            filter_expr = f"{filter_expr} and {cold_expr}" if filter_expr else cold_expr
+        dense_future = self.milvus.search_async(query_vectors=[query_vector], top_k=limit,
+                                                filter_expr=filter_expr, output_fields=output_fields)
+        return dense_future, hot_future
+
+    @staticmethod
+    def _merge_by_score(hot_docs: List[Dict[str, Any]], dense_docs: List[Dict[str, Any]],
+                        limit: int) -> List[Dict[str, Any]]:
+        """热层与Milvus结果按内积得分合并（同一doc_id保留热层结果）"""
+        seen = {doc['doc_id'] for doc in hot_docs}
+        merged = hot_docs + [doc for doc in dense_docs if doc.get('doc_id') not in seen]
+        merged.sort(key=lambda doc: doc['score'], reverse=True)
+        return merged[:limit]
+
+    def _cancel(self, dense_futures: List[Any], lexical_futures: List[Any]):
+        """取消低优先级级别的未完成请求"""
+        cancelled = 0
+        for future in dense_futures:
+            if future is None:
+                continue
+            try:
+                if not future.done():
+                    future.cancel()
+                    cancelled += 1
+            except Exception as e:
+                self.logger.debug(f"取消检索请求失败: {e}")
+        for future in lexical_futures:
+            if future is not None and future.cancel():
+                cancelled += 1
+        if cancelled:
+            with self._lock:
+                self.stats['cancelled'] += cancelled
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各级别命中次数与取消次数"""
+        with self._lock:
+            return dict(self.stats)
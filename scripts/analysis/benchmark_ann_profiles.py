@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+向量索引配置基准测试：recall@k vs QPS
+用同一份数据在不同索引配置下的集合（由 scripts/maintenance/rebuild_milvus_index.py 生成）
+执行一组留出查询，以FLAT集合的精确结果为基准计算召回率，并在给定并发下测量吞吐，
+用于选择 MILVUS_INDEX_PROFILE 以及 interactive / batch 两类查询的检索参数
+
+示例：
+    python scripts/analysis/benchmark_ann_profiles.py --ground-truth stock_announcements__flat_xxx \
+        --collections stock_announcements__hnsw_xxx stock_announcements__ivf_sq8_xxx --queries queries.txt
+"""
+
+import sys
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.settings import settings
+from database.milvus_connector import MilvusConnector
+from models.embedding_model import EmbeddingModel
+
+DEFAULT_QUERIES = [
+    "贵州茅台2024年第一季度营收情况",
+    "宁德时代的研发投入",
+    "平安银行不良贷款率变化",
+    "比亚迪新能源汽车销量",
+    "招商银行分红方案",
+    "公司关于回购股份的公告",
+    "董事会决议公告",
+    "年度报告中的风险提示",
+    "重大资产重组进展",
+    "股东减持计划",
+]
+
+# 每种索引类型扫描的检索参数（在配置文件中两类查询参数的基础上加密）
+SWEEP = {
+    "IVF_FLAT": ("nprobe", [4, 8, 16, 32, 64, 128]),
+    "IVF_SQ8": ("nprobe", [8, 16, 32, 64, 128, 256]),
+    "HNSW": ("ef", [32, 64, 128, 256, 512]),
+    "DISKANN": ("search_list", [20, 50, 100, 200, 400]),
+    "FLAT": (None, [None]),
+}
+
+
+def load_queries(path):
+    if not path:
+        return DEFAULT_QUERIES
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def search_keys(milvus, vectors, top_k, params):
+    """批量检索，返回每个查询的(doc_id, chunk_id)列表（主键在各集合间不同）"""
+    results = milvus.collection.search(
+        data=vectors,
+        anns_field="embeddings",
+        param=params,
+        limit=top_k,
+        output_fields=["doc_id", "chunk_id"]
+    )
+    return [[(hit.entity.get("doc_id"), hit.entity.get("chunk_id")) for hit in hits] for hits in results]
+
+
+def measure_qps(milvus, vectors, top_k, params, concurrency):
+    """每个请求一个查询向量，按给定并发执行全部查询"""
+    def one(vector):
+        milvus.collection.search(data=[vector], anns_field="embeddings", param=params,
+                                 limit=top_k, output_fields=["doc_id"])
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, vectors))
+    return len(vectors) / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量索引配置 recall@k vs QPS 基准测试")
+    parser.add_argument("--ground-truth", required=True, help="FLAT索引集合（精确结果）")
+    parser.add_argument("--collections", nargs="+", required=True, help="待比较的集合")
+    parser.add_argument("--queries", help="留出查询文件（每行一个查询）")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5, help="QPS测量时查询集的重复次数")
+    args = parser.parse_args()
+
+    model = EmbeddingModel()
+    queries = load_queries(args.queries)
+    vectors = [model.encode_query(q).tolist() for q in queries]
+
+    truth_conn = MilvusConnector(collection_name=args.ground_truth, partitioned=False)
+    truth = search_keys(truth_conn, vectors, args.top_k, truth_conn.get_search_params(top_k=args.top_k))
+
+    print(f"\n=== recall@{args.top_k} vs QPS ({len(queries)}个查询, 并发{args.concurrency}) ===")
+    print(f"{'集合':<48}{'索引':<10}{'参数':<20}{'recall':>8}{'QPS':>10}")
+    for name in args.collections:
+        milvus = MilvusConnector(collection_name=name, partitioned=False)
+        profile = settings.MILVUS_INDEX_PROFILES[milvus.index_profile]
+        index_type = profile["index"]["index_type"]
+        key, values = SWEEP.get(index_type, (None, [None]))
+        for value in values:
+            params = {"metric_type": profile["index"]["metric_type"], "params": {}}
+            if key:
+                params["params"][key] = max(value, args.top_k) if key != "nprobe" else value
+
+            found = search_keys(milvus, vectors, args.top_k, params)
+            recall = sum(
+                len(set(f) & set(t)) / max(len(t), 1) for f, t in zip(found, truth)
+            ) / len(truth)
+            qps = measure_qps(milvus, vectors * args.repeat, args.top_k, params, args.concurrency)
+            label = f"{key}={params['params'][key]}" if key else "-"
+            print(f"{name:<48}{index_type:<10}{label:<20}{recall:>8.3f}{qps:>10.1f}")
+
+        print(f"{'':<48}配置中的参数: interactive={profile['search']['interactive']} "
+              f"batch={profile['search']['batch']}")
+
+
+if __name__ == "__main__":
+    main()
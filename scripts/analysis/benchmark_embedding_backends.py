@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+嵌入推理后端基准测试：PyTorch fp32 vs ONNX Runtime fp32 / int8
+- 查询编码：单条文本延迟 p50 / p95
+- 入库编码：chunk批量吞吐（文本/秒）
+可扫描ONNX Runtime的intra-op线程数，用于设置 EMBEDDING_ONNX_INTRA_OP_THREADS
+
+示例：
+    python scripts/analysis/benchmark_embedding_backends.py --threads 2 4 8 --batch-texts 256
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.settings import settings
+from models.embedding_model import EmbeddingModel
+from models.onnx_backend import OnnxEmbeddingBackend, ONNX_FP32_FILE, ONNX_INT8_FILE
+
+QUERIES = [
+    "贵州茅台2024年第一季度营收情况",
+    "宁德时代的研发投入",
+    "平安银行不良贷款率变化",
+    "比亚迪新能源汽车销量",
+    "招商银行分红方案",
+]
+
+CHUNK_SAMPLE = ("公司2023年度实现营业收入1,234.56亿元，同比增长12.34%；归属于上市公司股东的净利润"
+                "234.56亿元，同比增长8.90%。报告期内，公司持续加大研发投入，推进产品结构优化。")
+
+
+def build_chunks(count):
+    """长度从几十字到CHUNK_SIZE不等的chunk样本"""
+    rng = np.random.RandomState(0)
+    chunks = []
+    for _ in range(count):
+        length = int(rng.randint(20, settings.CHUNK_SIZE + 1))
+        chunks.append((CHUNK_SAMPLE * (length // len(CHUNK_SAMPLE) + 1))[:length])
+    return chunks
+
+
+def bench(name, encode, chunks, rounds):
+    encode(QUERIES[:1])  # 预热
+    latencies = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            encode([query])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    encode(chunks)
+    throughput = len(chunks) / (time.perf_counter() - start)
+
+    print(f"{name:<28} {np.percentile(latencies, 50):>9.1f} {np.percentile(latencies, 95):>9.1f} {throughput:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="嵌入推理后端基准测试")
+    parser.add_argument("--threads", type=int, nargs="*", default=[settings.EMBEDDING_ONNX_INTRA_OP_THREADS],
+                        help="ONNX Runtime intra-op线程数（0为默认）")
+    parser.add_argument("--batch-texts", type=int, default=256, help="吞吐测试的chunk数")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=5, help="查询延迟测试轮数")
+    parser.add_argument("--skip-torch", action="store_true")
+    args = parser.parse_args()
+
+    chunks = build_chunks(args.batch_texts)
+    print(f"{'后端':<28} {'p50(ms)':>9} {'p95(ms)':>9} {'吞吐(条/秒)':>12}")
+    print("-" * 62)
+
+    if not args.skip_torch:
+        model = EmbeddingModel(backend='torch', device='cpu', load_mode='eager')
+        bench("torch fp32", lambda texts: model.model.encode(
+            texts, batch_size=args.batch_size, normalize_embeddings=True), chunks, args.rounds)
+
+    for label, quantized, file_name in (("onnx fp32", False, ONNX_FP32_FILE), ("onnx int8", True, ONNX_INT8_FILE)):
+        if not os.path.exists(os.path.join(settings.EMBEDDING_ONNX_PATH, file_name)):
+            print(f"{label:<28} 未找到 {file_name}，跳过")
+            continue
+        for threads in args.threads:
+            backend = OnnxEmbeddingBackend(settings.EMBEDDING_ONNX_PATH, quantized=quantized,
+                                           intra_op_threads=threads)
+            bench(f"{label} (intra_op={threads})", lambda texts: backend.encode(
+                texts, batch_size=args.batch_size, normalize_embeddings=True), chunks, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+多进程编码池扩展性基准测试
+在相同总核数下比较不同子进程数（每进程线程数 = 核数 / 子进程数）的入库编码吞吐，
+相对单进程的加速比接近线性说明计算受限，增长放缓处即内存带宽饱和点，
+用于设置 EMBEDDING_POOL_WORKERS / EMBEDDING_POOL_THREADS_PER_WORKER
+
+示例：
+    python scripts/analysis/benchmark_embedding_pool.py --workers 1 2 4 8 16 --texts 2048
+"""
+
+import sys
+import os
+import time
+import argparse
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.settings import settings
+from models.embedding_pool import EmbeddingProcessPool
+
+CHUNK_SAMPLE = ("公司2023年度实现营业收入1,234.56亿元，同比增长12.34%；归属于上市公司股东的净利润"
+                "234.56亿元，同比增长8.90%。报告期内，公司持续加大研发投入，推进产品结构优化。")
+
+
+def build_chunks(count):
+    """长度从几十字到CHUNK_SIZE不等的chunk样本"""
+    rng = np.random.RandomState(0)
+    chunks = []
+    for _ in range(count):
+        length = int(rng.randint(20, settings.CHUNK_SIZE + 1))
+        chunks.append((CHUNK_SAMPLE * (length // len(CHUNK_SAMPLE) + 1))[:length])
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程编码池扩展性基准测试")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--cores", type=int, default=os.cpu_count() or 1, help="参与测试的总核数")
+    parser.add_argument("--texts", type=int, default=1024, help="每轮编码的chunk数")
+    parser.add_argument("--backend", default=settings.EMBEDDING_BACKEND, choices=["torch", "onnx"])
+    args = parser.parse_args()
+
+    chunks = build_chunks(args.texts)
+    print(f"{'子进程':>6} {'线程/进程':>9} {'吞吐(条/秒)':>12} {'tokens/秒':>12} {'加速比':>8}")
+    print("-" * 52)
+
+    baseline = None
+    for workers in args.workers:
+        threads = max(1, args.cores // workers)
+        pool = EmbeddingProcessPool(num_workers=workers, threads_per_worker=threads, backend=args.backend)
+        try:
+            pool.encode(chunks[:workers * 4])  # 预热
+            pool.stats.update({'texts': 0, 'tokens': 0, 'encode_time': 0.0})
+            start = time.time()
+            pool.encode(chunks)
+            elapsed = time.time() - start
+        finally:
+            pool.close()
+
+        throughput = len(chunks) / elapsed
+        baseline = baseline or throughput
+        print(f"{workers:>6} {threads:>9} {throughput:>12.1f} {pool.stats['tokens'] / elapsed:>12.0f} "
+              f"{throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Milvus分区剪枝基准测试
+对同一组带过滤条件的查询，比较未分区集合（全量扫描+标量过滤）与分区集合（只检索相关分区）的延迟
+"""
+
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.settings import settings
+from database.milvus_connector import MilvusConnector
+from models.embedding_model import EmbeddingModel
+
+CASES = [
+    ("贵州茅台年度报告营收", 'ts_code == "600519.SH"'),
+    ("贵州茅台2024年经营情况", 'ts_code == "600519.SH" and ann_date >= "20240101" and ann_date <= "20241231"'),
+    ("银行不良贷款率", 'ts_code in ["000001.SZ", "600036.SH"]'),
+    ("最近的分红公告", 'ann_date >= "20250101"'),
+    ("新能源汽车销量", None),
+]
+
+
+def measure(milvus, vector, expr, top_k, rounds):
+    latencies, hits = [], 0
+    for _ in range(rounds):
+        start = time.time()
+        results = milvus.search([vector], top_k=top_k, filter_expr=expr,
+                                output_fields=milvus.LIGHT_OUTPUT_FIELDS)
+        latencies.append(time.time() - start)
+        hits = len(results[0])
+    latencies.sort()
+    return sum(latencies) / len(latencies) * 1000, latencies[int(len(latencies) * 0.95) - 1] * 1000, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Milvus分区剪枝基准测试")
+    parser.add_argument("--source", default=settings.MILVUS_COLLECTION_NAME, help="未分区集合")
+    parser.add_argument("--target", default=f"{settings.MILVUS_COLLECTION_NAME}_partitioned", help="分区集合")
+    parser.add_argument("--top-k", type=int, default=15)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    flat = MilvusConnector(collection_name=args.source, partitioned=False)
+    partitioned = MilvusConnector(collection_name=args.target, partitioned=True)
+    model = EmbeddingModel()
+
+    print(f"\n=== 分区剪枝基准 (top_k={args.top_k}, 每个查询{args.rounds}次) ===")
+    print(f"{'过滤条件':<60}{'分区数':>8}{'未分区ms(avg/p95)':>20}{'分区ms(avg/p95)':>20}{'命中':>10}")
+    for question, expr in CASES:
+        vector = model.encode_query(question).tolist()
+        # 预热
+        measure(flat, vector, expr, args.top_k, 2)
+        measure(partitioned, vector, expr, args.top_k, 2)
+
+        flat_avg, flat_p95, flat_hits = measure(flat, vector, expr, args.top_k, args.rounds)
+        part_avg, part_p95, part_hits = measure(partitioned, vector, expr, args.top_k, args.rounds)
+        partitions = partitioned.resolve_partitions(expr)
+        partition_count = 'all' if partitions is None else len(partitions)
+        print(f"{str(expr):<60}{partition_count:>8}"
+              f"{flat_avg:>11.1f}/{flat_p95:<8.1f}{part_avg:>11.1f}/{part_p95:<8.1f}"
+              f"{flat_hits:>5}/{part_hits:<4}")
+
+    print(f"\n分区统计: {partitioned.get_partition_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+两阶段检索基准测试
+对比完整字段检索与"主键+得分 -> 按主键批量回填"两种模式的延迟和结果负载
+"""
+
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from database.milvus_connector import MilvusConnector
+from models.embedding_model import EmbeddingModel
+
+QUERIES = [
+    "贵州茅台2024年第一季度营收情况",
+    "宁德时代的研发投入",
+    "平安银行不良贷款率变化",
+    "比亚迪新能源汽车销量",
+    "招商银行分红方案",
+]
+
+
+def run_full(milvus, vector, top_k, keep):
+    start = time.time()
+    hits = milvus.search([vector], top_k=top_k)[0]
+    rows = [{field: hit.entity.get(field) for field in milvus.SEARCH_OUTPUT_FIELDS} for hit in hits]
+    return time.time() - start, milvus.estimate_payload_bytes(rows), len(rows[:keep])
+
+
+def run_two_phase(milvus, vector, top_k, keep):
+    start = time.time()
+    hits = milvus.search([vector], top_k=top_k, output_fields=milvus.LIGHT_OUTPUT_FIELDS)[0]
+    light = [{'doc_id': hit.entity.get('doc_id')} for hit in hits]
+    survivors = [hit.id for hit in hits][:keep]
+    rows = milvus.fetch_by_ids(survivors)
+    payload = milvus.estimate_payload_bytes(light) + milvus.estimate_payload_bytes(list(rows.values()))
+    return time.time() - start, payload, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="两阶段检索基准测试")
+    parser.add_argument("--top-k", type=int, default=50, help="第一阶段候选数")
+    parser.add_argument("--keep", type=int, default=5, help="回填的文档数")
+    parser.add_argument("--rounds", type=int, default=5, help="每个查询的重复次数")
+    args = parser.parse_args()
+
+    milvus = MilvusConnector()
+    model = EmbeddingModel()
+    vectors = [model.encode_query(q).tolist() for q in QUERIES]
+
+    # 预热
+    for vector in vectors:
+        run_full(milvus, vector, args.top_k, args.keep)
+        run_two_phase(milvus, vector, args.top_k, args.keep)
+
+    results = {}
+    for name, runner in (('full', run_full), ('two_phase', run_two_phase)):
+        latencies, payloads = [], []
+        for _ in range(args.rounds):
+            for vector in vectors:
+                latency, payload, _ = runner(milvus, vector, args.top_k, args.keep)
+                latencies.append(latency)
+                payloads.append(payload)
+        latencies.sort()
+        results[name] = {
+            'avg_ms': sum(latencies) / len(latencies) * 1000,
+            'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            'avg_payload_kb': sum(payloads) / len(payloads) / 1024,
+        }
+
+    print(f"\n=== 两阶段检索基准 (top_k={args.top_k}, 回填{args.keep}条, {len(QUERIES) * args.rounds}次) ===")
+    print(f"{'模式':<12}{'平均延迟(ms)':>14}{'P95延迟(ms)':>14}{'平均负载(KB)':>14}")
+    for name, r in results.items():
+        print(f"{name:<12}{r['avg_ms']:>14.1f}{r['p95_ms']:>14.1f}{r['avg_payload_kb']:>14.1f}")
+
+    full, light = results['full'], results['two_phase']
+    if full['avg_payload_kb']:
+        print(f"\n负载减少: {(1 - light['avg_payload_kb'] / full['avg_payload_kb']) * 100:.1f}%")
+    print(f"延迟变化: {light['avg_ms'] - full['avg_ms']:+.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
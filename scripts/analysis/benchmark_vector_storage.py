@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+向量存储精度基准测试：recall@k / 延迟 / 内存
+以float32 FLAT集合的精确结果为基准，比较低精度集合（由 rebuild_milvus_index.py --storage 生成）
+在不精排与精排两种方式下的召回率和p50/p95延迟，并列出Milvus查询节点的段内存与本地全精度存储的磁盘占用，
+用于选择 MILVUS_VECTOR_STORAGE 与各精度的 rescore_multiplier
+
+示例：
+    python scripts/analysis/benchmark_vector_storage.py --ground-truth stock_announcements__flat_xxx \
+        --collections stock_announcements__hnsw_xxx stock_announcements__bin_ivf_flat_xxx --queries queries.txt
+不连接Milvus，用numpy在随机（或本地嵌入存储中的）向量上模拟各精度的召回率：
+    python scripts/analysis/benchmark_vector_storage.py --simulate --corpus-size 50000
+"""
+
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+
+from config.settings import settings
+
+DEFAULT_QUERIES = [
+    "贵州茅台2024年第一季度营收情况",
+    "宁德时代的研发投入",
+    "平安银行不良贷款率变化",
+    "比亚迪新能源汽车销量",
+    "招商银行分红方案",
+    "公司关于回购股份的公告",
+    "董事会决议公告",
+    "年度报告中的风险提示",
+    "重大资产重组进展",
+    "股东减持计划",
+]
+
+
+def load_queries(path):
+    if not path:
+        return DEFAULT_QUERIES
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def recall_at_k(found, truth):
+    return sum(len(set(f) & set(t)) / max(len(t), 1) for f, t in zip(found, truth)) / len(truth)
+
+
+def percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q)) * 1000 if latencies else 0.0
+
+
+def segment_memory(collection_name):
+    """查询节点上已加载段的内存占用（字节）"""
+    from pymilvus import utility
+    try:
+        return sum(segment.mem_size for segment in utility.get_query_segment_info(collection_name))
+    except Exception:
+        return 0
+
+
+def search_keys(milvus, vectors, top_k, rescore):
+    """逐条检索，返回每个查询的(doc_id, chunk_id)列表（主键在各集合间不同）及单次延迟"""
+    keys, latencies = [], []
+    for vector in vectors:
+        start = time.time()
+        hits = milvus.search([vector], top_k=top_k, output_fields=["doc_id", "chunk_id"], rescore=rescore)[0]
+        latencies.append(time.time() - start)
+        keys.append([(hit.entity.get("doc_id"), hit.entity.get("chunk_id")) for hit in hits])
+    return keys, latencies
+
+
+def run_live(args):
+    from database.milvus_connector import MilvusConnector
+    from models.embedding_model import EmbeddingModel
+
+    model = EmbeddingModel()
+    vectors = [model.encode_query(q).tolist() for q in load_queries(args.queries)]
+
+    truth_conn = MilvusConnector(collection_name=args.ground_truth, partitioned=False)
+    truth, _ = search_keys(truth_conn, vectors, args.top_k, rescore=False)
+
+    print(f"\n=== 向量存储精度 recall@{args.top_k} / 延迟 / 内存 ({len(vectors)}个查询) ===")
+    print(f"{'集合':<48}{'精度':<9}{'精排':<6}{'recall':>8}{'p50(ms)':>10}{'p95(ms)':>10}"
+          f"{'段内存(MB)':>12}{'本地存储(MB)':>14}")
+    for name in [args.ground_truth] + args.collections:
+        milvus = MilvusConnector(collection_name=name, partitioned=False)
+        memory = segment_memory(milvus.collection.describe().get("collection_name") or name)
+        disk = milvus.full_precision_store.get_stats()['disk_bytes'] if milvus.rescore_enabled else 0
+        modes = [False, True] if milvus.vector_storage != "float32" else [False]
+        for rescore in modes:
+            found, latencies = search_keys(milvus, vectors * args.repeat, args.top_k, rescore)
+            recall = recall_at_k(found[:len(vectors)], truth)
+            print(f"{name:<48}{milvus.vector_storage:<9}{'是' if rescore else '否':<6}{recall:>8.3f}"
+                  f"{percentile_ms(latencies, 50):>10.2f}{percentile_ms(latencies, 95):>10.2f}"
+                  f"{memory / 2**20:>12.1f}{disk / 2**20:>14.1f}")
+
+
+def load_corpus(size, dimension):
+    """本地嵌入存储中的向量（不足时用随机单位向量补齐）"""
+    path = os.path.join(settings.EMBEDDING_STORE_PATH, "vectors.f32")
+    rows = os.path.getsize(path) // (dimension * 4) if os.path.exists(path) else 0
+    vectors = np.fromfile(path, dtype=np.float32, count=min(rows, size) * dimension).reshape(-1, dimension) \
+        if rows else np.empty((0, dimension), dtype=np.float32)
+    if len(vectors) < size:
+        rng = np.random.default_rng(0)
+        extra = rng.standard_normal((size - len(vectors), dimension)).astype(np.float32)
+        vectors = np.vstack([vectors, extra])
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def simulate_scores(storage, corpus, queries):
+    """各精度下ANN阶段的近似得分（越大越相似）"""
+    if storage == "binary":
+        corpus_bits, query_bits = corpus > 0, queries > 0
+        # 汉明距离 = 维数 - 一致位数
+        agree = query_bits.astype(np.float32) @ corpus_bits.T + (~query_bits).astype(np.float32) @ (~corpus_bits).T
+        return agree
+    if storage == "int8":
+        # IVF_SQ8：每维按全局最小/最大值量化为1字节
+        low, high = corpus.min(axis=0), corpus.max(axis=0)
+        scale = np.where(high > low, (high - low) / 255, 1.0)
+        corpus = np.round((corpus - low) / scale) * scale + low
+        return queries @ corpus.T
+    if storage == "float16":
+        return queries.astype(np.float16).astype(np.float32) @ corpus.astype(np.float16).astype(np.float32).T
+    return queries @ corpus.T
+
+
+def run_simulation(args):
+    dimension = settings.EMBEDDING_DIM
+    corpus = load_corpus(args.corpus_size, dimension)
+    rng = np.random.default_rng(1)
+    # 查询取语料向量加噪声，近邻结构接近真实查询
+    queries = corpus[rng.choice(len(corpus), args.num_queries, replace=False)]
+    queries = queries + rng.standard_normal(queries.shape).astype(np.float32) * 0.05
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = queries @ corpus.T
+    truth = [list(np.argsort(-row)[:args.top_k]) for row in exact]
+
+    print(f"\n=== 精度模拟 recall@{args.top_k} (语料{len(corpus)}条, {args.num_queries}个查询, 维度{dimension}) ===")
+    print(f"{'精度':<9}{'字节/条':>9}{'倍数':>6}{'不精排':>10}{'精排':>10}{'耗时(ms/查询)':>16}")
+    for storage, mode in settings.MILVUS_VECTOR_STORAGE_MODES.items():
+        multiplier = mode["rescore_multiplier"]
+        start = time.time()
+        approx = simulate_scores(storage, corpus, queries)
+        plain, rescored = [], []
+        for row, exact_row in zip(approx, exact):
+            candidates = np.argsort(-row, kind='stable')[:args.top_k * multiplier]
+            plain.append(list(candidates[:args.top_k]))
+            rescored.append(list(candidates[np.argsort(-exact_row[candidates], kind='stable')][:args.top_k]))
+        elapsed = (time.time() - start) / args.num_queries * 1000
+        row_bytes = {"binary": dimension // 8, "int8": dimension, "float16": dimension * 2}.get(storage, dimension * 4)
+        print(f"{storage:<9}{row_bytes:>9}{multiplier:>6}{recall_at_k(plain, truth):>10.3f}"
+              f"{recall_at_k(rescored, truth):>10.3f}{elapsed:>16.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量存储精度 recall@k / 延迟 / 内存 基准测试")
+    parser.add_argument("--ground-truth", help="float32 FLAT索引集合（精确结果）")
+    parser.add_argument("--collections", nargs="*", default=[], help="待比较的低精度集合")
+    parser.add_argument("--queries", help="留出查询文件（每行一个查询）")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="延迟测量时查询集的重复次数")
+    parser.add_argument("--simulate", action="store_true", help="不连接Milvus，用numpy模拟各精度的召回率")
+    parser.add_argument("--corpus-size", type=int, default=20000, help="模拟语料条数")
+    parser.add_argument("--num-queries", type=int, default=100, help="模拟查询数")
+    args = parser.parse_args()
+
+    if args.simulate:
+        run_simulation(args)
+    elif not args.ground_truth:
+        parser.error("需要 --ground-truth 或 --simulate")
+    else:
+        run_live(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+导出 BGE-M3 为ONNX图（供 EMBEDDING_BACKEND=onnx 使用）
+1. 以 last_hidden_state 为输出导出fp32图（batch、序列长度动态），分词器文件一并复制；
+   稀疏权重头存为 sparse_linear.npz（ONNX后端由last_hidden_state计算稀疏向量，无需torch）
+2. 可选：ONNX Runtime 动态int8量化（权重int8、激活运行时量化），生成 model_int8.onnx
+
+导出后请运行 scripts/tests/test_onnx_parity.py 校验与PyTorch向量的余弦容差
+
+示例：
+    python scripts/maintenance/export_onnx_embedding.py --quantize
+"""
+
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.settings import settings
+from models.embedding_model import resolve_model_path
+from models.onnx_backend import ONNX_FP32_FILE, ONNX_INT8_FILE
+from models.sparse_encoder import SparseHead, SPARSE_HEAD_NPZ_FILE
+
+ONNX_OPSET = 17
+
+
+def export_fp32(model_path, output_dir):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModel.from_pretrained(model_path)
+    model.eval()
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, encoder):
+            super().__init__()
+            self.encoder = encoder
+
+        def forward(self, input_ids, attention_mask):
+            return self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    sample = tokenizer(["示例文本"], return_tensors="pt")
+    output_file = os.path.join(output_dir, ONNX_FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(model),
+            (sample["input_ids"], sample["attention_mask"]),
+            output_file,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=ONNX_OPSET,
+            do_constant_folding=True,
+        )
+    tokenizer.save_pretrained(output_dir)
+    try:
+        SparseHead.load(model_path, tokenizer).save_npz(os.path.join(output_dir, SPARSE_HEAD_NPZ_FILE))
+    except FileNotFoundError as e:
+        print(f"   ⚠️ {e}，ONNX后端不支持稀疏向量")
+    return output_file
+
+
+def quantize_int8(output_dir):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    source = os.path.join(output_dir, ONNX_FP32_FILE)
+    target = os.path.join(output_dir, ONNX_INT8_FILE)
+    # fp32图超过2GB，以外部数据格式读写
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8, per_channel=True,
+                     use_external_data_format=True)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出BGE-M3 ONNX图")
+    parser.add_argument("--model", default=None, help="模型目录或名称（默认本地models/bge-m3）")
+    parser.add_argument("--output", default=settings.EMBEDDING_ONNX_PATH, help="导出目录")
+    parser.add_argument("--quantize", action="store_true", help="同时生成int8动态量化图")
+    parser.add_argument("--skip-export", action="store_true", help="只对已导出的fp32图做量化")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    model_path = args.model or resolve_model_path('torch')
+
+    if not args.skip_export:
+        print(f"导出fp32 ONNX图: {model_path} -> {args.output}")
+        start = time.time()
+        output_file = export_fp32(model_path, args.output)
+        print(f"   ✅ {output_file} ({time.time() - start:.1f}秒)")
+
+    if args.quantize:
+        print("动态int8量化...")
+        start = time.time()
+        output_file = quantize_int8(args.output)
+        print(f"   ✅ {output_file} ({time.time() - start:.1f}秒)")
+
+    print("\n请运行 python scripts/tests/test_onnx_parity.py 校验向量一致性")
+
+
+if __name__ == "__main__":
+    main()
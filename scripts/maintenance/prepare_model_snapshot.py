@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+准备嵌入模型本地快照
+从HuggingFace（或已有本地目录）加载BGE-M3，以safetensors格式保存到 EMBEDDING_SNAPSHOT_PATH。
+safetensors权重按内存映射加载，无需反序列化pickle，也不再访问网络，显著缩短模型加载时间。
+BGE-M3稀疏权重头（sparse_linear.pt）不属于SentenceTransformer模块，单独复制到快照目录
+
+示例：
+    python scripts/maintenance/prepare_model_snapshot.py
+    python scripts/maintenance/prepare_model_snapshot.py --source /data/models/bge-m3 --verify
+"""
+
+import sys
+import os
+import time
+import shutil
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.settings import settings
+from models.sparse_encoder import SPARSE_HEAD_FILE
+
+
+def save_snapshot(source, target):
+    """加载模型并以safetensors格式保存；目标已存在时先写临时目录再替换"""
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(source, device="cpu", trust_remote_code=True)
+    staging = f"{target}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    model.save(staging, safe_serialization=True)
+    copy_sparse_head(source, staging)
+
+    # 去掉pickle格式的旧权重，避免加载时被优先选用
+    for root, _, files in os.walk(staging):
+        for name in files:
+            if name.endswith(".bin") and "pytorch_model" in name:
+                os.remove(os.path.join(root, name))
+
+    if os.path.exists(target):
+        backup = f"{target}.bak"
+        shutil.rmtree(backup, ignore_errors=True)
+        os.replace(target, backup)
+        os.replace(staging, target)
+        shutil.rmtree(backup, ignore_errors=True)
+    else:
+        os.replace(staging, target)
+
+
+def copy_sparse_head(source, target):
+    """复制稀疏权重头；来源为模型名时从HuggingFace下载"""
+    path = os.path.join(source, SPARSE_HEAD_FILE)
+    if not os.path.exists(path):
+        if os.path.isdir(source):
+            print(f"   ⚠️ {source} 中没有 {SPARSE_HEAD_FILE}，快照不支持稀疏向量")
+            return
+        from huggingface_hub import hf_hub_download
+        path = hf_hub_download(source, SPARSE_HEAD_FILE)
+    shutil.copy(path, os.path.join(target, SPARSE_HEAD_FILE))
+
+
+def verify(target):
+    """测量快照加载时间"""
+    from sentence_transformers import SentenceTransformer
+
+    start = time.time()
+    model = SentenceTransformer(target, device="cpu", trust_remote_code=True)
+    load_time = time.time() - start
+    dimension = model.encode("测试文本").shape[0]
+    print(f"   加载时间: {load_time:.1f}秒, 向量维度: {dimension}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="准备嵌入模型safetensors本地快照")
+    parser.add_argument("--source", default=None,
+                        help="模型来源（默认本地快照目录，不存在时使用EMBEDDING_MODEL_NAME）")
+    parser.add_argument("--target", default=str(settings.EMBEDDING_SNAPSHOT_PATH), help="快照目录")
+    parser.add_argument("--verify", action="store_true", help="保存后测量加载时间")
+    args = parser.parse_args()
+
+    source = args.source or (args.target if os.path.exists(args.target) else settings.EMBEDDING_MODEL_NAME)
+    print(f"准备模型快照: {source} -> {args.target}")
+    start = time.time()
+    save_snapshot(source, args.target)
+    weights = [name for name in os.listdir(args.target) if name.endswith(".safetensors")]
+    print(f"   ✅ 完成 ({time.time() - start:.1f}秒), 权重文件: {', '.join(weights) or '无'}")
+
+    if args.verify:
+        verify(args.target)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Milvus向量索引在线重建工具
+按settings.MILVUS_INDEX_PROFILES中的索引配置建影子集合，复制数据并等待索引构建完成后原子切换别名。
+服务需通过别名访问集合：MILVUS_COLLECTION_NAME=<别名>
+切换后会从源集合补齐最后写入的数据并删除复制后在源集合被删除的行；切换瞬间仍在途的写入或删除可能丢失，
+对一致性要求严格时应在重建期间暂停入库
+
+首次使用（别名尚不存在）：
+    python scripts/maintenance/rebuild_milvus_index.py --alias stock_announcements_live \
+        --source stock_announcements --profile hnsw
+之后切换索引：
+    python scripts/maintenance/rebuild_milvus_index.py --alias stock_announcements_live --profile ivf_sq8
+增加BGE-M3稀疏向量字段（由模型按chunk文本补算稀疏向量，之后设置EMBEDDING_SPARSE_ENABLED=true）：
+    python scripts/maintenance/rebuild_milvus_index.py --alias stock_announcements_live --profile hnsw --sparse
+改为低精度向量存储（ANN阶段用紧凑向量，检索时按本地全精度向量精排）：
+    python scripts/maintenance/rebuild_milvus_index.py --alias stock_announcements_live --profile bin_ivf_flat \
+        --storage binary
+"""
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.settings import settings
+from database.milvus_index_manager import rebuild_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Milvus向量索引在线重建工具")
+    parser.add_argument("--alias", required=True, help="服务使用的别名")
+    parser.add_argument("--profile", required=True, choices=sorted(settings.MILVUS_INDEX_PROFILES), help="目标索引配置")
+    parser.add_argument("--source", help="别名尚不存在时的源集合")
+    parser.add_argument("--batch-size", type=int, default=2000, help="每批复制的条数")
+    parser.add_argument("--drop-old", action="store_true", help="切换后删除旧集合")
+    parser.add_argument("--sparse", action="store_true", help="新集合增加稀疏向量字段")
+    parser.add_argument("--storage", choices=sorted(settings.MILVUS_VECTOR_STORAGE_MODES),
+                        help="新集合的向量存储精度，默认与源集合相同")
+    args = parser.parse_args()
+
+    if args.sparse:
+        # 补算稀疏向量需要加载稀疏权重头
+        settings.EMBEDDING_SPARSE_ENABLED = True
+    target = rebuild_index(args.alias, args.profile, args.source, args.batch_size, args.drop_old,
+                           sparse=True if args.sparse else None, vector_storage=args.storage)
+    print(f"重建完成，别名 {args.alias} -> {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database.mysql_connector import MySQLConnector
 from database.milvus_connector import MilvusConnector
 from rag.document_processor import DocumentProcessor
+from models.embedding_store import get_embedding_store
+from config.settings import settings
 from utils.logger import setup_logger
 import json
 from pathlib import Path
@@ -80,6 +82,9 @@ class VectorRecovery:
                 failed_count += 1
         
         logger.info(f"\n恢复完成: 成功 {success_count}, 失败 {failed_count}")
+        if settings.EMBEDDING_STORE_ENABLED:
+            store_stats = get_embedding_store().get_stats()
+            logger.info(f"向量库命中 {store_stats['hits']}/{store_stats['lookups']} 个chunk（跳过模型推理）")
         return success_count, failed_count
     
     def recover_from_json(self, json_file="missing_in_milvus.json"):
@@ -0,0 +1,99 @@
+# tests/test_context_builder.py
+"""
+测试提示词上下文构建（不依赖LLM与Milvus）
+- 同一公告的相邻/重叠chunk合并，去掉重叠部分
+- 跨文档近重复句段折叠，数字不同的句段保留
+- 按相关性顺序装入token预算，超出部分在句段边界截断
+"""
+
+import sys
+sys.path.append('.')
+
+from rag.context_builder import ContextBuilder
+from utils.token_estimator import estimate_tokens
+
+BOILERPLATE = "本公司董事会及全体董事保证本公告内容不存在任何虚假记载、误导性陈述或者重大遗漏。"
+
+
+def make_doc(doc_id, text, ts_code='600519.SH'):
+    chunk_id = int(doc_id.rsplit('_', 1)[1])
+    return {'doc_id': doc_id, 'chunk_id': chunk_id, 'text': text, 'ts_code': ts_code,
+            'title': f"公告{doc_id}", 'ann_date': '20240301'}
+
+
+def test_merge_adjacent():
+    """相邻chunk合并到排名较高的一个中，重叠部分只保留一次"""
+    print("\n1. 测试相邻chunk合并...")
+    builder = ContextBuilder(token_budget=10000)
+    docs = [
+        make_doc("ann1_1", "第二段内容。营业收入同比增长。"),
+        make_doc("ann2_0", "另一份公告的内容。", ts_code='000001.SZ'),
+        make_doc("ann1_0", "第一段内容。第二段内容。"),
+        make_doc("ann1_5", "相隔较远的段落。"),
+    ]
+    merged, count = builder._merge_adjacent(docs)
+    assert count == 1, count
+    assert [doc['doc_id'] for doc in merged] == ["ann1_1", "ann2_0", "ann1_5"], merged
+    assert merged[0]['text'] == "第一段内容。第二段内容。营业收入同比增长。", merged[0]['text']
+    assert merged[0]['chunk_range'] == (0, 1)
+
+    # 已被包含的chunk不重复拼接
+    expanded = dict(make_doc("ann3_1", "甲。乙。丙。"), chunk_range=(0, 2))
+    merged, count = builder._merge_adjacent([expanded, make_doc("ann3_2", "丙。")])
+    assert count == 1 and merged == [expanded], merged
+    print("   ✅ 合并正确，重叠部分不重复")
+
+
+def test_drop_duplicate_segments():
+    """模板文字只在排名最高的文档中保留"""
+    print("\n2. 测试近重复句段折叠...")
+    builder = ContextBuilder(token_budget=10000)
+    docs = [
+        make_doc("ann1_0", BOILERPLATE + "公司2023年度实现营业收入1234.56亿元。"),
+        make_doc("ann2_0", BOILERPLATE + "公司2023年度实现营业收入987.65亿元。"),
+        make_doc("ann3_0", BOILERPLATE),
+    ]
+    deduped, duplicates = builder._drop_duplicate_segments(docs)
+    assert duplicates == 2, duplicates
+    assert [doc['doc_id'] for doc in deduped] == ["ann1_0", "ann2_0"], "只剩模板文字的文档应被丢弃"
+    assert deduped[0]['text'].startswith(BOILERPLATE)
+    assert BOILERPLATE not in deduped[1]['text'] and "987.65" in deduped[1]['text'], "数字不同的句段应保留"
+    print("   ✅ 模板文字折叠，数字不同的句段保留")
+
+
+def test_pack_budget():
+    """超出预算的文档在句段边界截断，之后的文档不再装入"""
+    print("\n3. 测试token预算装填...")
+    long_text = "".join(f"第{i}条事项说明，涉及金额{i * 100}万元。" for i in range(60))
+    docs = [
+        make_doc("ann1_0", "公司股价小幅上涨。"),
+        make_doc("ann2_0", long_text),
+        make_doc("ann3_0", "不会被装入的文档。"),
+    ]
+    budget = 300
+    builder = ContextBuilder(token_budget=budget)
+    context, info = builder.build(docs)
+    assert info['documents_out'] == 2 and info['truncated'] == 1, info
+    assert estimate_tokens(context) <= budget + 5, estimate_tokens(context)
+    assert "不会被装入" not in context
+    truncated = context.split("内容: ")[-1].split("\n---")[0]
+    assert truncated and long_text.startswith(truncated) and truncated.endswith("。"), truncated
+    assert info['tokens_saved'] > 0
+
+    stats = builder.get_stats()
+    assert stats['queries'] == 1 and stats['truncated'] == 1 and stats['tokens_saved'] == info['tokens_saved']
+    print(f"   ✅ 截断在句段边界，节省 {info['tokens_saved']} tokens")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("上下文构建测试")
+    print("=" * 50)
+    try:
+        test_merge_adjacent()
+        test_drop_duplicate_segments()
+        test_pack_budget()
+        print("\n✅ 上下文构建测试通过")
+    except AssertionError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,131 @@
+# tests/test_embedding_store.py
+"""
+测试内容寻址的持久化向量库（不依赖模型，使用临时目录与随机向量）
+- 写入后按模型标识与文本命中，重复键不重复追加
+- 重新打开后从磁盘恢复，排序索引与新追加条目一致
+- 中断的追加（向量或键文件留下不完整尾部）在加载时忽略，下次追加时截掉
+- 多个实例（进程）共用目录时互相可见，已由其他实例写入的键不重复追加
+"""
+
+import sys
+sys.path.append('.')
+
+import tempfile
+
+import numpy as np
+from models.embedding_store import EmbeddingStore, KEY_DTYPE
+
+DIM = 8
+MODEL_ID = "bge-m3"
+
+
+def make_vectors(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+
+def test_put_and_get():
+    """写入、命中与重新打开"""
+    print("\n1. 测试写入与命中...")
+    path = tempfile.mkdtemp()
+    store = EmbeddingStore(path, dimension=DIM)
+    texts = [f"chunk文本{i}" for i in range(10)]
+    vectors = make_vectors(10)
+    store.put_many(MODEL_ID, texts, vectors)
+    store.put_many(MODEL_ID, texts[:3], make_vectors(3, seed=1))
+    assert store.get_stats()['entries'] == 10, "已存在的键不应重复追加"
+
+    found, got = store.get_many(MODEL_ID, texts + ["未写入的文本"])
+    assert found.tolist() == [True] * 10 + [False]
+    assert np.array_equal(got[:10], vectors) and not got[10].any()
+    assert not store.get_many("other-model", texts[:1])[0][0], "不同模型的键不应命中"
+
+    reopened = EmbeddingStore(path, dimension=DIM)
+    found, got = reopened.get_many(MODEL_ID, texts)
+    assert found.all() and np.array_equal(got, vectors)
+    print("   ✅ 命中正确，重新打开后数据完整")
+
+
+def test_torn_tail_recovery():
+    """中断的追加只留下不完整的尾部，加载时忽略，下次追加时截掉"""
+    print("\n2. 测试中断追加的恢复...")
+    path = tempfile.mkdtemp()
+    store = EmbeddingStore(path, dimension=DIM)
+    texts = [f"chunk文本{i}" for i in range(5)]
+    vectors = make_vectors(5)
+    store.put_many(MODEL_ID, texts, vectors)
+
+    # 向量已写入一行半、键只写入半条：模拟追加过程中进程被终止
+    with open(store.vectors_file, 'ab') as f:
+        f.write(make_vectors(2, seed=2).tobytes()[:DIM * 4 + 10])
+    with open(store.keys_file, 'ab') as f:
+        f.write(b'\x01' * (KEY_DTYPE.itemsize // 2))
+
+    recovered = EmbeddingStore(path, dimension=DIM)
+    assert recovered.get_stats()['entries'] == 5, recovered.get_stats()
+    found, got = recovered.get_many(MODEL_ID, texts)
+    assert found.all() and np.array_equal(got, vectors)
+
+    more_texts = [f"新chunk{i}" for i in range(3)]
+    more_vectors = make_vectors(3, seed=3)
+    recovered.put_many(MODEL_ID, more_texts, more_vectors)
+    assert recovered.vectors_file.stat().st_size == 8 * DIM * 4, "不完整的向量尾部应被截掉"
+    assert recovered.keys_file.stat().st_size == 8 * KEY_DTYPE.itemsize, "不完整的键尾部应被截掉"
+
+    reopened = EmbeddingStore(path, dimension=DIM)
+    found, got = reopened.get_many(MODEL_ID, texts + more_texts)
+    assert found.all() and np.array_equal(got, np.vstack([vectors, more_vectors]))
+    print("   ✅ 不完整尾部被忽略并在追加时截掉")
+
+
+def test_pending_merge():
+    """本进程新追加的条目合并进排序索引后仍可命中"""
+    print("\n3. 测试排序索引合并...")
+    store = EmbeddingStore(tempfile.mkdtemp(), dimension=DIM)
+    texts = [f"chunk文本{i}" for i in range(20)]
+    vectors = make_vectors(20)
+    store.put_many(MODEL_ID, texts[:10], vectors[:10])
+    store._merge_pending()
+    store.put_many(MODEL_ID, texts[10:], vectors[10:])
+    store._merge_pending()
+    found, got = store.get_many(MODEL_ID, texts)
+    assert found.all() and np.array_equal(got, vectors)
+    assert store.get_stats()['hit_rate'] == 1.0
+    print("   ✅ 合并后全部命中")
+
+
+def test_shared_directory():
+    """其他实例追加的行在未命中时同步，追加前计入索引"""
+    print("\n4. 测试多实例共用目录...")
+    path = tempfile.mkdtemp()
+    first = EmbeddingStore(path, dimension=DIM)
+    second = EmbeddingStore(path, dimension=DIM)
+    texts = [f"chunk文本{i}" for i in range(6)]
+    vectors = make_vectors(6)
+
+    first.put_many(MODEL_ID, texts[:4], vectors[:4])
+    found, got = second.get_many(MODEL_ID, texts[:4])
+    assert found.all() and np.array_equal(got, vectors[:4]), "其他实例写入的向量应可见"
+
+    first.put_many(MODEL_ID, texts[4:], vectors[4:])
+    second.put_many(MODEL_ID, texts, make_vectors(6, seed=5))
+    assert second.get_stats()['entries'] == 6, "已由其他实例写入的键不应重复追加"
+    found, got = second.get_many(MODEL_ID, texts)
+    assert found.all() and np.array_equal(got, vectors)
+    found, got = first.get_many(MODEL_ID, texts)
+    assert found.all() and np.array_equal(got, vectors)
+    print("   ✅ 实例间互相可见，无重复追加")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("持久化向量库测试")
+    print("=" * 50)
+    try:
+        test_put_and_get()
+        test_torn_tail_recovery()
+        test_pending_merge()
+        test_shared_directory()
+        print("\n✅ 持久化向量库测试通过")
+    except AssertionError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,171 @@
+# tests/test_hot_tier_index.py
+"""
+测试近期公告热层索引（不依赖Milvus和模型，使用临时目录与随机向量）
+- 日期路由：local / remote / merge
+- 压缩频率：只有压缩后新增的日志条目计入HOT_TIER_COMPACT_EVERY
+- 读取端落后于写入端的压缩时仍可检索（保留上一代文件 / 重新加载重试）
+- 从Milvus回填期间读取端继续使用已发布的数据
+"""
+
+import sys
+sys.path.append('.')
+
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+from config.settings import settings
+from rag.hot_tier_index import HotTierIndex, ROUTE_LOCAL, ROUTE_REMOTE, ROUTE_MERGE
+
+DIM = 8
+TODAY = datetime.now().strftime('%Y%m%d')
+OLD = (datetime.now() - timedelta(days=400)).strftime('%Y%m%d')
+
+
+def make_docs(start, count, ann_date=TODAY, seed=0):
+    rng = np.random.default_rng(seed + start)
+    vectors = rng.standard_normal((count, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [{'doc_id': f"ann{start + i}_0", 'embedding': vectors[i], 'text': f"正文{start + i}",
+             'ts_code': '600519.SH' if (start + i) % 2 else '000001.SZ', 'ann_date': ann_date,
+             'title': f"公告{start + i}", 'chunk_id': 0} for i in range(count)]
+
+
+def test_routing():
+    """日期过滤条件的路由"""
+    print("\n1. 测试日期路由...")
+    index = HotTierIndex(tempfile.mkdtemp(), dimension=DIM)
+    assert index.route({'ann_date': TODAY}) == ROUTE_REMOTE, "未回填时不参与路由"
+
+    index.add_documents(make_docs(0, 4))
+    index.compact(covered_since=(datetime.now() - timedelta(days=30)).strftime('%Y%m%d'))
+    boundary = index.boundary
+    assert index.route(None) == ROUTE_MERGE
+    assert index.route({'ann_date': TODAY}) == ROUTE_LOCAL
+    assert index.route({'ann_date': OLD}) == ROUTE_REMOTE
+    assert index.route({'ann_date': {'start': boundary}}) == ROUTE_LOCAL
+    assert index.route({'ann_date': {'end': OLD}}) == ROUTE_REMOTE
+    assert index.route({'ann_date': {'start': OLD, 'end': TODAY}}) == ROUTE_MERGE
+    print("   ✅ 路由正确")
+
+
+def test_compaction_frequency():
+    """压缩后不再每次写入都压缩"""
+    print("\n2. 测试压缩频率...")
+    original = settings.HOT_TIER_COMPACT_EVERY
+    settings.HOT_TIER_COMPACT_EVERY = 50
+    try:
+        index = HotTierIndex(tempfile.mkdtemp(), dimension=DIM)
+        for start in range(0, 60, 10):
+            index.add_documents(make_docs(start, 10))
+        assert index.get_stats()['generation'] == 1, index.get_stats()
+
+        for start in range(60, 65):
+            index.add_documents(make_docs(start, 1))
+        assert index.get_stats()['generation'] == 1, f"单行写入触发了压缩: {index.get_stats()}"
+
+        # 写入进程重启后同样只计算压缩之后的条目
+        restarted = HotTierIndex(index.index_path, dimension=DIM)
+        restarted.add_documents(make_docs(65, 1))
+        assert restarted.get_stats()['generation'] == 1
+        restarted.add_documents(make_docs(66, 40))
+        assert restarted.get_stats()['generation'] == 2
+        assert restarted.doc_count == 106
+    finally:
+        settings.HOT_TIER_COMPACT_EVERY = original
+    print("   ✅ 只有压缩后的新增条目计入阈值")
+
+
+def test_reader_across_compaction():
+    """读取端在写入端压缩后（尚未刷新时）检索"""
+    print("\n3. 测试读取端跨代检索...")
+    path = tempfile.mkdtemp()
+    writer = HotTierIndex(path, dimension=DIM)
+    docs = make_docs(0, 20)
+    writer.add_documents(docs)
+    reader = HotTierIndex(path, dimension=DIM)
+    query = docs[3]['embedding']
+
+    writer.delete_documents([docs[0]['doc_id']])
+    writer.compact()  # 保留上一代文件
+    results = reader.search(query, top_k=1)
+    assert results[0]['doc_id'] == docs[3]['doc_id'] and results[0]['text'] == "正文3", results
+    assert reader.get_stats()['generation'] == 0, "应在刷新间隔内继续使用旧的一代"
+
+    writer.compact()  # 删除读取端使用的一代
+    results = reader.search(query, top_k=1)
+    assert results[0]['doc_id'] == docs[3]['doc_id'] and results[0]['text'] == "正文3", results
+    assert reader.get_stats()['generation'] == 2 and reader.doc_count == 19
+    print("   ✅ 旧代被删除后重新加载并重试")
+
+
+def test_window_and_replacement():
+    """压缩丢弃滑出窗口的行，重复doc_id以新行替换"""
+    print("\n4. 测试窗口与替换...")
+    index = HotTierIndex(tempfile.mkdtemp(), dimension=DIM)
+    index.add_documents(make_docs(0, 3, ann_date=OLD), enforce_window=False)
+    index.add_documents(make_docs(10, 3))
+    replaced = make_docs(10, 1, seed=99)
+    replaced[0]['text'] = "新正文"
+    index.add_documents(replaced)
+    assert index.doc_count == 6
+    index.compact()
+    assert index.doc_count == 3
+    hit = index.search(replaced[0]['embedding'], top_k=1)[0]
+    assert hit['doc_id'] == "ann10_0" and hit['text'] == "新正文", hit
+    assert index.search(replaced[0]['embedding'], top_k=5, filters={'ts_code': '000001.SZ'})[0]['ts_code'] == '000001.SZ'
+    print("   ✅ 窗口外数据被丢弃，替换生效")
+
+
+def test_rebuild_keeps_published_data():
+    """回填写入未发布的一代，完成前读取端数据不变"""
+    print("\n5. 测试回填期间的读取...")
+    path = tempfile.mkdtemp()
+    writer = HotTierIndex(path, dimension=DIM)
+    writer.add_documents(make_docs(0, 5))
+    writer.compact()
+    reader = HotTierIndex(path, dimension=DIM)
+    fresh = make_docs(100, 7)
+
+    class Iterator:
+        def __init__(self):
+            self.batches = [fresh[:4], fresh[4:], []]
+
+        def next(self):
+            reader.refresh(force=True)
+            assert reader.doc_count == 5, "回填过程中读取端看到了未发布的数据"
+            return self.batches.pop(0)
+
+        def close(self):
+            pass
+
+    class Collection:
+        def query_iterator(self, **kwargs):
+            return Iterator()
+
+    class Connector:
+        collection = Collection()
+
+        def full_precision_vectors(self, rows):
+            return np.asarray([row['embedding'] for row in rows], dtype=np.float32)
+
+    assert writer.rebuild_from_milvus(Connector()) == 7
+    reader.refresh(force=True)
+    assert reader.doc_count == 7 and reader.boundary is not None
+    print("   ✅ 回填完成后一次切换")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("热层索引测试")
+    print("=" * 50)
+    try:
+        test_routing()
+        test_compaction_frequency()
+        test_reader_across_compaction()
+        test_window_and_replacement()
+        test_rebuild_keeps_published_data()
+        print("\n✅ 热层索引测试通过")
+    except AssertionError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
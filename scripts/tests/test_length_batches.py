@@ -0,0 +1,69 @@
+# tests/test_length_batches.py
+"""
+测试按长度分桶的组批（不加载模型）
+- 每个文本恰好出现在一个批次中
+- 批内按长度降序，填充后的token数不超过预算（超长的单条文本单独成批）
+- 批内条数不超过上限
+"""
+
+import sys
+sys.path.append('.')
+
+import numpy as np
+from models.embedding_model import plan_length_batches
+
+
+def check_plan(lengths, max_batch_tokens, max_batch_size):
+    batches = plan_length_batches(lengths, max_batch_tokens, max_batch_size)
+    indices = np.concatenate(batches) if batches else np.empty(0, dtype=np.int64)
+    assert sorted(indices.tolist()) == list(range(len(lengths))), "每个文本应恰好出现在一个批次中"
+    for batch in batches:
+        batch_lengths = lengths[batch]
+        assert list(batch_lengths) == sorted(batch_lengths, reverse=True), "批内应按长度降序"
+        assert len(batch) <= max_batch_size
+        assert len(batch) == 1 or len(batch) * batch_lengths[0] <= max_batch_tokens, \
+            f"批次填充后 {len(batch)} × {batch_lengths[0]} 超出预算 {max_batch_tokens}"
+    return batches
+
+
+def test_budget_and_size():
+    """随机长度下的预算与条数上限"""
+    print("\n1. 测试预算与条数上限...")
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        lengths = rng.integers(1, 600, size=rng.integers(1, 300))
+        check_plan(lengths, max_batch_tokens=4096, max_batch_size=32)
+    print("   ✅ 所有批次满足预算和条数上限")
+
+
+def test_grouping():
+    """长短文本分到不同批次，短文本批次更大"""
+    print("\n2. 测试长度分桶...")
+    lengths = np.array([10] * 40 + [500] * 4)
+    batches = check_plan(lengths, max_batch_tokens=1000, max_batch_size=64)
+    assert [len(batch) for batch in batches] == [2, 2, 40], [len(batch) for batch in batches]
+    assert all(lengths[i] == 500 for batch in batches[:2] for i in batch)
+    print("   ✅ 长文本在前、短文本合并为大批次")
+
+
+def test_edge_cases():
+    """空输入、超长文本和零长度文本"""
+    print("\n3. 测试边界情况...")
+    assert plan_length_batches(np.array([], dtype=np.int64), 1000, 8) == []
+    batches = check_plan(np.array([5000, 3, 0]), max_batch_tokens=1000, max_batch_size=8)
+    assert [len(batch) for batch in batches] == [1, 2], "超长文本应单独成批"
+    print("   ✅ 边界情况正确")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("长度分桶组批测试")
+    print("=" * 50)
+    try:
+        test_budget_and_size()
+        test_grouping()
+        test_edge_cases()
+        print("\n✅ 长度分桶组批测试通过")
+    except AssertionError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
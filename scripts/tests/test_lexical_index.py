@@ -0,0 +1,215 @@
+# tests/test_lexical_index.py
+"""
+测试词法检索索引（不依赖Milvus，使用临时目录）
+- BM25得分与逐文档计算的参考实现一致（压缩段 + 增量）
+- 过滤条件、替换与删除
+- 压缩后读取端仍可检索（保留上一代 / 重新加载重试）
+- 从Milvus重建时只在结束时写出一次压缩段
+"""
+
+import sys
+sys.path.append('.')
+
+import math
+import tempfile
+from collections import Counter
+
+from config.settings import settings
+from rag.lexical_index import LexicalIndex, tokenize
+
+WORDS = ["募集资金", "商誉减值", "回购股份", "分红方案", "董事会决议", "年度报告",
+         "风险提示", "股东减持", "重大资产重组", "研发投入", "营业收入", "净利润"]
+
+
+def make_docs(start, count):
+    docs = []
+    for i in range(start, start + count):
+        words = [WORDS[(i * 7 + j * 3) % len(WORDS)] for j in range(1 + i % 4)]
+        docs.append({'doc_id': f"ann{i}_0", 'text': "公司" + "，".join(words) + "。",
+                     'ts_code': '600519.SH' if i % 2 else '000001.SZ',
+                     'ann_date': f"2024{1 + i % 12:02d}15", 'title': f"关于{WORDS[i % len(WORDS)]}的公告",
+                     'chunk_id': 0})
+    return docs
+
+
+def reference_scores(docs, query, boost):
+    """逐文档计算BM25（与索引相同的公式）"""
+    analyzed = {doc['doc_id']: Counter(tokenize(doc['text']) + tokenize(doc['title']) * boost) for doc in docs}
+    n_docs = len(analyzed)
+    avgdl = sum(sum(tf.values()) for tf in analyzed.values()) / n_docs
+    k1, b = settings.BM25_K1, settings.BM25_B
+    scores = Counter()
+    for term in set(tokenize(query)):
+        df = sum(1 for tf in analyzed.values() if term in tf)
+        if not df:
+            continue
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        for doc_id, tf in analyzed.items():
+            if term in tf:
+                dl = sum(tf.values())
+                scores[doc_id] += idf * tf[term] * (k1 + 1) / (tf[term] + k1 * (1 - b + b * dl / avgdl))
+    return scores
+
+
+def assert_matches_reference(index, docs, query):
+    expected = reference_scores(docs, query, index.title_boost)
+    results = index.search(query, top_k=len(docs))
+    assert len(results) == len(expected), (len(results), len(expected))
+    for doc in results:
+        assert abs(doc['score'] - expected[doc['doc_id']]) < 1e-4, (doc['doc_id'], doc['score'], expected[doc['doc_id']])
+    assert [doc['score'] for doc in results] == sorted((doc['score'] for doc in results), reverse=True)
+
+
+def test_bm25_scores():
+    """压缩段与增量混合时的得分"""
+    print("\n1. 测试BM25得分...")
+    index = LexicalIndex(tempfile.mkdtemp())
+    docs = make_docs(0, 40)
+    index.add_documents(docs[:30])
+    index.compact()
+    index.add_documents(docs[30:])
+    stats = index.get_stats()
+    assert stats['generation'] == 1 and stats['delta_docs'] == 10, stats
+    for query in ["募集资金使用情况", "商誉减值 风险提示", "回购股份的公告"]:
+        assert_matches_reference(index, docs, query)
+    index.compact()
+    assert_matches_reference(index, docs, "净利润 研发投入")
+    hit = index.search("重大资产重组", top_k=1)[0]
+    assert "重大资产重组" in hit['text'] and hit['ann_date'].startswith('2024'), hit
+    print("   ✅ 得分与参考实现一致")
+
+
+def test_filters():
+    """过滤条件在压缩段和增量上语义一致"""
+    print("\n2. 测试过滤条件...")
+    index = LexicalIndex(tempfile.mkdtemp())
+    docs = make_docs(0, 24)
+    index.add_documents(docs[:12])
+    index.compact()
+    index.add_documents(docs[12:])
+    filters = {'ts_code': ['600519.SH'], 'ann_date': {'start': '2024-03-01', 'end': '20240930'},
+               'title_keywords': ['分红', '回购']}
+    expected = {doc['doc_id'] for doc in docs if index._matches(
+        {**doc, 'ann_date': doc['ann_date']}, filters) and tokenize(doc['text'] + doc['title'])}
+    results = index.search("公司 公告", top_k=50, filters=filters)
+    assert {doc['doc_id'] for doc in results} == expected and expected, (results, expected)
+    assert index.search("公司", top_k=5, filters={'ts_code': '999999.SH'}) == []
+    assert all(doc['ann_date'] == '20240515' for doc in index.search("公司", top_k=50, filters={'ann_date': '20240515'}))
+    print("   ✅ 过滤结果一致")
+
+
+def test_replace_and_delete():
+    """重复doc_id替换旧文档，删除在压缩前后都生效"""
+    print("\n3. 测试替换与删除...")
+    path = tempfile.mkdtemp()
+    index = LexicalIndex(path)
+    docs = make_docs(0, 10)
+    index.add_documents(docs)
+    index.compact()
+    replaced = dict(docs[0], text="公司商誉减值测试")
+    index.add_documents([replaced, dict(replaced, text="公司商誉减值测试结果")])
+    assert index.doc_count == 10
+    assert index.delete_announcement("ann1") == 1 and index.delete_documents(["ann2_0", "missing"]) == 1
+    current = [dict(replaced, text="公司商誉减值测试结果")] + docs[3:]
+    assert_matches_reference(index, current, "商誉减值 募集资金")
+
+    reader = LexicalIndex(path)
+    assert reader.doc_count == 8
+    assert_matches_reference(reader, current, "商誉减值 募集资金")
+    index.compact()
+    assert index.get_stats()['deleted'] == 0 and index.doc_count == 8
+    assert_matches_reference(LexicalIndex(path), current, "商誉减值 测试结果")
+    print("   ✅ 替换与删除生效")
+
+
+def test_reader_across_compaction():
+    """读取端在写入端压缩后（尚未刷新时）检索"""
+    print("\n4. 测试读取端跨代检索...")
+    path = tempfile.mkdtemp()
+    writer = LexicalIndex(path)
+    docs = make_docs(0, 20)
+    writer.add_documents(docs)
+    writer.compact()
+    reader = LexicalIndex(path)
+
+    writer.compact()  # 保留读取端使用的一代
+    assert reader.search("募集资金", top_k=1)[0]['text']
+    assert reader.get_stats()['generation'] == 1, "应在刷新间隔内继续使用旧的一代"
+
+    writer.compact()  # 删除读取端使用的一代
+    assert_matches_reference(reader, docs, "募集资金")
+    assert reader.get_stats()['generation'] == 3
+    print("   ✅ 旧代被删除后重新加载并重试")
+
+
+def test_auto_compaction():
+    """增量达到阈值时自动压缩"""
+    print("\n5. 测试自动压缩...")
+    original = settings.LEXICAL_INDEX_COMPACT_EVERY
+    settings.LEXICAL_INDEX_COMPACT_EVERY = 15
+    try:
+        index = LexicalIndex(tempfile.mkdtemp())
+        docs = make_docs(0, 25)
+        for start in range(0, 25, 5):
+            index.add_documents(docs[start:start + 5])
+        stats = index.get_stats()
+        assert stats['generation'] == 1 and stats['delta_docs'] == 10, stats
+        assert_matches_reference(index, docs, "年度报告 净利润")
+    finally:
+        settings.LEXICAL_INDEX_COMPACT_EVERY = original
+    print("   ✅ 压缩后只计算新增日志")
+
+
+def test_rebuild_compacts_once():
+    """重建直接写出一代压缩段，完成前读取端数据不变"""
+    print("\n6. 测试从Milvus重建...")
+    path = tempfile.mkdtemp()
+    writer = LexicalIndex(path)
+    writer.add_documents(make_docs(0, 5))
+    writer.compact()
+    reader = LexicalIndex(path)
+    fresh = make_docs(100, 30)
+
+    class Iterator:
+        def __init__(self):
+            self.batches = [fresh[:10], fresh[10:20], fresh[20:], []]
+
+        def next(self):
+            reader.refresh(force=True)
+            assert reader.doc_count == 5, "重建过程中读取端看到了未发布的数据"
+            return self.batches.pop(0)
+
+        def close(self):
+            pass
+
+    class Collection:
+        def query_iterator(self, **kwargs):
+            return Iterator()
+
+    class Connector:
+        collection = Collection()
+
+    assert writer.rebuild_from_milvus(Connector()) == 30
+    stats = writer.get_stats()
+    assert stats['generation'] == 2 and stats['delta_docs'] == 0 and stats['journal_entries'] == 0, stats
+    reader.refresh(force=True)
+    assert reader.doc_count == 30
+    assert_matches_reference(reader, fresh, "商誉减值 分红方案")
+    print("   ✅ 重建完成后一次切换")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("词法检索索引测试")
+    print("=" * 50)
+    try:
+        test_bm25_scores()
+        test_filters()
+        test_replace_and_delete()
+        test_reader_across_compaction()
+        test_auto_compaction()
+        test_rebuild_compacts_once()
+        print("\n✅ 词法检索索引测试通过")
+    except AssertionError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
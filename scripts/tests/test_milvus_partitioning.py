@@ -0,0 +1,86 @@
+# tests/test_milvus_partitioning.py
+"""
+测试Milvus分区路由（不依赖Milvus）
+- 分区命名与股票代码哈希桶
+- 从过滤表达式推导最小分区集合（股票代码、年份范围、and/or组合）
+"""
+
+import sys
+sys.path.append('.')
+
+from database.milvus_partitioning import PartitionRouter
+
+ROUTER = PartitionRouter(ts_buckets=4)
+CODES = ['600519.SH', '000001.SZ', '300750.SZ', '601318.SH']
+EXISTING = ['_default'] + sorted({ROUTER.partition_name(code, f"{year}0101") for year in (2022, 2023, 2024) for code in CODES})
+
+
+def names(years, codes):
+    return sorted({ROUTER.partition_name(code, f"{year}0601") for year in years for code in codes})
+
+
+def test_partition_name():
+    """分区命名"""
+    print("\n1. 测试分区命名...")
+    assert ROUTER.partition_name('600519.SH', '20240315') == ROUTER.partition_name('600519.SH', '2024-12-31')
+    assert ROUTER.partition_name('600519.SH', '20240315').startswith('y2024_b')
+    assert ROUTER.partition_name('600519.SH', None).startswith('y0000_b')
+    assert ROUTER.bucket('600519.SH') == PartitionRouter(ts_buckets=4).bucket('600519.SH'), "桶号应跨实例稳定"
+    assert all(0 <= ROUTER.bucket(code) < 4 for code in CODES)
+    print("   ✅ 分区名为 y{年份}_b{桶号}")
+
+
+def test_prune_by_code_and_year():
+    """股票代码与年份条件剪枝"""
+    print("\n2. 测试股票代码与年份剪枝...")
+    assert ROUTER.partitions_for_expr('ts_code == "600519.SH"', EXISTING) == names((2022, 2023, 2024), ['600519.SH'])
+    assert ROUTER.partitions_for_expr('ann_date >= "20230101" and ann_date <= "20231231"', EXISTING) == \
+        names((2023,), CODES)
+    assert ROUTER.partitions_for_expr('ann_date == "20240315"', EXISTING) == names((2024,), CODES)
+    assert ROUTER.partitions_for_expr('ann_date > "2023-06-01"', EXISTING) == names((2023, 2024), CODES)
+    assert ROUTER.partitions_for_expr(
+        'ts_code in ["600519.SH", "000001.SZ"] and ann_date >= "20240101"', EXISTING
+    ) == names((2024,), ['600519.SH', '000001.SZ'])
+    # 多个股票代码条件取交集
+    assert ROUTER.partitions_for_expr(
+        'ts_code in ["600519.SH", "000001.SZ"] and ts_code == "000001.SZ"', EXISTING
+    ) == names((2022, 2023, 2024), ['000001.SZ'])
+    print("   ✅ 只保留满足条件的分区")
+
+
+def test_unprunable_expressions():
+    """无法剪枝时检索全部分区"""
+    print("\n3. 测试无法剪枝的表达式...")
+    assert ROUTER.partitions_for_expr(None, EXISTING) is None
+    assert ROUTER.partitions_for_expr('', EXISTING) is None
+    assert ROUTER.partitions_for_expr('title like "%年度报告%"', EXISTING) is None
+    assert ROUTER.partitions_for_expr('ts_code == "600519.SH" or ann_date >= "20240101"', EXISTING) is None
+    assert ROUTER.partitions_for_expr('not ts_code == "600519.SH"', EXISTING) is None
+    print("   ✅ 顶层or/not及无关条件返回None")
+
+
+def test_nested_or_and_empty_result():
+    """括号内的or不影响顶层条件；无匹配分区时返回空列表"""
+    print("\n4. 测试括号与空结果...")
+    expr = 'ts_code == "600519.SH" and (title like "%分红%" or title like "%回购%")'
+    assert ROUTER.partitions_for_expr(expr, EXISTING) == names((2022, 2023, 2024), ['600519.SH'])
+    assert ROUTER.partitions_for_expr('ann_date >= "20300101"', EXISTING) == []
+    assert ROUTER.partitions_for_expr('ann_date >= "20240101"', ['_default']) == []
+    # 新建的分区出现在分区列表中后即可被选中
+    assert ROUTER.partitions_for_expr('ann_date >= "20300101"', EXISTING + ['y2030_b01']) == ['y2030_b01']
+    print("   ✅ 剪枝结果正确")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Milvus分区路由测试")
+    print("=" * 50)
+    try:
+        test_partition_name()
+        test_prune_by_code_and_year()
+        test_unprunable_expressions()
+        test_nested_or_and_empty_result()
+        print("\n✅ Milvus分区路由测试通过")
+    except AssertionError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
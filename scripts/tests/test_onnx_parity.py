@@ -0,0 +1,102 @@
+# tests/test_onnx_parity.py
+"""
+测试 ONNX Runtime 后端与 PyTorch 路径的向量一致性
+- 逐条余弦：fp32 >= 0.9999，int8 >= EMBEDDING_ONNX_COSINE_TOLERANCE
+- 检索一致性：以PyTorch向量为基准，ONNX向量在样本语料上的top-k重合率
+"""
+
+import sys
+sys.path.append('.')
+
+import os
+import numpy as np
+from config.settings import settings
+from models.embedding_model import EmbeddingModel
+from models.onnx_backend import OnnxEmbeddingBackend, ONNX_FP32_FILE, ONNX_INT8_FILE
+
+FP32_TOLERANCE = 0.9999
+TOP_K = 3
+
+QUERIES = [
+    "平安银行2024年第一季度净利润",
+    "贵州茅台分红方案",
+    "宁德时代研发投入",
+    "The stock market performed well today",
+]
+
+DOCUMENTS = [
+    "平安银行股份有限公司2024年第一季度报告：本报告期实现营业收入386.77亿元，归属于本行股东的净利润149.32亿元，同比增长2.3%。",
+    "贵州茅台酒股份有限公司2023年度利润分配方案：以实施权益分派股权登记日登记的总股本为基数，每股派发现金红利30.876元（含税）。",
+    "宁德时代新能源科技股份有限公司2023年年度报告：报告期内研发投入183.56亿元，同比增长18.35%，研发人员20,346名。",
+    "本公司及董事会全体成员保证信息披露的内容真实、准确、完整，没有虚假记载、误导性陈述或重大遗漏。",
+    "关于回购公司股份的进展公告：截至2024年3月31日，公司通过集中竞价交易方式累计回购股份1,234,567股。",
+    "股东减持股份计划公告：持股5%以上股东计划在本公告披露之日起15个交易日后的3个月内减持不超过1%。",
+    "重大资产重组进展公告：公司正在积极推进本次重组涉及的审计、评估等各项工作。",
+    "The board of directors announced the annual results for the year ended 31 December 2023.",
+    "公司",  # 极短文本
+    "年度报告摘要。" * 300,  # 长文本（触发截断路径之前的长序列）
+]
+
+
+def cosine_rows(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def top_k_overlap(reference_queries, reference_docs, queries, docs):
+    ref = np.argsort(-(reference_queries @ reference_docs.T), axis=1)[:, :TOP_K]
+    got = np.argsort(-(queries @ docs.T), axis=1)[:, :TOP_K]
+    return float(np.mean([len(set(r) & set(g)) / TOP_K for r, g in zip(ref, got)]))
+
+
+def check_variant(name, backend, tolerance, reference_docs, reference_queries):
+    print(f"\n{name}:")
+    docs = backend.encode(DOCUMENTS, normalize_embeddings=True)
+    queries = backend.encode(QUERIES, normalize_embeddings=True)
+
+    cosines = cosine_rows(reference_docs, docs)
+    print(f"   文档余弦: 最小 {cosines.min():.6f}, 平均 {cosines.mean():.6f}")
+    query_cosines = cosine_rows(reference_queries, queries)
+    print(f"   查询余弦: 最小 {query_cosines.min():.6f}, 平均 {query_cosines.mean():.6f}")
+    overlap = top_k_overlap(reference_queries, reference_docs, queries, docs)
+    print(f"   top-{TOP_K}重合率: {overlap:.2%}")
+
+    passed = min(cosines.min(), query_cosines.min()) >= tolerance
+    print(f"   {'✅' if passed else '❌'} 容差 {tolerance}")
+    return passed
+
+
+def test_onnx_parity():
+    """ONNX（fp32 / int8）与PyTorch向量的一致性"""
+    print("\n测试ONNX后端一致性...")
+    reference = EmbeddingModel(backend='torch', device='cpu')
+    reference_docs = np.asarray(reference.encode(DOCUMENTS, normalize_embeddings=True))
+    reference_queries = np.asarray(reference.encode(QUERIES, normalize_embeddings=True))
+
+    variants = [
+        ("ONNX fp32", False, ONNX_FP32_FILE, FP32_TOLERANCE),
+        ("ONNX int8", True, ONNX_INT8_FILE, settings.EMBEDDING_ONNX_COSINE_TOLERANCE),
+    ]
+    results = []
+    for name, quantized, file_name, tolerance in variants:
+        if not os.path.exists(os.path.join(settings.EMBEDDING_ONNX_PATH, file_name)):
+            print(f"\n{name}: 跳过（未找到 {file_name}）")
+            continue
+        backend = OnnxEmbeddingBackend(settings.EMBEDDING_ONNX_PATH, quantized=quantized)
+        results.append(check_variant(name, backend, tolerance, reference_docs, reference_queries))
+
+    assert results, "未找到导出的ONNX模型，请先运行 scripts/maintenance/export_onnx_embedding.py"
+    assert all(results), "ONNX向量超出余弦容差"
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("ONNX 后端一致性测试")
+    print("=" * 50)
+    try:
+        test_onnx_parity()
+        print("\n✅ 一致性测试通过")
+    except AssertionError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
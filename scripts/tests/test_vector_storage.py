@@ -0,0 +1,85 @@
+# tests/test_vector_storage.py
+"""
+测试低精度向量存储的本地全精度存储与精排（不依赖Milvus，使用临时目录与随机向量）
+- 按主键写入与读取，其他进程追加的行在未命中时同步
+- rescore_results按全精度内积重排，缺失向量的候选沿用近似得分（汉明距离换算为余弦估计）
+只追加文件的中断恢复与持久化chunk向量库共用（utils/append_only_store.py），见test_embedding_store.py
+"""
+
+import sys
+sys.path.append('.')
+
+import tempfile
+
+import numpy as np
+from database.vector_storage import FullPrecisionStore, rescore_results, STORAGE_BINARY
+
+DIM = 8
+
+
+def make_vectors(count, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class Hit:
+    """与pymilvus的Hit字段一致的检索结果"""
+
+    def __init__(self, id, distance):
+        self.id = id
+        self.distance = distance
+        self.entity = {'doc_id': f"doc{id}"}
+
+
+def test_put_and_get():
+    """按主键读取，其他实例追加的行在未命中时同步"""
+    print("\n1. 测试按主键读取...")
+    path = tempfile.mkdtemp()
+    writer = FullPrecisionStore(path, dimension=DIM)
+    reader = FullPrecisionStore(path, dimension=DIM)
+    ids = [905, 17, 4403]
+    vectors = make_vectors(3)
+    writer.put(ids, vectors)
+
+    found, got = reader.get_many([17, 12345, 4403, 905])
+    assert found.tolist() == [True, False, True, True], found
+    assert np.array_equal(got[[0, 2, 3]], vectors[[1, 2, 0]]) and not got[1].any()
+    print("   ✅ 读取正确，其他实例写入的行可见")
+
+
+def test_rescore_results():
+    """按全精度内积重排，缺失向量的候选按近似得分参与排序"""
+    print("\n2. 测试精排...")
+    store = FullPrecisionStore(tempfile.mkdtemp(), dimension=DIM)
+    vectors = make_vectors(4)
+    query = vectors[2]
+    store.put([10, 11, 12], vectors[:3])
+
+    # 汉明距离：越小越相似；id=13本地缺少全精度向量
+    hits = [Hit(10, 1), Hit(11, 2), Hit(12, 3), Hit(13, 0)]
+    rescored = rescore_results([hits, []], [query, query], store, STORAGE_BINARY, top_k=3)
+    assert rescored[1] == []
+    top = rescored[0]
+    assert len(top) == 3 and top[0].id in (12, 13), [hit.id for hit in top]
+
+    scores = {hit.id: hit.score for hit in top}
+    assert abs(scores.get(12, 1.0) - 1.0) < 1e-5, "有全精度向量的候选应使用精确内积"
+    assert abs(scores[13] - 1.0) < 1e-6, "汉明距离0应换算为余弦1"
+    exact = {i: float(vectors[i - 10] @ query) for i in (10, 11, 12)}
+    expected = sorted(exact, key=lambda i: -exact[i])[:2]
+    assert [hit.id for hit in top if hit.id != 13] == expected, ([hit.id for hit in top], exact)
+    assert top[0].get('doc_id') == f"doc{top[0].id}"
+    print("   ✅ 精排顺序正确，缺失向量沿用换算后的近似得分")
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("全精度向量存储与精排测试")
+    print("=" * 50)
+    try:
+        test_put_and_get()
+        test_rescore_results()
+        print("\n✅ 全精度向量存储与精排测试通过")
+    except AssertionError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
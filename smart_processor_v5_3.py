@@ -341,7 +341,7 @@ class SmartProcessorV5_3:
     def __init__(self):
         self.mysql = MySQLConnector()
         self.milvus = MilvusConnector()
-        self.processor = DocumentProcessor()
+        self.processor = DocumentProcessor(use_embedding_pool=True)
         self.content_filter = ContentFilter()
         self.performance_tracker = PerformanceTracker()
         self.auto_perf_logger = AutoPerformanceLogger()
@@ -0,0 +1,139 @@
+# utils/append_only_store.py
+"""
+只追加、内存映射的 键 -> float32向量 存储基类
+持久化chunk向量库（models/embedding_store.py）和全精度向量存储（database/vector_storage.py）共用
+
+存储为两个只追加文件，第i个键对应第i行向量：
+- 键文件：定长键（由子类的KEY_DTYPE决定）
+- vectors.f32：float32向量行，读取时内存映射
+追加时先写向量再写键，中断的追加只留下不完整的尾部，加载时忽略、下次追加时截掉；
+多个进程可共用同一目录：追加在文件锁内进行，其他进程追加的行在同步时计入索引
+"""
+
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable
+
+import numpy as np
+
+try:
+    import fcntl  # 多进程追加时的文件锁（Windows上退化为仅进程内加锁）
+except ImportError:
+    fcntl = None
+
+
+class AppendOnlyVectorStore:
+    """只追加的 键文件 + 向量文件 存储；子类实现 _index_keys 维护 键 -> 行号 索引"""
+
+    KEY_DTYPE = np.dtype('<i8')
+    KEYS_FILE_NAME = "keys.bin"
+
+    def __init__(self, path: Path, dimension: int):
+        """
+        Args:
+            path: 存储目录
+            dimension: 向量维度
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.row_bytes = self.dimension * 4
+        self.keys_file = self.path / self.KEYS_FILE_NAME
+        self.vectors_file = self.path / "vectors.f32"
+        self.lock_file = self.path / "store.lock"
+
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._vectors: Optional[np.memmap] = None
+        self.stats = {'lookups': 0, 'hits': 0, 'appended': 0}
+
+    def _index_keys(self, keys: np.ndarray, rows: np.ndarray):
+        """把新读取的键及其行号加入索引（持有self._lock时调用）"""
+        raise NotImplementedError
+
+    def _index_bytes(self) -> int:
+        """索引的内存占用"""
+        return 0
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程互斥的文件锁"""
+        with open(self.lock_file, 'a+b') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _consistent_rows(self) -> int:
+        """两个文件中完整对应的行数（中断的追加只留下不完整的尾部）"""
+        keys = self.keys_file.stat().st_size // self.KEY_DTYPE.itemsize if self.keys_file.exists() else 0
+        vectors = self.vectors_file.stat().st_size // self.row_bytes if self.vectors_file.exists() else 0
+        return min(keys, vectors)
+
+    def _sync(self):
+        """读取本进程或其他进程新追加的完整行并加入索引（持有self._lock时调用）"""
+        rows = self._consistent_rows()
+        if rows <= self._rows:
+            return
+        keys = np.fromfile(self.keys_file, dtype=self.KEY_DTYPE, count=rows - self._rows,
+                           offset=self._rows * self.KEY_DTYPE.itemsize)
+        self._index_keys(keys, np.arange(self._rows, rows, dtype=np.int64))
+        self._rows = rows
+
+    def _vector_view(self) -> np.ndarray:
+        """向量文件的只读内存映射（文件增长后重新映射）"""
+        if self._vectors is None or len(self._vectors) < self._rows:
+            self._vectors = np.memmap(self.vectors_file, dtype=np.float32, mode='r',
+                                      shape=(self._rows, self.dimension))
+        return self._vectors
+
+    def _append(self, keys: np.ndarray, vectors: np.ndarray,
+                select: Optional[Callable[[], np.ndarray]] = None) -> int:
+        """
+        追加键和向量（持有self._lock时调用）
+
+        Args:
+            keys: KEY_DTYPE键数组
+            vectors: 与keys逐行对应的float32矩阵
+            select: 同步其他进程追加的行之后调用，返回实际需要追加的行掩码（如跳过已存在的键）
+
+        Returns:
+            追加的行数
+        """
+        with self._file_lock():
+            # 截掉中断追加留下的尾部，其他进程追加的行先计入索引
+            start = self._consistent_rows()
+            for file, size in ((self.vectors_file, start * self.row_bytes),
+                               (self.keys_file, start * self.KEY_DTYPE.itemsize)):
+                with open(file, 'ab') as f:
+                    f.truncate(size)
+            self._sync()
+            if select is not None:
+                mask = select()
+                keys, vectors = keys[mask], vectors[mask]
+            if not len(keys):
+                return 0
+            # 先写向量再写键，键总是指向完整的向量行
+            with open(self.vectors_file, 'ab') as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            with open(self.keys_file, 'ab') as f:
+                f.write(np.ascontiguousarray(keys, dtype=self.KEY_DTYPE).tobytes())
+        self._sync()
+        self.stats['appended'] += len(keys)
+        return len(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """命中率与磁盘占用"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({
+                'entries': self._rows,
+                'hit_rate': stats['hits'] / stats['lookups'] if stats['lookups'] else 0.0,
+                'disk_bytes': self._rows * (self.row_bytes + self.KEY_DTYPE.itemsize),
+                'index_bytes': self._index_bytes()
+            })
+        return stats
@@ -11,16 +11,23 @@
 4. 不中断用户体验
 """
 
+import asyncio
 import re
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Any, Union
 from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
+
 from database.mysql_connector import MySQLConnector
+from database.daily_bar_cache import get_daily_bar_cache
 from utils.logger import setup_logger
 
+if TYPE_CHECKING:
+    from database.async_mysql_connector import AsyncMySQLConnector
+
 logger = setup_logger("date_intelligence")
 
 class TimeExpressionType(Enum):
@@ -67,8 +74,10 @@ class TradingDayCalculator:
         "年": 250
     }
     
-    def __init__(self, mysql_connector: MySQLConnector):
+    def __init__(self, mysql_connector: MySQLConnector,
+                 async_mysql_connector: Optional["AsyncMySQLConnector"] = None):
         self.mysql = mysql_connector
+        self._async_mysql = async_mysql_connector
         self._trading_days_cache = {}
         self._cache_timestamp = {}
         self._cache_ttl = 1800  # 缓存30分钟，应对交易日数据更新
@@ -109,6 +118,27 @@ class TradingDayCalculator:
             return self._trading_days_cache[cache_key]
         return None
     
+    @property
+    def async_mysql(self) -> "AsyncMySQLConnector":
+        """异步连接器（aget_*方法使用，与API共享进程内的异步连接池）"""
+        if self._async_mysql is None:
+            from database.async_mysql_connector import get_async_mysql_connector
+            self._async_mysql = get_async_mysql_connector()
+        return self._async_mysql
+    
+    async def _run_blocking(self, func, *args):
+        """缓存查找（日线缓存首次使用时需读取文件）在线程池中执行，不阻塞事件循环"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+    
+    def _get_bar_cache(self):
+        """获取可用的日线列式缓存，不可用或后台增量同步进行中时返回None（回退到SQL）"""
+        try:
+            cache = get_daily_bar_cache()
+            return cache if cache.ensure_synced(background=True) else None
+        except Exception as e:
+            logger.debug(f"日线缓存不可用: {e}")
+            return None
+    
     def get_cache_status(self) -> Dict[str, Any]:
         """获取缓存状态信息（用于监控和调试）"""
         current_time = time.time()
@@ -123,17 +153,8 @@ class TradingDayCalculator:
             'cache_ttl_minutes': self._cache_ttl / 60
         }
     
-    def get_latest_trading_day(self, before_date: Optional[str] = None) -> Optional[str]:
-        """
-        获取最近的交易日 - 数据驱动+智能缓存版本
-        
-        Args:
-            before_date: 在此日期之前的最近交易日，格式YYYY-MM-DD，默认为当前日期
-            
-        Returns:
-            最近交易日，格式YYYY-MM-DD
-        """
-        # 生成缓存键
+    def _cached_latest_trading_day(self, before_date: Optional[str] = None) -> Optional[str]:
+        """最近交易日的缓存查找（今日缓存、常规缓存、日线缓存），未命中返回None"""
         cache_key = f"latest_trading_day_{before_date or 'current'}"
         
         # 检查今日缓存（如果查询的是当前最新交易日）
@@ -152,60 +173,130 @@ class TradingDayCalculator:
             logger.debug(f"使用常规缓存: {cached_result}")
             return cached_result
         
-        try:
-            if before_date:
-                # 格式化日期
-                if len(before_date) == 8:  # YYYYMMDD格式
-                    formatted_date = f"{before_date[:4]}-{before_date[4:6]}-{before_date[6:8]}"
-                else:
-                    formatted_date = before_date
-                
-                # 历史日期查询（保持原逻辑）
-                query = """
-                SELECT trade_date 
-                FROM tu_daily_detail 
-                WHERE trade_date < :before_date
-                ORDER BY trade_date DESC 
-                LIMIT 1
-                """
-                result = self.mysql.execute_query(query, {'before_date': formatted_date})
-            else:
-                # 【核心改进】数据驱动的最新交易日判断
-                query = """
-                SELECT trade_date 
-                FROM tu_daily_detail 
-                WHERE trade_date <= CURDATE()
-                  AND trade_date >= DATE_SUB(CURDATE(), INTERVAL 10 DAY)
-                ORDER BY trade_date DESC 
-                LIMIT 1
-                """
-                result = self.mysql.execute_query(query)
-                
-                logger.info(f"数据驱动查询最新交易日，查询范围：最近10天内")
-            
-            if result and len(result) > 0:
-                latest_date = str(result[0]['trade_date'])
-                
-                # 设置常规缓存
+        # 优先使用本地日线缓存（当前最新交易日）
+        if not before_date:
+            bar_cache = self._get_bar_cache()
+            if bar_cache and bar_cache.latest_trade_date():
+                latest_date = bar_cache.format_date(bar_cache.trading_dates()[-1], dash=True)
                 self._set_cache(cache_key, latest_date)
-                
-                # 如果是当前查询，设置今日交易日缓存
-                if not before_date:
-                    today = datetime.now().strftime('%Y-%m-%d') 
-                    self._daily_cache_date = today
-                    self._trading_day_cache['current_latest'] = latest_date
-                    logger.info(f"更新今日交易日缓存: {latest_date}")
-                
-                logger.info(f"获取最近交易日成功: {latest_date}")
+                self._daily_cache_date = datetime.now().strftime('%Y-%m-%d')
+                self._trading_day_cache['current_latest'] = latest_date
+                logger.info(f"从日线缓存获取最近交易日: {latest_date}")
                 return latest_date
+        
+        return None
+    
+    def _latest_trading_day_statement(self, before_date: Optional[str] = None) -> Tuple[str, Optional[Dict]]:
+        """最近交易日查询语句"""
+        if before_date:
+            # 格式化日期
+            if len(before_date) == 8:  # YYYYMMDD格式
+                formatted_date = f"{before_date[:4]}-{before_date[4:6]}-{before_date[6:8]}"
+            else:
+                formatted_date = before_date
             
-            logger.warning("未找到最近交易日数据")
+            # 历史日期查询（保持原逻辑）
+            query = """
+            SELECT trade_date 
+            FROM tu_daily_detail 
+            WHERE trade_date < :before_date
+            ORDER BY trade_date DESC 
+            LIMIT 1
+            """
+            return query, {'before_date': formatted_date}
+        
+        # 【核心改进】数据驱动的最新交易日判断
+        query = """
+        SELECT trade_date 
+        FROM tu_daily_detail 
+        WHERE trade_date <= CURDATE()
+          AND trade_date >= DATE_SUB(CURDATE(), INTERVAL 10 DAY)
+        ORDER BY trade_date DESC 
+        LIMIT 1
+        """
+        logger.info(f"数据驱动查询最新交易日，查询范围：最近10天内")
+        return query, None
+    
+    def _store_latest_trading_day(self, result: List[Dict], before_date: Optional[str] = None) -> Optional[str]:
+        """解析最近交易日查询结果并写入缓存"""
+        if result and len(result) > 0:
+            latest_date = str(result[0]['trade_date'])
+            
+            # 设置常规缓存
+            self._set_cache(f"latest_trading_day_{before_date or 'current'}", latest_date)
+            
+            # 如果是当前查询，设置今日交易日缓存
+            if not before_date:
+                today = datetime.now().strftime('%Y-%m-%d') 
+                self._daily_cache_date = today
+                self._trading_day_cache['current_latest'] = latest_date
+                logger.info(f"更新今日交易日缓存: {latest_date}")
+            
+            logger.info(f"获取最近交易日成功: {latest_date}")
+            return latest_date
+        
+        logger.warning("未找到最近交易日数据")
+        return None
+    
+    def get_latest_trading_day(self, before_date: Optional[str] = None) -> Optional[str]:
+        """
+        获取最近的交易日 - 数据驱动+智能缓存版本
+        
+        Args:
+            before_date: 在此日期之前的最近交易日，格式YYYY-MM-DD，默认为当前日期
+            
+        Returns:
+            最近交易日，格式YYYY-MM-DD
+        """
+        cached_result = self._cached_latest_trading_day(before_date)
+        if cached_result:
+            return cached_result
+        
+        try:
+            query, params = self._latest_trading_day_statement(before_date)
+            result = self.mysql.execute_query(query, params)
+            return self._store_latest_trading_day(result, before_date)
+            
+        except Exception as e:
+            logger.error(f"获取最近交易日失败: {e}")
             return None
+    
+    async def aget_latest_trading_day(self, before_date: Optional[str] = None) -> Optional[str]:
+        """get_latest_trading_day的异步版本（使用异步连接池）"""
+        cached_result = await self._run_blocking(self._cached_latest_trading_day, before_date)
+        if cached_result:
+            return cached_result
+        
+        try:
+            query, params = self._latest_trading_day_statement(before_date)
+            result = await self.async_mysql.execute_query(query, params)
+            return self._store_latest_trading_day(result, before_date)
             
         except Exception as e:
             logger.error(f"获取最近交易日失败: {e}")
             return None
     
+    def _latest_report_period_statement(self, ts_code: Optional[str], report_type: str) -> Tuple[str, Dict]:
+        """最新报告期查询语句"""
+        if ts_code:
+            query = """
+            SELECT end_date 
+            FROM tu_income 
+            WHERE ts_code = :ts_code AND report_type = :report_type
+            ORDER BY end_date DESC 
+            LIMIT 1
+            """
+            return query, {'ts_code': ts_code, 'report_type': report_type}
+        
+        query = """
+        SELECT end_date 
+        FROM tu_income 
+        WHERE report_type = :report_type
+        ORDER BY end_date DESC 
+        LIMIT 1
+        """
+        return query, {'report_type': report_type}
+    
     def get_latest_report_period(self, ts_code: Optional[str] = None, 
                                report_type: str = '1') -> Optional[str]:
         """
@@ -224,24 +315,31 @@ class TradingDayCalculator:
             return cached_result
         
         try:
-            if ts_code:
-                query = """
-                SELECT end_date 
-                FROM tu_income 
-                WHERE ts_code = :ts_code AND report_type = :report_type
-                ORDER BY end_date DESC 
-                LIMIT 1
-                """
-                result = self.mysql.execute_query(query, {'ts_code': ts_code, 'report_type': report_type})
-            else:
-                query = """
-                SELECT end_date 
-                FROM tu_income 
-                WHERE report_type = :report_type
-                ORDER BY end_date DESC 
-                LIMIT 1
-                """
-                result = self.mysql.execute_query(query, {'report_type': report_type})
+            query, params = self._latest_report_period_statement(ts_code, report_type)
+            result = self.mysql.execute_query(query, params)
+            
+            if result and len(result) > 0:
+                latest_period = str(result[0]['end_date'])
+                self._set_cache(cache_key, latest_period)
+                return latest_period
+            
+            return None
+            
+        except Exception as e:
+            logger.error(f"获取最新报告期失败: {e}")
+            return None
+    
+    async def aget_latest_report_period(self, ts_code: Optional[str] = None, 
+                                        report_type: str = '1') -> Optional[str]:
+        """get_latest_report_period的异步版本（使用异步连接池）"""
+        cache_key = f"latest_report_{ts_code or 'all'}_{report_type}"
+        cached_result = self._get_cache(cache_key)
+        if cached_result:
+            return cached_result
+        
+        try:
+            query, params = self._latest_report_period_statement(ts_code, report_type)
+            result = await self.async_mysql.execute_query(query, params)
             
             if result and len(result) > 0:
                 latest_period = str(result[0]['end_date'])
@@ -320,6 +418,43 @@ class TradingDayCalculator:
             logger.error(f"获取最新公告日期失败: {e}")
             return None
     
+    def _cached_nth_trading_day_before(self, n: int, base_date: str) -> Optional[str]:
+        """前第N个交易日的缓存查找（常规缓存、日线缓存），未命中返回None"""
+        cache_key = self._get_cache_key("nth_before", n=n, base=base_date)
+        if self._is_cache_valid(cache_key):
+            return self._trading_days_cache[cache_key]
+        
+        # 优先使用本地日线缓存的交易日序列
+        bar_cache = self._get_bar_cache()
+        if bar_cache and bar_cache.covers(base_date):
+            dates = bar_cache.trading_dates()
+            pos = int(np.searchsorted(dates, bar_cache.to_int_date(base_date), side='right')) - 1 - n
+            if pos >= 0:
+                target_date = bar_cache.format_date(dates[pos], dash=True)
+                self._set_cache(cache_key, target_date)
+                return target_date
+        
+        return None
+    
+    def _trading_days_statement(self, end_date: str, limit: int) -> Tuple[str, Dict]:
+        """截至指定日期的最近N个交易日查询语句"""
+        query = """
+        SELECT trade_date 
+        FROM tu_daily_detail 
+        WHERE trade_date <= :end_date
+        ORDER BY trade_date DESC 
+        LIMIT :limit
+        """
+        return query, {'end_date': end_date, 'limit': limit}
+    
+    def _store_nth_trading_day_before(self, result: List[Dict], n: int, base_date: str) -> Optional[str]:
+        """解析前第N个交易日查询结果并写入缓存"""
+        if result and len(result) > n:
+            target_date = str(result[n]['trade_date'])
+            self._set_cache(self._get_cache_key("nth_before", n=n, base=base_date), target_date)
+            return target_date
+        return None
+    
     def get_nth_trading_day_before(self, n: int, base_date: str = None) -> Optional[str]:
         """获取前第N个交易日"""
         if base_date is None:
@@ -328,32 +463,69 @@ class TradingDayCalculator:
         if base_date is None:
             return None
         
-        cache_key = self._get_cache_key("nth_before", n=n, base=base_date)
-        if self._is_cache_valid(cache_key):
-            return self._trading_days_cache[cache_key]
+        cached_result = self._cached_nth_trading_day_before(n, base_date)
+        if cached_result:
+            return cached_result
         
         try:
-            query = """
-            SELECT trade_date 
-            FROM tu_daily_detail 
-            WHERE trade_date <= :base_date
-            ORDER BY trade_date DESC 
-            LIMIT :limit
-            """
-            
-            result = self.mysql.execute_query(query, {'base_date': base_date, 'limit': n + 1})
-            
-            if result and len(result) > n:
-                target_date = str(result[n]['trade_date'])
-                self._set_cache(cache_key, target_date)
-                return target_date
+            query, params = self._trading_days_statement(base_date, n + 1)
+            result = self.mysql.execute_query(query, params)
+            return self._store_nth_trading_day_before(result, n, base_date)
             
+        except Exception as e:
+            logger.error(f"获取前第{n}个交易日失败: {e}")
             return None
+    
+    async def aget_nth_trading_day_before(self, n: int, base_date: str = None) -> Optional[str]:
+        """get_nth_trading_day_before的异步版本（使用异步连接池）"""
+        if base_date is None:
+            base_date = await self.aget_latest_trading_day()
+        
+        if base_date is None:
+            return None
+        
+        cached_result = await self._run_blocking(self._cached_nth_trading_day_before, n, base_date)
+        if cached_result:
+            return cached_result
+        
+        try:
+            query, params = self._trading_days_statement(base_date, n + 1)
+            result = await self.async_mysql.execute_query(query, params)
+            return self._store_nth_trading_day_before(result, n, base_date)
             
         except Exception as e:
             logger.error(f"获取前第{n}个交易日失败: {e}")
             return None
     
+    def _cached_trading_days_range(self, days: int, end_date: str) -> Optional[Tuple[str, str]]:
+        """最近N个交易日范围的缓存查找（常规缓存、日线缓存），未命中返回None"""
+        cache_key = self._get_cache_key("range", days=days, end=end_date)
+        if self._is_cache_valid(cache_key):
+            return self._trading_days_cache[cache_key]
+        
+        # 优先使用本地日线缓存的交易日序列
+        bar_cache = self._get_bar_cache()
+        if bar_cache and bar_cache.covers(end_date):
+            dates = bar_cache.trading_dates()
+            end_pos = int(np.searchsorted(dates, bar_cache.to_int_date(end_date), side='right'))
+            start_pos = end_pos - days
+            if end_pos > 0 and start_pos >= 0:
+                range_result = (bar_cache.format_date(dates[start_pos], dash=True),
+                                bar_cache.format_date(dates[end_pos - 1], dash=True))
+                self._set_cache(cache_key, range_result)
+                return range_result
+        
+        return None
+    
+    def _store_trading_days_range(self, result: List[Dict], days: int, end_date: str) -> Optional[Tuple[str, str]]:
+        """解析交易日范围查询结果并写入缓存"""
+        if result and len(result) > 0:
+            range_result = (str(result[-1]['trade_date']),  # 最早的日期
+                            str(result[0]['trade_date']))   # 最新的日期
+            self._set_cache(self._get_cache_key("range", days=days, end=end_date), range_result)
+            return range_result
+        return None
+    
     def get_trading_days_range(self, days: int, end_date: str = None) -> Optional[Tuple[str, str]]:
         """获取最近N个交易日的范围"""
         if end_date is None:
@@ -362,34 +534,71 @@ class TradingDayCalculator:
         if end_date is None:
             return None
         
-        cache_key = self._get_cache_key("range", days=days, end=end_date)
-        if self._is_cache_valid(cache_key):
-            return self._trading_days_cache[cache_key]
+        cached_result = self._cached_trading_days_range(days, end_date)
+        if cached_result:
+            return cached_result
         
         try:
-            query = """
-            SELECT trade_date 
-            FROM tu_daily_detail 
-            WHERE trade_date <= :end_date
-            ORDER BY trade_date DESC 
-            LIMIT :limit
-            """
-            
-            result = self.mysql.execute_query(query, {'end_date': end_date, 'limit': days})
-            
-            if result and len(result) > 0:
-                start_date = str(result[-1]['trade_date'])  # 最早的日期
-                end_date = str(result[0]['trade_date'])     # 最新的日期
-                range_result = (start_date, end_date)
-                self._set_cache(cache_key, range_result)
-                return range_result
+            query, params = self._trading_days_statement(end_date, days)
+            result = self.mysql.execute_query(query, params)
+            return self._store_trading_days_range(result, days, end_date)
             
+        except Exception as e:
+            logger.error(f"获取{days}个交易日范围失败: {e}")
+            return None
+    
+    async def aget_trading_days_range(self, days: int, end_date: str = None) -> Optional[Tuple[str, str]]:
+        """get_trading_days_range的异步版本（使用异步连接池）"""
+        if end_date is None:
+            end_date = await self.aget_latest_trading_day()
+        
+        if end_date is None:
             return None
+        
+        cached_result = await self._run_blocking(self._cached_trading_days_range, days, end_date)
+        if cached_result:
+            return cached_result
+        
+        try:
+            query, params = self._trading_days_statement(end_date, days)
+            result = await self.async_mysql.execute_query(query, params)
+            return self._store_trading_days_range(result, days, end_date)
             
         except Exception as e:
             logger.error(f"获取{days}个交易日范围失败: {e}")
             return None
     
+    def _year_relative_statement(self, years_offset: int, base_date: str) -> Tuple[str, str, Dict]:
+        """年份相对日期：目标日期及其之前最近交易日的查询语句（一次往返完成）"""
+        # 解析基准日期
+        base_dt = datetime.strptime(base_date, '%Y-%m-%d')
+        # 计算目标年份
+        target_year = base_dt.year + years_offset
+        target_dt = base_dt.replace(year=target_year)
+        target_date = target_dt.strftime('%Y-%m-%d')
+        
+        query = """
+        SELECT trade_date 
+        FROM tu_daily_detail 
+        WHERE trade_date <= :target_date
+        ORDER BY trade_date DESC 
+        LIMIT 1
+        """
+        return target_date, query, {'target_date': target_date}
+    
+    def _resolve_year_relative(self, result: List[Dict], target_date: str) -> Optional[str]:
+        """目标日期是交易日时返回目标日期，否则返回其之前最近的交易日"""
+        if not result:
+            return None
+        
+        adjusted_date = str(result[0]['trade_date'])
+        if adjusted_date.replace('-', '')[:8] == target_date.replace('-', ''):
+            # 目标日期是交易日
+            return target_date
+        
+        logger.info(f"年份相对日期{target_date}非交易日，调整为{adjusted_date}")
+        return adjusted_date
+    
     def get_year_relative_date(self, years_offset: int, base_date: str = None) -> Optional[str]:
         """获取年份相对日期"""
         if base_date is None:
@@ -399,44 +608,26 @@ class TradingDayCalculator:
             return None
         
         try:
-            # 解析基准日期
-            base_dt = datetime.strptime(base_date, '%Y-%m-%d')
-            # 计算目标年份
-            target_year = base_dt.year + years_offset
-            target_dt = base_dt.replace(year=target_year)
-            target_date = target_dt.strftime('%Y-%m-%d')
-            
-            # 检查目标日期是否为交易日
-            query = """
-            SELECT trade_date 
-            FROM tu_daily_detail 
-            WHERE trade_date = :target_date
-            LIMIT 1
-            """
+            target_date, query, params = self._year_relative_statement(years_offset, base_date)
+            result = self.mysql.execute_query(query, params)
+            return self._resolve_year_relative(result, target_date)
             
-            result = self.mysql.execute_query(query, {'target_date': target_date})
-            
-            if result and len(result) > 0:
-                # 目标日期是交易日
-                return target_date
-            else:
-                # 目标日期不是交易日，向前查找最近的交易日
-                query_before = """
-                SELECT trade_date 
-                FROM tu_daily_detail 
-                WHERE trade_date < :target_date
-                ORDER BY trade_date DESC 
-                LIMIT 1
-                """
-                
-                result_before = self.mysql.execute_query(query_before, {'target_date': target_date})
-                
-                if result_before and len(result_before) > 0:
-                    adjusted_date = str(result_before[0]['trade_date'])
-                    logger.info(f"年份相对日期{target_date}非交易日，调整为{adjusted_date}")
-                    return adjusted_date
-                
-                return None
+        except Exception as e:
+            logger.error(f"获取年份相对日期失败: {e}")
+            return None
+    
+    async def aget_year_relative_date(self, years_offset: int, base_date: str = None) -> Optional[str]:
+        """get_year_relative_date的异步版本（使用异步连接池）"""
+        if base_date is None:
+            base_date = await self.aget_latest_trading_day()
+        
+        if base_date is None:
+            return None
+        
+        try:
+            target_date, query, params = self._year_relative_statement(years_offset, base_date)
+            result = await self.async_mysql.execute_query(query, params)
+            return self._resolve_year_relative(result, target_date)
             
         except Exception as e:
             logger.error(f"获取年份相对日期失败: {e}")
@@ -748,6 +939,31 @@ class DateIntelligenceModule:
             expr.confidence = 0.0
             return expr
     
+    async def acalculate_expression_result(self, expr: TimeExpression) -> TimeExpression:
+        """calculate_expression_result的异步版本（交易日查询走异步连接池）"""
+        try:
+            if expr.type == TimeExpressionType.CURRENT_POINT:
+                expr.result_date = await self.calculator.aget_latest_trading_day()
+                
+            elif expr.type == TimeExpressionType.RELATIVE_POINT:
+                if expr.value and expr.unit == 'days':
+                    expr.result_date = await self.calculator.aget_nth_trading_day_before(expr.value)
+                    
+            elif expr.type == TimeExpressionType.TIME_RANGE:
+                if expr.value and expr.unit == 'days':
+                    expr.result_range = await self.calculator.aget_trading_days_range(expr.value)
+                    
+            elif expr.type == TimeExpressionType.YEAR_RELATIVE:
+                if expr.value and expr.unit == 'years':
+                    expr.result_date = await self.calculator.aget_year_relative_date(expr.value)
+            
+            return expr
+            
+        except Exception as e:
+            logger.error(f"计算时间表达结果失败: {e}")
+            expr.confidence = 0.0
+            return expr
+    
     def generate_replacement_text(self, expr: TimeExpression) -> str:
         """生成替换文本"""
         if expr.type in [TimeExpressionType.CURRENT_POINT, 
@@ -776,66 +992,64 @@ class DateIntelligenceModule:
         
         return text
     
+    def _build_parse_result(self, question: str, expressions: List[TimeExpression]) -> ParseResult:
+        """替换文本中已计算结果的时间表达并记录日志"""
+        modified_question = self.replace_expressions_in_text(question, expressions)
+        
+        for expr in expressions:
+            if expr.confidence > 0.5:
+                if expr.result_date:
+                    logger.info(f"日期智能解析: '{question}' -> '{modified_question}'")
+                    logger.info(f"解析详情: 将'{expr.original_text}'解析为{expr.type.value}: {expr.result_date}")
+                elif expr.result_range:
+                    logger.info(f"日期智能解析: '{question}' -> '{modified_question}'")
+                    logger.info(f"解析详情: 将'{expr.original_text}'解析为{expr.type.value}: {expr.result_range[0]}至{expr.result_range[1]}")
+        
+        return ParseResult(
+            success=True,
+            original_question=question,
+            modified_question=modified_question,
+            expressions=expressions
+        )
+    
+    def _failed_parse_result(self, question: str, error: Exception) -> ParseResult:
+        logger.error(f"智能日期解析失败: {error}")
+        return ParseResult(
+            success=False,
+            original_question=question,
+            modified_question=question,
+            expressions=[],
+            error=str(error)
+        )
+    
     def intelligent_date_parsing(self, question: str) -> ParseResult:
         """智能日期解析主函数"""
         try:
             # 1. 解析时间表达
             expressions = self.parser.parse_time_expressions(question)
             
-            if not expressions:
-                return ParseResult(
-                    success=True,
-                    original_question=question,
-                    modified_question=question,
-                    expressions=[]
-                )
-            
             # 2. 计算每个表达的结果
             for i, expr in enumerate(expressions):
                 expressions[i] = self.calculate_expression_result(expr)
             
             # 3. 替换文本中的表达
-            modified_question = self.replace_expressions_in_text(question, expressions)
-            
-            # 4. 记录日志
-            for expr in expressions:
-                if expr.confidence > 0.5:
-                    if expr.result_date:
-                        logger.info(f"日期智能解析: '{question}' -> '{modified_question}'")
-                        logger.info(f"解析详情: 将'{expr.original_text}'解析为{expr.type.value}: {expr.result_date}")
-                    elif expr.result_range:
-                        logger.info(f"日期智能解析: '{question}' -> '{modified_question}'")
-                        logger.info(f"解析详情: 将'{expr.original_text}'解析为{expr.type.value}: {expr.result_range[0]}至{expr.result_range[1]}")
-            
-            return ParseResult(
-                success=True,
-                original_question=question,
-                modified_question=modified_question,
-                expressions=expressions
-            )
+            return self._build_parse_result(question, expressions)
             
         except Exception as e:
-            logger.error(f"智能日期解析失败: {e}")
-            return ParseResult(
-                success=False,
-                original_question=question,
-                modified_question=question,
-                expressions=[],
-                error=str(e)
-            )
+            return self._failed_parse_result(question, e)
     
-    def preprocess_question(self, question: str) -> Tuple[str, Dict[str, Any]]:
-        """
-        预处理问题，将时间表达转换为具体日期
-        
-        Args:
-            question: 原始问题
+    async def aintelligent_date_parsing(self, question: str) -> ParseResult:
+        """intelligent_date_parsing的异步版本"""
+        try:
+            expressions = self.parser.parse_time_expressions(question)
+            for i, expr in enumerate(expressions):
+                expressions[i] = await self.acalculate_expression_result(expr)
+            return self._build_parse_result(question, expressions)
             
-        Returns:
-            (处理后的问题, 解析结果)
-        """
-        parsing_result = self.intelligent_date_parsing(question)
-        
+        except Exception as e:
+            return self._failed_parse_result(question, e)
+    
+    def _preprocess_output(self, question: str, parsing_result: ParseResult) -> Tuple[str, Dict[str, Any]]:
         if parsing_result.success and parsing_result.modified_question != question:
             processed_question = parsing_result.modified_question
         else:
@@ -852,6 +1066,26 @@ class DateIntelligenceModule:
         }
         
         return processed_question, result_dict
+    
+    def preprocess_question(self, question: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        预处理问题，将时间表达转换为具体日期
+        
+        Args:
+            question: 原始问题
+            
+        Returns:
+            (处理后的问题, 解析结果)
+        """
+        return self._preprocess_output(question, self.intelligent_date_parsing(question))
+    
+    async def apreprocess_question(self, question: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        preprocess_question的异步版本（API请求路径使用）
+        
+        解析结果写入交易日缓存，随后Agent内部的同步解析直接命中缓存
+        """
+        return self._preprocess_output(question, await self.aintelligent_date_parsing(question))
 
 # 全局实例
 date_intelligence = DateIntelligenceModule()
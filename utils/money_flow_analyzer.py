@@ -8,15 +8,20 @@
 3. 四级资金分布分析 (超大单、大单、中单、小单)
 """
 
+import asyncio
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 import logging
 from dataclasses import dataclass
 from database.mysql_connector import MySQLConnector
+from database.daily_bar_cache import get_daily_bar_cache
 from utils.logger import setup_logger
 
+if TYPE_CHECKING:
+    from database.async_mysql_connector import AsyncMySQLConnector
+
 
 @dataclass
 class MoneyFlowData:
@@ -69,9 +74,11 @@ class MoneyFlowAnalysisResult:
 class MoneyFlowAnalyzer:
     """资金流向分析器"""
     
-    def __init__(self, mysql_connector: MySQLConnector = None):
+    def __init__(self, mysql_connector: MySQLConnector = None,
+                 async_mysql_connector: "AsyncMySQLConnector" = None):
         """初始化分析器"""
         self.mysql_conn = mysql_connector or MySQLConnector()
+        self._async_mysql_conn = async_mysql_connector
         self.logger = setup_logger("money_flow_analyzer")
         
         # 资金级别定义（万元）
@@ -82,47 +89,99 @@ class MoneyFlowAnalyzer:
             'super_large': {'min': 100, 'max': float('inf'), 'name': '超大单'}
         }
     
+    @property
+    def async_mysql_conn(self) -> "AsyncMySQLConnector":
+        """异步连接器（afetch_*方法使用，与API共享进程内的异步连接池）"""
+        if self._async_mysql_conn is None:
+            from database.async_mysql_connector import get_async_mysql_connector
+            self._async_mysql_conn = get_async_mysql_connector()
+        return self._async_mysql_conn
+    
+    def _cache_ready(self) -> bool:
+        """日线缓存是否可用；增量同步到期时在后台进行，同步期间返回False，由调用方回退到SQL"""
+        try:
+            return get_daily_bar_cache().ensure_synced(background=True)
+        except Exception as e:
+            self.logger.debug(f"日线缓存不可用: {e}")
+            return False
+    
+    def _date_range(self, days: int) -> Tuple[str, str]:
+        """计算分析的日期范围（YYYYMMDD）"""
+        end_date = datetime.now().strftime('%Y%m%d')
+        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
+        return start_date, end_date
+    
+    def _money_flow_statement(self, ts_code: str, days: int) -> Tuple[str, Dict[str, Any]]:
+        """资金流向查询语句"""
+        start_date, end_date = self._date_range(days)
+        query = """
+        SELECT 
+            trade_date, ts_code, name, pct_change, close,
+            buy_sm_amount, buy_md_amount, buy_lg_amount, buy_elg_amount,
+            net_amount,
+            buy_sm_amount_rate, buy_md_amount_rate, buy_lg_amount_rate, buy_elg_amount_rate
+        FROM tu_moneyflow_dc
+        WHERE ts_code = :ts_code
+        AND trade_date BETWEEN :start_date AND :end_date
+        ORDER BY trade_date DESC
+        """
+        return query, {'ts_code': ts_code, 'start_date': start_date, 'end_date': end_date}
+    
+    def _price_statement(self, ts_code: str, days: int) -> Tuple[str, Dict[str, Any]]:
+        """日线行情查询语句（缓存不可用时使用）"""
+        start_date, end_date = self._date_range(days)
+        query = """
+        SELECT trade_date, ts_code, close, pct_chg
+        FROM tu_daily_detail
+        WHERE ts_code = :ts_code
+        AND trade_date BETWEEN :start_date AND :end_date
+        """
+        return query, {'ts_code': ts_code, 'start_date': start_date, 'end_date': end_date}
+    
+    def _parse_money_flow_rows(self, results: List[Dict[str, Any]]) -> List[MoneyFlowData]:
+        """将查询结果转换为MoneyFlowData列表"""
+        money_flow_data = []
+        for row in results:
+            data = MoneyFlowData(
+                trade_date=str(row.get('trade_date', '')),
+                ts_code=row.get('ts_code', ''),
+                name=row.get('name', ''),
+                pct_change=float(row.get('pct_change', 0) or 0),
+                close=float(row.get('close', 0) or 0),
+                buy_sm_amount=float(row.get('buy_sm_amount', 0) or 0),
+                buy_md_amount=float(row.get('buy_md_amount', 0) or 0),
+                buy_lg_amount=float(row.get('buy_lg_amount', 0) or 0),
+                buy_elg_amount=float(row.get('buy_elg_amount', 0) or 0),
+                net_amount=float(row.get('net_amount', 0) or 0),
+                buy_sm_amount_rate=float(row.get('buy_sm_amount_rate', 0) or 0),
+                buy_md_amount_rate=float(row.get('buy_md_amount_rate', 0) or 0),
+                buy_lg_amount_rate=float(row.get('buy_lg_amount_rate', 0) or 0),
+                buy_elg_amount_rate=float(row.get('buy_elg_amount_rate', 0) or 0)
+            )
+            money_flow_data.append(data)
+        return money_flow_data
+    
     def fetch_money_flow_data(self, ts_code: str, days: int = 30) -> List[MoneyFlowData]:
         """获取资金流向数据"""
         try:
-            # 计算日期范围
-            end_date = datetime.now().strftime('%Y%m%d')
-            start_date = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
-            
-            query = f"""
-            SELECT 
-                trade_date, ts_code, name, pct_change, close,
-                buy_sm_amount, buy_md_amount, buy_lg_amount, buy_elg_amount,
-                net_amount,
-                buy_sm_amount_rate, buy_md_amount_rate, buy_lg_amount_rate, buy_elg_amount_rate
-            FROM tu_moneyflow_dc
-            WHERE ts_code = '{ts_code}'
-            AND trade_date BETWEEN '{start_date}' AND '{end_date}'
-            ORDER BY trade_date DESC
-            """
-            
-            results = self.mysql_conn.execute_query(query)
-            
-            money_flow_data = []
-            for row in results:
-                data = MoneyFlowData(
-                    trade_date=str(row.get('trade_date', '')),
-                    ts_code=row.get('ts_code', ''),
-                    name=row.get('name', ''),
-                    pct_change=float(row.get('pct_change', 0) or 0),
-                    close=float(row.get('close', 0) or 0),
-                    buy_sm_amount=float(row.get('buy_sm_amount', 0) or 0),
-                    buy_md_amount=float(row.get('buy_md_amount', 0) or 0),
-                    buy_lg_amount=float(row.get('buy_lg_amount', 0) or 0),
-                    buy_elg_amount=float(row.get('buy_elg_amount', 0) or 0),
-                    net_amount=float(row.get('net_amount', 0) or 0),
-                    buy_sm_amount_rate=float(row.get('buy_sm_amount_rate', 0) or 0),
-                    buy_md_amount_rate=float(row.get('buy_md_amount_rate', 0) or 0),
-                    buy_lg_amount_rate=float(row.get('buy_lg_amount_rate', 0) or 0),
-                    buy_elg_amount_rate=float(row.get('buy_elg_amount_rate', 0) or 0)
-                )
-                money_flow_data.append(data)
+            query, params = self._money_flow_statement(ts_code, days)
+            results = self.mysql_conn.execute_query(query, params)
+            
+            money_flow_data = self._parse_money_flow_rows(results)
+            self.logger.info(f"获取到 {len(money_flow_data)} 条资金流向数据")
+            return money_flow_data
+            
+        except Exception as e:
+            self.logger.error(f"获取资金流向数据失败: {e}")
+            return []
+    
+    async def afetch_money_flow_data(self, ts_code: str, days: int = 30) -> List[MoneyFlowData]:
+        """fetch_money_flow_data的异步版本（使用异步连接池）"""
+        try:
+            query, params = self._money_flow_statement(ts_code, days)
+            results = await self.async_mysql_conn.execute_query(query, params)
             
+            money_flow_data = self._parse_money_flow_rows(results)
             self.logger.info(f"获取到 {len(money_flow_data)} 条资金流向数据")
             return money_flow_data
             
@@ -130,6 +189,92 @@ class MoneyFlowAnalyzer:
             self.logger.error(f"获取资金流向数据失败: {e}")
             return []
     
+    def _align_price_data(self, data: List[MoneyFlowData], bars: List[Dict]) -> Optional[List[Dict]]:
+        """
+        将行情按资金流向数据的交易日逐日对齐，缺日时返回None
+        SQL回退路径的价格列为Decimal，统一转为float以便numpy计算
+        """
+        bars_by_date = {str(bar['trade_date']).replace('-', '')[:8]: bar for bar in bars}
+        
+        price_data = []
+        for day_data in data:
+            bar = bars_by_date.get(str(day_data.trade_date).replace('-', '')[:8])
+            if bar is None:
+                return None
+            price_data.append({**bar, 'close': float(bar.get('close') or 0),
+                               'pct_chg': float(bar.get('pct_chg') or 0)})
+        return price_data
+    
+    def fetch_price_data(self, data: List[MoneyFlowData]) -> Optional[List[Dict]]:
+        """
+        从本地日线缓存获取与资金流向数据逐日对齐的行情，缓存未构建或缺日时返回None
+        调用方先经_cache_ready确认缓存可用；之后开始的后台同步不影响已加载数据的读取
+        """
+        if not data:
+            return None
+        
+        try:
+            cache = get_daily_bar_cache()
+            if cache.row_count == 0:
+                return None
+            
+            dates = [d.trade_date for d in data]
+            bars = cache.get_range(data[0].ts_code, min(dates), max(dates))
+            return self._align_price_data(data, bars)
+            
+        except Exception as e:
+            self.logger.warning(f"获取缓存行情数据失败: {e}")
+            return None
+    
+    def fetch_analysis_data(self, ts_code: str, days: int = 30) -> Tuple[List[MoneyFlowData], Optional[List[Dict]]]:
+        """
+        获取分析所需的资金流向和行情数据
+        
+        日线缓存可用时行情从缓存读取；否则两条相互独立的查询并发执行
+        
+        Returns:
+            (资金流向数据, 对齐的行情数据或None)
+        """
+        if self._cache_ready():
+            money_flow_data = self.fetch_money_flow_data(ts_code, days)
+            return money_flow_data, self.fetch_price_data(money_flow_data)
+        
+        try:
+            results = self.mysql_conn.execute_batch({
+                'money_flow': self._money_flow_statement(ts_code, days),
+                'price': self._price_statement(ts_code, days)
+            }, parallel=True)
+            
+            money_flow_data = self._parse_money_flow_rows(results['money_flow'])
+            self.logger.info(f"获取到 {len(money_flow_data)} 条资金流向数据")
+            return money_flow_data, self._align_price_data(money_flow_data, results['price'])
+            
+        except Exception as e:
+            self.logger.error(f"批量获取资金流向数据失败: {e}")
+            return [], None
+    
+    async def afetch_analysis_data(self, ts_code: str, days: int = 30) -> Tuple[List[MoneyFlowData], Optional[List[Dict]]]:
+        """fetch_analysis_data的异步版本：缓存不可用时两条查询在异步连接池上并发执行"""
+        # 缓存的首次加载和读取是同步调用，在线程池中执行，不阻塞事件循环
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, self._cache_ready):
+            money_flow_data = await self.afetch_money_flow_data(ts_code, days)
+            return money_flow_data, await loop.run_in_executor(None, self.fetch_price_data, money_flow_data)
+        
+        try:
+            results = await self.async_mysql_conn.execute_batch({
+                'money_flow': self._money_flow_statement(ts_code, days),
+                'price': self._price_statement(ts_code, days)
+            }, parallel=True)
+            
+            money_flow_data = self._parse_money_flow_rows(results['money_flow'])
+            self.logger.info(f"获取到 {len(money_flow_data)} 条资金流向数据")
+            return money_flow_data, self._align_price_data(money_flow_data, results['price'])
+            
+        except Exception as e:
+            self.logger.error(f"批量获取资金流向数据失败: {e}")
+            return [], None
+    
     def analyze_main_capital_flow(self, data: List[MoneyFlowData]) -> Dict[str, Any]:
         """分析主力资金净流入/流出 - 最高优先级"""
         if not data:
@@ -271,7 +416,8 @@ class MoneyFlowAnalyzer:
                     if len(price_changes) > 1:
                         correlation_matrix = np.corrcoef(super_large_flows, price_changes)
                         price_correlation = correlation_matrix[0, 1] if not np.isnan(correlation_matrix[0, 1]) else 0.0
-                except:
+                except Exception as e:
+                    self.logger.warning(f"超大单与股价相关性计算失败: {e}")
                     price_correlation = 0.0
             
             return {
@@ -428,77 +574,95 @@ class MoneyFlowAnalyzer:
             self.logger.error(f"生成综合评估失败: {e}")
             return "数据分析中，请稍后再试", "数据获取异常", "建议等待数据更新后再做判断"
     
+    def _analyze_fetched_data(self, ts_code: str, money_flow_data: List[MoneyFlowData],
+                              price_data: Optional[List[Dict]]) -> MoneyFlowAnalysisResult:
+        """基于已获取的数据执行资金流向分析"""
+        if not money_flow_data:
+            raise ValueError(f"未找到股票 {ts_code} 的资金流向数据")
+        
+        # 1. 主力资金分析 (最高优先级)
+        main_capital_analysis = self.analyze_main_capital_flow(money_flow_data)
+        
+        # 2. 超大单分析 (重点单独分析)
+        super_large_analysis = self.analyze_super_large_orders(money_flow_data, price_data)
+        
+        # 3. 四级资金分布分析
+        distribution_analysis = self.analyze_four_tier_distribution(money_flow_data)
+        
+        # 4. 生成综合评估
+        overall_assessment, risk_warning, investment_suggestion = self.generate_comprehensive_assessment(
+            main_capital_analysis, super_large_analysis, distribution_analysis
+        )
+        
+        # 5. 构建分析结果
+        result = MoneyFlowAnalysisResult(
+            # 主力资金
+            main_capital_net_flow=main_capital_analysis.get('main_capital_net_flow', 0),
+            main_capital_flow_trend=main_capital_analysis.get('main_capital_flow_trend', 'balanced'),
+            main_capital_flow_strength=main_capital_analysis.get('main_capital_flow_strength', 'weak'),
+            main_capital_flow_consistency=main_capital_analysis.get('main_capital_flow_consistency', 0),
+            
+            # 超大单
+            super_large_net_flow=super_large_analysis.get('super_large_net_flow', 0),
+            super_large_buy_ratio=super_large_analysis.get('super_large_buy_ratio', 0.5),
+            super_large_frequency=super_large_analysis.get('super_large_frequency', 0),
+            super_large_vs_price_correlation=super_large_analysis.get('super_large_vs_price_correlation', 0),
+            super_large_behavior_pattern=super_large_analysis.get('super_large_behavior_pattern', 'uncertain'),
+            super_large_dominance=super_large_analysis.get('super_large_dominance', 0),
+            
+            # 四级分布
+            fund_distribution=distribution_analysis,
+            
+            # 综合评估
+            overall_assessment=overall_assessment,
+            risk_warning=risk_warning,
+            investment_suggestion=investment_suggestion
+        )
+        
+        self.logger.info(f"资金流向分析完成: {ts_code}")
+        return result
+    
+    def _failed_analysis_result(self, error: Exception) -> MoneyFlowAnalysisResult:
+        """构造分析失败时的空结果"""
+        # 返回空的分析结果
+        return MoneyFlowAnalysisResult(
+            main_capital_net_flow=0,
+            main_capital_flow_trend='unknown',
+            main_capital_flow_strength='unknown',
+            main_capital_flow_consistency=0,
+            super_large_net_flow=0,
+            super_large_buy_ratio=0.5,
+            super_large_frequency=0,
+            super_large_vs_price_correlation=0,
+            super_large_behavior_pattern='unknown',
+            super_large_dominance=0,
+            fund_distribution={},
+            overall_assessment=f"分析失败: {str(error)}",
+            risk_warning="数据获取异常",
+            investment_suggestion="建议联系系统管理员"
+        )
+    
     def analyze_money_flow(self, ts_code: str, days: int = 30) -> MoneyFlowAnalysisResult:
         """执行完整的资金流向分析"""
         try:
             self.logger.info(f"开始分析 {ts_code} 的资金流向（{days}天）")
+            money_flow_data, price_data = self.fetch_analysis_data(ts_code, days)
+            return self._analyze_fetched_data(ts_code, money_flow_data, price_data)
             
-            # 1. 获取数据
-            money_flow_data = self.fetch_money_flow_data(ts_code, days)
-            if not money_flow_data:
-                raise ValueError(f"未找到股票 {ts_code} 的资金流向数据")
-            
-            # 2. 主力资金分析 (最高优先级)
-            main_capital_analysis = self.analyze_main_capital_flow(money_flow_data)
-            
-            # 3. 超大单分析 (重点单独分析)
-            super_large_analysis = self.analyze_super_large_orders(money_flow_data)
-            
-            # 4. 四级资金分布分析
-            distribution_analysis = self.analyze_four_tier_distribution(money_flow_data)
-            
-            # 5. 生成综合评估
-            overall_assessment, risk_warning, investment_suggestion = self.generate_comprehensive_assessment(
-                main_capital_analysis, super_large_analysis, distribution_analysis
-            )
-            
-            # 6. 构建分析结果
-            result = MoneyFlowAnalysisResult(
-                # 主力资金
-                main_capital_net_flow=main_capital_analysis.get('main_capital_net_flow', 0),
-                main_capital_flow_trend=main_capital_analysis.get('main_capital_flow_trend', 'balanced'),
-                main_capital_flow_strength=main_capital_analysis.get('main_capital_flow_strength', 'weak'),
-                main_capital_flow_consistency=main_capital_analysis.get('main_capital_flow_consistency', 0),
-                
-                # 超大单
-                super_large_net_flow=super_large_analysis.get('super_large_net_flow', 0),
-                super_large_buy_ratio=super_large_analysis.get('super_large_buy_ratio', 0.5),
-                super_large_frequency=super_large_analysis.get('super_large_frequency', 0),
-                super_large_vs_price_correlation=super_large_analysis.get('super_large_vs_price_correlation', 0),
-                super_large_behavior_pattern=super_large_analysis.get('super_large_behavior_pattern', 'uncertain'),
-                super_large_dominance=super_large_analysis.get('super_large_dominance', 0),
-                
-                # 四级分布
-                fund_distribution=distribution_analysis,
-                
-                # 综合评估
-                overall_assessment=overall_assessment,
-                risk_warning=risk_warning,
-                investment_suggestion=investment_suggestion
-            )
-            
-            self.logger.info(f"资金流向分析完成: {ts_code}")
-            return result
+        except Exception as e:
+            self.logger.error(f"资金流向分析失败: {e}")
+            return self._failed_analysis_result(e)
+    
+    async def aanalyze_money_flow(self, ts_code: str, days: int = 30) -> MoneyFlowAnalysisResult:
+        """analyze_money_flow的异步版本：数据获取走异步连接池，分析计算在本地完成"""
+        try:
+            self.logger.info(f"开始分析 {ts_code} 的资金流向（{days}天）")
+            money_flow_data, price_data = await self.afetch_analysis_data(ts_code, days)
+            return self._analyze_fetched_data(ts_code, money_flow_data, price_data)
             
         except Exception as e:
             self.logger.error(f"资金流向分析失败: {e}")
-            # 返回空的分析结果
-            return MoneyFlowAnalysisResult(
-                main_capital_net_flow=0,
-                main_capital_flow_trend='unknown',
-                main_capital_flow_strength='unknown',
-                main_capital_flow_consistency=0,
-                super_large_net_flow=0,
-                super_large_buy_ratio=0.5,
-                super_large_frequency=0,
-                super_large_vs_price_correlation=0,
-                super_large_behavior_pattern='unknown',
-                super_large_dominance=0,
-                fund_distribution={},
-                overall_assessment=f"分析失败: {str(e)}",
-                risk_warning="数据获取异常",
-                investment_suggestion="建议联系系统管理员"
-            )
+            return self._failed_analysis_result(e)
 
 
 def format_money_flow_report(result: MoneyFlowAnalysisResult, ts_code: str) -> str:
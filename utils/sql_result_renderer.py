@@ -0,0 +1,190 @@
+"""
+SQL结果渲染器
+根据列元数据将SQL查询结果行确定性地格式化为中文答案（单位换算、百分比、日期），
+替代额外的LLM翻译调用
+"""
+import re
+from datetime import datetime, date
+from decimal import Decimal
+from typing import List, Dict, Any, Optional
+
+
+class SQLResultRenderer:
+    """SQL结果中文渲染器"""
+
+    # 列名 -> (中文名称, 单位类型, 基础单位换算到元/手的倍数)
+    # 单位类型: price=价格(元)、percent=百分比、money=金额、volume=成交量(手)、date=日期、text=文本、number=普通数值
+    COLUMN_META = {
+        'ts_code': ('股票代码', 'text', 1),
+        'name': ('股票名称', 'text', 1),
+        'trade_date': ('交易日期', 'date', 1),
+        'ann_date': ('公告日期', 'date', 1),
+        'end_date': ('报告期', 'date', 1),
+        'open': ('开盘价', 'price', 1),
+        'high': ('最高价', 'price', 1),
+        'low': ('最低价', 'price', 1),
+        'close': ('收盘价', 'price', 1),
+        'pre_close': ('昨收价', 'price', 1),
+        'change': ('涨跌额', 'price', 1),
+        'pct_chg': ('涨跌幅', 'percent', 1),
+        'pct_change': ('涨跌幅', 'percent', 1),
+        'turnover_rate': ('换手率', 'percent', 1),
+        'vol': ('成交量', 'volume', 1),
+        'amount': ('成交额', 'money', 1000),          # tushare日线成交额单位为千元
+        'total_mv': ('总市值', 'money', 10000),       # 万元
+        'circ_mv': ('流通市值', 'money', 10000),      # 万元
+        'pe': ('市盈率', 'number', 1),
+        'pe_ttm': ('市盈率(TTM)', 'number', 1),
+        'pb': ('市净率', 'number', 1),
+        'net_amount': ('净流入', 'money', 10000),     # 资金流向表单位为万元
+        'buy_elg_amount': ('超大单买入', 'money', 10000),
+        'buy_lg_amount': ('大单买入', 'money', 10000),
+        'buy_md_amount': ('中单买入', 'money', 10000),
+        'buy_sm_amount': ('小单买入', 'money', 10000),
+        'total_revenue': ('营业总收入', 'money', 1),
+        'revenue': ('营业收入', 'money', 1),
+        'n_income': ('净利润', 'money', 1),
+        'n_income_attr_p': ('归母净利润', 'money', 1),
+        'total_assets': ('总资产', 'money', 1),
+        'total_liab': ('总负债', 'money', 1),
+        'roe': ('净资产收益率', 'percent', 1),
+        'roa': ('总资产收益率', 'percent', 1),
+        'debt_to_assets': ('资产负债率', 'percent', 1),
+        'title': ('公告标题', 'text', 1),
+    }
+
+    # 每行开头用于标识主体的列，不在明细中重复
+    SUBJECT_COLUMNS = ('name', 'ts_code', 'trade_date', 'ann_date', 'end_date')
+
+    def __init__(self, column_comments: Optional[Dict[str, str]] = None, max_rows: int = 20):
+        """
+        Args:
+            column_comments: 列名 -> 数据库列注释，用于未内置元数据的列
+            max_rows: 最多渲染的行数
+        """
+        self.column_comments = column_comments or {}
+        self.max_rows = max_rows
+
+    @classmethod
+    def from_schema_info(cls, schema_info: Dict[str, Any], **kwargs) -> 'SQLResultRenderer':
+        """从SQLAgent的schema信息构建渲染器"""
+        comments = {}
+        for info in schema_info.values():
+            for col in (info or {}).get('columns', []):
+                comment = (col.get('COLUMN_COMMENT') or '').strip()
+                if comment and col['COLUMN_NAME'] not in comments:
+                    comments[col['COLUMN_NAME']] = comment
+        return cls(column_comments=comments, **kwargs)
+
+    def _label(self, column: str) -> str:
+        if column in self.COLUMN_META:
+            return self.COLUMN_META[column][0]
+        return self.column_comments.get(column, column)
+
+    def _unit_type(self, column: str) -> str:
+        if column in self.COLUMN_META:
+            return self.COLUMN_META[column][1]
+        if column.endswith('_rate') or column.startswith('pct_'):
+            return 'percent'
+        if column.endswith('_date'):
+            return 'date'
+        return 'number'
+
+    @staticmethod
+    def format_money(yuan: float) -> str:
+        """金额（元）转换为亿元/万元/元"""
+        if abs(yuan) >= 1e8:
+            return f"{yuan / 1e8:.2f}亿元"
+        if abs(yuan) >= 1e4:
+            return f"{yuan / 1e4:.2f}万元"
+        return f"{yuan:.2f}元"
+
+    @staticmethod
+    def format_date(value: Any) -> str:
+        """日期转换为YYYY年MM月DD日"""
+        if isinstance(value, (datetime, date)):
+            return value.strftime('%Y年%m月%d日')
+        digits = re.sub(r'\D', '', str(value))
+        if len(digits) == 8:
+            return f"{digits[:4]}年{digits[4:6]}月{digits[6:8]}日"
+        return str(value)
+
+    def format_value(self, column: str, value: Any) -> str:
+        """按列元数据格式化单个值"""
+        if value is None:
+            return "N/A"
+
+        unit_type = self._unit_type(column)
+        if unit_type == 'date':
+            return self.format_date(value)
+        if unit_type == 'text' or isinstance(value, str):
+            return str(value)
+
+        if isinstance(value, Decimal):
+            value = float(value)
+        if not isinstance(value, (int, float)):
+            return str(value)
+
+        if unit_type == 'price':
+            return f"{value:.2f}元"
+        if unit_type == 'percent':
+            return f"{value:.2f}%"
+        if unit_type == 'money':
+            multiplier = self.COLUMN_META.get(column, (None, None, 1))[2]
+            return self.format_money(value * multiplier)
+        if unit_type == 'volume':
+            return f"{value / 1e4:.2f}万手" if abs(value) >= 1e4 else f"{value:.0f}手"
+        if isinstance(value, float):
+            return f"{value:.2f}"
+        return str(value)
+
+    def _subject(self, row: Dict[str, Any]) -> str:
+        parts = []
+        if row.get('name') and row.get('ts_code'):
+            parts.append(f"{row['name']}（{row['ts_code']}）")
+        elif row.get('name') or row.get('ts_code'):
+            parts.append(str(row.get('name') or row.get('ts_code')))
+        for column in ('trade_date', 'ann_date', 'end_date'):
+            if row.get(column) is not None:
+                parts.append(f"在{self.format_date(row[column])}" if column == 'trade_date'
+                             else f"{self._label(column)}{self.format_date(row[column])}")
+                break
+        return "".join(parts)
+
+    def render_row(self, row: Dict[str, Any]) -> str:
+        """渲染单行结果"""
+        subject = self._subject(row)
+        details = [
+            f"{self._label(column)}{self.format_value(column, value)}"
+            for column, value in row.items()
+            if column not in self.SUBJECT_COLUMNS
+        ]
+        if subject and details:
+            return f"{subject}的数据为：{'，'.join(details)}"
+        return subject or "，".join(details)
+
+    def render(self, rows: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        渲染查询结果
+
+        Args:
+            rows: 查询结果行（字典列表）
+
+        Returns:
+            中文答案；无结果行时返回None
+        """
+        if rows is None:
+            return None
+        if not rows:
+            return "根据查询条件，数据库中暂无相关数据。"
+
+        if len(rows) == 1:
+            return self.render_row(rows[0]) + "。"
+
+        shown = rows[:self.max_rows]
+        lines = [f"共查询到{len(rows)}条记录："]
+        for i, row in enumerate(shown, 1):
+            lines.append(f"{i}. {self.render_row(row)}")
+        if len(rows) > len(shown):
+            lines.append(f"（仅显示前{len(shown)}条）")
+        return "\n".join(lines)
@@ -239,6 +239,25 @@ class StockCodeMapper:
         # 从反向缓存查找
         with self._cache_lock:
             return self._reverse_cache.get(ts_code, ts_code)
+    
+    def mentions_stock(self, text: str) -> bool:
+        """
+        判断文本是否提到具体股票（名称、简称、代码）
+        
+        Args:
+            text: 用户问题等文本
+            
+        Returns:
+            是否包含缓存中的任一股票名称或代码
+        """
+        if not text:
+            return False
+            
+        if self._is_cache_expired():
+            self._refresh_cache()
+            
+        with self._cache_lock:
+            return any(key in text for key in self._cache if len(key) >= 2)
 
 
 # 单例实例
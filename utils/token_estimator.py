@@ -0,0 +1,21 @@
+"""
+提示词token估算
+无需加载LLM分词器的快速估算：中日韩字符按1个token计，其余字符按约4个字符1个token计
+"""
+import re
+from typing import Iterable
+
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """估算单段文本的token数"""
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def estimate_total_tokens(texts: Iterable[str]) -> int:
+    """估算多段文本的token总数"""
+    return sum(estimate_tokens(text) for text in texts)